@@ -0,0 +1,368 @@
+"""
+Checkpoint Management for Inventory Management Agents
+
+Keeps the model directory small and fast to scan:
+- CheckpointManager keeps only the top-k checkpoints by evaluation score plus
+  the latest one, deleting the rest as training goes
+- Every kept model is also exported as an inference-only .npz (policy MLP
+  weights, optionally float16) that loads with NumPy alone
+- A manifest.json in the model directory lists every model with its
+  algorithm, files, timesteps and score, so tools can discover models without
+  opening any zip
+
+Existing model directories can be converted with:
+    python agents/checkpoints.py --models-dir models --top-k 3
+"""
+
+import os
+import sys
+import re
+import json
+import time
+import argparse
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference.policy import MANIFEST_NAME, POLICY_FORMAT, NumpyPolicy, detect_algo, read_manifest
+
+
+# Checkpoint files written by CheckpointCallback / CheckpointManager
+CHECKPOINT_PATTERN = re.compile(r'^(?P<prefix>.+)_(?P<timesteps>\d+)_steps\.zip$')
+
+
+def export_policy(model, path, float16=False, timesteps=None):
+    """
+    Export the inference-only policy weights of a model to an .npz file.
+    
+    The file holds w0, b0, w1, b1, ... (weights as (in, out)) and a JSON
+    'metadata' entry with the algorithm, layer count and activations. DQN
+    exports the Q-network (action = argmax of the output); PPO exports the
+    actor network (output = action logits).
+    
+    Args:
+        model: Trained DQN or PPO model
+        path: Output .npz path
+        float16: Store weights as float16 to halve the file size (default: False)
+        timesteps: Training timesteps to record (default: model.num_timesteps)
+    
+    Returns:
+        str: Path of the written file
+    """
+    policy = NumpyPolicy.from_model(model)
+    dtype = np.float16 if float16 else np.float32
+    
+    arrays = {}
+    for i, (weight, bias) in enumerate(zip(policy.weights, policy.biases)):
+        arrays[f"w{i}"] = weight.astype(dtype)
+        arrays[f"b{i}"] = bias.astype(dtype)
+    
+    metadata = {
+        'format': POLICY_FORMAT,
+        'algo': policy.algo,
+        'n_layers': len(policy.weights),
+        'activations': policy.activations,
+        'obs_dim': int(policy.obs_dim),
+        'n_actions': int(policy.n_actions),
+        'float16': bool(float16),
+        'timesteps': int(model.num_timesteps if timesteps is None else timesteps)
+    }
+    arrays['metadata'] = np.array(json.dumps(metadata))
+    
+    # Write to a temporary file first so readers never see a partial export
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+    return path
+
+
+
+def update_manifest(models_dir, entries=None, remove=()):
+    """
+    Add, replace or remove manifest entries (read-modify-write, atomic replace).
+    
+    Args:
+        models_dir: Model directory
+        entries: Dict of model name -> entry to add or replace
+        remove: Model names to drop
+    
+    Returns:
+        dict: Updated manifest
+    """
+    manifest = read_manifest(models_dir)
+    for name in remove:
+        manifest['models'].pop(name, None)
+    manifest['models'].update(entries or {})
+    manifest['updated'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    
+    path = os.path.join(models_dir, MANIFEST_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def register_model(model, zip_path, kind='final', score=None, float16=False):
+    """
+    Export the policy of a saved model and add it to its directory's manifest.
+    
+    Args:
+        model: Trained DQN or PPO model already saved to zip_path
+        zip_path: Path of the saved .zip
+        kind: Manifest kind, e.g. 'final' or 'best' (default: 'final')
+        score: Evaluation score, if known
+        float16: Export float16 weights (default: False)
+    
+    Returns:
+        dict: Manifest entry
+    """
+    models_dir, name = os.path.split(os.path.splitext(zip_path)[0])
+    policy_path = os.path.join(models_dir, name + '.npz')
+    export_policy(model, policy_path, float16=float16)
+    
+    entry = {
+        'algo': type(model).__name__,
+        'kind': kind,
+        'zip': name + '.zip',
+        'policy': name + '.npz',
+        'timesteps': int(model.num_timesteps),
+        'score': score,
+        'float16': bool(float16)
+    }
+    update_manifest(models_dir or '.', {name: entry})
+    return entry
+
+
+class CheckpointManager:
+    """
+    Saves checkpoints and keeps only the top-k by evaluation score plus the latest.
+    
+    A checkpoint is saved first (save) and scored later (set_score), so it
+    works with both synchronous and asynchronous evaluation. Unscored
+    checkpoints are never pruned.
+    """
+    
+    def __init__(self, save_dir, name_prefix, top_k=3, float16=False, verbose=1):
+        """
+        Initialize the checkpoint manager.
+        
+        Args:
+            save_dir: Directory for checkpoints and the manifest
+            name_prefix: Checkpoint file prefix, e.g. 'ppo_checkpoint'
+            top_k: Number of best-scoring checkpoints to keep (default: 3)
+            float16: Export float16 policy weights (default: False)
+            verbose: Print saves and deletions (default: 1)
+        """
+        self.save_dir = save_dir
+        self.name_prefix = name_prefix
+        self.top_k = top_k
+        self.float16 = float16
+        self.verbose = verbose
+        
+        # Model name -> manifest entry, for this prefix only
+        self.entries = {}
+        
+        os.makedirs(save_dir, exist_ok=True)
+    
+    def _name(self, timesteps):
+        """Model name of the checkpoint at a timestep."""
+        return f"{self.name_prefix}_{timesteps}_steps"
+    
+    def save(self, model, timesteps=None):
+        """
+        Save a checkpoint (full zip plus policy export) without a score yet.
+        
+        Args:
+            model: Model to save
+            timesteps: Training timesteps (default: model.num_timesteps)
+        
+        Returns:
+            str: Path of the saved .zip
+        """
+        timesteps = int(model.num_timesteps if timesteps is None else timesteps)
+        name = self._name(timesteps)
+        zip_path = os.path.join(self.save_dir, name + '.zip')
+        
+        model.save(zip_path)
+        export_policy(model, os.path.join(self.save_dir, name + '.npz'),
+                      float16=self.float16, timesteps=timesteps)
+        
+        self.entries[name] = {
+            'algo': type(model).__name__,
+            'kind': 'checkpoint',
+            'zip': name + '.zip',
+            'policy': name + '.npz',
+            'timesteps': timesteps,
+            'score': None,
+            'float16': bool(self.float16)
+        }
+        update_manifest(self.save_dir, {name: self.entries[name]})
+        return zip_path
+    
+    def set_score(self, timesteps, score):
+        """
+        Record the evaluation score of a checkpoint and prune the rest.
+        
+        Args:
+            timesteps: Timesteps of a checkpoint passed to save()
+            score: Mean evaluation reward
+        """
+        name = self._name(int(timesteps))
+        if name not in self.entries:
+            return
+        self.entries[name]['score'] = float(score)
+        self.prune()
+    
+    def keep(self):
+        """
+        Names of the checkpoints to keep: top-k scored, the latest and all unscored.
+        
+        Returns:
+            set: Model names
+        """
+        scored = [n for n, e in self.entries.items() if e['score'] is not None]
+        scored.sort(key=lambda n: self.entries[n]['score'], reverse=True)
+        
+        keep = set(scored[:self.top_k])
+        keep.update(n for n, e in self.entries.items() if e['score'] is None)
+        if self.entries:
+            keep.add(max(self.entries, key=lambda n: self.entries[n]['timesteps']))
+        return keep
+    
+    def prune(self):
+        """
+        Delete checkpoints outside keep() and update the manifest.
+        
+        Returns:
+            list: Names of the deleted checkpoints
+        """
+        keep = self.keep()
+        removed = [name for name in self.entries if name not in keep]
+        
+        for name in removed:
+            for key in ('zip', 'policy'):
+                path = os.path.join(self.save_dir, self.entries[name][key])
+                if os.path.exists(path):
+                    os.remove(path)
+            del self.entries[name]
+            if self.verbose >= 1:
+                print(f"Removed checkpoint {name}")
+        
+        update_manifest(self.save_dir,
+                        {name: self.entries[name] for name in keep},
+                        remove=removed)
+        return removed
+    
+    def best(self):
+        """
+        Get the best-scoring checkpoint entry.
+        
+        Returns:
+            dict or None: Manifest entry, or None if nothing is scored yet
+        """
+        scored = [e for e in self.entries.values() if e['score'] is not None]
+        return max(scored, key=lambda e: e['score']) if scored else None
+
+
+def _evaluate_zip(zip_path, algo, demand_tapes):
+    """Load a saved model and score it on demand tapes (for the CLI)."""
+    from stable_baselines3 import DQN, PPO
+    from agents.eval_callback import evaluate_on_tapes
+    
+    model = {'DQN': DQN, 'PPO': PPO}[algo].load(zip_path, device='cpu')
+    return model, float(np.mean(evaluate_on_tapes(model, demand_tapes)))
+
+
+def rebuild_directory(models_dir, top_k=3, float16=False, n_eval_episodes=500, dry_run=False):
+    """
+    Score, prune and export an existing model directory, and write its manifest.
+    
+    Checkpoints (<prefix>_<timesteps>_steps.zip) are scored on the fixed
+    evaluation demand tapes and pruned to the top-k plus the latest per prefix.
+    Every remaining zip gets a policy export and a manifest entry.
+    
+    Args:
+        models_dir: Model directory
+        top_k: Checkpoints to keep per prefix (default: 3)
+        float16: Export float16 weights (default: False)
+        n_eval_episodes: Demand tapes used for scoring (default: 500)
+        dry_run: Only print what would be deleted (default: False)
+    
+    Returns:
+        dict: Manifest (the current one if dry_run)
+    """
+    from agents.eval_callback import EVAL_TAPE_SEED
+    from env.batched_env import draw_demand_tapes
+    
+    demand_tapes = draw_demand_tapes(n_eval_episodes, seed=EVAL_TAPE_SEED)
+    managers = {}
+    
+    for file_name in sorted(os.listdir(models_dir)):
+        if not file_name.endswith('.zip'):
+            continue
+        zip_path = os.path.join(models_dir, file_name)
+        algo = detect_algo(zip_path)
+        model, score = _evaluate_zip(zip_path, algo, demand_tapes)
+        print(f"{file_name}: {algo}, score {score:.2f}")
+        
+        match = CHECKPOINT_PATTERN.match(file_name)
+        if match is None:
+            if not dry_run:
+                register_model(model, zip_path, kind='best' if file_name.startswith('best') else 'final',
+                               score=score, float16=float16)
+            continue
+        
+        prefix, timesteps = match.group('prefix'), int(match.group('timesteps'))
+        manager = managers.setdefault(prefix, CheckpointManager(models_dir, prefix, top_k, float16))
+        name = manager._name(timesteps)
+        manager.entries[name] = {
+            'algo': algo,
+            'kind': 'checkpoint',
+            'zip': name + '.zip',
+            'policy': name + '.npz',
+            'timesteps': timesteps,
+            'score': score,
+            'float16': bool(float16)
+        }
+        if not dry_run:
+            export_policy(model, os.path.join(models_dir, name + '.npz'), float16=float16, timesteps=timesteps)
+    
+    for prefix, manager in managers.items():
+        if dry_run:
+            removed = sorted(set(manager.entries) - manager.keep())
+            print(f"{prefix}: would keep {len(manager.entries) - len(removed)}, delete {len(removed)}: {removed}")
+        else:
+            manager.prune()
+    
+    return read_manifest(models_dir)
+
+
+def main():
+    """Prune and export an existing model directory."""
+    parser = argparse.ArgumentParser(description='Prune checkpoints and export inference-only policies')
+    parser.add_argument('--models-dir', type=str, default=None,
+                        help='Model directory (default: models/)')
+    parser.add_argument('--top-k', type=int, default=3,
+                        help='Checkpoints to keep per prefix, besides the latest (default: 3)')
+    parser.add_argument('--float16', action='store_true',
+                        help='Export float16 policy weights')
+    parser.add_argument('--eval-episodes', type=int, default=500,
+                        help='Demand tapes used to score checkpoints (default: 500)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Only print what would be deleted')
+    
+    args = parser.parse_args()
+    
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    models_dir = args.models_dir or os.path.join(os.path.dirname(script_dir), "models")
+    
+    manifest = rebuild_directory(models_dir, args.top_k, args.float16, args.eval_episodes, args.dry_run)
+    if not args.dry_run:
+        print(f"\nManifest with {len(manifest['models'])} models written to "
+              f"{os.path.join(models_dir, MANIFEST_NAME)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+Shared Training Utilities for Inventory Management
+
+Helpers used by both train_dqn.py and train_ppo.py:
+- Environment factories with per-environment seeding
+- Vectorized environment construction (dummy, subproc or batched backend)
+- Rollout/update scaling so hyperparameters mean the same thing for any n_envs
+- A throughput callback reporting env steps/sec and updates/sec
+"""
+
+import os
+import sys
+import math
+import time
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.monitor import Monitor
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecEnv, VecMonitor
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from env.inventory_env import InventoryEnv
+from env.batched_env import BatchedInventoryEnv
+
+
+# Environment configuration shared by training and evaluation
+ENV_KWARGS = {
+    'initial_inventory': 100,
+    'max_capacity': 100,
+    'episode_length': 30,
+    'trend_strength': 5
+}
+
+VEC_BACKENDS = ['dummy', 'subproc', 'batched']
+
+
+def make_env(rank=0, seed=None):
+    """
+    Create a factory for one wrapped inventory environment.
+    
+    The factory form is what DummyVecEnv/SubprocVecEnv expect; call the
+    returned function to get the environment itself.
+    
+    Args:
+        rank: Index of the environment within its vectorized env (default: 0)
+        seed: Base random seed; the environment is seeded with seed + rank
+              so every sub-environment draws a different demand sequence
+    
+    Returns:
+        callable: Function that creates a Monitor-wrapped InventoryEnv
+    """
+    def _init():
+        env = Monitor(InventoryEnv(**ENV_KWARGS))
+        if seed is not None:
+            env.reset(seed=seed + rank)
+            env.action_space.seed(seed + rank)
+        return env
+    
+    return _init
+
+
+class BatchedVecEnv(VecEnv):
+    """
+    Stable-Baselines3 VecEnv adapter around BatchedInventoryEnv.
+    
+    Finished environments are reset automatically, with the final observation
+    stored in info['terminal_observation'] as SB3 expects. Per-step info dicts
+    only carry the keys SB3 needs; wrap in VecMonitor for episode statistics.
+    """
+    
+    def __init__(self, n_envs, seed=None, **env_kwargs):
+        """
+        Initialize the adapter.
+        
+        Args:
+            n_envs: Number of environments in the batch
+            seed: Random seed for the batch demand generator
+            **env_kwargs: Environment parameters (default: ENV_KWARGS)
+        """
+        kwargs = dict(ENV_KWARGS)
+        kwargs.update(env_kwargs)
+        self.env = BatchedInventoryEnv(n_envs, seed=seed, **kwargs)
+        self.actions = None
+        
+        super().__init__(n_envs, self.env.observation_space, self.env.action_space)
+    
+    def reset(self):
+        """
+        Reset all environments.
+        
+        Returns:
+            np.array: (n_envs, 3) observations
+        """
+        # The batch shares one generator, so only the first sub-env seed is used
+        obs = self.env.reset(seed=self._seeds[0])
+        self._reset_seeds()
+        self._reset_options()
+        self.reset_infos = [{} for _ in range(self.num_envs)]
+        return obs
+    
+    def step_async(self, actions):
+        """Store the actions for the next step_wait call."""
+        self.actions = actions
+    
+    def step_wait(self):
+        """
+        Step all environments and reset the ones that finished.
+        
+        Returns:
+            tuple: (observations, rewards, dones, infos)
+        """
+        obs, rewards, dones, _ = self.env.step(self.actions)
+        infos = [{} for _ in range(self.num_envs)]
+        
+        done_indices = np.nonzero(dones)[0]
+        if len(done_indices):
+            for i in done_indices:
+                infos[i]['terminal_observation'] = obs[i]
+                infos[i]['TimeLimit.truncated'] = False
+            obs = self.env.reset(indices=done_indices)
+        
+        return obs, rewards, dones, infos
+    
+    def close(self):
+        """Nothing to release; the batch lives in this process."""
+        pass
+    
+    def _indices_count(self, indices):
+        """Number of sub-environments addressed by an indices argument."""
+        return len(self._get_indices(indices))
+    
+    def get_attr(self, attr_name, indices=None):
+        """Get an attribute of the batch, once per addressed sub-environment."""
+        if attr_name == 'render_mode':
+            return [None] * self._indices_count(indices)
+        return [getattr(self.env, attr_name)] * self._indices_count(indices)
+    
+    def set_attr(self, attr_name, value, indices=None):
+        """Set an attribute on the batch (shared by all sub-environments)."""
+        setattr(self.env, attr_name, value)
+    
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        """Call a method of the batch once and return its result per sub-environment."""
+        result = getattr(self.env, method_name)(*method_args, **method_kwargs)
+        return [result] * self._indices_count(indices)
+    
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        """The batched environment is never wrapped by gymnasium wrappers."""
+        return [False] * self._indices_count(indices)
+
+
+def make_vec_env(n_envs=1, backend='dummy', seed=None):
+    """
+    Create a vectorized training environment.
+    
+    Args:
+        n_envs: Number of parallel environments (default: 1)
+        backend: 'dummy' (sequential, in-process), 'subproc' (one process per
+                 env) or 'batched' (NumPy-vectorized, in-process)
+        seed: Base random seed; sub-environment i gets seed + i
+    
+    Returns:
+        VecEnv: Vectorized environment with episode statistics
+    """
+    if n_envs < 1:
+        raise ValueError(f"n_envs must be at least 1, got {n_envs}")
+    
+    if backend == 'dummy':
+        return DummyVecEnv([make_env(rank, seed) for rank in range(n_envs)])
+    elif backend == 'subproc':
+        return SubprocVecEnv([make_env(rank, seed) for rank in range(n_envs)])
+    elif backend == 'batched':
+        return VecMonitor(BatchedVecEnv(n_envs, seed=seed))
+    
+    raise ValueError(f"Unknown vec backend '{backend}', expected one of {VEC_BACKENDS}")
+
+
+def scale_rollout(n_steps, batch_size, n_envs):
+    """
+    Split a PPO rollout across n_envs while keeping its total size constant.
+    
+    SB3 collects n_steps per environment, so a rollout holds n_steps * n_envs
+    transitions. The per-env step count is divided by n_envs and, when the
+    original rollout was a whole number of minibatches, rounded so it still is.
+    
+    Args:
+        n_steps: Rollout size for a single environment
+        batch_size: Minibatch size
+        n_envs: Number of parallel environments
+    
+    Returns:
+        tuple: (n_steps per environment, batch_size)
+    """
+    if n_envs == 1:
+        return n_steps, batch_size
+    
+    if n_steps % batch_size == 0:
+        # Smallest per-env step count whose rollout is a whole number of minibatches
+        step = batch_size // math.gcd(batch_size, n_envs)
+        n_steps_per_env = max(step, int(round(n_steps / n_envs / step)) * step)
+    else:
+        n_steps_per_env = max(1, int(round(n_steps / n_envs)))
+    
+    rollout = n_steps_per_env * n_envs
+    return n_steps_per_env, min(batch_size, rollout)
+
+
+def scale_train_freq(train_freq, gradient_steps, n_envs):
+    """
+    Keep DQN's gradient updates per collected transition constant for n_envs.
+    
+    SB3 counts train_freq in env.step calls, each of which collects n_envs
+    transitions, so the update schedule is rescaled to the same ratio.
+    
+    Args:
+        train_freq: Env steps between updates for a single environment
+        gradient_steps: Gradient steps per update for a single environment
+        n_envs: Number of parallel environments
+    
+    Returns:
+        tuple: (train_freq, gradient_steps) for the vectorized env
+    """
+    if n_envs == 1:
+        return train_freq, gradient_steps
+    
+    updates_per_transition = gradient_steps / train_freq
+    scaled_freq = max(1, int(round(train_freq / n_envs)))
+    scaled_steps = max(1, int(round(updates_per_transition * scaled_freq * n_envs)))
+    return scaled_freq, scaled_steps
+
+
+class ThroughputCallback(BaseCallback):
+    """
+    Measure training throughput and print a report when training ends.
+    
+    Reports env steps/sec and gradient updates/sec over the whole run, plus
+    the rate of rollout collection alone (excluding training and callbacks).
+    """
+    
+    def __init__(self, verbose=1):
+        super().__init__(verbose)
+        self.report = {}
+        self._start_time = None
+        self._start_steps = 0
+        self._start_updates = 0
+        self._rollout_start = None
+        self._rollout_time = 0.0
+    
+    def _gradient_steps(self):
+        """Gradient steps taken so far (PPO counts epochs, not minibatches)."""
+        n_updates = getattr(self.model, '_n_updates', 0)
+        if hasattr(self.model, 'n_epochs'):
+            rollout = self.model.n_steps * self.model.n_envs
+            return n_updates * math.ceil(rollout / self.model.batch_size)
+        return n_updates
+    
+    def _on_training_start(self):
+        self._start_time = time.perf_counter()
+        self._start_steps = self.num_timesteps
+        self._start_updates = self._gradient_steps()
+        self._rollout_time = 0.0
+    
+    def _on_rollout_start(self):
+        self._rollout_start = time.perf_counter()
+    
+    def _on_rollout_end(self):
+        if self._rollout_start is not None:
+            self._rollout_time += time.perf_counter() - self._rollout_start
+            self._rollout_start = None
+    
+    def _on_step(self):
+        return True
+    
+    def _on_training_end(self):
+        elapsed = max(time.perf_counter() - self._start_time, 1e-9)
+        steps = self.num_timesteps - self._start_steps
+        updates = self._gradient_steps() - self._start_updates
+        
+        self.report = {
+            'n_envs': self.model.n_envs,
+            'wall_time_s': elapsed,
+            'env_steps': steps,
+            'gradient_updates': updates,
+            'env_steps_per_sec': steps / elapsed,
+            'updates_per_sec': updates / elapsed,
+            'collection_steps_per_sec': steps / self._rollout_time if self._rollout_time > 0 else 0.0
+        }
+        
+        if self.verbose:
+            print_throughput_report(self.report)
+
+
+def print_throughput_report(report):
+    """
+    Print a throughput report produced by ThroughputCallback.
+    
+    Args:
+        report: ThroughputCallback.report dict
+    """
+    print("\n" + "=" * 60)
+    print("Training Throughput")
+    print("=" * 60)
+    print(f"Environments: {report['n_envs']}")
+    print(f"Wall time: {report['wall_time_s']:.1f} s")
+    print(f"Env steps: {report['env_steps']} ({report['env_steps_per_sec']:.0f} steps/sec)")
+    print(f"Rollout collection: {report['collection_steps_per_sec']:.0f} steps/sec")
+    print(f"Gradient updates: {report['gradient_updates']} ({report['updates_per_sec']:.1f} updates/sec)")
+    print("=" * 60)
@@ -0,0 +1,312 @@
+"""
+Batched In-Training Evaluation for Inventory Management
+
+Replacement for Stable-Baselines3's EvalCallback that:
+- Evaluates on a fixed bank of pre-drawn demand tapes (common random numbers),
+  so every checkpoint faces exactly the same demand and differences between
+  checkpoints reflect the policy rather than sampling noise
+- Simulates all evaluation episodes at once with BatchedInventoryEnv; the
+  policy network runs in NumPy on the whole batch, once per simulated day
+- Can evaluate asynchronously: the model is saved as a checkpoint and scored
+  in a separate process while training continues
+- Can hand every evaluated checkpoint and its score to a CheckpointManager,
+  which keeps only the best ones
+"""
+
+import os
+import sys
+import shutil
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.common import ENV_KWARGS
+from agents.checkpoints import export_policy, register_model, update_manifest
+from env.batched_env import BatchedInventoryEnv, draw_demand_tapes
+from inference.policy import NumpyPolicy
+
+
+# Seed of the default demand bank, shared by every run so results stay comparable
+EVAL_TAPE_SEED = 2024
+
+
+def evaluate_on_tapes(model, demand_tapes, deterministic=True, env_kwargs=None):
+    """
+    Run one episode per demand tape, all in a single batch.
+    
+    Args:
+        model: DQN or PPO model (run as a NumpyPolicy), or anything with predict
+        demand_tapes: (n_episodes, episode_length) demand from draw_demand_tapes
+        deterministic: Use deterministic actions (default: True)
+        env_kwargs: Environment parameters (default: ENV_KWARGS)
+    
+    Returns:
+        np.array: (n_episodes,) total reward of each episode
+    """
+    if type(model).__name__ in ('DQN', 'PPO'):
+        # Skips torch dispatch on every step (DQN's epsilon-greedy exploration is not reproduced)
+        model = NumpyPolicy.from_model(model)
+    
+    kwargs = dict(ENV_KWARGS)
+    kwargs.update(env_kwargs or {})
+    kwargs['episode_length'] = demand_tapes.shape[1]
+    
+    env = BatchedInventoryEnv(len(demand_tapes), demand_tape=demand_tapes, **kwargs)
+    obs = env.reset()
+    episode_rewards = np.zeros(len(demand_tapes))
+    
+    for _ in range(env.episode_length):
+        actions, _ = model.predict(obs, deterministic=deterministic)
+        obs, rewards, _, _ = env.step(actions)
+        episode_rewards += rewards
+    
+    return episode_rewards
+
+
+def _init_eval_worker():
+    """Keep the evaluation process from competing with training for cores."""
+    import torch
+    torch.set_num_threads(1)
+
+
+def _evaluate_checkpoint(algo_name, model_path, demand_tapes, deterministic, env_kwargs, float16=False):
+    """
+    Load a saved checkpoint and evaluate it (runs in the evaluation process).
+    
+    Also exports the checkpoint's policy next to it, if not already exported.
+    
+    Returns:
+        np.array: (n_episodes,) total reward of each episode
+    """
+    from stable_baselines3 import DQN, PPO
+    
+    model = {'DQN': DQN, 'PPO': PPO}[algo_name].load(model_path, device='cpu')
+    policy_path = os.path.splitext(model_path)[0] + '.npz'
+    if not os.path.exists(policy_path):
+        export_policy(model, policy_path, float16=float16)
+    return evaluate_on_tapes(model, demand_tapes, deterministic, env_kwargs)
+
+
+class BatchedEvalCallback(BaseCallback):
+    """
+    Periodically evaluate the model on a fixed bank of demand tapes.
+    
+    Exposes the same results as EvalCallback (last_mean_reward,
+    best_mean_reward, evaluations_* lists, evaluations.npz and best_model.zip),
+    so it can be used in its place.
+    """
+    
+    def __init__(self,
+                 eval_freq=5000,
+                 n_eval_episodes=500,
+                 seed=EVAL_TAPE_SEED,
+                 best_model_save_path=None,
+                 log_path=None,
+                 deterministic=True,
+                 async_eval=False,
+                 checkpoint_manager=None,
+                 env_kwargs=None,
+                 verbose=1):
+        """
+        Initialize the callback.
+        
+        Args:
+            eval_freq: Evaluate every eval_freq calls of the callback, i.e. every
+                       eval_freq * n_envs timesteps (default: 5000)
+            n_eval_episodes: Number of demand tapes / episodes per evaluation (default: 500)
+            seed: Seed of the demand bank (default: EVAL_TAPE_SEED)
+            best_model_save_path: Directory for best_model.zip (default: None)
+            log_path: Directory for evaluations.npz (default: None)
+            deterministic: Use deterministic actions (default: True)
+            async_eval: Evaluate saved checkpoints in a separate process (default: False)
+            checkpoint_manager: CheckpointManager that saves a checkpoint at every
+                                evaluation and prunes by score (default: None)
+            env_kwargs: Environment parameters (default: ENV_KWARGS)
+            verbose: Print evaluation results (default: 1)
+        """
+        super().__init__(verbose)
+        self.eval_freq = eval_freq
+        self.n_eval_episodes = n_eval_episodes
+        self.seed = seed
+        self.best_model_save_path = best_model_save_path
+        self.log_path = log_path
+        self.deterministic = deterministic
+        self.async_eval = async_eval
+        self.checkpoint_manager = checkpoint_manager
+        self.env_kwargs = dict(ENV_KWARGS)
+        self.env_kwargs.update(env_kwargs or {})
+        
+        self.demand_tapes = draw_demand_tapes(
+            n_eval_episodes,
+            episode_length=self.env_kwargs['episode_length'],
+            trend_strength=self.env_kwargs['trend_strength'],
+            seed=seed
+        )
+        
+        self.best_mean_reward = -np.inf
+        self.last_mean_reward = -np.inf
+        self.evaluations_timesteps = []
+        self.evaluations_results = []
+        self.evaluations_length = []
+        
+        self._executor = None
+        self._pending = []
+    
+    def _init_callback(self):
+        if self.best_model_save_path is not None:
+            os.makedirs(self.best_model_save_path, exist_ok=True)
+        if self.log_path is not None:
+            os.makedirs(self.log_path, exist_ok=True)
+        
+        if self.async_eval and self._executor is None:
+            context = multiprocessing.get_context('spawn')
+            self._executor = ProcessPoolExecutor(max_workers=1, mp_context=context,
+                                                 initializer=_init_eval_worker)
+    
+    def _float16(self):
+        """Whether policy exports use float16 weights (follows the checkpoint manager)."""
+        return self.checkpoint_manager is not None and self.checkpoint_manager.float16
+    
+    def _checkpoint_dir(self):
+        """Directory for checkpoints waiting to be evaluated asynchronously."""
+        base = self.log_path or self.best_model_save_path or '.'
+        return os.path.join(base, 'eval_checkpoints')
+    
+    def _on_step(self):
+        if self._pending:
+            self._collect(block=False)
+        
+        if self.eval_freq > 0 and self.n_calls % self.eval_freq == 0:
+            path = None
+            if self.checkpoint_manager is not None:
+                path = self.checkpoint_manager.save(self.model, self.num_timesteps)
+            
+            if self.async_eval:
+                if path is None:
+                    os.makedirs(self._checkpoint_dir(), exist_ok=True)
+                    path = os.path.join(self._checkpoint_dir(), f"eval_{self.num_timesteps}_steps.zip")
+                    self.model.save(path)
+                future = self._executor.submit(
+                    _evaluate_checkpoint, type(self.model).__name__, path,
+                    self.demand_tapes, self.deterministic, self.env_kwargs, self._float16()
+                )
+                self._pending.append((self.num_timesteps, path, future))
+            else:
+                episode_rewards = evaluate_on_tapes(self.model, self.demand_tapes,
+                                                    self.deterministic, self.env_kwargs)
+                self._record(self.num_timesteps, episode_rewards, checkpoint_path=path)
+        
+        return True
+    
+    def _collect(self, block):
+        """
+        Record finished asynchronous evaluations, in submission order.
+        
+        Args:
+            block: Wait for all pending evaluations to finish
+        """
+        while self._pending:
+            timesteps, path, future = self._pending[0]
+            if not block and not future.done():
+                break
+            self._pending.pop(0)
+            self._record(timesteps, future.result(), checkpoint_path=path)
+            if self.checkpoint_manager is None:
+                for temp_path in (path, os.path.splitext(path)[0] + '.npz'):
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+    
+    def _record(self, timesteps, episode_rewards, checkpoint_path=None):
+        """
+        Log one evaluation and keep the best model.
+        
+        Args:
+            timesteps: Training timesteps at which the model was evaluated
+            episode_rewards: (n_episodes,) total reward per demand tape
+            checkpoint_path: Saved model that was evaluated (async mode or with a
+                             checkpoint manager)
+        """
+        mean_reward = float(np.mean(episode_rewards))
+        std_reward = float(np.std(episode_rewards))
+        # Standard error of the mean; with fixed tapes, checkpoint differences are paired
+        sem_reward = std_reward / np.sqrt(len(episode_rewards))
+        self.last_mean_reward = mean_reward
+        
+        self.evaluations_timesteps.append(timesteps)
+        self.evaluations_results.append(episode_rewards)
+        self.evaluations_length.append(np.full(len(episode_rewards), self.demand_tapes.shape[1]))
+        
+        if self.log_path is not None:
+            np.savez(
+                os.path.join(self.log_path, 'evaluations'),
+                timesteps=self.evaluations_timesteps,
+                results=self.evaluations_results,
+                ep_lengths=self.evaluations_length
+            )
+        
+        if self.verbose >= 1:
+            print(f"Eval num_timesteps={timesteps}, episode_reward={mean_reward:.2f} +/- {std_reward:.2f} "
+                  f"(sem {sem_reward:.2f}, {len(episode_rewards)} episodes)")
+        
+        self.logger.record("eval/mean_reward", mean_reward)
+        self.logger.record("eval/sem_reward", sem_reward)
+        self.logger.record("eval/timesteps", timesteps)
+        
+        if mean_reward > self.best_mean_reward:
+            if self.verbose >= 1:
+                print("New best mean reward!")
+            if self.best_model_save_path is not None:
+                self._save_best(timesteps, mean_reward, checkpoint_path)
+            self.best_mean_reward = mean_reward
+        
+        # Score after saving the best model: pruning may delete the checkpoint
+        if self.checkpoint_manager is not None:
+            self.checkpoint_manager.set_score(timesteps, mean_reward)
+    
+    def _save_best(self, timesteps, mean_reward, checkpoint_path=None):
+        """
+        Save best_model.zip and its policy export, and list it in the manifest.
+        
+        Args:
+            timesteps: Training timesteps of the best model
+            mean_reward: Its evaluation score
+            checkpoint_path: Saved .zip of the model, if any (copied instead of re-saving)
+        """
+        best_path = os.path.join(self.best_model_save_path, 'best_model.zip')
+        float16 = self._float16()
+        
+        if checkpoint_path is None:
+            self.model.save(best_path)
+            register_model(self.model, best_path, kind='best', score=mean_reward, float16=float16)
+            return
+        
+        shutil.copyfile(checkpoint_path, best_path)
+        policy_path = os.path.splitext(checkpoint_path)[0] + '.npz'
+        if os.path.exists(policy_path):
+            # Exported with the checkpoint (manager) or by the evaluation process (async)
+            shutil.copyfile(policy_path, os.path.join(self.best_model_save_path, 'best_model.npz'))
+            update_manifest(self.best_model_save_path, {'best_model': {
+                'algo': type(self.model).__name__,
+                'kind': 'best',
+                'zip': 'best_model.zip',
+                'policy': 'best_model.npz',
+                'timesteps': int(timesteps),
+                'score': mean_reward,
+                'float16': bool(float16)
+            }})
+        else:
+            register_model(self.model, best_path, kind='best', score=mean_reward, float16=float16)
+    
+    def _on_training_end(self):
+        if self._pending:
+            self._collect(block=True)
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            if os.path.isdir(self._checkpoint_dir()) and not os.listdir(self._checkpoint_dir()):
+                os.rmdir(self._checkpoint_dir())
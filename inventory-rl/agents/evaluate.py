@@ -14,13 +14,13 @@ import argparse
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from stable_baselines3 import DQN, PPO
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from env.inventory_env import InventoryEnv
-from utils.eoq import EOQBaseline
+from inference import load_policy
+from utils.eoq import EOQBaseline, tune_baseline
 from utils.heatmap import generate_heatmap_from_model
 
 # Set plotting style
@@ -33,10 +33,10 @@ def evaluate_model(model, env, num_episodes=10):
     Evaluate a trained model over multiple episodes.
     
     Args:
-        model: Trained Stable-Baselines3 model
+        model: Trained policy (NumpyPolicy or Stable-Baselines3 model)
         env: Gymnasium environment instance
         num_episodes: Number of episodes to evaluate (default: 10)
-        
+    
     Returns:
         dict: Evaluation metrics and episode data
     """
@@ -91,13 +91,13 @@ def evaluate_model(model, env, num_episodes=10):
 
 def evaluate_baseline(baseline, env, num_episodes=10):
     """
-    Evaluate EOQ baseline policy over multiple episodes.
+    Evaluate a classical baseline policy over multiple episodes.
     
     Args:
-        baseline: EOQBaseline policy instance
+        baseline: EOQBaseline or SSPolicy instance
         env: Gymnasium environment instance
         num_episodes: Number of episodes to evaluate (default: 10)
-        
+    
     Returns:
         dict: Evaluation metrics and episode data
     """
@@ -119,7 +119,7 @@ def evaluate_baseline(baseline, env, num_episodes=10):
         
         while not done:
             # Get action from baseline
-            action = baseline.get_discrete_action(env.inventory, env.max_capacity)
+            action = baseline.get_discrete_action(env.inventory, env.max_capacity, env.day_of_week)
             
             # Step environment
             obs, reward, terminated, truncated, info = env.step(action)
@@ -217,7 +217,7 @@ def plot_demand_supply_comparison(results, title, save_path):
     plt.close()
 
 
-def plot_reward_comparison(rl_results, baseline_results, save_path):
+def plot_reward_comparison(rl_results, baseline_results, save_path, baseline_label='EOQ Baseline'):
     """
     Plot reward comparison between RL agent and baseline.
     
@@ -225,19 +225,20 @@ def plot_reward_comparison(rl_results, baseline_results, save_path):
         rl_results: Results from RL agent
         baseline_results: Results from EOQ baseline
         save_path: Path to save the figure
+        baseline_label: Name of the baseline in the plot (default: 'EOQ Baseline')
     """
     fig, ax = plt.subplots(figsize=(10, 6))
     
     x = np.arange(2)
     rewards = [rl_results['mean_reward'], baseline_results['mean_reward']]
     stds = [rl_results['std_reward'], baseline_results['std_reward']]
-    labels = ['RL Agent', 'EOQ Baseline']
+    labels = ['RL Agent', baseline_label]
     colors = ['skyblue', 'lightcoral']
     
     bars = ax.bar(x, rewards, yerr=stds, capsize=5, color=colors, alpha=0.8, edgecolor='black')
     
     ax.set_ylabel('Mean Episode Reward', fontsize=12)
-    ax.set_title('RL Agent vs EOQ Baseline Performance', fontsize=14, fontweight='bold')
+    ax.set_title(f'RL Agent vs {baseline_label} Performance', fontsize=14, fontweight='bold')
     ax.set_xticks(x)
     ax.set_xticklabels(labels, fontsize=12)
     ax.grid(axis='y', alpha=0.3)
@@ -262,6 +263,8 @@ def main():
                         help='Model type to evaluate (default: dqn)')
     parser.add_argument('--episodes', type=int, default=10,
                         help='Number of episodes to evaluate (default: 10)')
+    parser.add_argument('--tune-baseline', action='store_true',
+                        help='Compare against an (s, S) baseline tuned by simulation instead of default EOQ')
     
     args = parser.parse_args()
     
@@ -285,11 +288,14 @@ def main():
         print("Please train a model first using train_dqn.py or train_ppo.py")
         return
     
+    # The policy network runs in NumPy; DQN vs PPO comes from the file, not --model
+    policy_path = os.path.splitext(model_path)[0] + ".npz"
+    if os.path.exists(policy_path):
+        model_path = policy_path
+    
     print(f"Loading model from {model_path}...")
-    if args.model == 'dqn':
-        model = DQN.load(model_path)
-    else:
-        model = PPO.load(model_path)
+    model = load_policy(model_path)
+    print(f"Loaded {model}")
     
     # Create environment
     env = InventoryEnv()
@@ -299,12 +305,17 @@ def main():
     
     print(f"\nRL Agent Mean Reward: {rl_results['mean_reward']:.2f} ± {rl_results['std_reward']:.2f}")
     
-    # Evaluate EOQ baseline
-    print("\nEvaluating EOQ baseline...")
-    baseline = EOQBaseline(avg_daily_demand=20, reorder_point=40)
+    # Evaluate the classical baseline
+    if args.tune_baseline:
+        print("\nTuning (s, S) baseline on simulated episodes...")
+        baseline = tune_baseline()['policy']
+    else:
+        baseline = EOQBaseline(avg_daily_demand=20, reorder_point=40)
+    
+    print(f"\nEvaluating baseline {baseline}...")
     baseline_results = evaluate_baseline(baseline, env, num_episodes=args.episodes)
     
-    print(f"EOQ Baseline Mean Reward: {baseline_results['mean_reward']:.2f} ± {baseline_results['std_reward']:.2f}")
+    print(f"Baseline Mean Reward: {baseline_results['mean_reward']:.2f} ± {baseline_results['std_reward']:.2f}")
     
     # Generate plots
     print("\nGenerating plots...")
@@ -324,7 +335,8 @@ def main():
     plot_reward_comparison(
         rl_results,
         baseline_results,
-        os.path.join(results_dir, "reward_comparison.png")
+        os.path.join(results_dir, "reward_comparison.png"),
+        baseline_label='Tuned (s, S) Baseline' if args.tune_baseline else 'EOQ Baseline'
     )
     
     # Generate heatmap
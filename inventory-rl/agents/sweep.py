@@ -0,0 +1,679 @@
+"""
+Hyperparameter Sweep Runner for Inventory Management
+
+Searches over the hyperparameters that train_dqn() / train_ppo() expose:
+- Grid, random or Sobol (quasi-random) sampling of a search space
+- Trials scheduled across a process pool, one torch thread per worker
+- Asynchronous successive halving (ASHA): every trial starts with a small
+  timestep budget and only the best 1/eta of each rung is trained further
+- Leaderboard written as CSV and JSON, plus a copy of the best model
+
+Runs fully offline on CPU.
+
+Usage:
+    python agents/sweep.py --algo ppo --search random --n-trials 16 --workers 4
+    python agents/sweep.py --algo dqn --search grid --space my_space.json
+"""
+
+import os
+import sys
+import csv
+import json
+import math
+import time
+import shutil
+import inspect
+import argparse
+import warnings
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.common import ENV_KWARGS, VEC_BACKENDS, make_vec_env, scale_rollout, scale_train_freq
+from agents.eval_callback import EVAL_TAPE_SEED, evaluate_on_tapes
+from env.batched_env import draw_demand_tapes
+from agents.checkpoints import export_policy, update_manifest
+from agents.train_dqn import train_dqn
+from agents.train_ppo import train_ppo
+
+
+# Training-script arguments that are run settings rather than hyperparameters
+RUN_ARGS = ('total_timesteps', 'n_envs', 'vec_backend', 'seed', 'eval_episodes', 'async_eval',
+            'keep_checkpoints', 'float16_export', 'progress_bar', 'save_path', 'log_path')
+
+# Default search spaces. A list is a set of choices; a dict is a distribution:
+# {'type': 'uniform' | 'loguniform' | 'int', 'low': ..., 'high': ..., 'num': grid points}
+DEFAULT_SPACES = {
+    'ppo': {
+        'learning_rate': {'type': 'loguniform', 'low': 1e-4, 'high': 1e-3},
+        'n_steps': [512, 1024, 2048],
+        'batch_size': [32, 64, 128],
+        'gamma': {'type': 'uniform', 'low': 0.9, 'high': 0.999},
+        'ent_coef': {'type': 'loguniform', 'low': 1e-4, 'high': 1e-2},
+        'clip_range': [0.1, 0.2, 0.3]
+    },
+    'dqn': {
+        'learning_rate': {'type': 'loguniform', 'low': 1e-4, 'high': 3e-3},
+        'batch_size': [32, 64, 128],
+        'gamma': {'type': 'uniform', 'low': 0.9, 'high': 0.999},
+        'exploration_fraction': {'type': 'uniform', 'low': 0.05, 'high': 0.3},
+        'target_update_interval': [250, 500, 1000],
+        'train_freq': [1, 4, 8]
+    }
+}
+
+
+def get_hyperparameters(algo):
+    """
+    Get the tunable hyperparameters of an algorithm and their defaults.
+    
+    Taken from the keyword arguments of train_dqn() / train_ppo(), so the
+    sweep always accepts exactly what the training scripts accept.
+    
+    Args:
+        algo: 'dqn' or 'ppo'
+    
+    Returns:
+        dict: Hyperparameter name -> default value
+    """
+    train_fn = {'dqn': train_dqn, 'ppo': train_ppo}[algo]
+    return {
+        name: param.default
+        for name, param in inspect.signature(train_fn).parameters.items()
+        if name not in RUN_ARGS
+    }
+
+
+def _to_python(value):
+    """Convert NumPy scalars to plain Python values (for JSON and SB3)."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _from_unit(spec, u):
+    """
+    Map a number in [0, 1) to a value of a search-space dimension.
+    
+    Args:
+        spec: List of choices or distribution dict
+        u: Position in the unit interval
+    
+    Returns:
+        Value of the dimension
+    """
+    if isinstance(spec, (list, tuple)):
+        return _to_python(spec[min(int(u * len(spec)), len(spec) - 1)])
+    
+    kind, low, high = spec.get('type', 'uniform'), spec['low'], spec['high']
+    if kind == 'uniform':
+        return float(low + u * (high - low))
+    elif kind == 'loguniform':
+        return float(math.exp(math.log(low) + u * (math.log(high) - math.log(low))))
+    elif kind == 'int':
+        return int(min(low + math.floor(u * (high - low + 1)), high))
+    
+    raise ValueError(f"Unknown distribution type '{kind}'")
+
+
+def _grid_points(spec):
+    """
+    Get the values of a search-space dimension used by grid search.
+    
+    Args:
+        spec: List of choices or distribution dict (uses spec['num'] points, default 3)
+    
+    Returns:
+        list: Grid values
+    """
+    if isinstance(spec, (list, tuple)):
+        return [_to_python(v) for v in spec]
+    
+    num = spec.get('num', 3)
+    kind, low, high = spec.get('type', 'uniform'), spec['low'], spec['high']
+    if kind == 'loguniform':
+        points = np.geomspace(low, high, num)
+    else:
+        points = np.linspace(low, high, num)
+    
+    if kind == 'int':
+        return sorted(set(int(round(p)) for p in points))
+    return [float(p) for p in points]
+
+
+def validate_space(algo, space):
+    """
+    Check that every dimension of a search space is a hyperparameter of algo.
+    
+    Args:
+        algo: 'dqn' or 'ppo'
+        space: Search space dict
+    
+    Raises:
+        ValueError: If the space names an unknown hyperparameter or is empty
+    """
+    allowed = get_hyperparameters(algo)
+    unknown = sorted(set(space) - set(allowed))
+    if unknown:
+        raise ValueError(f"Unknown {algo} hyperparameters {unknown}; expected a subset of {sorted(allowed)}")
+    if not space:
+        raise ValueError("Search space is empty")
+
+
+def sample_configs(space, search='random', n_trials=16, seed=None):
+    """
+    Draw hyperparameter configurations from a search space.
+    
+    Args:
+        space: Dict of hyperparameter name -> list of choices or distribution dict
+        search: 'grid' (every combination), 'random' or 'sobol' (default: 'random')
+        n_trials: Number of configurations for random/Sobol search (default: 16)
+        seed: Random seed for the sampler
+    
+    Returns:
+        list: Hyperparameter dicts, one per trial
+    """
+    names = sorted(space)
+    
+    if search == 'grid':
+        axes = [_grid_points(space[name]) for name in names]
+        combos = np.array(np.meshgrid(*[np.arange(len(a)) for a in axes], indexing='ij')).reshape(len(names), -1).T
+        return [{name: axes[d][i] for d, (name, i) in enumerate(zip(names, combo))} for combo in combos]
+    
+    if search == 'random':
+        units = np.random.default_rng(seed).random((n_trials, len(names)))
+    elif search == 'sobol':
+        try:
+            from scipy.stats import qmc
+        except ImportError:
+            raise ImportError("Sobol search requires scipy (pip install scipy)")
+        sampler = qmc.Sobol(d=len(names), scramble=True, seed=seed)
+        with warnings.catch_warnings():
+            # Sobol balance properties need a power-of-two count; any count is still valid
+            warnings.simplefilter('ignore')
+            units = sampler.random(n_trials)
+    else:
+        raise ValueError(f"Unknown search '{search}', expected 'grid', 'random' or 'sobol'")
+    
+    return [{name: _from_unit(space[name], u) for name, u in zip(names, row)} for row in units]
+
+
+def asha_rungs(min_timesteps, max_timesteps, eta=3):
+    """
+    Compute the timestep budget of each ASHA rung.
+    
+    Args:
+        min_timesteps: Budget of the first rung
+        max_timesteps: Budget of the last rung
+        eta: Reduction factor between rungs (default: 3)
+    
+    Returns:
+        list: Increasing cumulative timestep budgets, ending with max_timesteps
+    """
+    rungs = []
+    budget = min_timesteps
+    while budget < max_timesteps:
+        rungs.append(int(budget))
+        budget *= eta
+    rungs.append(int(max_timesteps))
+    return rungs
+
+
+def rollout_size(algo, params, n_envs=1):
+    """
+    Get the timesteps a trial collects between two updates.
+    
+    SB3 only stops learn() at the end of a rollout (PPO) or train_freq
+    collection (DQN), after training on it, so budgets should be multiples of
+    this (see align_budget).
+    
+    Args:
+        algo: 'dqn' or 'ppo'
+        params: Hyperparameter dict (missing ones use the training-script defaults)
+        n_envs: Number of training environments (default: 1)
+    
+    Returns:
+        int: Timesteps per rollout, summed over all environments
+    """
+    kwargs = get_hyperparameters(algo)
+    kwargs.update(params)
+    
+    if algo == 'ppo':
+        n_steps, _ = scale_rollout(kwargs['n_steps'], kwargs['batch_size'], n_envs)
+    else:
+        n_steps, _ = scale_train_freq(kwargs['train_freq'], kwargs['gradient_steps'], n_envs)
+    return n_steps * n_envs
+
+
+def align_budget(budget, unit):
+    """
+    Round a timestep budget to the nearest whole number of rollouts.
+    
+    Each trial is aligned to its own rollout size, so a budget moves by at most
+    half a rollout (except that every trial trains for at least one rollout).
+    
+    Args:
+        budget: Nominal cumulative timestep budget
+        unit: Rollout size of the trial (see rollout_size)
+    
+    Returns:
+        int: Budget that learn() stops at exactly
+    """
+    return max(1, int(budget / unit + 0.5)) * unit
+
+
+def _init_worker():
+    """Limit each worker process to a single torch/BLAS thread."""
+    os.environ['OMP_NUM_THREADS'] = '1'
+    os.environ['MKL_NUM_THREADS'] = '1'
+    import torch
+    torch.set_num_threads(1)
+
+
+def build_model(algo, params, env, n_envs, seed=None):
+    """
+    Create an untrained model with the given hyperparameters.
+    
+    Applies the same n_envs scaling as the training scripts.
+    
+    Args:
+        algo: 'dqn' or 'ppo'
+        params: Hyperparameter dict (missing ones use the training-script defaults)
+        env: Vectorized training environment
+        n_envs: Number of environments in env
+        seed: Random seed
+    
+    Returns:
+        BaseAlgorithm: DQN or PPO model
+    """
+    from stable_baselines3 import DQN, PPO
+    
+    kwargs = get_hyperparameters(algo)
+    kwargs.update(params)
+    
+    if algo == 'ppo':
+        kwargs['n_steps'], kwargs['batch_size'] = scale_rollout(kwargs['n_steps'], kwargs['batch_size'], n_envs)
+        return PPO("MlpPolicy", env, seed=seed, verbose=0, **kwargs)
+    
+    kwargs['train_freq'], kwargs['gradient_steps'] = scale_train_freq(kwargs['train_freq'], kwargs['gradient_steps'], n_envs)
+    return DQN("MlpPolicy", env, seed=seed, verbose=0, **kwargs)
+
+
+def run_trial(job):
+    """
+    Train one trial up to its rung budget and evaluate it (runs in a worker).
+    
+    A trial promoted to a later rung resumes from the model (and, for DQN, the
+    replay buffer) saved at the end of its previous rung. The saved model is
+    scored after learn() returns, on the same bank of demand tapes for every
+    trial, so rung comparisons are paired.
+    
+    Args:
+        job: Dict with algo, trial_id, rung, budget, params, trial_dir,
+             n_envs, vec_backend, seed and n_eval_episodes
+    
+    Returns:
+        dict: Job result with mean/std eval reward, timesteps and wall time
+    """
+    from stable_baselines3 import DQN, PPO
+    
+    start_time = time.perf_counter()
+    algo, n_envs = job['algo'], job['n_envs']
+    model_path = os.path.join(job['trial_dir'], 'model.zip')
+    buffer_path = os.path.join(job['trial_dir'], 'replay_buffer.pkl')
+    
+    train_env = make_vec_env(n_envs, job['vec_backend'], job['seed'])
+    
+    if os.path.exists(model_path):
+        model = {'dqn': DQN, 'ppo': PPO}[algo].load(model_path, env=train_env)
+        if os.path.exists(buffer_path):
+            model.load_replay_buffer(buffer_path)
+    else:
+        os.makedirs(job['trial_dir'], exist_ok=True)
+        model = build_model(algo, job['params'], train_env, n_envs, job['seed'])
+    
+    # Budgets are whole rollouts (see align_budget), so learn() stops exactly at the budget
+    steps = job['budget'] - model.num_timesteps
+    if steps > 0:
+        model.learn(total_timesteps=steps, reset_num_timesteps=False)
+    
+    demand_tapes = draw_demand_tapes(
+        job['n_eval_episodes'],
+        episode_length=ENV_KWARGS['episode_length'],
+        trend_strength=ENV_KWARGS['trend_strength'],
+        seed=EVAL_TAPE_SEED
+    )
+    episode_rewards = evaluate_on_tapes(model, demand_tapes, deterministic=True)
+    np.savez(os.path.join(job['trial_dir'], 'evaluations'), timesteps=[model.num_timesteps],
+             results=[episode_rewards], ep_lengths=[np.full(len(demand_tapes), demand_tapes.shape[1])])
+    
+    model.save(model_path)
+    export_policy(model, os.path.join(job['trial_dir'], 'policy.npz'))
+    if hasattr(model, 'replay_buffer') and model.replay_buffer is not None:
+        model.save_replay_buffer(buffer_path)
+    
+    train_env.close()
+    
+    return {
+        'trial_id': job['trial_id'],
+        'rung': job['rung'],
+        'timesteps': int(model.num_timesteps),
+        'mean_reward': float(np.mean(episode_rewards)),
+        'std_reward': float(np.std(episode_rewards)),
+        'wall_time_s': time.perf_counter() - start_time
+    }
+
+
+class SweepRunner:
+    """
+    Schedules sweep trials across a process pool with asynchronous successive halving.
+    
+    Whenever a worker is free, the scheduler promotes a trial that is in the
+    top 1/eta of its rung (checking the highest rung first); if none can be
+    promoted, it starts the next new trial. With a single rung this is a
+    plain parallel sweep.
+    """
+    
+    def __init__(self,
+                 algo,
+                 configs,
+                 out_dir,
+                 rungs,
+                 eta=3,
+                 workers=None,
+                 n_envs=1,
+                 vec_backend='dummy',
+                 seed=0,
+                 n_eval_episodes=500):
+        """
+        Initialize the sweep.
+        
+        Args:
+            algo: 'dqn' or 'ppo'
+            configs: List of hyperparameter dicts, one per trial
+            out_dir: Directory for trial models, leaderboard and best model
+            rungs: Cumulative timestep budget of each rung (see asha_rungs); every
+                   trial trains to the nearest whole number of its own rollouts
+            eta: ASHA reduction factor (default: 3)
+            workers: Number of worker processes (default: CPU count)
+            n_envs: Training environments per trial (default: 1)
+            vec_backend: Vectorized env backend per trial (default: 'dummy')
+            seed: Base seed; trial i uses seed + 1000 * i (default: 0)
+            n_eval_episodes: Episodes (fixed demand tapes) per evaluation (default: 500)
+        """
+        self.algo = algo
+        self.configs = configs
+        self.out_dir = out_dir
+        self.eta = eta
+        self.workers = workers or os.cpu_count() or 1
+        self.n_envs = n_envs
+        self.rungs = rungs
+        self.vec_backend = vec_backend
+        self.seed = seed
+        self.n_eval_episodes = n_eval_episodes
+        
+        # rung index -> {trial_id: result}, and trials already promoted out of each rung
+        self.results = [{} for _ in self.rungs]
+        self.promoted = [set() for _ in self.rungs]
+        self.next_trial = 0
+        
+        self.rollouts = [rollout_size(algo, params, n_envs) for params in configs]
+        too_long = sum(unit > 2 * rungs[0] for unit in self.rollouts)
+        if too_long:
+            print(f"Warning: {too_long} trial(s) collect more than twice the first rung budget "
+                  f"({rungs[0]} timesteps) per rollout; they train for one rollout in that rung")
+    
+    def _trial_dir(self, trial_id):
+        """Directory holding a trial's model and evaluations."""
+        return os.path.join(self.out_dir, 'trials', f"trial_{trial_id:03d}")
+    
+    def _make_job(self, trial_id, rung):
+        """Build the job dict for one trial at one rung."""
+        return {
+            'algo': self.algo,
+            'trial_id': trial_id,
+            'rung': rung,
+            'budget': align_budget(self.rungs[rung], self.rollouts[trial_id]),
+            'params': self.configs[trial_id],
+            'trial_dir': self._trial_dir(trial_id),
+            'n_envs': self.n_envs,
+            'vec_backend': self.vec_backend,
+            'seed': self.seed + 1000 * trial_id,
+            'n_eval_episodes': self.n_eval_episodes
+        }
+    
+    def _next_job(self):
+        """
+        Pick the next job: a promotion if one is allowed, otherwise a new trial.
+        
+        Returns:
+            dict or None: Job, or None if there is nothing to run right now
+        """
+        for rung in reversed(range(len(self.rungs) - 1)):
+            completed = self.results[rung]
+            n_top = len(completed) // self.eta
+            if n_top == 0:
+                continue
+            ranked = sorted(completed, key=lambda t: completed[t]['mean_reward'], reverse=True)
+            for trial_id in ranked[:n_top]:
+                if trial_id not in self.promoted[rung]:
+                    self.promoted[rung].add(trial_id)
+                    return self._make_job(trial_id, rung + 1)
+        
+        if self.next_trial < len(self.configs):
+            self.next_trial += 1
+            return self._make_job(self.next_trial - 1, 0)
+        return None
+    
+    def run(self):
+        """
+        Run the sweep until no trial can be started or promoted.
+        
+        Returns:
+            list: Leaderboard rows, best first
+        """
+        os.makedirs(self.out_dir, exist_ok=True)
+        start_time = time.perf_counter()
+        
+        print("=" * 60)
+        print(f"{self.algo.upper()} Hyperparameter Sweep")
+        print("=" * 60)
+        print(f"Trials: {len(self.configs)}")
+        print(f"Rungs (timesteps): {self.rungs}")
+        print(f"Workers: {self.workers}")
+        print("=" * 60)
+        
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                 initializer=_init_worker) as pool:
+            running = set()
+            while True:
+                while len(running) < self.workers:
+                    job = self._next_job()
+                    if job is None:
+                        break
+                    running.add(pool.submit(run_trial, job))
+                
+                if not running:
+                    break
+                
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    self.results[result['rung']][result['trial_id']] = result
+                    print(f"Trial {result['trial_id']:3d} | rung {result['rung']} | "
+                          f"{result['timesteps']:7d} steps | reward {result['mean_reward']:7.2f} "
+                          f"± {result['std_reward']:.2f} | {result['wall_time_s']:.1f} s")
+        
+        self.wall_time_s = time.perf_counter() - start_time
+        leaderboard = self.leaderboard()
+        self.save(leaderboard)
+        return leaderboard
+    
+    def leaderboard(self):
+        """
+        Rank trials by the highest rung they reached, then by eval reward.
+        
+        Returns:
+            list: One row dict per trial that ran, best first
+        """
+        rows = []
+        for trial_id, params in enumerate(self.configs):
+            reached = [r for r in range(len(self.rungs)) if trial_id in self.results[r]]
+            if not reached:
+                continue
+            result = self.results[reached[-1]][trial_id]
+            rows.append({
+                'trial_id': trial_id,
+                'rung': reached[-1],
+                'timesteps': result['timesteps'],
+                'mean_reward': result['mean_reward'],
+                'std_reward': result['std_reward'],
+                'status': 'completed' if reached[-1] == len(self.rungs) - 1 else 'stopped',
+                'params': params
+            })
+        
+        rows.sort(key=lambda row: (row['rung'], row['mean_reward']), reverse=True)
+        for rank, row in enumerate(rows, start=1):
+            row['rank'] = rank
+        return rows
+    
+    def save(self, leaderboard):
+        """
+        Write leaderboard.csv/json, copy the best model and drop replay buffers.
+        
+        Args:
+            leaderboard: Rows from leaderboard()
+        """
+        param_names = sorted(set().union(*(row['params'] for row in leaderboard))) if leaderboard else []
+        csv_path = os.path.join(self.out_dir, 'leaderboard.csv')
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['rank', 'trial_id', 'rung', 'timesteps', 'mean_reward', 'std_reward', 'status'] + param_names)
+            for row in leaderboard:
+                writer.writerow([row['rank'], row['trial_id'], row['rung'], row['timesteps'],
+                                 f"{row['mean_reward']:.4f}", f"{row['std_reward']:.4f}", row['status']]
+                                + [row['params'].get(name, '') for name in param_names])
+        
+        json_path = os.path.join(self.out_dir, 'leaderboard.json')
+        with open(json_path, 'w') as f:
+            json.dump({
+                'algo': self.algo,
+                'rungs': self.rungs,
+                'eta': self.eta,
+                'n_envs': self.n_envs,
+                'vec_backend': self.vec_backend,
+                'seed': self.seed,
+                'n_eval_episodes': self.n_eval_episodes,
+                'wall_time_s': self.wall_time_s,
+                'leaderboard': leaderboard
+            }, f, indent=2)
+        
+        # Replay buffers are only needed to resume trials
+        for trial_id in range(len(self.configs)):
+            buffer_path = os.path.join(self._trial_dir(trial_id), 'replay_buffer.pkl')
+            if os.path.exists(buffer_path):
+                os.remove(buffer_path)
+        
+        print("\n" + "=" * 60)
+        print("Leaderboard")
+        print("=" * 60)
+        for row in leaderboard[:10]:
+            params = ", ".join(f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}"
+                               for k, v in sorted(row['params'].items()))
+            print(f"{row['rank']:3d}. trial {row['trial_id']:3d} | {row['timesteps']:7d} steps | "
+                  f"reward {row['mean_reward']:7.2f} | {params}")
+        
+        if leaderboard:
+            best = leaderboard[0]
+            best_path = os.path.join(self.out_dir, 'best_model.zip')
+            shutil.copyfile(os.path.join(self._trial_dir(best['trial_id']), 'model.zip'), best_path)
+            shutil.copyfile(os.path.join(self._trial_dir(best['trial_id']), 'policy.npz'),
+                            os.path.join(self.out_dir, 'best_model.npz'))
+            update_manifest(self.out_dir, {'best_model': {
+                'algo': self.algo.upper(),
+                'kind': 'best',
+                'zip': 'best_model.zip',
+                'policy': 'best_model.npz',
+                'timesteps': best['timesteps'],
+                'score': best['mean_reward'],
+                'float16': False
+            }})
+            print(f"\nBest model (trial {best['trial_id']}) saved to {best_path}")
+        
+        print(f"Leaderboard saved to {csv_path} and {json_path}")
+        print(f"Sweep wall time: {self.wall_time_s:.1f} s")
+        print("=" * 60)
+
+
+def main():
+    """Main sweep function."""
+    parser = argparse.ArgumentParser(description='Hyperparameter sweep for the inventory agents')
+    parser.add_argument('--algo', type=str, default='ppo', choices=['dqn', 'ppo'],
+                        help='Algorithm to tune (default: ppo)')
+    parser.add_argument('--search', type=str, default='random', choices=['grid', 'random', 'sobol'],
+                        help='Search strategy (default: random)')
+    parser.add_argument('--space', type=str, default=None,
+                        help='JSON file with the search space (default: built-in space)')
+    parser.add_argument('--n-trials', type=int, default=16,
+                        help='Number of trials for random/Sobol search (default: 16)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes (default: CPU count)')
+    parser.add_argument('--min-timesteps', type=int, default=10000,
+                        help='Timestep budget of the first ASHA rung (default: 10000)')
+    parser.add_argument('--max-timesteps', type=int, default=100000,
+                        help='Timestep budget of fully trained trials (default: 100000)')
+    parser.add_argument('--eta', type=int, default=3,
+                        help='ASHA reduction factor (default: 3)')
+    parser.add_argument('--no-asha', action='store_true',
+                        help='Train every trial to --max-timesteps without early stopping')
+    parser.add_argument('--n-envs', type=int, default=1,
+                        help='Training environments per trial (default: 1)')
+    parser.add_argument('--vec-backend', type=str, default='dummy', choices=VEC_BACKENDS,
+                        help='Vectorized env backend per trial (default: dummy)')
+    parser.add_argument('--eval-episodes', type=int, default=500,
+                        help='Episodes (fixed demand tapes) per evaluation (default: 500)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Base random seed (default: 0)')
+    parser.add_argument('--out', type=str, default=None,
+                        help='Output directory (default: results/sweeps/<algo>)')
+    
+    args = parser.parse_args()
+    
+    # Get the absolute path to the project root
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(script_dir)
+    out_dir = args.out or os.path.join(project_root, "results", "sweeps", args.algo)
+    
+    if args.space:
+        with open(args.space) as f:
+            space = json.load(f)
+    else:
+        space = DEFAULT_SPACES[args.algo]
+    validate_space(args.algo, space)
+    
+    configs = sample_configs(space, args.search, args.n_trials, args.seed)
+    if args.no_asha:
+        rungs = [args.max_timesteps]
+    else:
+        rungs = asha_rungs(args.min_timesteps, args.max_timesteps, args.eta)
+    
+    runner = SweepRunner(
+        args.algo,
+        configs,
+        out_dir,
+        rungs,
+        eta=args.eta,
+        workers=args.workers,
+        n_envs=args.n_envs,
+        vec_backend=args.vec_backend,
+        seed=args.seed,
+        n_eval_episodes=args.eval_episodes
+    )
+    runner.run()
+
+
+if __name__ == "__main__":
+    main()
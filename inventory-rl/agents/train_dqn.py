@@ -7,33 +7,16 @@ using the custom Gymnasium environment.
 
 import os
 import sys
+import argparse
 import numpy as np
 from stable_baselines3 import DQN
-from stable_baselines3.common.callbacks import EvalCallback, CheckpointCallback
-from stable_baselines3.common.vec_env import DummyVecEnv
-from stable_baselines3.common.monitor import Monitor
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from env.inventory_env import InventoryEnv
-
-
-def make_env():
-    """
-    Create and wrap the inventory environment.
-    
-    Returns:
-        Monitor: Wrapped environment for tracking episode statistics
-    """
-    env = InventoryEnv(
-        initial_inventory=100,
-        max_capacity=100,
-        episode_length=30,
-        trend_strength=5
-    )
-    env = Monitor(env)
-    return env
+from agents.common import VEC_BACKENDS, make_vec_env, scale_train_freq, ThroughputCallback
+from agents.eval_callback import BatchedEvalCallback
+from agents.checkpoints import CheckpointManager, register_model
 
 
 def train_dqn(
@@ -46,6 +29,16 @@ def train_dqn(
     exploration_fraction=0.1,
     exploration_final_eps=0.05,
     target_update_interval=500,
+    train_freq=4,
+    gradient_steps=1,
+    n_envs=1,
+    vec_backend="dummy",
+    seed=None,
+    eval_episodes=500,
+    async_eval=False,
+    keep_checkpoints=3,
+    float16_export=False,
+    progress_bar=True,
     save_path="../models/dqn_inventory",
     log_path="../logs/dqn"
 ):
@@ -62,6 +55,16 @@ def train_dqn(
         exploration_fraction: Fraction of training for exploration (default: 0.1)
         exploration_final_eps: Final epsilon for exploration (default: 0.05)
         target_update_interval: Steps between target network updates (default: 500)
+        train_freq: Steps between training updates, for a single environment (default: 4)
+        gradient_steps: Gradient steps per training update, for a single environment (default: 1)
+        n_envs: Number of parallel training environments (default: 1)
+        vec_backend: Vectorized env backend: 'dummy', 'subproc' or 'batched' (default: "dummy")
+        seed: Base random seed; environment i is seeded with seed + i (default: None)
+        eval_episodes: Episodes (fixed demand tapes) per evaluation (default: 500)
+        async_eval: Evaluate checkpoints in a separate process (default: False)
+        keep_checkpoints: Number of best-scoring checkpoints kept besides the latest (default: 3)
+        float16_export: Export inference-only policy weights as float16 (default: False)
+        progress_bar: Show a progress bar (requires tqdm and rich) (default: True)
         save_path: Path to save the model (default: "../models/dqn_inventory")
         log_path: Path for TensorBoard logs (default: "../logs/dqn")
     
@@ -72,16 +75,18 @@ def train_dqn(
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
     os.makedirs(log_path, exist_ok=True)
     
-    # Create training environment
-    train_env = make_env()
+    # Create training environments
+    train_env = make_vec_env(n_envs, vec_backend, seed)
     
-    # Create evaluation environment
-    eval_env = make_env()
+    # Each vectorized step collects n_envs transitions; keep updates per transition constant
+    train_freq, gradient_steps = scale_train_freq(train_freq, gradient_steps, n_envs)
     
     print("=" * 60)
     print("Training DQN Agent for Inventory Management")
     print("=" * 60)
     print(f"Total timesteps: {total_timesteps}")
+    print(f"Environments: {n_envs} ({vec_backend})")
+    print(f"Train freq: {train_freq} steps, {gradient_steps} gradient steps")
     print(f"Learning rate: {learning_rate}")
     print(f"Batch size: {batch_size}")
     print(f"Gamma: {gamma}")
@@ -100,49 +105,78 @@ def train_dqn(
         exploration_fraction=exploration_fraction,
         exploration_final_eps=exploration_final_eps,
         target_update_interval=target_update_interval,
+        train_freq=train_freq,
+        gradient_steps=gradient_steps,
+        seed=seed,
         verbose=1,
         tensorboard_log=log_path
     )
     
-    # Create callbacks
-    eval_callback = EvalCallback(
-        eval_env,
+    # Checkpoints are saved at every evaluation and pruned to the best ones by score
+    checkpoint_manager = CheckpointManager(
+        os.path.dirname(save_path),
+        name_prefix="dqn_checkpoint",
+        top_k=keep_checkpoints,
+        float16=float16_export
+    )
+    
+    # Create callbacks (frequencies are counted in vectorized steps of n_envs transitions)
+    eval_callback = BatchedEvalCallback(
+        eval_freq=max(5000 // n_envs, 1),
+        n_eval_episodes=eval_episodes,
         best_model_save_path=os.path.dirname(save_path),
         log_path=log_path,
-        eval_freq=5000,
         deterministic=True,
-        render=False,
-        n_eval_episodes=10
+        async_eval=async_eval,
+        checkpoint_manager=checkpoint_manager
     )
     
-    checkpoint_callback = CheckpointCallback(
-        save_freq=10000,
-        save_path=os.path.dirname(save_path),
-        name_prefix="dqn_checkpoint"
-    )
+    throughput_callback = ThroughputCallback()
     
     # Train the model
     print("\nStarting training...")
     model.learn(
         total_timesteps=total_timesteps,
-        callback=[eval_callback, checkpoint_callback],
+        callback=[eval_callback, throughput_callback],
         log_interval=100,
-        progress_bar=True
+        progress_bar=progress_bar
     )
     
     # Save final model
     model.save(save_path)
-    print(f"\nTraining complete! Model saved to {save_path}.zip")
+    register_model(model, save_path + ".zip", kind='final', float16=float16_export)
+    print(f"\nTraining complete! Model saved to {save_path}.zip (policy export: {save_path}.npz)")
     
     # Clean up
     train_env.close()
-    eval_env.close()
     
     return model
 
 
 def main():
     """Main training function."""
+    parser = argparse.ArgumentParser(description='Train a DQN agent for inventory management')
+    parser.add_argument('--timesteps', type=int, default=100000,
+                        help='Total number of timesteps to train (default: 100000)')
+    parser.add_argument('--n-envs', type=int, default=1,
+                        help='Number of parallel training environments (default: 1)')
+    parser.add_argument('--vec-backend', type=str, default='dummy', choices=VEC_BACKENDS,
+                        help='Vectorized env backend (default: dummy)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Base random seed; environment i gets seed + i (default: random)')
+    parser.add_argument('--eval-episodes', type=int, default=500,
+                        help='Episodes (fixed demand tapes) per evaluation (default: 500)')
+    parser.add_argument('--async-eval', action='store_true',
+                        help='Evaluate checkpoints in a separate process while training continues')
+    parser.add_argument('--keep-checkpoints', type=int, default=3,
+                        help='Best-scoring checkpoints to keep besides the latest (default: 3)')
+    parser.add_argument('--float16-export', action='store_true',
+                        help='Export inference-only policy weights as float16')
+    parser.add_argument('--no-progress-bar', action='store_true',
+                        help='Disable the progress bar')
+    
+    args = parser.parse_args()
+    
     # Get the absolute path to the project root
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(script_dir)
@@ -152,7 +186,15 @@ def main():
     
     # Train the model
     model = train_dqn(
-        total_timesteps=100000,
+        total_timesteps=args.timesteps,
+        n_envs=args.n_envs,
+        vec_backend=args.vec_backend,
+        seed=args.seed,
+        eval_episodes=args.eval_episodes,
+        async_eval=args.async_eval,
+        keep_checkpoints=args.keep_checkpoints,
+        float16_export=args.float16_export,
+        progress_bar=not args.no_progress_bar,
         save_path=save_path,
         log_path=log_path
     )
@@ -7,33 +7,16 @@ inventory using the custom Gymnasium environment.
 
 import os
 import sys
+import argparse
 import numpy as np
 from stable_baselines3 import PPO
-from stable_baselines3.common.callbacks import EvalCallback, CheckpointCallback
-from stable_baselines3.common.vec_env import DummyVecEnv
-from stable_baselines3.common.monitor import Monitor
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from env.inventory_env import InventoryEnv
-
-
-def make_env():
-    """
-    Create and wrap the inventory environment.
-    
-    Returns:
-        Monitor: Wrapped environment for tracking episode statistics
-    """
-    env = InventoryEnv(
-        initial_inventory=100,
-        max_capacity=100,
-        episode_length=30,
-        trend_strength=5
-    )
-    env = Monitor(env)
-    return env
+from agents.common import VEC_BACKENDS, make_vec_env, scale_rollout, ThroughputCallback
+from agents.eval_callback import BatchedEvalCallback
+from agents.checkpoints import CheckpointManager, register_model
 
 
 def train_ppo(
@@ -48,6 +31,14 @@ def train_ppo(
     ent_coef=0.0,
     vf_coef=0.5,
     max_grad_norm=0.5,
+    n_envs=1,
+    vec_backend="dummy",
+    seed=None,
+    eval_episodes=500,
+    async_eval=False,
+    keep_checkpoints=3,
+    float16_export=False,
+    progress_bar=True,
     save_path="../models/ppo_inventory",
     log_path="../logs/ppo"
 ):
@@ -57,7 +48,8 @@ def train_ppo(
     Args:
         total_timesteps: Total number of timesteps to train (default: 100000)
         learning_rate: Learning rate for optimizer (default: 3e-4)
-        n_steps: Number of steps to collect before update (default: 2048)
+        n_steps: Number of steps to collect before update, summed over all
+                 environments (default: 2048)
         batch_size: Minibatch size for training (default: 64)
         n_epochs: Number of epochs for each update (default: 10)
         gamma: Discount factor (default: 0.99)
@@ -66,6 +58,14 @@ def train_ppo(
         ent_coef: Entropy coefficient (default: 0.0)
         vf_coef: Value function coefficient (default: 0.5)
         max_grad_norm: Maximum gradient norm (default: 0.5)
+        n_envs: Number of parallel training environments (default: 1)
+        vec_backend: Vectorized env backend: 'dummy', 'subproc' or 'batched' (default: "dummy")
+        seed: Base random seed; environment i is seeded with seed + i (default: None)
+        eval_episodes: Episodes (fixed demand tapes) per evaluation (default: 500)
+        async_eval: Evaluate checkpoints in a separate process (default: False)
+        keep_checkpoints: Number of best-scoring checkpoints kept besides the latest (default: 3)
+        float16_export: Export inference-only policy weights as float16 (default: False)
+        progress_bar: Show a progress bar (requires tqdm and rich) (default: True)
         save_path: Path to save the model (default: "../models/ppo_inventory")
         log_path: Path for TensorBoard logs (default: "../logs/ppo")
     
@@ -76,18 +76,19 @@ def train_ppo(
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
     os.makedirs(log_path, exist_ok=True)
     
-    # Create training environment
-    train_env = make_env()
+    # Create training environments
+    train_env = make_vec_env(n_envs, vec_backend, seed)
     
-    # Create evaluation environment
-    eval_env = make_env()
+    # Split the rollout across environments so each update sees the same amount of data
+    n_steps_per_env, batch_size = scale_rollout(n_steps, batch_size, n_envs)
     
     print("=" * 60)
     print("Training PPO Agent for Inventory Management")
     print("=" * 60)
     print(f"Total timesteps: {total_timesteps}")
+    print(f"Environments: {n_envs} ({vec_backend})")
     print(f"Learning rate: {learning_rate}")
-    print(f"N steps: {n_steps}")
+    print(f"N steps: {n_steps_per_env} per env x {n_envs} envs = {n_steps_per_env * n_envs}")
     print(f"Batch size: {batch_size}")
     print(f"N epochs: {n_epochs}")
     print(f"Gamma: {gamma}")
@@ -98,7 +99,7 @@ def train_ppo(
         "MlpPolicy",
         train_env,
         learning_rate=learning_rate,
-        n_steps=n_steps,
+        n_steps=n_steps_per_env,
         batch_size=batch_size,
         n_epochs=n_epochs,
         gamma=gamma,
@@ -107,49 +108,76 @@ def train_ppo(
         ent_coef=ent_coef,
         vf_coef=vf_coef,
         max_grad_norm=max_grad_norm,
+        seed=seed,
         verbose=1,
         tensorboard_log=log_path
     )
     
-    # Create callbacks
-    eval_callback = EvalCallback(
-        eval_env,
+    # Checkpoints are saved at every evaluation and pruned to the best ones by score
+    checkpoint_manager = CheckpointManager(
+        os.path.dirname(save_path),
+        name_prefix="ppo_checkpoint",
+        top_k=keep_checkpoints,
+        float16=float16_export
+    )
+    
+    # Create callbacks (frequencies are counted in vectorized steps of n_envs transitions)
+    eval_callback = BatchedEvalCallback(
+        eval_freq=max(5000 // n_envs, 1),
+        n_eval_episodes=eval_episodes,
         best_model_save_path=os.path.dirname(save_path),
         log_path=log_path,
-        eval_freq=5000,
         deterministic=True,
-        render=False,
-        n_eval_episodes=10
+        async_eval=async_eval,
+        checkpoint_manager=checkpoint_manager
     )
     
-    checkpoint_callback = CheckpointCallback(
-        save_freq=10000,
-        save_path=os.path.dirname(save_path),
-        name_prefix="ppo_checkpoint"
-    )
+    throughput_callback = ThroughputCallback()
     
     # Train the model
     print("\nStarting training...")
     model.learn(
         total_timesteps=total_timesteps,
-        callback=[eval_callback, checkpoint_callback],
+        callback=[eval_callback, throughput_callback],
         log_interval=10,
-        progress_bar=True
+        progress_bar=progress_bar
     )
     
     # Save final model
     model.save(save_path)
-    print(f"\nTraining complete! Model saved to {save_path}.zip")
+    register_model(model, save_path + ".zip", kind='final', float16=float16_export)
+    print(f"\nTraining complete! Model saved to {save_path}.zip (policy export: {save_path}.npz)")
     
     # Clean up
     train_env.close()
-    eval_env.close()
     
     return model
 
 
 def main():
     """Main training function."""
+    parser = argparse.ArgumentParser(description='Train a PPO agent for inventory management')
+    parser.add_argument('--timesteps', type=int, default=100000,
+                        help='Total number of timesteps to train (default: 100000)')
+    parser.add_argument('--n-envs', type=int, default=1,
+                        help='Number of parallel training environments (default: 1)')
+    parser.add_argument('--vec-backend', type=str, default='dummy', choices=VEC_BACKENDS,
+                        help='Vectorized env backend (default: dummy)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Base random seed; environment i gets seed + i (default: random)')
+    parser.add_argument('--eval-episodes', type=int, default=500,
+                        help='Episodes (fixed demand tapes) per evaluation (default: 500)')
+    parser.add_argument('--async-eval', action='store_true',
+                        help='Evaluate checkpoints in a separate process while training continues')
+    parser.add_argument('--keep-checkpoints', type=int, default=3,
+                        help='Best-scoring checkpoints to keep besides the latest (default: 3)')
+    parser.add_argument('--float16-export', action='store_true',
+                        help='Export inference-only policy weights as float16')
+    parser.add_argument('--no-progress-bar', action='store_true',
+                        help='Disable the progress bar')
+    
+    args = parser.parse_args()
+    
     # Get the absolute path to the project root
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(script_dir)
@@ -159,7 +187,15 @@ def main():
     
     # Train the model
     model = train_ppo(
-        total_timesteps=100000,
+        total_timesteps=args.timesteps,
+        n_envs=args.n_envs,
+        vec_backend=args.vec_backend,
+        seed=args.seed,
+        eval_episodes=args.eval_episodes,
+        async_eval=args.async_eval,
+        keep_checkpoints=args.keep_checkpoints,
+        float16_export=args.float16_export,
+        progress_bar=not args.no_progress_bar,
         save_path=save_path,
         log_path=log_path
     )
@@ -46,37 +46,31 @@ except ImportError:
     print("  pip install fastapi uvicorn pydantic")
     sys.exit(1)
 
-# Model loading
+# Model loading: the policy network runs in NumPy, so neither torch nor
+# stable-baselines3 is imported. The algorithm comes from the model files'
+# metadata (manifest.json or the zip's own metadata), not from the file name.
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(script_dir)
+
+from inference import find_models, load_policy
+from env.demand import WeekdayUniformDemand
+
 MODEL_LOADED = False
 model = None
 
-try:
-    from stable_baselines3 import DQN, PPO
-    
-    # Try to find the best model
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    model_paths = [
-        os.path.join(script_dir, "models", "best_model.zip"),
-        os.path.join(script_dir, "models", "dqn_inventory.zip"),
-        os.path.join(script_dir, "models", "ppo_inventory.zip"),
-    ]
-    
-    for path in model_paths:
-        if os.path.exists(path):
-            if "ppo" in path.lower() or "best" in path.lower():
-                model = PPO.load(path)
-                print(f"✅ Loaded PPO model: {path}")
-            else:
-                model = DQN.load(path)
-                print(f"✅ Loaded DQN model: {path}")
-            MODEL_LOADED = True
-            break
-    
-    if not MODEL_LOADED:
-        print("⚠️ No trained model found. Using fallback heuristic.")
-        
-except ImportError:
-    print("⚠️ stable-baselines3 not found. Using fallback heuristic.")
+# Try the best model first, then the final DQN / PPO models
+for entry in find_models(os.path.join(script_dir, "models")):
+    try:
+        model = load_policy(entry['path'])
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ Could not load {entry['path']}: {e}")
+        continue
+    print(f"✅ Loaded {model.algo} model: {entry['path']}")
+    MODEL_LOADED = True
+    break
+
+if not MODEL_LOADED:
+    print("⚠️ No trained model found. Using fallback heuristic.")
 
 # ============ API Setup ============
 app = FastAPI(
@@ -154,18 +148,21 @@ def get_reasoning(inv: float, dow: int, order: int) -> str:
         else:
             return "Large order to replenish after stockout or heavy demand."
 
-def fallback_heuristic(inventory: float, day_of_week: int) -> int:
+# Exact expected demand per day, from the same demand model as the training env
+DEMAND_MODEL = WeekdayUniformDemand()
+EXPECTED_DEMAND = DEMAND_MODEL.mean()
+EXPECTED_WEEKDAY_DEMAND = DEMAND_MODEL.weekday_mean()
+
+def fallback_heuristic(inventory: float, day_of_week: int, day_index: Optional[int] = None) -> int:
     """Simple rule-based ordering when no AI model is available."""
     # Target inventory: 50 units
     target = 50
     
-    # Predict demand based on day of week
-    if day_of_week < 5:
-        expected_demand = 10  # Weekday
-    elif day_of_week == 5:
-        expected_demand = 22  # Saturday
+    # Expected demand of this day (includes the trend), or of this weekday
+    if day_index is not None and 0 <= day_index < len(EXPECTED_DEMAND):
+        expected_demand = EXPECTED_DEMAND[day_index]
     else:
-        expected_demand = 40  # Sunday
+        expected_demand = EXPECTED_WEEKDAY_DEMAND[day_of_week % 7]
     
     # Calculate order to reach target + cover expected demand
     needed = max(0, target + expected_demand - inventory)
@@ -181,6 +178,7 @@ def root():
     return {
         "status": "online",
         "model_loaded": MODEL_LOADED,
+        "model_algo": model.algo if MODEL_LOADED else None,
         "requests_served": request_count,
         "total_units_ordered": total_ordered,
         "last_5_orders": last_orders[-5:]
@@ -208,7 +206,7 @@ def predict(state: InventoryState):
         action = int(action)
         method = "AI Model"
     else:
-        action = fallback_heuristic(state.inventory, state.day_of_week)
+        action = fallback_heuristic(state.inventory, state.day_of_week, state.day_index)
         method = "Heuristic"
     
     order_quantity = action * 5
@@ -1,4 +1,16 @@
 """Convenience imports for the env package."""
 from .inventory_env import InventoryEnv
+from .batched_env import BatchedInventoryEnv
+from .demand import (DemandModel, WeekdayUniformDemand, PoissonDemand, NegativeBinomialDemand,
+                     EmpiricalDemand, make_demand_model)
 
-__all__ = ['InventoryEnv']
+__all__ = [
+    'InventoryEnv',
+    'BatchedInventoryEnv',
+    'DemandModel',
+    'WeekdayUniformDemand',
+    'PoissonDemand',
+    'NegativeBinomialDemand',
+    'EmpiricalDemand',
+    'make_demand_model'
+]
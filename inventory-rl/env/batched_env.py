@@ -0,0 +1,216 @@
+"""
+Batched Inventory Environment
+
+Simulates many copies of InventoryEnv at once with NumPy arrays instead of
+one Python object per copy. Used by the training scripts as the 'batched'
+vectorized-environment backend: a single step call advances every copy,
+so rollouts avoid per-environment Python overhead and inter-process
+communication entirely.
+
+The dynamics, demand distribution, observation and reward are identical to
+InventoryEnv. Demand for the whole batch is drawn from one generator, so a
+batch seeded with the same seed is reproducible but does not replay the
+same demand sequence as individually seeded InventoryEnv instances.
+
+Demand can also be replayed from pre-drawn tapes (see draw_demand_tapes), so
+different policies are evaluated on exactly the same demand (common random
+numbers).
+"""
+
+import numpy as np
+from gymnasium import spaces
+
+from .demand import WeekdayUniformDemand
+
+
+def draw_demand_tapes(n_episodes, episode_length=30, trend_strength=5, seed=None, demand_model=None):
+    """
+    Pre-draw the demand of whole episodes.
+
+    Args:
+        n_episodes: Number of episodes (tape rows)
+        episode_length: Number of days per episode (default: 30)
+        trend_strength: Strength of demand trend over time (default: 5)
+        seed: Random seed (default: None)
+        demand_model: DemandModel to sample from (default: WeekdayUniformDemand
+                      with this episode_length and trend_strength; its own episode_length applies)
+
+    Returns:
+        np.array: (n_episodes, episode_length) integer demand
+    """
+    demand_model = demand_model or WeekdayUniformDemand(episode_length, trend_strength)
+    return demand_model.sample_episodes(np.random.default_rng(seed), n_episodes)
+
+
+class BatchedInventoryEnv:
+    """
+    Array-based simulator of n_envs independent inventory environments.
+
+    Unlike a Gymnasium environment, every method works on whole batches:
+    step takes an array of actions and returns arrays of observations,
+    rewards and termination flags.
+    """
+
+    def __init__(self,
+                 n_envs,
+                 initial_inventory=100,
+                 max_capacity=100,
+                 episode_length=30,
+                 trend_strength=5,
+                 seed=None,
+                 demand_tape=None,
+                 demand_model=None):
+        """
+        Initialize the batched environment.
+
+        Args:
+            n_envs: Number of environments simulated in parallel
+            initial_inventory: Starting inventory level (default: 100)
+            max_capacity: Maximum inventory capacity (default: 100)
+            episode_length: Number of days per episode (default: 30)
+            trend_strength: Strength of demand trend over time (default: 5)
+            seed: Random seed for the batch demand generator (default: None)
+            demand_tape: Optional (n_envs, episode_length) demand to replay
+                         instead of drawing it (default: None)
+            demand_model: DemandModel to sample from (default: WeekdayUniformDemand
+                          with this episode_length and trend_strength)
+        """
+        if n_envs < 1:
+            raise ValueError(f"n_envs must be at least 1, got {n_envs}")
+
+        self.n_envs = n_envs
+        self.initial_inventory = initial_inventory
+        self.max_capacity = max_capacity
+        self.episode_length = episode_length
+        self.trend_strength = trend_strength
+        self.demand_model = demand_model or WeekdayUniformDemand(episode_length, trend_strength)
+
+        # Same spaces as a single InventoryEnv
+        self.action_space = spaces.Discrete(11)
+        self.observation_space = spaces.Box(
+            low=np.array([0.0, 0.0, 0.0]),
+            high=np.array([1.0, 1.0, 1.0]),
+            dtype=np.float32
+        )
+
+        self.np_random = np.random.default_rng(seed)
+        self.demand_tape = None
+        if demand_tape is not None:
+            self.set_demand_tape(demand_tape)
+
+        # Batch state
+        self.inventory = np.full(n_envs, initial_inventory, dtype=np.int64)
+        self.day_index = np.zeros(n_envs, dtype=np.int64)
+        self.day_of_week = np.zeros(n_envs, dtype=np.int64)
+
+    def seed(self, seed=None):
+        """
+        Re-seed the batch demand generator.
+
+        Args:
+            seed: Random seed (None for fresh entropy)
+        """
+        self.np_random = np.random.default_rng(seed)
+
+    def set_demand_tape(self, demand_tape):
+        """
+        Replay fixed demand instead of drawing it (None to draw again).
+
+        Args:
+            demand_tape: (n_envs, episode_length) integer demand, or None
+        """
+        if demand_tape is not None:
+            demand_tape = np.asarray(demand_tape, dtype=np.int64)
+            if demand_tape.shape != (self.n_envs, self.episode_length):
+                raise ValueError(f"Demand tape shape {demand_tape.shape} does not match "
+                                 f"(n_envs, episode_length) = {(self.n_envs, self.episode_length)}")
+        self.demand_tape = demand_tape
+
+    def _get_observation(self):
+        """
+        Get the observations of all environments.
+
+        Returns:
+            np.array: (n_envs, 3) array of [inventory/100, day/30, dow/6]
+        """
+        obs = np.empty((self.n_envs, 3), dtype=np.float32)
+        obs[:, 0] = self.inventory / self.max_capacity
+        obs[:, 1] = self.day_index / self.episode_length
+        obs[:, 2] = self.day_of_week / 6.0
+        return obs
+
+    def reset(self, seed=None, indices=None):
+        """
+        Reset some or all environments to the initial state.
+
+        Args:
+            seed: Optional seed for the batch demand generator
+            indices: Environments to reset (default: all)
+
+        Returns:
+            np.array: (n_envs, 3) observations of all environments
+        """
+        if seed is not None:
+            self.seed(seed)
+
+        if indices is None:
+            indices = slice(None)
+
+        self.inventory[indices] = self.initial_inventory
+        self.day_index[indices] = 0
+        self.day_of_week[indices] = 0
+
+        return self._get_observation()
+
+    def _get_demand(self):
+        """
+        Generate the demand of every environment for the current day.
+
+        Returns:
+            np.array: (n_envs,) integer demand
+        """
+        if self.demand_tape is not None:
+            return self.demand_tape[np.arange(self.n_envs), self.day_index]
+
+        return self.demand_model.sample(self.np_random, self.day_index, self.day_of_week)
+
+    def step(self, actions):
+        """
+        Advance every environment by one day.
+
+        Environments that finish their episode are not reset automatically;
+        call reset(indices=...) for them before the next step.
+
+        Args:
+            actions: (n_envs,) integer actions from 0-10
+
+        Returns:
+            tuple: (observations, rewards, terminated, info) where info is a
+                   dict of (n_envs,) arrays with the same keys as InventoryEnv
+        """
+        order_qty = np.asarray(actions, dtype=np.int64).reshape(self.n_envs) * 5
+
+        self.inventory += order_qty
+        demand = self._get_demand()
+
+        sold = np.minimum(self.inventory, demand)
+        unmet_demand = demand - sold
+        self.inventory -= sold
+
+        perfect = (unmet_demand == 0) & (self.inventory <= self.max_capacity) & (self.inventory > 0)
+        rewards = np.where(perfect, 1.0, -1.0).astype(np.float32)
+
+        self.day_index += 1
+        self.day_of_week = (self.day_of_week + 1) % 7
+        terminated = self.day_index >= self.episode_length
+
+        info = {
+            'demand': demand,
+            'sold': sold,
+            'unmet_demand': unmet_demand,
+            'inventory': self.inventory.copy(),
+            'order_qty': order_qty,
+            'day': self.day_index.copy()
+        }
+
+        return self._get_observation(), rewards, terminated, info
@@ -0,0 +1,427 @@
+"""
+Demand Models for Inventory Management
+
+A demand model describes the distribution of daily demand over an episode.
+It is shared by the environments (which sample from it) and by the
+classical baselines, the API fallback and any dynamic-programming solver
+(which use its exact per-day statistics instead of simulating episodes).
+
+Available models:
+- WeekdayUniformDemand: uniform ranges by weekday plus a trend (the default)
+- PoissonDemand: Poisson with a mean per weekday plus a linear trend
+- NegativeBinomialDemand: like PoissonDemand, with extra variance
+- EmpiricalDemand: bootstrap from historical daily demand (CSV or NPY),
+  resampling each day from past days on the same weekday
+
+Every model samples whole arrays at once: any array of days (sample) or
+a batch of complete episodes (sample_episodes).
+
+Days are counted from the episode start, which is always a Monday, so day t
+falls on weekday t % 7.
+"""
+
+import os
+import csv
+
+import numpy as np
+
+
+# Base demand ranges by day of week (Monday=0 ... Sunday=6), upper bound exclusive
+DEMAND_LOW = np.array([0, 0, 0, 0, 0, 15, 30])
+DEMAND_HIGH = np.array([16, 16, 16, 16, 16, 31, 51])
+
+# Mean demand by weekday of the default uniform ranges
+WEEKDAY_MEANS = (DEMAND_LOW + DEMAND_HIGH - 1) / 2.0
+
+# Names accepted by make_demand_model (besides a .csv/.npy path)
+DEMAND_MODELS = ['uniform', 'poisson', 'negbin']
+
+
+class DemandModel:
+    """
+    Base class for demand models.
+    
+    Subclasses implement pmf (exact distribution of each day's demand) and
+    sample; mean, variance and the derived statistics follow from the pmf.
+    """
+    
+    def __init__(self, episode_length=30):
+        """
+        Initialize the demand model.
+        
+        Args:
+            episode_length: Number of days per episode (default: 30)
+        """
+        self.episode_length = episode_length
+    
+    def pmf(self):
+        """
+        Exact probability of every demand value on every day.
+        
+        Returns:
+            np.array: (episode_length, max_demand + 1) probabilities; row t sums to 1
+        """
+        raise NotImplementedError
+    
+    def sample(self, rng, day_index, day_of_week):
+        """
+        Draw demand for arrays of days.
+        
+        Args:
+            rng: numpy Generator
+            day_index: Integer array of days since the episode start
+            day_of_week: Integer array of weekdays (0=Monday, 6=Sunday)
+        
+        Returns:
+            np.array: Integer demand with the shape of day_index
+        """
+        raise NotImplementedError
+    
+    def sample_episodes(self, rng, n_episodes):
+        """
+        Draw the demand of whole episodes as one array.
+        
+        Args:
+            rng: numpy Generator
+            n_episodes: Number of episodes
+        
+        Returns:
+            np.array: (n_episodes, episode_length) integer demand
+        """
+        days = np.broadcast_to(np.arange(self.episode_length), (n_episodes, self.episode_length))
+        return self.sample(rng, days, days % 7)
+    
+    def mean(self):
+        """
+        Expected demand of every day.
+        
+        Returns:
+            np.array: (episode_length,) means
+        """
+        pmf = self.pmf()
+        return pmf @ np.arange(pmf.shape[1])
+    
+    def var(self):
+        """
+        Variance of every day's demand.
+        
+        Returns:
+            np.array: (episode_length,) variances
+        """
+        pmf = self.pmf()
+        values = np.arange(pmf.shape[1])
+        return pmf @ values ** 2 - (pmf @ values) ** 2
+    
+    def mean_daily_demand(self):
+        """
+        Average expected demand per day over the episode.
+        
+        Returns:
+            float: Mean daily demand
+        """
+        return float(np.mean(self.mean()))
+    
+    def weekday_mean(self):
+        """
+        Expected demand of each weekday, averaged over the episode's days on that weekday.
+        
+        Returns:
+            np.array: (7,) means for Monday-Sunday
+        """
+        days = np.arange(self.episode_length)
+        means = self.mean()
+        return np.array([means[days % 7 == dow].mean() for dow in range(7)])
+
+
+class WeekdayUniformDemand(DemandModel):
+    """
+    Uniform demand by day of week plus a linear trend (InventoryEnv's demand).
+    
+    Demand on day t is uniform on [low[dow], high[dow]) plus
+    int(t / episode_length * trend_strength), floored at zero.
+    """
+    
+    def __init__(self, episode_length=30, trend_strength=5, low=DEMAND_LOW, high=DEMAND_HIGH):
+        """
+        Initialize the demand model.
+        
+        Args:
+            episode_length: Number of days per episode (default: 30)
+            trend_strength: Strength of demand trend over time (default: 5)
+            low: (7,) lowest base demand of each weekday (default: DEMAND_LOW)
+            high: (7,) exclusive upper bound of each weekday (default: DEMAND_HIGH)
+        """
+        super().__init__(episode_length)
+        self.trend_strength = trend_strength
+        self.low = np.asarray(low, dtype=np.int64)
+        self.high = np.asarray(high, dtype=np.int64)
+    
+    def trend(self, day_index):
+        """
+        Trend component of the given days, truncated like int().
+        
+        Args:
+            day_index: Integer array of days since the episode start
+        
+        Returns:
+            np.array: Integer trend with the shape of day_index
+        """
+        return (np.asarray(day_index) / self.episode_length * self.trend_strength).astype(np.int64)
+    
+    def sample(self, rng, day_index, day_of_week):
+        base_demand = rng.integers(self.low[day_of_week], self.high[day_of_week])
+        return np.maximum(0, base_demand + self.trend(day_index))
+    
+    def pmf(self):
+        days = np.arange(self.episode_length)
+        dows = days % 7
+        trend = self.trend(days)
+        max_demand = int(max(0, np.max(self.high[dows] - 1 + trend)))
+        
+        pmf = np.zeros((self.episode_length, max_demand + 1))
+        for day, dow in enumerate(dows):
+            values = np.maximum(0, np.arange(self.low[dow], self.high[dow]) + trend[day])
+            np.add.at(pmf[day], values, 1.0 / (self.high[dow] - self.low[dow]))
+        return pmf
+    
+    def __repr__(self):
+        return f"WeekdayUniformDemand(episode_length={self.episode_length}, trend_strength={self.trend_strength})"
+
+
+def _log_factorial(n):
+    """log(k!) for k = 0..n."""
+    return np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, n + 1)))])
+
+
+def _normalize_rows(pmf):
+    """Rescale each row to sum to 1 (the support is truncated far in the tail)."""
+    return pmf / pmf.sum(axis=1, keepdims=True)
+
+
+class PoissonDemand(DemandModel):
+    """
+    Poisson demand with a mean per weekday plus a linear trend.
+    
+    The mean on day t is weekday_means[t % 7] + t / episode_length * trend_strength.
+    """
+    
+    def __init__(self, weekday_means=WEEKDAY_MEANS, episode_length=30, trend_strength=5):
+        """
+        Initialize the demand model.
+        
+        Args:
+            weekday_means: (7,) mean demand for Monday-Sunday, or one mean for
+                           every day (default: means of the uniform ranges)
+            episode_length: Number of days per episode (default: 30)
+            trend_strength: Mean demand added by the end of the episode (default: 5)
+        """
+        super().__init__(episode_length)
+        self.weekday_means = np.broadcast_to(np.asarray(weekday_means, dtype=np.float64), (7,)).copy()
+        self.trend_strength = trend_strength
+        if np.any(self.weekday_means < 0):
+            raise ValueError("Mean demand must be non-negative")
+    
+    def rates(self, day_index, day_of_week):
+        """
+        Mean demand of the given days.
+        
+        Args:
+            day_index: Integer array of days since the episode start
+            day_of_week: Integer array of weekdays (0=Monday, 6=Sunday)
+        
+        Returns:
+            np.array: Means with the shape of day_index
+        """
+        trend = np.asarray(day_index) / self.episode_length * self.trend_strength
+        return np.maximum(0.0, self.weekday_means[day_of_week] + trend)
+    
+    def _episode_rates(self):
+        days = np.arange(self.episode_length)
+        return self.rates(days, days % 7)
+    
+    def sample(self, rng, day_index, day_of_week):
+        return rng.poisson(self.rates(day_index, day_of_week))
+    
+    def pmf(self):
+        rates = self._episode_rates()[:, None]
+        max_demand = int(rates.max() + 10 * np.sqrt(rates.max()) + 10)
+        values = np.arange(max_demand + 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_pmf = values * np.log(rates) - rates - _log_factorial(max_demand)
+        # log(0) * 0 is nan for a zero rate; all mass is then at 0
+        log_pmf = np.where(rates > 0, log_pmf, np.where(values == 0, 0.0, -np.inf))
+        return _normalize_rows(np.exp(log_pmf))
+    
+    def __repr__(self):
+        return f"PoissonDemand(weekday_means={self.weekday_means.tolist()}, trend_strength={self.trend_strength})"
+
+
+class NegativeBinomialDemand(PoissonDemand):
+    """
+    Negative binomial demand: PoissonDemand's means with extra variance.
+    
+    With mean mu and dispersion k the variance is mu + mu^2 / k, so demand is
+    burstier than Poisson; k -> infinity recovers the Poisson model.
+    """
+    
+    def __init__(self, weekday_means=WEEKDAY_MEANS, dispersion=5.0, episode_length=30, trend_strength=5):
+        """
+        Initialize the demand model.
+        
+        Args:
+            weekday_means: (7,) mean demand for Monday-Sunday, or one mean for
+                           every day (default: means of the uniform ranges)
+            dispersion: Shape parameter k; smaller is more variable (default: 5.0)
+            episode_length: Number of days per episode (default: 30)
+            trend_strength: Mean demand added by the end of the episode (default: 5)
+        """
+        super().__init__(weekday_means, episode_length, trend_strength)
+        if dispersion <= 0:
+            raise ValueError(f"dispersion must be positive, got {dispersion}")
+        self.dispersion = float(dispersion)
+    
+    def sample(self, rng, day_index, day_of_week):
+        rates = self.rates(day_index, day_of_week)
+        return rng.negative_binomial(self.dispersion, self.dispersion / (self.dispersion + rates))
+    
+    def pmf(self):
+        k = self.dispersion
+        rates = self._episode_rates()[:, None]
+        max_var = rates.max() + rates.max() ** 2 / k
+        max_demand = int(rates.max() + 10 * np.sqrt(max_var) + 10)
+        values = np.arange(max_demand + 1)
+        
+        # log C(x + k - 1, x) = sum_{i<x} log(k + i) - log(x!)
+        log_binomial = np.concatenate([[0.0], np.cumsum(np.log(k + values[:-1]))]) - _log_factorial(max_demand)
+        p = k / (k + rates)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_pmf = log_binomial + k * np.log(p) + values * np.log1p(-p)
+        log_pmf = np.where(rates > 0, log_pmf, np.where(values == 0, 0.0, -np.inf))
+        return _normalize_rows(np.exp(log_pmf))
+    
+    def __repr__(self):
+        return (f"NegativeBinomialDemand(weekday_means={self.weekday_means.tolist()}, "
+                f"dispersion={self.dispersion}, trend_strength={self.trend_strength})")
+
+
+class EmpiricalDemand(DemandModel):
+    """
+    Bootstrap demand from historical daily sales.
+    
+    Each simulated day draws, with replacement, one historical day on the same
+    weekday, so the weekly pattern of the history is kept.
+    """
+    
+    def __init__(self, history, weekdays=None, start_weekday=0, episode_length=30):
+        """
+        Initialize the demand model.
+        
+        Args:
+            history: 1-D array of daily demand, oldest first
+            weekdays: Weekday (0=Monday) of each history entry (default: consecutive
+                      days from start_weekday)
+            start_weekday: Weekday of the first entry when weekdays is None (default: 0)
+            episode_length: Number of days per episode (default: 30)
+        """
+        super().__init__(episode_length)
+        history = np.asarray(history, dtype=np.float64).ravel()
+        if weekdays is None:
+            weekdays = (start_weekday + np.arange(len(history))) % 7
+        weekdays = np.asarray(weekdays, dtype=np.int64)
+        
+        keep = ~np.isnan(history)
+        history, weekdays = np.rint(history[keep]).astype(np.int64), weekdays[keep]
+        if np.any(history < 0):
+            raise ValueError("Historical demand must be non-negative")
+        
+        counts = np.bincount(weekdays, minlength=7)
+        if np.any(counts == 0):
+            missing = [dow for dow in range(7) if counts[dow] == 0]
+            raise ValueError(f"History has no days on weekdays {missing}")
+        
+        # Demand grouped by weekday: values[offsets[dow]:offsets[dow] + counts[dow]]
+        order = np.argsort(weekdays, kind='stable')
+        self.values = history[order]
+        self.counts = counts
+        self.offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    
+    @classmethod
+    def from_file(cls, path, column='demand', date_column='date', start_weekday=0, episode_length=30):
+        """
+        Load historical demand from a .npy array or a .csv file.
+        
+        A CSV needs a header row. The demand column is `column`, or the only
+        column besides the date. If a `date_column` (YYYY-MM-DD) is present,
+        weekdays come from the dates; otherwise rows are consecutive days
+        starting on start_weekday.
+        
+        Args:
+            path: Path to a .npy or .csv file
+            column: Name of the demand column in a CSV (default: 'demand')
+            date_column: Name of the optional date column in a CSV (default: 'date')
+            start_weekday: Weekday of the first row without dates (default: 0)
+            episode_length: Number of days per episode (default: 30)
+        
+        Returns:
+            EmpiricalDemand: Demand model
+        """
+        if path.endswith('.npy'):
+            return cls(np.load(path), start_weekday=start_weekday, episode_length=episode_length)
+        
+        with open(path, newline='') as f:
+            rows = list(csv.DictReader(f))
+        if not rows:
+            raise ValueError(f"No rows in {path}")
+        
+        columns = [c for c in rows[0] if c != date_column]
+        if column not in rows[0]:
+            if len(columns) != 1:
+                raise ValueError(f"No '{column}' column in {path} (columns: {list(rows[0])})")
+            column = columns[0]
+        history = [float(row[column]) if row[column] not in ('', None) else np.nan for row in rows]
+        
+        weekdays = None
+        if date_column in rows[0]:
+            days = np.array([row[date_column] for row in rows], dtype='datetime64[D]').astype(np.int64)
+            # 1970-01-01 was a Thursday
+            weekdays = (days + 3) % 7
+        return cls(history, weekdays, start_weekday, episode_length)
+    
+    def sample(self, rng, day_index, day_of_week):
+        day_of_week = np.asarray(day_of_week)
+        picks = rng.integers(0, self.counts[day_of_week])
+        return self.values[self.offsets[day_of_week] + picks]
+    
+    def pmf(self):
+        pmf = np.zeros((self.episode_length, int(self.values.max()) + 1))
+        for dow in range(7):
+            group = self.values[self.offsets[dow]:self.offsets[dow] + self.counts[dow]]
+            pmf[np.arange(self.episode_length) % 7 == dow] = np.bincount(group, minlength=pmf.shape[1]) / len(group)
+        return pmf
+    
+    def __repr__(self):
+        return f"EmpiricalDemand({len(self.values)} days, episode_length={self.episode_length})"
+
+
+def make_demand_model(spec='uniform', episode_length=30, trend_strength=5, **kwargs):
+    """
+    Build a demand model from a name or a history file.
+    
+    Args:
+        spec: 'uniform', 'poisson', 'negbin', or a path to a .csv/.npy history
+        episode_length: Number of days per episode (default: 30)
+        trend_strength: Trend of the parametric models (default: 5)
+        **kwargs: Extra model arguments (e.g. weekday_means, dispersion, column)
+    
+    Returns:
+        DemandModel: Demand model
+    """
+    if spec == 'uniform':
+        return WeekdayUniformDemand(episode_length, trend_strength, **kwargs)
+    if spec == 'poisson':
+        return PoissonDemand(episode_length=episode_length, trend_strength=trend_strength, **kwargs)
+    if spec == 'negbin':
+        return NegativeBinomialDemand(episode_length=episode_length, trend_strength=trend_strength, **kwargs)
+    if os.path.splitext(spec)[1] in ('.csv', '.npy'):
+        return EmpiricalDemand.from_file(spec, episode_length=episode_length, **kwargs)
+    raise ValueError(f"Unknown demand model '{spec}', expected one of {DEMAND_MODELS} or a .csv/.npy path")
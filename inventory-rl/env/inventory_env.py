@@ -13,6 +13,8 @@ import numpy as np
 import gymnasium as gym
 from gymnasium import spaces
 
+from .demand import WeekdayUniformDemand
+
 
 class InventoryEnv(gym.Env):
     """
@@ -27,7 +29,8 @@ class InventoryEnv(gym.Env):
                  initial_inventory=100,
                  max_capacity=100,
                  episode_length=30,
-                 trend_strength=5):
+                 trend_strength=5,
+                 demand_model=None):
         """
         Initialize the inventory environment.
         
@@ -36,6 +39,8 @@ class InventoryEnv(gym.Env):
             max_capacity: Maximum inventory capacity (default: 100)
             episode_length: Number of days per episode (default: 30)
             trend_strength: Strength of demand trend over time (default: 5)
+            demand_model: DemandModel to sample from (default: WeekdayUniformDemand
+                          with this episode_length and trend_strength)
         """
         super().__init__()
         
@@ -43,6 +48,7 @@ class InventoryEnv(gym.Env):
         self.max_capacity = max_capacity
         self.episode_length = episode_length
         self.trend_strength = trend_strength
+        self.demand_model = demand_model or WeekdayUniformDemand(episode_length, trend_strength)
         
         # Action space: 11 discrete actions (0, 5, 10, ..., 50 units)
         self.action_space = spaces.Discrete(11)
@@ -59,12 +65,13 @@ class InventoryEnv(gym.Env):
         self.inventory = initial_inventory
         self.day_index = 0
         self.day_of_week = 0  # 0=Monday, 6=Sunday
+        self.demand_tape = None
         
         # Tracking
         self.demand_history = []
         self.inventory_history = []
         self.action_history = []
-        
+    
     def _get_demand(self):
         """
         Generate demand based on day of week and trend.
@@ -74,24 +81,20 @@ class InventoryEnv(gym.Env):
         - Saturday: 15-30 units
         - Sunday: 30-50 units
         
-        Plus a trend component that increases over the episode.
+        Plus a trend component that increases over the episode (see
+        env/demand.py; a different demand_model can replace this).
+        
+        The episode's demand is drawn at reset from the environment's own
+        generator (self.np_random), so reset(seed=...) makes each environment
+        instance reproducible.
         
         Returns:
             int: Demand for the current day
         """
-        # Base demand by day of week
-        if self.day_of_week < 5:  # Monday-Friday
-            base_demand = np.random.randint(0, 16)
-        elif self.day_of_week == 5:  # Saturday
-            base_demand = np.random.randint(15, 31)
-        else:  # Sunday
-            base_demand = np.random.randint(30, 51)
-        
-        # Add trend component
-        trend = self.day_index / self.episode_length
-        demand_with_trend = base_demand + int(trend * self.trend_strength)
-        
-        return max(0, demand_with_trend)
+        if self.demand_tape is not None and self.day_index < len(self.demand_tape):
+            return int(self.demand_tape[self.day_index])
+        # Stepped without reset or past the episode end
+        return int(self.demand_model.sample(self.np_random, self.day_index, self.day_of_week))
     
     def _get_observation(self):
         """
@@ -115,7 +118,7 @@ class InventoryEnv(gym.Env):
         Args:
             seed: Random seed for reproducibility
             options: Additional options (not used)
-            
+        
         Returns:
             tuple: (observation, info)
         """
@@ -125,6 +128,9 @@ class InventoryEnv(gym.Env):
         self.day_index = 0
         self.day_of_week = 0
         
+        # The whole episode's demand is drawn at once
+        self.demand_tape = self.demand_model.sample_episodes(self.np_random, 1)[0]
+        
         self.demand_history = []
         self.inventory_history = []
         self.action_history = []
@@ -140,7 +146,7 @@ class InventoryEnv(gym.Env):
         
         Args:
             action: Integer from 0-10, representing order quantity (action * 5 units)
-            
+        
         Returns:
             tuple: (observation, reward, terminated, truncated, info)
         """
@@ -0,0 +1,219 @@
+"""
+Inventory Simulator Kernel
+
+Rolls out whole episodes of fixed policies without returning to Python per
+step, for Monte Carlo policy scoring, baseline parameter search and checking
+dynamic-programming solutions.
+
+A policy is given as an action table indexed by (inventory, day): every
+state of InventoryEnv is covered, since the weekday follows from the day.
+Tables can be built from a linear rule (linear_policy_table) or from any
+policy with a batched predict, such as a NumpyPolicy (table_from_policy),
+and many tables are scored at once on the same demand tapes.
+
+The loop is compiled with numba when it is installed; otherwise every
+(policy, episode) pair is advanced together with NumPy array operations, one
+day at a time. Both give exactly the rewards of InventoryEnv.
+"""
+
+import numpy as np
+
+from .batched_env import draw_demand_tapes
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+# Units ordered per action step and number of actions, as in InventoryEnv
+ACTION_UNITS = 5
+N_ACTIONS = 11
+
+BACKENDS = ['auto', 'numba', 'numpy']
+
+
+def max_inventory(initial_inventory=100, episode_length=30):
+    """
+    Highest inventory an episode can reach (ordering the maximum every day).
+    
+    Args:
+        initial_inventory: Starting inventory level (default: 100)
+        episode_length: Number of days per episode (default: 30)
+    
+    Returns:
+        int: Maximum reachable inventory
+    """
+    return initial_inventory + ACTION_UNITS * (N_ACTIONS - 1) * episode_length
+
+
+def _state_grid(n_levels, episode_length, max_capacity):
+    """Observations of every (inventory, day) state, shape (n_levels * episode_length, 3)."""
+    inventory, day = np.meshgrid(np.arange(n_levels), np.arange(episode_length), indexing='ij')
+    obs = np.empty((n_levels * episode_length, 3), dtype=np.float32)
+    obs[:, 0] = inventory.ravel() / max_capacity
+    obs[:, 1] = day.ravel() / episode_length
+    obs[:, 2] = (day.ravel() % 7) / 6.0
+    return obs
+
+
+def table_from_policy(policy, n_levels=None, episode_length=30, max_capacity=100, initial_inventory=100):
+    """
+    Tabulate a policy's greedy action in every (inventory, day) state.
+    
+    Args:
+        policy: Anything with a batched predict(obs, deterministic=True),
+                e.g. a NumpyPolicy or Stable-Baselines3 model
+        n_levels: Inventory levels in the table (default: all reachable levels)
+        episode_length: Number of days per episode (default: 30)
+        max_capacity: Maximum inventory capacity, for observations (default: 100)
+        initial_inventory: Starting inventory level (default: 100)
+    
+    Returns:
+        np.array: (n_levels, episode_length) int8 action table
+    """
+    if n_levels is None:
+        n_levels = max_inventory(initial_inventory, episode_length) + 1
+    obs = _state_grid(n_levels, episode_length, max_capacity)
+    actions, _ = policy.predict(obs, deterministic=True)
+    return np.asarray(actions, dtype=np.int8).reshape(n_levels, episode_length)
+
+
+def linear_policy_table(weights, bias=0.0, n_levels=None, episode_length=30, max_capacity=100,
+                        initial_inventory=100):
+    """
+    Tabulate a linear policy: action = round(bias + weights . observation), clipped to 0-10.
+    
+    Args:
+        weights: (3,) weights of [inventory/capacity, day/length, dow/6]
+        bias: Constant term (default: 0.0)
+        n_levels: Inventory levels in the table (default: all reachable levels)
+        episode_length: Number of days per episode (default: 30)
+        max_capacity: Maximum inventory capacity, for observations (default: 100)
+        initial_inventory: Starting inventory level (default: 100)
+    
+    Returns:
+        np.array: (n_levels, episode_length) int8 action table
+    """
+    if n_levels is None:
+        n_levels = max_inventory(initial_inventory, episode_length) + 1
+    obs = _state_grid(n_levels, episode_length, max_capacity)
+    actions = np.clip(np.rint(bias + obs @ np.asarray(weights, dtype=np.float64)), 0, N_ACTIONS - 1)
+    return actions.astype(np.int8).reshape(n_levels, episode_length)
+
+
+def _rollout_loop(tables, demand_tapes, initial_inventory, max_capacity, totals):
+    """
+    Plain-loop kernel, compiled with numba (too slow to run uncompiled).
+    
+    Writes the total reward of policy p on tape e to totals[p, e].
+    """
+    n_policies, n_levels, _ = tables.shape
+    n_episodes, episode_length = demand_tapes.shape
+    
+    for p in range(n_policies):
+        for e in range(n_episodes):
+            inventory = initial_inventory
+            total = 0
+            for day in range(episode_length):
+                inventory += ACTION_UNITS * tables[p, min(inventory, n_levels - 1), day]
+                demand = demand_tapes[e, day]
+                sold = min(inventory, demand)
+                inventory -= sold
+                if sold == demand and 0 < inventory <= max_capacity:
+                    total += 1
+                else:
+                    total -= 1
+            totals[p, e] = total
+
+
+if NUMBA_AVAILABLE:
+    _rollout_compiled = numba.njit(cache=True)(_rollout_loop)
+
+
+def _rollout_numpy(tables, demand_tapes, initial_inventory, max_capacity):
+    """Vectorized kernel: all (policy, episode) pairs advance one day at a time."""
+    n_policies, n_levels, _ = tables.shape
+    n_episodes, episode_length = demand_tapes.shape
+    
+    inventory = np.full((n_policies, n_episodes), initial_inventory, dtype=np.int64)
+    totals = np.zeros((n_policies, n_episodes), dtype=np.int64)
+    policy_index = np.arange(n_policies)[:, None]
+    
+    for day in range(episode_length):
+        level = np.minimum(inventory, n_levels - 1)
+        inventory += ACTION_UNITS * tables[policy_index, level, day].astype(np.int64)
+        demand = demand_tapes[:, day]
+        sold = np.minimum(inventory, demand)
+        inventory -= sold
+        perfect = (sold == demand) & (inventory > 0) & (inventory <= max_capacity)
+        totals += 2 * perfect - 1
+    
+    return totals
+
+
+def rollout_policies(tables, demand_tapes, initial_inventory=100, max_capacity=100, backend='auto'):
+    """
+    Total reward of every policy on every demand tape.
+    
+    Episodes start at initial_inventory on a Monday, as InventoryEnv.reset does.
+    Passing the same tapes to every call gives common random numbers, so
+    differences between policies are not sampling noise.
+    
+    Args:
+        tables: (n_levels, episode_length) action table, or (n_policies, n_levels,
+                episode_length) tables; inventory above the last row uses the last row
+        demand_tapes: (n_episodes, episode_length) demand from draw_demand_tapes
+        initial_inventory: Starting inventory level (default: 100)
+        max_capacity: Maximum inventory capacity (default: 100)
+        backend: 'numba', 'numpy' or 'auto' (numba if installed) (default: 'auto')
+    
+    Returns:
+        np.array: (n_episodes,) rewards for one table, (n_policies, n_episodes) for several
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+    if backend == 'numba' and not NUMBA_AVAILABLE:
+        raise ImportError("numba is not installed; use backend='numpy'")
+    
+    tables = np.asarray(tables)
+    single = tables.ndim == 2
+    tables = np.ascontiguousarray(tables.reshape((-1,) + tables.shape[-2:]), dtype=np.int8)
+    demand_tapes = np.ascontiguousarray(demand_tapes, dtype=np.int64)
+    
+    if tables.shape[2] != demand_tapes.shape[1]:
+        raise ValueError(f"Tables cover {tables.shape[2]} days but tapes have {demand_tapes.shape[1]}")
+    if tables.min() < 0 or tables.max() >= N_ACTIONS:
+        raise ValueError(f"Table actions must be in 0-{N_ACTIONS - 1}")
+    
+    if backend == 'numba' or (backend == 'auto' and NUMBA_AVAILABLE):
+        totals = np.zeros((len(tables), len(demand_tapes)), dtype=np.int64)
+        _rollout_compiled(tables, demand_tapes, int(initial_inventory), int(max_capacity), totals)
+    else:
+        totals = _rollout_numpy(tables, demand_tapes, initial_inventory, max_capacity)
+    
+    rewards = totals.astype(np.float64)
+    return rewards[0] if single else rewards
+
+
+def simulate_policy(table, n_episodes=1000, episode_length=30, trend_strength=5, seed=None,
+                    initial_inventory=100, max_capacity=100, backend='auto'):
+    """
+    Score one action table on freshly drawn demand.
+    
+    Args:
+        table: (n_levels, episode_length) action table
+        n_episodes: Number of episodes (default: 1000)
+        episode_length: Number of days per episode (default: 30)
+        trend_strength: Strength of demand trend over time (default: 5)
+        seed: Random seed for the demand (default: None)
+        initial_inventory: Starting inventory level (default: 100)
+        max_capacity: Maximum inventory capacity (default: 100)
+        backend: Kernel backend, see rollout_policies (default: 'auto')
+    
+    Returns:
+        np.array: (n_episodes,) total reward of each episode
+    """
+    demand_tapes = draw_demand_tapes(n_episodes, episode_length, trend_strength, seed)
+    return rollout_policies(table, demand_tapes, initial_inventory, max_capacity, backend)
@@ -0,0 +1,4 @@
+"""Convenience imports for the inference package (NumPy only, no torch)."""
+from .policy import NumpyPolicy, load_policy, find_models, verify_policy, detect_algo, read_state_dict
+
+__all__ = ['NumpyPolicy', 'load_policy', 'find_models', 'verify_policy', 'detect_algo', 'read_state_dict']
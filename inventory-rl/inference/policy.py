@@ -0,0 +1,464 @@
+"""
+Lightweight Policy Inference for Inventory Management
+
+Loads trained DQN and PPO policies into plain NumPy arrays and runs the
+forward pass in NumPy, so serving a model (api.py, the dashboard) needs
+neither torch nor Stable-Baselines3:
+- Policy exports (.npz, written by agents/checkpoints.py) load directly
+- Full Stable-Baselines3 zips are read without torch: the algorithm comes from
+  the zip's metadata and the weights from the raw tensor storages in policy.pth
+- find_models lists the models of a directory from its manifest.json, falling
+  back to scanning the zips
+
+Usage:
+    from inference import find_models, load_policy
+    policy = load_policy(find_models("models")[0]['path'])
+    action, _ = policy.predict(obs, deterministic=True)
+"""
+
+import io
+import os
+import re
+import json
+import pickle
+import zipfile
+import collections
+import numpy as np
+
+
+MANIFEST_NAME = 'manifest.json'
+POLICY_FORMAT = 'inventory-policy-v1'
+
+# Activations of the default MlpPolicy of each algorithm
+DEFAULT_ACTIVATIONS = {'DQN': 'relu', 'PPO': 'tanh'}
+
+ACTIVATIONS = {
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'identity': lambda x: x
+}
+
+# Manifest kinds in order of preference when picking a model to serve
+KIND_ORDER = ['best', 'final', 'checkpoint']
+
+# Storage classes used in torch's pickle format
+_STORAGE_DTYPES = {
+    'FloatStorage': np.float32,
+    'DoubleStorage': np.float64,
+    'HalfStorage': np.float16,
+    'LongStorage': np.int64,
+    'IntStorage': np.int32,
+    'BoolStorage': np.bool_
+}
+
+
+def _read_data(archive):
+    """Read the JSON metadata ('data') of an open Stable-Baselines3 zip."""
+    return json.loads(archive.read('data'))
+
+
+def detect_algo(zip_path):
+    """
+    Detect the algorithm of a saved Stable-Baselines3 model from its metadata.
+    
+    Reads the 'data' JSON inside the zip (no torch or SB3 import needed).
+    
+    Args:
+        zip_path: Path to a model saved with model.save()
+    
+    Returns:
+        str: 'DQN' or 'PPO'
+    
+    Raises:
+        ValueError: If the policy class is not a DQN or actor-critic policy
+    """
+    with zipfile.ZipFile(zip_path) as archive:
+        data = _read_data(archive)
+    return _algo_from_data(data, zip_path)
+
+
+def _algo_from_data(data, zip_path):
+    """Algorithm name from the 'data' metadata of a saved model."""
+    policy_class = data.get('policy_class', {})
+    module = policy_class.get('__module__', '')
+    if 'dqn' in module:
+        return 'DQN'
+    if 'ActorCriticPolicy' in str(policy_class.get('__init__', '')) or 'predict_values' in policy_class:
+        return 'PPO'
+    
+    raise ValueError(f"Cannot detect the algorithm of {zip_path} (policy module '{module}')")
+
+
+class _StateDictUnpickler(pickle.Unpickler):
+    """
+    Unpickles a torch state dict into NumPy arrays without importing torch.
+    
+    Tensors in torch's zip format are pickled as references to raw storage
+    files (archive/data/<key>); they are rebuilt here as strided views.
+    """
+    
+    def __init__(self, archive, prefix):
+        super().__init__(io.BytesIO(archive.read(prefix + 'data.pkl')))
+        self.archive = archive
+        self.prefix = prefix
+    
+    def find_class(self, module, name):
+        if module == 'collections' and name == 'OrderedDict':
+            return collections.OrderedDict
+        if module == 'torch._utils' and name == '_rebuild_tensor_v2':
+            return self._rebuild_tensor
+        if module == 'torch._utils' and name == '_rebuild_parameter':
+            return lambda data, requires_grad, backward_hooks: data
+        if module == 'torch' and name in _STORAGE_DTYPES:
+            return _STORAGE_DTYPES[name]
+        raise pickle.UnpicklingError(f"Unsupported object in policy weights: {module}.{name}")
+    
+    def persistent_load(self, pid):
+        # ('storage', storage class, key, device, numel)
+        _, dtype, key, _, numel = pid
+        raw = self.archive.read(f"{self.prefix}data/{key}")
+        return np.frombuffer(raw, dtype=np.dtype(dtype).newbyteorder('<'), count=numel)
+    
+    @staticmethod
+    def _rebuild_tensor(storage, offset, size, stride, requires_grad=False, backward_hooks=None,
+                        metadata=None):
+        strides = [s * storage.itemsize for s in stride]
+        return np.lib.stride_tricks.as_strided(storage[offset:], shape=size, strides=strides).copy()
+
+
+def read_state_dict(zip_path):
+    """
+    Read the policy weights of a saved Stable-Baselines3 model without torch.
+    
+    Args:
+        zip_path: Path to a model saved with model.save()
+    
+    Returns:
+        tuple: (dict of parameter name -> np.array, 'data' metadata dict)
+    """
+    with zipfile.ZipFile(zip_path) as outer:
+        data = _read_data(outer)
+        policy_bytes = outer.read('policy.pth')
+    
+    with zipfile.ZipFile(io.BytesIO(policy_bytes)) as archive:
+        # Entries live under a single top-level folder whose name varies
+        pickle_name = next(n for n in archive.namelist() if n.endswith('data.pkl'))
+        prefix = pickle_name[:-len('data.pkl')]
+        state = _StateDictUnpickler(archive, prefix).load()
+    
+    return dict(state), data
+
+
+def _activation_name(data, algo):
+    """Activation of the policy MLP, from policy_kwargs or the algorithm default."""
+    kwargs = data.get('policy_kwargs', {})
+    description = kwargs.get('activation_fn') if isinstance(kwargs, dict) else None
+    if description is None:
+        return DEFAULT_ACTIVATIONS[algo]
+    # Stored as the class repr, e.g. "<class 'torch.nn.modules.activation.ReLU'>"
+    match = re.search(r"\.(\w+)'>", description)
+    name = match.group(1).lower() if match else str(description)
+    if name not in ACTIVATIONS:
+        raise ValueError(f"Unsupported activation: {description}")
+    return name
+
+
+def _sequential_layers(state, prefix):
+    """(weight, bias) pairs of an nn.Sequential in a state dict, in order."""
+    pattern = re.compile(re.escape(prefix) + r'(\d+)\.weight$')
+    indices = sorted(int(m.group(1)) for m in map(pattern.match, state) if m)
+    # Stored as (in, out) so the forward pass is x @ W + b
+    return [(state[f"{prefix}{i}.weight"].T, state[f"{prefix}{i}.bias"]) for i in indices]
+
+
+def _policy_layers(state, algo):
+    """
+    Layers of the action network in a policy state dict.
+    
+    DQN: the Q-network. PPO: the actor MLP followed by the action head
+    (the value network is not needed to act).
+    
+    Args:
+        state: Dict of parameter name -> np.array (policy.state_dict())
+        algo: 'DQN' or 'PPO'
+    
+    Returns:
+        list: (weight, bias) pairs, weights as (in, out)
+    """
+    if algo == 'DQN':
+        return _sequential_layers(state, 'q_net.q_net.')
+    layers = _sequential_layers(state, 'mlp_extractor.policy_net.')
+    layers.append((state['action_net.weight'].T, state['action_net.bias']))
+    return layers
+
+
+class NumpyPolicy:
+    """
+    A DQN Q-network or PPO actor network evaluated with NumPy.
+    
+    Drop-in replacement for model.predict of a Stable-Baselines3 MlpPolicy:
+    a whole (batch, obs_dim) array of observations goes through one chain of
+    matrix products. DQN picks the action with the highest Q-value; PPO the
+    action with the highest logit, or samples from the softmax of the logits
+    when deterministic=False.
+    """
+    
+    def __init__(self, layers, activations, algo, metadata=None, seed=None):
+        """
+        Initialize the policy.
+        
+        Args:
+            layers: List of (weight, bias) arrays, weights as (in, out)
+            activations: Activation names between layers ('relu', 'tanh', ...)
+            algo: 'DQN' or 'PPO'
+            metadata: Extra information to keep (timesteps, source path, ...)
+            seed: Seed for sampling stochastic PPO actions (default: None)
+        """
+        if len(activations) != len(layers) - 1:
+            raise ValueError(f"Expected {len(layers) - 1} activations, got {len(activations)}")
+        
+        self.weights = [np.asarray(w, dtype=np.float32) for w, _ in layers]
+        self.biases = [np.asarray(b, dtype=np.float32) for _, b in layers]
+        self.activations = list(activations)
+        self._activation_fns = [ACTIVATIONS[name] for name in self.activations]
+        self.algo = algo
+        self.metadata = metadata or {}
+        self.rng = np.random.default_rng(seed)
+        
+        self.obs_dim = self.weights[0].shape[0]
+        self.n_actions = self.weights[-1].shape[1]
+    
+    def forward(self, obs):
+        """
+        Compute the network output (Q-values or action logits).
+        
+        Args:
+            obs: (batch, obs_dim) observations
+        
+        Returns:
+            np.array: (batch, n_actions) outputs
+        """
+        x = np.asarray(obs, dtype=np.float32)
+        for i, activation in enumerate(self._activation_fns):
+            x = activation(x @ self.weights[i] + self.biases[i])
+        return x @ self.weights[-1] + self.biases[-1]
+    
+    @classmethod
+    def from_model(cls, model, seed=None):
+        """
+        Copy the action network of a trained Stable-Baselines3 model.
+        
+        Args:
+            model: Trained DQN or PPO model with an MlpPolicy
+            seed: Seed for sampling stochastic PPO actions (default: None)
+        
+        Returns:
+            NumpyPolicy: Policy with the model's current weights
+        """
+        algo = type(model).__name__
+        state = {name: tensor.detach().cpu().numpy() for name, tensor in model.policy.state_dict().items()}
+        layers = _policy_layers(state, algo)
+        activation = model.policy.activation_fn.__name__.lower()
+        metadata = {'algo': algo, 'timesteps': int(model.num_timesteps)}
+        return cls(layers, [activation] * (len(layers) - 1), algo, metadata, seed=seed)
+    
+    def action_probabilities(self, obs):
+        """
+        Action probabilities of the PPO actor (softmax of the logits).
+        
+        Args:
+            obs: (batch, obs_dim) observations
+        
+        Returns:
+            np.array: (batch, n_actions) probabilities
+        """
+        logits = self.forward(obs)
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+    
+    def predict(self, observation, state=None, episode_start=None, deterministic=True):
+        """
+        Get the action for one observation or a batch.
+        
+        Same signature and return value as Stable-Baselines3's predict. DQN is
+        always greedy (exploration belongs to training, not to the Q-network).
+        
+        Args:
+            observation: (obs_dim,) observation or (batch, obs_dim) observations
+            deterministic: Greedy actions; if False, PPO samples its actions (default: True)
+        
+        Returns:
+            tuple: (action or (batch,) actions, None)
+        """
+        obs = np.asarray(observation, dtype=np.float32)
+        single = obs.ndim == 1
+        obs = obs.reshape(-1, self.obs_dim)
+        
+        if deterministic or self.algo == 'DQN':
+            actions = np.argmax(self.forward(obs), axis=1)
+        else:
+            # Inverse-CDF sampling, one uniform draw per observation
+            cumulative = np.cumsum(self.action_probabilities(obs), axis=1)
+            draws = self.rng.random((len(obs), 1)) * cumulative[:, -1:]
+            actions = np.minimum((cumulative < draws).sum(axis=1), self.n_actions - 1)
+        return (actions[0] if single else actions), None
+    
+    def __repr__(self):
+        sizes = [self.obs_dim] + [w.shape[1] for w in self.weights]
+        return f"NumpyPolicy({self.algo}, layers={sizes}, activations={self.activations})"
+
+
+def _load_npz(path):
+    """Load a policy export written by agents/checkpoints.export_policy."""
+    with np.load(path) as arrays:
+        metadata = json.loads(str(arrays['metadata']))
+        if metadata.get('format') != POLICY_FORMAT:
+            raise ValueError(f"{path} is not a policy export (format {metadata.get('format')})")
+        layers = [(arrays[f"w{i}"], arrays[f"b{i}"]) for i in range(metadata['n_layers'])]
+    
+    metadata['path'] = path
+    return NumpyPolicy(layers, metadata['activations'], metadata['algo'], metadata)
+
+
+def _load_zip(path):
+    """Load the policy network of a full Stable-Baselines3 zip, without torch."""
+    state, data = read_state_dict(path)
+    algo = _algo_from_data(data, path)
+    layers = _policy_layers(state, algo)
+    activation = _activation_name(data, algo)
+    metadata = {'algo': algo, 'timesteps': data.get('num_timesteps'), 'path': path}
+    return NumpyPolicy(layers, [activation] * (len(layers) - 1), algo, metadata)
+
+
+def load_policy(path):
+    """
+    Load a trained policy for NumPy inference.
+    
+    Args:
+        path: Policy export (.npz) or Stable-Baselines3 model (.zip)
+    
+    Returns:
+        NumpyPolicy: Loaded policy
+    
+    Raises:
+        FileNotFoundError: If the file does not exist
+        ValueError: If the file is not a supported DQN/PPO model
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Model not found: {path}")
+    if path.endswith('.npz'):
+        return _load_npz(path)
+    return _load_zip(path)
+
+
+def verify_policy(model, policy=None, n_obs=10000, seed=0):
+    """
+    Check a NumPy policy against the Stable-Baselines3 model it came from.
+    
+    Compares greedy actions with model.predict and the network outputs
+    (DQN Q-values, PPO action log-probabilities) on random observations.
+    Needs torch, unlike the rest of this module.
+    
+    Args:
+        model: Trained DQN or PPO model
+        policy: NumpyPolicy to check (default: NumpyPolicy.from_model(model))
+        n_obs: Number of random observations (default: 10000)
+        seed: Seed of the observations (default: 0)
+    
+    Returns:
+        dict: 'agreement' (fraction of equal actions) and 'max_abs_error'
+    """
+    import torch
+    
+    if policy is None:
+        policy = NumpyPolicy.from_model(model)
+    
+    space = model.observation_space
+    rng = np.random.default_rng(seed)
+    obs = rng.uniform(space.low, space.high, size=(n_obs,) + space.shape).astype(np.float32)
+    
+    expected_actions, _ = model.predict(obs, deterministic=True)
+    actions, _ = policy.predict(obs, deterministic=True)
+    
+    outputs = policy.forward(obs)
+    with torch.no_grad():
+        obs_tensor = torch.as_tensor(obs, device=model.device)
+        if policy.algo == 'DQN':
+            expected = model.q_net(obs_tensor).cpu().numpy()
+        else:
+            # Categorical normalizes its logits to log-probabilities
+            expected = model.policy.get_distribution(obs_tensor).distribution.logits.cpu().numpy()
+            outputs = np.log(policy.action_probabilities(obs))
+    
+    return {
+        'agreement': float(np.mean(actions == expected_actions)),
+        'max_abs_error': float(np.max(np.abs(outputs - expected)))
+    }
+
+
+def read_manifest(models_dir):
+    """
+    Read the model manifest of a directory.
+    
+    Args:
+        models_dir: Model directory
+    
+    Returns:
+        dict: Manifest with a 'models' dict (empty if there is no manifest)
+    """
+    path = os.path.join(models_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {'version': 1, 'models': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def find_models(models_dir, include_checkpoints=False):
+    """
+    List the servable models of a directory, most preferred first.
+    
+    Uses manifest.json when present (preferring the .npz policy export of
+    each model); otherwise scans the zips and reads their metadata. Models are
+    ordered best, final, then checkpoints (by score), and by name within a kind.
+    
+    Args:
+        models_dir: Model directory
+        include_checkpoints: Also list training checkpoints (default: False)
+    
+    Returns:
+        list: Dicts with 'name', 'algo', 'kind', 'score' and 'path'
+    """
+    if not os.path.isdir(models_dir):
+        return []
+    
+    models = []
+    manifest = read_manifest(models_dir)
+    if manifest['models']:
+        for name, entry in manifest['models'].items():
+            paths = [os.path.join(models_dir, entry[key]) for key in ('policy', 'zip') if entry.get(key)]
+            paths = [p for p in paths if os.path.exists(p)]
+            if paths:
+                models.append({'name': name, 'algo': entry['algo'], 'kind': entry.get('kind', 'final'),
+                               'score': entry.get('score'), 'path': paths[0]})
+    else:
+        for file_name in sorted(os.listdir(models_dir)):
+            if not file_name.endswith('.zip'):
+                continue
+            path = os.path.join(models_dir, file_name)
+            try:
+                algo = detect_algo(path)
+            except (ValueError, KeyError, zipfile.BadZipFile):
+                continue
+            name = file_name[:-len('.zip')]
+            kind = 'best' if name.startswith('best') else 'checkpoint' if name.endswith('_steps') else 'final'
+            models.append({'name': name, 'algo': algo, 'kind': kind, 'score': None, 'path': path})
+    
+    if not include_checkpoints:
+        models = [m for m in models if m['kind'] != 'checkpoint']
+    
+    def sort_key(model):
+        kind = KIND_ORDER.index(model['kind']) if model['kind'] in KIND_ORDER else len(KIND_ORDER)
+        score = -model['score'] if model['kind'] == 'checkpoint' and model['score'] is not None else 0
+        return kind, score, model['name']
+    
+    return sorted(models, key=sort_key)
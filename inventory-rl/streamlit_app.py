@@ -25,14 +25,7 @@ sys.path.append(str(project_root))
 from env.inventory_env import InventoryEnv
 from utils.eoq import EOQBaseline
 from utils.heatmap import StateHeatmap
-
-# Try to import Stable-Baselines3 (may not be available)
-try:
-    from stable_baselines3 import DQN, PPO
-    SB3_AVAILABLE = True
-except ImportError:
-    SB3_AVAILABLE = False
-    st.warning("Stable-Baselines3 not available. RL models cannot be loaded.")
+from inference import find_models, load_policy
 
 # Set page config
 st.set_page_config(
@@ -49,29 +42,20 @@ plt.rcParams['figure.figsize'] = (10, 6)
 
 def load_rl_model(model_path):
     """
-    Load a trained RL model.
+    Load a trained RL model for NumPy inference (no torch needed).
     
     Args:
-        model_path: Path to the model file
+        model_path: Path to the policy export (.npz) or model (.zip)
         
     Returns:
-        Loaded model or None if failed
+        NumpyPolicy or None if failed
     """
-    if not SB3_AVAILABLE:
-        return None
-    
     if not os.path.exists(model_path):
         return None
     
     try:
-        # Try DQN first
-        try:
-            model = DQN.load(model_path)
-            return model
-        except:
-            # Try PPO
-            model = PPO.load(model_path)
-            return model
+        # DQN or PPO is read from the file's metadata
+        return load_policy(model_path)
     except Exception as e:
         st.error(f"Error loading model: {e}")
         return None
@@ -87,7 +71,7 @@ def run_episode(env, policy_type, model=None, baseline=None, seed=None):
         model: Trained RL model (for policy_type="rl")
         baseline: EOQBaseline instance (for policy_type="eoq")
         seed: Random seed for reproducibility
-        
+    
     Returns:
         dict: Episode data including metrics and history
     """
@@ -181,7 +165,7 @@ def run_multiple_episodes(env, policy_type, num_episodes, model=None, baseline=N
         model: Trained RL model (optional)
         baseline: EOQBaseline instance (optional)
         seed: Base random seed (optional)
-        
+    
     Returns:
         tuple: (list of results, last episode data)
     """
@@ -307,17 +291,11 @@ def main():
     # Policy selection
     policy_options = ["Random Policy", "EOQ Baseline"]
     
-    # Check for trained models
+    # Check for trained models (listed in models/manifest.json, or found by scanning)
     models_dir = project_root / "models"
-    available_models = []
-    
-    if models_dir.exists():
-        for model_file in ["best_model.zip", "dqn_inventory.zip", "ppo_inventory.zip"]:
-            model_path = models_dir / model_file
-            if model_path.exists():
-                available_models.append(model_file)
+    available_models = [os.path.basename(entry['path']) for entry in find_models(str(models_dir))]
     
-    if available_models and SB3_AVAILABLE:
+    if available_models:
         policy_options.append("Trained RL Policy")
     
     policy_type = st.sidebar.selectbox(
@@ -516,7 +494,7 @@ def main():
                     env_heatmap.close()
             
             env.close()
-            
+        
         st.success("✅ Simulation complete!")
     
     else:
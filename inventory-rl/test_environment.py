@@ -12,7 +12,11 @@ import numpy as np
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from env.inventory_env import InventoryEnv
-from utils.eoq import EOQBaseline, calculate_eoq
+from env.batched_env import BatchedInventoryEnv, draw_demand_tapes
+from env.demand import WeekdayUniformDemand, EmpiricalDemand, make_demand_model
+from env.simulator import NUMBA_AVAILABLE, linear_policy_table, rollout_policies, table_from_policy
+from utils.eoq import EOQBaseline, SSPolicy, calculate_eoq, estimate_demand, tune_baseline
+from inference import NumpyPolicy, find_models, load_policy, verify_policy
 
 
 def test_environment():
@@ -53,7 +57,7 @@ def test_environment():
     
     env.close()
     print(f"\n✓ Environment test passed!")
-    
+
 
 def test_eoq():
     """Test EOQ module."""
@@ -124,12 +128,476 @@ def test_baseline_episode():
     env.close()
 
 
+def test_batched_environment():
+    """Test seeding and the NumPy-batched environment used for vectorized training."""
+    print("\n" + "=" * 60)
+    print("Testing Batched Environment")
+    print("=" * 60)
+    
+    # Same seed -> same demand sequence for a single environment
+    demands = []
+    for _ in range(2):
+        env = InventoryEnv()
+        env.reset(seed=7)
+        demands.append([env.step(2)[4]['demand'] for _ in range(30)])
+    assert demands[0] == demands[1], "Seeded environments should be reproducible"
+    print(f"\n✓ Seeded InventoryEnv is reproducible")
+    
+    batch = BatchedInventoryEnv(n_envs=16, seed=7)
+    obs = batch.reset()
+    assert obs.shape == (16, 3) and obs.dtype == np.float32
+    
+    actions = np.arange(16) % 11
+    for day in range(30):
+        dow = day % 7
+        obs, rewards, terminated, info = batch.step(actions)
+        
+        # Demand stays within the weekday/weekend ranges plus trend
+        low = {5: 15, 6: 30}.get(dow, 0)
+        high = {5: 30, 6: 50}.get(dow, 15) + 5
+        assert np.all((info['demand'] >= low) & (info['demand'] <= high))
+        
+        # Same reward rule as InventoryEnv
+        perfect = (info['unmet_demand'] == 0) & (info['inventory'] > 0) & (info['inventory'] <= 100)
+        assert np.array_equal(rewards, np.where(perfect, 1.0, -1.0))
+        assert terminated.all() == (day == 29)
+    print(f"✓ 16 batched environments ran a full episode")
+    
+    obs = batch.reset(indices=[0, 3])
+    assert obs[0, 1] == 0.0 and obs[3, 1] == 0.0 and obs[1, 1] == 1.0
+    print(f"✓ Partial reset only resets the selected environments")
+    
+    # Demand tapes are reproducible and replayed exactly
+    tapes = draw_demand_tapes(8, seed=3)
+    assert np.array_equal(tapes, draw_demand_tapes(8, seed=3))
+    replay = BatchedInventoryEnv(n_envs=8, demand_tape=tapes)
+    replay.reset()
+    replayed = np.stack([replay.step(np.zeros(8))[3]['demand'] for _ in range(30)], axis=1)
+    assert np.array_equal(replayed, tapes)
+    print(f"✓ Demand tapes replay the same demand")
+    
+    print(f"\n✓ Batched environment test passed!")
+
+
+def test_numpy_policy():
+    """Test torch-free model loading and the NumPy forward pass."""
+    print("\n" + "=" * 60)
+    print("Testing NumPy Policy Inference")
+    print("=" * 60)
+    
+    # Greedy action is the argmax of the network output, single or batched
+    rng = np.random.default_rng(0)
+    layers = [(rng.normal(size=(3, 8)), rng.normal(size=8)), (rng.normal(size=(8, 11)), rng.normal(size=11))]
+    policy = NumpyPolicy(layers, ['relu'], 'DQN')
+    obs = rng.random((64, 3)).astype(np.float32)
+    actions, _ = policy.predict(obs)
+    expected = np.argmax(np.maximum(obs @ layers[0][0] + layers[0][1], 0) @ layers[1][0] + layers[1][1], axis=1)
+    assert np.array_equal(actions, expected)
+    assert policy.predict(obs[5])[0] == actions[5]
+    print(f"\n✓ Forward pass matches the reference computation")
+    
+    # Same actions and outputs as the Stable-Baselines3 models, also after an .npz export
+    from stable_baselines3 import DQN, PPO
+    from agents.checkpoints import export_policy
+    import tempfile
+    
+    for algo in (DQN, PPO):
+        model = algo("MlpPolicy", InventoryEnv(), seed=0, device="cpu")
+        result = verify_policy(model, n_obs=2000)
+        assert result['agreement'] == 1.0 and result['max_abs_error'] < 1e-4, result
+        with tempfile.TemporaryDirectory() as tmp:
+            path = export_policy(model, os.path.join(tmp, "policy.npz"))
+            assert verify_policy(model, load_policy(path), n_obs=2000)['agreement'] == 1.0
+        print(f"✓ {algo.__name__}: NumPy policy matches model.predict")
+    
+    # Stochastic PPO actions follow the softmax of the logits
+    policy = NumpyPolicy.from_model(model, seed=0)
+    sampled, _ = policy.predict(np.repeat(obs[:1], 20000, axis=0), deterministic=False)
+    frequencies = np.bincount(sampled, minlength=policy.n_actions) / len(sampled)
+    assert np.abs(frequencies - policy.action_probabilities(obs[:1])[0]).max() < 0.02
+    print(f"✓ Sampled PPO actions follow the action probabilities")
+    
+    models_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+    models = find_models(models_dir)
+    if not models:
+        print("  (no trained models found, skipping model loading)")
+        return
+    
+    for entry in models:
+        policy = load_policy(entry['path'])
+        assert policy.algo == entry['algo'] and policy.obs_dim == 3 and policy.n_actions == 11
+        actions, _ = policy.predict(obs)
+        assert actions.shape == (64,) and actions.min() >= 0 and actions.max() <= 10
+        print(f"✓ Loaded {entry['name']} as {policy}")
+    
+    print(f"\n✓ NumPy policy test passed!")
+
+
+def test_simulator():
+    """Test the whole-episode simulator kernel against the batched environment."""
+    print("\n" + "=" * 60)
+    print("Testing Simulator Kernel")
+    print("=" * 60)
+    
+    tapes = draw_demand_tapes(200, seed=11)
+    tables = np.stack([linear_policy_table([-12, 2, 8], bias=bias) for bias in (3, 6, 9)])
+    rewards = rollout_policies(tables, tapes, backend='numpy')
+    assert rewards.shape == (3, 200)
+    
+    # Same episodes replayed step by step in BatchedInventoryEnv
+    for table, expected in zip(tables, rewards):
+        env = BatchedInventoryEnv(n_envs=200, demand_tape=tapes)
+        env.reset()
+        totals = np.zeros(200)
+        for day in range(30):
+            actions = table[np.minimum(env.inventory, len(table) - 1), day]
+            totals += env.step(actions)[1]
+        assert np.array_equal(totals, expected)
+    print(f"\n✓ Kernel rewards match BatchedInventoryEnv exactly")
+    
+    # A table built from a policy's predict reproduces that policy
+    class Linear:
+        def predict(self, obs, deterministic=True):
+            return np.clip(np.rint(6 + obs @ np.array([-12, 2, 8])), 0, 10).astype(int), None
+    
+    assert np.array_equal(table_from_policy(Linear()), tables[1])
+    print(f"✓ Policy tabulation matches the linear table")
+    
+    if NUMBA_AVAILABLE:
+        assert np.array_equal(rollout_policies(tables, tapes, backend='numba'), rewards)
+        print(f"✓ Compiled kernel matches the NumPy kernel")
+    
+    print(f"\n✓ Simulator test passed!")
+
+
+def test_tune_baseline():
+    """Test the (s, S) policy and its simulation-based tuning."""
+    print("\n" + "=" * 60)
+    print("Testing Baseline Tuning")
+    print("=" * 60)
+    
+    # Action table agrees with the per-step rule, per weekday target
+    policy = SSPolicy(reorder_point=50, order_up_to=[40, 40, 40, 40, 45, 60, 80])
+    table = policy.action_table(200)
+    assert all(table[inv, day] == policy.get_discrete_action(inv, 100, day % 7)
+               for inv in range(200) for day in range(30))
+    print(f"\n✓ {policy} table matches get_discrete_action")
+    
+    result = tune_baseline(n_episodes=300, reorder_points=range(0, 81, 20),
+                           order_up_to=range(20, 121, 20), seed=1, verbose=0)
+    low, high = result['ci']
+    assert low <= result['mean_reward'] <= high
+    assert result['mean_reward'] >= result['eoq_mean_reward']
+    print(f"✓ Tuned {result['policy']}: {result['mean_reward']:.2f} "
+          f"vs EOQ {result['eoq_mean_reward']:.2f}")
+    
+    print(f"\n✓ Baseline tuning test passed!")
+
+
+def test_demand_model():
+    """Test the exact demand statistics against the environment's demand."""
+    print("\n" + "=" * 60)
+    print("Testing Demand Model")
+    print("=" * 60)
+    
+    model = WeekdayUniformDemand(episode_length=30, trend_strength=5)
+    pmf = model.pmf()
+    assert pmf.shape[0] == 30 and np.allclose(pmf.sum(axis=1), 1.0)
+    
+    # Monday of day 0: uniform 0-15; Sunday of day 27: uniform 30-50 plus trend 4
+    assert model.mean()[0] == 7.5 and np.isclose(model.var()[0], (16 ** 2 - 1) / 12)
+    assert model.mean()[27] == 44.0 and np.isclose(model.var()[27], (21 ** 2 - 1) / 12)
+    print(f"\n✓ Exact mean/variance: Monday {model.mean()[0]:.1f}, last Sunday {model.mean()[27]:.1f}")
+    
+    # Sampled tapes agree with the exact statistics
+    tapes = draw_demand_tapes(50000, seed=0)
+    assert np.abs(tapes.mean(axis=0) - model.mean()).max() < 0.2
+    assert np.abs(tapes.var(axis=0) - model.var()).max() < 2.0
+    print(f"✓ Sampled demand matches the exact statistics")
+    
+    # EOQ code uses the exact mean instead of simulated episodes
+    env = InventoryEnv()
+    assert estimate_demand(env) == model.mean_daily_demand()
+    assert EOQBaseline(demand_model=env.demand_model).avg_daily_demand == model.mean_daily_demand()
+    print(f"✓ Mean daily demand: {model.mean_daily_demand():.2f}")
+    
+    print(f"\n✓ Demand model test passed!")
+
+
+def test_demand_models():
+    """Test the pluggable demand models and their batched sampling."""
+    print("\n" + "=" * 60)
+    print("Testing Demand Models")
+    print("=" * 60)
+    
+    # Two years of weekly-patterned history, rows starting on a Monday
+    rng = np.random.default_rng(0)
+    history = rng.poisson(np.tile([5, 6, 7, 8, 9, 20, 30], 104))
+    models = [make_demand_model('poisson'), make_demand_model('negbin', dispersion=2.0),
+              EmpiricalDemand(history)]
+    
+    for model in models:
+        tapes = draw_demand_tapes(40000, seed=1, demand_model=model)
+        assert tapes.shape == (40000, 30) and tapes.min() >= 0
+        assert np.allclose(model.pmf().sum(axis=1), 1.0)
+        assert np.abs(tapes.mean(axis=0) - model.mean()).max() < 0.1 * model.mean().max()
+        assert np.allclose(tapes.var(axis=0), model.var(), rtol=0.15)
+        print(f"✓ {model}: sampled episodes match the exact statistics")
+    
+    # Negative binomial is burstier than Poisson with the same means
+    assert np.allclose(models[0].mean(), models[1].mean())
+    assert np.all(models[1].var() > models[0].var())
+    
+    # Bootstrapped demand keeps the weekday pattern of the history
+    assert np.allclose(models[2].weekday_mean(), history.reshape(-1, 7).mean(axis=0))
+    
+    # Environments sample the chosen model, and seeding stays reproducible
+    episodes = []
+    for _ in range(2):
+        env = InventoryEnv(demand_model=models[2])
+        env.reset(seed=3)
+        episodes.append([env.step(2)[4]['demand'] for _ in range(30)])
+    assert episodes[0] == episodes[1]
+    assert set(episodes[0]) <= set(history.tolist())
+    
+    for model in models:
+        batched = BatchedInventoryEnv(n_envs=4, seed=3, demand_model=model)
+        batched.reset()
+        for _ in range(30):
+            _, _, terminated, info = batched.step(np.full(4, 2))
+            assert info['demand'].shape == (4,) and info['demand'].min() >= 0
+        assert np.all(terminated)
+    print(f"✓ InventoryEnv and BatchedInventoryEnv draw from the configured model")
+    
+    print(f"\n✓ Demand models test passed!")
+
+
+def test_sweep():
+    """Test sweep sampling, rung budgets and ASHA scheduling (training stubbed out)."""
+    print("\n" + "=" * 60)
+    print("Testing Hyperparameter Sweep")
+    print("=" * 60)
+    
+    from agents.sweep import (DEFAULT_SPACES, SweepRunner, align_budget, asha_rungs,
+                              rollout_size, sample_configs)
+    
+    space = DEFAULT_SPACES['ppo']
+    configs = sample_configs(space, 'random', 16, seed=0)
+    assert configs == sample_configs(space, 'random', 16, seed=0), "Sampling should be seeded"
+    assert all(1e-4 <= c['learning_rate'] <= 1e-3 and c['n_steps'] in space['n_steps'] for c in configs)
+    assert len(sample_configs({'n_steps': [512, 1024], 'gamma': {'low': 0.9, 'high': 0.99}}, 'grid')) == 6
+    assert asha_rungs(10000, 100000, 3) == [10000, 30000, 90000, 100000]
+    print(f"✓ Configs are seeded and inside the space; rungs grow by eta")
+    
+    # Each trial stops at a whole rollout within half a rollout of the rung budget
+    rungs = asha_rungs(10000, 100000)
+    for n_envs in (1, 2, 3, 4, 6):
+        runner = SweepRunner('ppo', configs, '.', rungs, n_envs=n_envs)
+        for trial_id, params in enumerate(configs):
+            unit = rollout_size('ppo', params, n_envs)
+            for rung, nominal in enumerate(rungs):
+                budget = runner._make_job(trial_id, rung)['budget']
+                assert budget % unit == 0 and abs(budget - nominal) <= unit / 2, (n_envs, params, budget)
+    assert align_budget(500, 2048) == 2048, "Every trial trains for at least one rollout"
+    print(f"✓ Rung budgets are aligned to each trial's rollout for 1-6 envs")
+    
+    # Asynchronous successive halving with a stubbed score: each trial's gamma
+    runner = SweepRunner('ppo', configs[:9], '.', [1000, 3000, 9000], eta=3)
+    order = []
+    job = runner._next_job()
+    while job is not None:
+        completed = runner.results[job['rung'] - 1] if job['rung'] else {}
+        if job['rung']:
+            # Promoted trials are in the top 1/eta of the rung below
+            ranked = sorted(completed, key=lambda t: completed[t]['mean_reward'], reverse=True)
+            assert job['trial_id'] in ranked[:len(completed) // 3]
+        order.append((job['trial_id'], job['rung']))
+        runner.results[job['rung']][job['trial_id']] = {
+            'trial_id': job['trial_id'], 'rung': job['rung'], 'timesteps': job['budget'],
+            'mean_reward': configs[job['trial_id']]['gamma'] + job['rung'], 'std_reward': 0.0
+        }
+        job = runner._next_job()
+    
+    best = max(range(9), key=lambda t: configs[t]['gamma'])
+    assert order[:3] == [(0, 0), (1, 0), (2, 0)] and order[3][1] == 1, "Promote as soon as eta trials finished"
+    assert sum(rung == 0 for _, rung in order) == 9 and sum(rung == 1 for _, rung in order) == 3
+    assert (best, 2) in order
+    
+    leaderboard = runner.leaderboard()
+    assert [row['rank'] for row in leaderboard] == list(range(1, 10))
+    assert leaderboard[0]['trial_id'] == best and leaderboard[0]['status'] == 'completed'
+    assert [row['rung'] for row in leaderboard] == sorted((row['rung'] for row in leaderboard), reverse=True)
+    print(f"✓ ASHA promotes the top 1/eta and the leaderboard ranks by rung, then reward")
+    
+    print(f"\n✓ Sweep test passed!")
+
+
+def test_checkpoints():
+    """Test top-k checkpoint pruning and the model manifest."""
+    print("\n" + "=" * 60)
+    print("Testing Checkpoint Management")
+    print("=" * 60)
+    
+    import tempfile
+    from agents.checkpoints import CheckpointManager, rebuild_directory, update_manifest
+    from inference.policy import read_manifest
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        # Fake checkpoints: empty files plus manifest entries, and one unrelated model
+        manager = CheckpointManager(tmp, 'ppo_checkpoint', top_k=2, verbose=0)
+        scores = {1000: 5.0, 2000: 9.0, 3000: 1.0, 4000: 7.0, 5000: None, 6000: 0.5}
+        for timesteps, score in scores.items():
+            name = manager._name(timesteps)
+            manager.entries[name] = {'algo': 'PPO', 'kind': 'checkpoint', 'zip': name + '.zip',
+                                     'policy': name + '.npz', 'timesteps': timesteps, 'score': score}
+            for ext in ('.zip', '.npz'):
+                open(os.path.join(tmp, name + ext), 'w').close()
+        update_manifest(tmp, dict(manager.entries, ppo_inventory={'algo': 'PPO', 'kind': 'final'}))
+        
+        def surviving():
+            files = sorted(f for f in os.listdir(tmp) if f.startswith('ppo_checkpoint'))
+            steps = sorted({int(f.split('_')[2]) for f in files})
+            assert files == sorted(f"ppo_checkpoint_{t}_steps{ext}" for t in steps for ext in ('.npz', '.zip'))
+            manifest = read_manifest(tmp)['models']
+            assert sorted(n for n in manifest if n.startswith('ppo_checkpoint')) == sorted(manager.entries)
+            assert 'ppo_inventory' in manifest, "Other models are left alone"
+            return steps
+        
+        # Top-2 by score (2000, 4000), the unscored 5000 and the latest 6000 survive
+        assert sorted(manager.prune()) == ['ppo_checkpoint_1000_steps', 'ppo_checkpoint_3000_steps']
+        assert surviving() == [2000, 4000, 5000, 6000]
+        
+        # Scoring 5000 above 4000 pushes 4000 out of the top-2
+        manager.set_score(5000, 8.0)
+        assert surviving() == [2000, 5000, 6000]
+        assert manager.best()['timesteps'] == 2000
+    print(f"✓ Prune keeps the top-k, the latest and unscored checkpoints, files and manifest together")
+    
+    # Converting an existing directory: every zip is scored, exported and listed
+    from stable_baselines3 import PPO
+    model = PPO("MlpPolicy", InventoryEnv(), seed=0, device="cpu")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ('ppo_checkpoint_1000_steps', 'ppo_checkpoint_2000_steps', 'ppo_checkpoint_3000_steps',
+                     'ppo_inventory'):
+            model.save(os.path.join(tmp, name))
+        
+        manifest = rebuild_directory(tmp, top_k=1, n_eval_episodes=50)['models']
+        zips = sorted(os.path.splitext(f)[0] for f in os.listdir(tmp) if f.endswith('.zip'))
+        assert sorted(manifest) == zips and len(zips) == 3, zips
+        assert 'ppo_checkpoint_3000_steps' in manifest and manifest['ppo_inventory']['kind'] == 'final'
+        assert all(os.path.exists(os.path.join(tmp, entry['policy'])) for entry in manifest.values())
+    print(f"✓ rebuild_directory prunes, exports and writes the manifest")
+    
+    print(f"\n✓ Checkpoint test passed!")
+
+
+def test_eval_callback():
+    """Test fixed-tape evaluation, synchronous and in a separate process."""
+    print("\n" + "=" * 60)
+    print("Testing Batched Evaluation")
+    print("=" * 60)
+    
+    import tempfile
+    from stable_baselines3 import PPO
+    from agents.eval_callback import EVAL_TAPE_SEED, BatchedEvalCallback, evaluate_on_tapes
+    from inference.policy import read_manifest
+    
+    # Common random numbers: the same model scores identically on the same tapes
+    model = PPO("MlpPolicy", InventoryEnv(), seed=0, device="cpu")
+    tapes = draw_demand_tapes(200, seed=EVAL_TAPE_SEED)
+    first = evaluate_on_tapes(model, tapes)
+    assert first.shape == (200,) and np.array_equal(first, evaluate_on_tapes(model, tapes))
+    print(f"✓ Repeated evaluations give identical episode rewards")
+    
+    # Async evaluation of saved checkpoints gives the same scores as evaluating in place
+    callbacks = []
+    for async_eval in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            model = PPO("MlpPolicy", InventoryEnv(), n_steps=64, batch_size=32, n_epochs=1, seed=0, device="cpu")
+            callback = BatchedEvalCallback(eval_freq=64, n_eval_episodes=50, best_model_save_path=tmp,
+                                           log_path=tmp, async_eval=async_eval, verbose=0)
+            model.learn(192, callback=callback)
+            
+            assert sorted(os.listdir(tmp)) == ['best_model.npz', 'best_model.zip', 'evaluations.npz',
+                                               'manifest.json'], "Temporary checkpoints should be removed"
+            best = PPO.load(os.path.join(tmp, 'best_model.zip'), device="cpu")
+            assert np.mean(evaluate_on_tapes(best, callback.demand_tapes)) == callback.best_mean_reward
+            assert read_manifest(tmp)['models']['best_model']['score'] == callback.best_mean_reward
+            callbacks.append(callback)
+    
+    sync, parallel = callbacks
+    assert sync.evaluations_timesteps == parallel.evaluations_timesteps == [64, 128, 192]
+    assert all(np.array_equal(a, b) for a, b in zip(sync.evaluations_results, parallel.evaluations_results))
+    print(f"✓ Async evaluation matches sync, in order, and keeps the best model")
+    
+    print(f"\n✓ Evaluation callback test passed!")
+
+
+def test_vec_envs():
+    """Test vectorized training environments and rollout scaling."""
+    print("\n" + "=" * 60)
+    print("Testing Vectorized Training Environments")
+    print("=" * 60)
+    
+    from agents.common import make_vec_env, scale_rollout, scale_train_freq
+    
+    # Sub-environments are seeded with seed + rank: distinct, but reproducible
+    for backend in ('dummy', 'subproc'):
+        runs = []
+        for _ in range(2):
+            vec_env = make_vec_env(4, backend, seed=11)
+            vec_env.reset()
+            demands = []
+            for _ in range(30):
+                _, _, _, infos = vec_env.step(np.full(4, 2))
+                demands.append([info['demand'] for info in infos])
+            vec_env.close()
+            runs.append(np.array(demands))
+        assert np.array_equal(runs[0], runs[1]), f"{backend}: seeded runs should match"
+        assert len({tuple(runs[0][:, i]) for i in range(4)}) == 4, f"{backend}: sub-env demand should differ"
+        print(f"✓ {backend}: sub-environments draw distinct, reproducible demand")
+    
+    # Batched backend resets finished episodes and reports the terminal observation
+    vec_env = make_vec_env(8, 'batched', seed=11)
+    obs = vec_env.reset()
+    for day in range(30):
+        obs, rewards, dones, infos = vec_env.step(np.full(8, 2))
+        assert dones.all() == (day == 29)
+    assert all(np.isclose(info['terminal_observation'][1], 1.0) for info in infos)
+    assert all(info['episode']['l'] == 30 for info in infos)
+    assert np.all(obs[:, 0] == 1.0) and np.all(obs[:, 1] == 0.0), "Returned observations start a new episode"
+    vec_env.close()
+    print(f"✓ batched: auto-reset with terminal_observation and episode statistics")
+    
+    # A PPO rollout keeps ~2048 transitions and stays a whole number of minibatches
+    for n_envs in (1, 2, 3, 4):
+        n_steps, batch_size = scale_rollout(2048, 64, n_envs)
+        rollout = n_steps * n_envs
+        assert rollout % batch_size == 0 and abs(rollout - 2048) <= 0.05 * 2048, (n_envs, n_steps, batch_size)
+        train_freq, gradient_steps = scale_train_freq(4, 1, n_envs)
+        assert np.isclose(gradient_steps / (train_freq * n_envs), 1 / 4, rtol=0.5)
+    assert scale_rollout(2048, 64, 1) == (2048, 64) and scale_rollout(2048, 64, 4) == (512, 64)
+    print(f"✓ Rollout and update scaling keep the per-transition schedule")
+    
+    print(f"\n✓ Vectorized environment test passed!")
+
+
 def main():
     """Run all tests."""
     try:
         test_environment()
         test_eoq()
         test_baseline_episode()
+        test_batched_environment()
+        test_numpy_policy()
+        test_simulator()
+        test_tune_baseline()
+        test_demand_model()
+        test_demand_models()
+        test_sweep()
+        test_checkpoints()
+        test_eval_callback()
+        test_vec_envs()
         
         print("\n" + "=" * 60)
         print("✓ ALL TESTS PASSED!")
@@ -138,7 +606,7 @@ def main():
         print("  python agents/train_dqn.py")
         print("  python agents/train_ppo.py")
         print("=" * 60)
-        
+    
     except Exception as e:
         print(f"\n✗ TEST FAILED: {e}")
         import traceback
@@ -1,11 +1,13 @@
 """Convenience imports for the utils package."""
-from .eoq import calculate_eoq, EOQBaseline, estimate_demand
+from .eoq import calculate_eoq, EOQBaseline, SSPolicy, estimate_demand, tune_baseline
 from .heatmap import StateHeatmap, generate_heatmap_from_episodes, generate_heatmap_from_model
 
 __all__ = [
     'calculate_eoq',
     'EOQBaseline',
+    'SSPolicy',
     'estimate_demand',
+    'tune_baseline',
     'StateHeatmap',
     'generate_heatmap_from_episodes',
     'generate_heatmap_from_model'
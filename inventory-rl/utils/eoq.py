@@ -3,10 +3,19 @@ Economic Order Quantity (EOQ) Module
 
 Provides EOQ calculation and baseline policy for inventory management.
 EOQ is used as a reference for comparison with RL-based policies.
+
+Also provides an (s, S) order-up-to baseline whose parameters are tuned by
+Monte Carlo simulation (tune_baseline), so RL agents are compared against
+the best classical policy rather than a guessed one.
 """
 
+from statistics import NormalDist
+
 import numpy as np
 
+from env.batched_env import draw_demand_tapes
+from env.simulator import ACTION_UNITS, N_ACTIONS, max_inventory, rollout_policies
+
 
 def calculate_eoq(demand_total, ordering_cost, holding_cost):
     """
@@ -23,7 +32,7 @@ def calculate_eoq(demand_total, ordering_cost, holding_cost):
         demand_total: Total expected demand over the planning period
         ordering_cost: Fixed cost per order
         holding_cost: Cost to hold one unit for one period
-        
+    
     Returns:
         float: Optimal order quantity
     """
@@ -46,7 +55,8 @@ class EOQBaseline:
                  episode_length=30,
                  ordering_cost=50,
                  holding_cost=1,
-                 reorder_point=40):
+                 reorder_point=40,
+                 demand_model=None):
         """
         Initialize EOQ baseline policy.
         
@@ -56,7 +66,11 @@ class EOQBaseline:
             ordering_cost: Fixed cost per order (default: 50)
             holding_cost: Cost per unit per day (default: 1)
             reorder_point: Inventory level that triggers reorder (default: 40)
+            demand_model: DemandModel whose exact mean replaces avg_daily_demand (default: None)
         """
+        if demand_model is not None:
+            avg_daily_demand = demand_model.mean_daily_demand()
+        
         self.avg_daily_demand = avg_daily_demand
         self.episode_length = episode_length
         self.ordering_cost = ordering_cost
@@ -66,7 +80,7 @@ class EOQBaseline:
         # Calculate EOQ
         total_demand = avg_daily_demand * episode_length
         self.eoq = calculate_eoq(total_demand, ordering_cost, holding_cost)
-        
+    
     def get_action(self, inventory, max_capacity=100):
         """
         Decide order quantity based on EOQ policy.
@@ -79,7 +93,7 @@ class EOQBaseline:
         Args:
             inventory: Current inventory level
             max_capacity: Maximum inventory capacity (default: 100)
-            
+        
         Returns:
             int: Order quantity (rounded to nearest 5 for consistency)
         """
@@ -92,14 +106,15 @@ class EOQBaseline:
         else:
             return 0
     
-    def get_discrete_action(self, inventory, max_capacity=100):
+    def get_discrete_action(self, inventory, max_capacity=100, day_of_week=None):
         """
         Get action in the same discrete format as RL agent (0-10).
         
         Args:
             inventory: Current inventory level
             max_capacity: Maximum inventory capacity (default: 100)
-            
+            day_of_week: Ignored; accepted so all baselines share one interface
+        
         Returns:
             int: Discrete action (0-10) where action * 5 = order quantity
         """
@@ -108,25 +123,237 @@ class EOQBaseline:
         discrete_action = min(order_qty // 5, 10)
         return discrete_action
     
+    def action_table(self, n_levels, episode_length=30, max_capacity=100):
+        """
+        Tabulate the policy over (inventory, day) for env.simulator.
+        
+        Args:
+            n_levels: Number of inventory levels (rows)
+            episode_length: Number of days (columns) (default: 30)
+            max_capacity: Maximum inventory capacity (default: 100)
+        
+        Returns:
+            np.array: (n_levels, episode_length) int8 action table
+        """
+        actions = [self.get_discrete_action(level, max_capacity) for level in range(n_levels)]
+        return np.repeat(np.array(actions, dtype=np.int8)[:, None], episode_length, axis=1)
+    
     def __str__(self):
         """String representation of the baseline policy."""
         return f"EOQBaseline(EOQ={self.eoq:.2f}, reorder_point={self.reorder_point})"
 
 
+class SSPolicy:
+    """
+    (s, S) order-up-to policy.
+    
+    When inventory is at or below the reorder point s, order enough to bring it
+    up to the order-up-to level S (rounded to the nearest multiple of 5, at
+    most 50 units). S can differ by day of week, since demand does.
+    """
+    
+    def __init__(self, reorder_point=40, order_up_to=80):
+        """
+        Initialize the (s, S) policy.
+        
+        Args:
+            reorder_point: Inventory level that triggers an order (default: 40)
+            order_up_to: Target level after ordering, or 7 targets for Monday-Sunday (default: 80)
+        """
+        self.reorder_point = int(reorder_point)
+        self.order_up_to = np.broadcast_to(np.asarray(order_up_to, dtype=np.int64), (7,)).copy()
+    
+    def get_action(self, inventory, max_capacity=100, day_of_week=0):
+        """
+        Decide the order quantity.
+        
+        Args:
+            inventory: Current inventory level
+            max_capacity: Maximum inventory capacity (unused, the targets set the level)
+            day_of_week: Current weekday, 0=Monday (default: 0)
+        
+        Returns:
+            int: Order quantity (multiple of 5, 0-50)
+        """
+        if inventory > self.reorder_point:
+            return 0
+        order_qty = round((self.order_up_to[day_of_week % 7] - inventory) / ACTION_UNITS) * ACTION_UNITS
+        return int(min(max(order_qty, 0), ACTION_UNITS * (N_ACTIONS - 1)))
+    
+    def get_discrete_action(self, inventory, max_capacity=100, day_of_week=0):
+        """
+        Get action in the same discrete format as RL agent (0-10).
+        
+        Args:
+            inventory: Current inventory level
+            max_capacity: Maximum inventory capacity (default: 100)
+            day_of_week: Current weekday, 0=Monday (default: 0)
+        
+        Returns:
+            int: Discrete action (0-10) where action * 5 = order quantity
+        """
+        return self.get_action(inventory, max_capacity, day_of_week) // ACTION_UNITS
+    
+    def action_table(self, n_levels, episode_length=30, max_capacity=100):
+        """
+        Tabulate the policy over (inventory, day) for env.simulator.
+        
+        Args:
+            n_levels: Number of inventory levels (rows)
+            episode_length: Number of days (columns) (default: 30)
+            max_capacity: Maximum inventory capacity (unused) (default: 100)
+        
+        Returns:
+            np.array: (n_levels, episode_length) int8 action table
+        """
+        inventory = np.arange(n_levels)[:, None]
+        targets = self.order_up_to[np.arange(episode_length) % 7][None, :]
+        # np.rint rounds half to even, like round() in get_action
+        actions = np.clip(np.rint((targets - inventory) / ACTION_UNITS), 0, N_ACTIONS - 1)
+        actions[inventory[:, 0] > self.reorder_point] = 0
+        return actions.astype(np.int8)
+    
+    def __str__(self):
+        """String representation of the policy."""
+        if np.all(self.order_up_to == self.order_up_to[0]):
+            return f"SSPolicy(s={self.reorder_point}, S={self.order_up_to[0]})"
+        return f"SSPolicy(s={self.reorder_point}, S={self.order_up_to.tolist()})"
+
+
+def _confidence_interval(samples, confidence):
+    """Normal-approximation confidence interval of the mean of samples."""
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    half_width = z * np.std(samples, ddof=1) / np.sqrt(len(samples))
+    return float(np.mean(samples) - half_width), float(np.mean(samples) + half_width)
+
+
+def tune_baseline(n_episodes=2000,
+                  reorder_points=None,
+                  order_up_to=None,
+                  per_weekday=True,
+                  max_sweeps=3,
+                  confidence=0.95,
+                  seed=0,
+                  episode_length=30,
+                  trend_strength=5,
+                  initial_inventory=100,
+                  max_capacity=100,
+                  demand_model=None,
+                  verbose=1):
+    """
+    Find the best (s, S) policy by simulating batches of episodes.
+    
+    1. Grid search over reorder point s and a single order-up-to level S
+    2. If per_weekday, coordinate search over one S per weekday (each weekday
+       in turn, repeated until no weekday improves or max_sweeps)
+    
+    Every candidate is scored on the same demand tapes (common random numbers),
+    so comparisons between candidates are paired. The winner is then scored on
+    fresh tapes for an unbiased mean and confidence interval, next to the
+    EOQBaseline for the same demand model on the same tapes.
+    
+    Args:
+        n_episodes: Episodes for tuning and again for validation (default: 2000)
+        reorder_points: Candidate s values (default: 0-100 in steps of 5)
+        order_up_to: Candidate S values (default: 10-150 in steps of 5)
+        per_weekday: Also tune one S per weekday (default: True)
+        max_sweeps: Maximum passes over the weekdays (default: 3)
+        confidence: Confidence level of the intervals (default: 0.95)
+        seed: Random seed for the demand tapes (default: 0)
+        episode_length: Number of days per episode (default: 30)
+        trend_strength: Strength of demand trend over time (default: 5)
+        initial_inventory: Starting inventory level (default: 100)
+        max_capacity: Maximum inventory capacity (default: 100)
+        demand_model: DemandModel to simulate (default: the environment's
+                      WeekdayUniformDemand)
+        verbose: Print search progress (default: 1)
+    
+    Returns:
+        dict: 'policy' (SSPolicy), 'mean_reward', 'ci', 'std_reward' (validation),
+              'tuning_mean_reward', 'n_candidates', 'eoq_mean_reward' and
+              'improvement_ci' (paired difference to the EOQ baseline)
+    """
+    reorder_points = list(range(0, 101, 5) if reorder_points is None else reorder_points)
+    order_up_to = list(range(10, 151, 5) if order_up_to is None else order_up_to)
+    
+    tune_seed, validation_seed = np.random.SeedSequence(seed).spawn(2)
+    tune_tapes = draw_demand_tapes(n_episodes, episode_length, trend_strength, tune_seed, demand_model)
+    n_levels = max_inventory(initial_inventory, episode_length) + 1
+    
+    def score(policies):
+        tables = np.stack([p.action_table(n_levels, episode_length) for p in policies])
+        return rollout_policies(tables, tune_tapes, initial_inventory, max_capacity).mean(axis=1)
+    
+    # 1. Single order-up-to level
+    candidates = [SSPolicy(s, S) for s in reorder_points for S in order_up_to if S > s]
+    scores = score(candidates)
+    n_candidates = len(candidates)
+    best, best_score = candidates[int(np.argmax(scores))], float(np.max(scores))
+    if verbose >= 1:
+        print(f"Grid search: {n_candidates} policies, best {best} ({best_score:.2f})")
+    
+    # 2. One order-up-to level per weekday
+    if per_weekday:
+        for sweep in range(max_sweeps):
+            improved = False
+            for day in range(7):
+                candidates = []
+                for S in order_up_to:
+                    targets = best.order_up_to.copy()
+                    targets[day] = S
+                    candidates.append(SSPolicy(best.reorder_point, targets))
+                scores = score(candidates)
+                n_candidates += len(candidates)
+                if np.max(scores) > best_score + 1e-9:
+                    best, best_score = candidates[int(np.argmax(scores))], float(np.max(scores))
+                    improved = True
+            if verbose >= 1:
+                print(f"Weekday sweep {sweep + 1}: best {best} ({best_score:.2f})")
+            if not improved:
+                break
+    
+    # Validate on fresh tapes, paired with the EOQ baseline for the same demand
+    validation_tapes = draw_demand_tapes(n_episodes, episode_length, trend_strength, validation_seed, demand_model)
+    eoq = EOQBaseline(episode_length=episode_length, demand_model=demand_model)
+    tables = np.stack([best.action_table(n_levels, episode_length),
+                       eoq.action_table(n_levels, episode_length, max_capacity)])
+    rewards, eoq_rewards = rollout_policies(tables, validation_tapes, initial_inventory, max_capacity)
+    
+    result = {
+        'policy': best,
+        'mean_reward': float(np.mean(rewards)),
+        'ci': _confidence_interval(rewards, confidence),
+        'std_reward': float(np.std(rewards)),
+        'tuning_mean_reward': best_score,
+        'n_candidates': n_candidates,
+        'eoq_mean_reward': float(np.mean(eoq_rewards)),
+        'improvement_ci': _confidence_interval(rewards - eoq_rewards, confidence)
+    }
+    if verbose >= 1:
+        low, high = result['ci']
+        print(f"Tuned baseline {best}: {result['mean_reward']:.2f} "
+              f"({confidence:.0%} CI {low:.2f} to {high:.2f}, {n_episodes} fresh episodes)")
+    return result
+
+
 def estimate_demand(env, num_episodes=10):
     """
-    Estimate average daily demand by running random episodes.
+    Average daily demand of an environment.
     
-    This is useful for dynamically calculating EOQ when actual demand
-    distribution is unknown.
+    Exact when the environment has a demand_model (InventoryEnv and
+    BatchedInventoryEnv do); otherwise estimated by running random episodes.
     
     Args:
         env: Gymnasium environment instance
-        num_episodes: Number of episodes to sample (default: 10)
-        
+        num_episodes: Number of episodes to sample without a demand model (default: 10)
+    
     Returns:
-        float: Estimated average daily demand
+        float: Average daily demand
     """
+    demand_model = getattr(getattr(env, 'unwrapped', env), 'demand_model', None)
+    if demand_model is not None:
+        return demand_model.mean_daily_demand()
+    
     total_demand = 0
     total_days = 0
     
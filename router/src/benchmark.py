@@ -0,0 +1,543 @@
+"""
+Benchmark module.
+Generates synthetic top-down warehouse scenes with known ground truth and times each
+pipeline stage (warp, classify, plan) for every registered engine.
+
+Each scene is a random block layout rendered on a textured floor, with a robot marker
+in one of the RobotDetector colors, viewed through a random perspective distortion.
+Classification engines are scored against the ground-truth grid and planning engines
+are checked for collision-free, shortest paths. Results are written as JSON so runs
+can be diffed to spot regressions.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --sizes 5 10 25 --densities 0.2 --repeats 5 --output bench.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import time
+from collections import deque
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from detector import BackgroundModel, CellClassifier, RobotDetector
+from grid_mapper import GridMapper
+from hierarchical_planner import HierarchicalPlanner
+from homography import compute_homography, warp_perspective
+from occupancy_grid import OccupancyGrid
+from planner import PlannerContext, find_path
+
+
+FLOOR_COLOR = (40, 60, 90)       # Dark brown floor (BGR)
+BLOCK_COLOR = (235, 235, 235)    # White cards (BGR)
+BORDER_COLOR = (110, 110, 110)   # Area outside the inventory floor (BGR)
+
+
+def marker_color_bgr(color):
+    """
+    Get a representative BGR color for a robot marker color name.
+    
+    Uses the center of the first HSV range defined by RobotDetector, so the rendered
+    marker is always inside the range the detector looks for.
+    
+    Args:
+        color: Color name known to RobotDetector (e.g. 'red', 'blue')
+    
+    Returns:
+        tuple: (B, G, R) color
+    """
+    lower, upper = RobotDetector(color=color).color_ranges[color][0]
+    hsv = ((lower.astype(int) + upper.astype(int)) // 2).astype(np.uint8)
+    bgr = cv2.cvtColor(hsv.reshape(1, 1, 3), cv2.COLOR_HSV2BGR)[0, 0]
+    return tuple(int(v) for v in bgr)
+
+
+def reachable_cells(truth, start):
+    """
+    Compute shortest-path distances from start over non-block cells.
+    
+    Args:
+        truth: Ground-truth occupancy array
+        start: Start position (row, col)
+    
+    Returns:
+        numpy.ndarray: Distance per cell (-1 for unreachable cells)
+    """
+    n_rows, n_cols = truth.shape
+    dist = np.full(truth.shape, -1, dtype=int)
+    dist[start] = 0
+    queue = deque([start])
+    
+    while queue:
+        row, col = queue.popleft()
+        for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            r, c = row + dr, col + dc
+            if 0 <= r < n_rows and 0 <= c < n_cols and dist[r, c] < 0 and truth[r, c] != OccupancyGrid.BLOCK:
+                dist[r, c] = dist[row, col] + 1
+                queue.append((r, c))
+    
+    return dist
+
+
+def render_floor(height, width, noise, rng):
+    """
+    Render an empty floor with per-pixel texture noise.
+    
+    Args:
+        height: Image height in pixels
+        width: Image width in pixels
+        noise: Standard deviation of the floor texture noise
+        rng: numpy Generator
+    
+    Returns:
+        np.array: (height, width, 3) uint8 BGR image
+    """
+    floor = np.empty((height, width, 3), dtype=np.float32)
+    floor[:] = FLOOR_COLOR
+    floor += rng.normal(0.0, noise, size=(height, width, 1))
+    return np.clip(floor, 0, 255).astype(np.uint8)
+
+
+def generate_scene(n_rows, n_cols, density=0.2, robot_color='red', cell_pixels=24,
+                   distortion=0.15, noise=6.0, seed=None):
+    """
+    Procedurally generate a synthetic warehouse scene.
+    
+    Args:
+        n_rows: Number of grid rows
+        n_cols: Number of grid columns
+        density: Probability of each cell holding a block
+        robot_color: Robot marker color (any RobotDetector color)
+        cell_pixels: Side length of a cell in the undistorted top-down view
+        distortion: Maximum corner displacement as a fraction of the view size
+        noise: Standard deviation of the floor texture noise
+        seed: Random seed for reproducibility
+    
+    Returns:
+        dict: 'image' (camera view), 'background' (camera view of the empty floor),
+              'corners' (inventory corners in the camera view, ordered TL, TR, BR, BL), 'truth' (ground-truth occupancy array),
+              'robot' and 'goal' positions, 'goal_distance' (optimal path length)
+              and the 'width'/'height' of the undistorted view
+    """
+    rng = np.random.default_rng(seed)
+    
+    # Random block layout with robot and goal on free cells
+    truth = np.where(rng.random((n_rows, n_cols)) < density,
+                     OccupancyGrid.BLOCK, OccupancyGrid.FREE)
+    free_cells = np.argwhere(truth == OccupancyGrid.FREE)
+    if len(free_cells) == 0:
+        free_cells = np.array([[0, 0]])
+        truth[0, 0] = OccupancyGrid.FREE
+    robot = tuple(int(v) for v in free_cells[rng.integers(len(free_cells))])
+    truth[robot] = OccupancyGrid.ROBOT
+    
+    # Pick the goal among cells reachable from the robot
+    dist = reachable_cells(truth, robot)
+    candidates = np.argwhere(dist > 0)
+    if len(candidates) > 0:
+        goal = tuple(int(v) for v in candidates[rng.integers(len(candidates))])
+    else:
+        goal = robot
+    
+    # Render the undistorted top-down view
+    width = n_cols * cell_pixels
+    height = n_rows * cell_pixels
+    top_down = render_floor(height, width, noise, rng)
+    
+    # The empty-floor reference is a separate capture: same floor, its own sensor noise,
+    # drawn from a child of this scene's seed so the scene stream is unchanged
+    empty_floor = render_floor(height, width, noise, rng.spawn(1)[0])
+    
+    margin = max(1, int(cell_pixels * 0.1))
+    for row, col in np.argwhere(truth == OccupancyGrid.BLOCK):
+        x1, y1 = col * cell_pixels + margin, row * cell_pixels + margin
+        x2, y2 = (col + 1) * cell_pixels - margin, (row + 1) * cell_pixels - margin
+        top_down[y1:y2, x1:x2] = BLOCK_COLOR
+    
+    center = (int((robot[1] + 0.5) * cell_pixels), int((robot[0] + 0.5) * cell_pixels))
+    cv2.circle(top_down, center, max(2, int(cell_pixels * 0.3)), marker_color_bgr(robot_color), -1)
+    
+    # Project into a camera view with a random perspective distortion
+    pad = int(max(width, height) * distortion)
+    src = np.float32([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]])
+    jitter = rng.uniform(0, pad, size=(4, 2)) if pad > 0 else np.zeros((4, 2))
+    corners = np.float32([
+        [pad - jitter[0, 0], pad - jitter[0, 1]],
+        [pad + width - 1 + jitter[1, 0], pad - jitter[1, 1]],
+        [pad + width - 1 + jitter[2, 0], pad + height - 1 + jitter[2, 1]],
+        [pad - jitter[3, 0], pad + height - 1 + jitter[3, 1]]
+    ])
+    H = cv2.getPerspectiveTransform(src, corners)
+    image = cv2.warpPerspective(top_down, H, (width + 2 * pad, height + 2 * pad),
+                                flags=cv2.INTER_LINEAR, borderValue=BORDER_COLOR)
+    background = cv2.warpPerspective(empty_floor, H, (width + 2 * pad, height + 2 * pad),
+                                     flags=cv2.INTER_LINEAR, borderValue=BORDER_COLOR)
+    
+    return {
+        'image': image,
+        'background': background,
+        'corners': corners,
+        'truth': truth,
+        'robot': robot,
+        'goal': goal,
+        'goal_distance': int(dist[goal]),
+        'width': width,
+        'height': height
+    }
+
+
+def classify_per_cell(top_down, n_rows, n_cols, robot_color, background_model=None):
+    """
+    Classification engine: CellClassifier on every cell of the grid.
+    
+    Args:
+        top_down: Warped top-down image
+        n_rows: Number of grid rows
+        n_cols: Number of grid columns
+        robot_color: Robot marker color
+        background_model: Unused (per-cell Otsu thresholding)
+    
+    Returns:
+        numpy.ndarray: Predicted cell classifications
+    """
+    grid_mapper = GridMapper(top_down, n_rows, n_cols, verbose=False)
+    classifier = CellClassifier(robot_color=robot_color)
+    return classifier.classify_all_cells(grid_mapper)
+
+
+def classify_background(top_down, n_rows, n_cols, robot_color, background_model=None):
+    """
+    Classification engine: CellClassifier with a BackgroundModel fitted on the empty floor.
+    
+    Args:
+        top_down: Warped top-down image
+        n_rows: Number of grid rows
+        n_cols: Number of grid columns
+        robot_color: Robot marker color
+        background_model: BackgroundModel fitted on the warped empty-floor view
+    
+    Returns:
+        numpy.ndarray: Predicted cell classifications
+    """
+    grid_mapper = GridMapper(top_down, n_rows, n_cols, verbose=False)
+    classifier = CellClassifier(robot_color=robot_color, background_model=background_model)
+    return classifier.classify_all_cells(grid_mapper)
+
+
+def plan_astar(start, goal, occupancy_grid):
+    """Planning engine: A* via find_path."""
+    return find_path(start, goal, occupancy_grid, algorithm='astar', verbose=False)
+
+
+def plan_bfs(start, goal, occupancy_grid):
+    """Planning engine: BFS via find_path."""
+    return find_path(start, goal, occupancy_grid, algorithm='bfs', verbose=False)
+
+
+_planner_context = PlannerContext()
+
+
+def plan_context_astar(start, goal, occupancy_grid):
+    """Planning engine: A* on a reused PlannerContext."""
+    return _planner_context.astar(start, goal, occupancy_grid).path
+
+
+def plan_context_bfs(start, goal, occupancy_grid):
+    """Planning engine: BFS on a reused PlannerContext."""
+    return _planner_context.bfs(start, goal, occupancy_grid).path
+
+
+_hierarchical_planner = HierarchicalPlanner(cluster_size=8)
+
+
+def plan_hpa(start, goal, occupancy_grid):
+    """Planning engine: HPA* (abstraction built on the first call per grid, then reused)."""
+    return _hierarchical_planner.find_path(start, goal, occupancy_grid)
+
+
+# Engine registries: name -> callable. New engines register themselves here.
+CLASSIFIERS = {
+    'per_cell': classify_per_cell,
+    'background': classify_background
+}
+
+PLANNERS = {
+    'astar': plan_astar,
+    'bfs': plan_bfs,
+    'context_astar': plan_context_astar,
+    'context_bfs': plan_context_bfs,
+    'hpa': plan_hpa
+}
+
+
+def time_call(func, repeats, *args):
+    """
+    Call a function several times and time it.
+    
+    Console output produced by the function is discarded.
+    
+    Args:
+        func: Callable to time
+        repeats: Number of calls
+        *args: Arguments passed to the function
+    
+    Returns:
+        tuple: (last result, dict with min/median/max milliseconds)
+    """
+    timings = []
+    result = None
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(max(1, repeats)):
+            start = time.perf_counter()
+            result = func(*args)
+            timings.append((time.perf_counter() - start) * 1000.0)
+    
+    return result, {
+        'min_ms': float(np.min(timings)),
+        'median_ms': float(np.median(timings)),
+        'max_ms': float(np.max(timings))
+    }
+
+
+def validate_path(path, truth, start, goal):
+    """
+    Check that a path is contiguous, collision-free and connects start to goal.
+    
+    Args:
+        path: List of (row, col) positions
+        truth: Ground-truth occupancy array
+        start: Start position
+        goal: Goal position
+    
+    Returns:
+        bool: True if the path is valid
+    """
+    if not path or tuple(path[0]) != tuple(start) or tuple(path[-1]) != tuple(goal):
+        return False
+    
+    for (r1, c1), (r2, c2) in zip(path[:-1], path[1:]):
+        if abs(r1 - r2) + abs(c1 - c2) != 1:
+            return False
+    
+    return all(truth[r, c] != OccupancyGrid.BLOCK for r, c in path)
+
+
+def describe_optimality(planning_result):
+    """
+    Short label for a planning result: 'ok' if optimal, the length ratio if the path
+    is valid but longer (e.g. HPA*), and 'FAIL' otherwise.
+    """
+    if planning_result['optimal']:
+        return 'ok'
+    if planning_result['valid'] and planning_result['length_ratio'] is not None:
+        return f"x{planning_result['length_ratio']:.2f}"
+    return 'FAIL'
+
+
+def benchmark_scene(scene, n_rows, n_cols, robot_color, repeats=3,
+                    classifiers=None, planners=None):
+    """
+    Run every stage and engine on a single scene.
+    
+    Args:
+        scene: Scene dictionary from generate_scene
+        n_rows: Number of grid rows
+        n_cols: Number of grid columns
+        robot_color: Robot marker color
+        repeats: Number of timed repetitions per stage
+        classifiers: Classification engine names (default: all registered)
+        planners: Planning engine names (default: all registered)
+    
+    Returns:
+        dict: Timings and correctness checks per stage and engine
+    """
+    width, height = scene['width'], scene['height']
+    truth = scene['truth']
+    
+    # Warp stage
+    def warp():
+        H, _ = compute_homography(scene['corners'], width, height)
+        return warp_perspective(scene['image'], H, width, height)
+    
+    top_down, warp_timing = time_call(warp, repeats)
+    
+    # Background model fitted once on the warped empty floor (not timed: done at setup)
+    with contextlib.redirect_stdout(io.StringIO()):
+        H, _ = compute_homography(scene['corners'], width, height)
+        background = warp_perspective(scene['background'], H, width, height)
+    background_model = BackgroundModel().fit(background, n_rows, n_cols)
+    
+    # Classification stage
+    classification = {}
+    for name in classifiers or CLASSIFIERS:
+        predicted, timing = time_call(CLASSIFIERS[name], repeats, top_down, n_rows, n_cols, robot_color,
+                                       background_model)
+        predicted = np.asarray(predicted)
+        robot_cells = np.argwhere(predicted == OccupancyGrid.ROBOT)
+        classification[name] = dict(timing, **{
+            'accuracy': float(np.mean(predicted == truth)),
+            'block_recall': float(np.mean(predicted[truth == OccupancyGrid.BLOCK] == OccupancyGrid.BLOCK))
+                            if np.any(truth == OccupancyGrid.BLOCK) else 1.0,
+            'free_recall': float(np.mean(predicted[truth == OccupancyGrid.FREE] == OccupancyGrid.FREE))
+                           if np.any(truth == OccupancyGrid.FREE) else 1.0,
+            'robot_found': bool(len(robot_cells) > 0 and tuple(robot_cells[0]) == scene['robot'])
+        })
+    
+    # Planning stage (on the ground-truth grid, so planners are compared on equal input)
+    occupancy_grid = OccupancyGrid(n_rows, n_cols)
+    occupancy_grid.from_classifications(truth)
+    
+    planning = {}
+    for name in planners or PLANNERS:
+        path, timing = time_call(PLANNERS[name], repeats, scene['robot'], scene['goal'], occupancy_grid)
+        length = len(path) - 1 if path else None
+        planning[name] = dict(timing, **{
+            'path_length': length,
+            'optimal_length': scene['goal_distance'],
+            'valid': validate_path(path, truth, scene['robot'], scene['goal']),
+            'optimal': length == scene['goal_distance'],
+            'length_ratio': length / scene['goal_distance'] if length is not None and scene['goal_distance'] else None
+        })
+    
+    return {
+        'stages': {'warp': warp_timing},
+        'classification': classification,
+        'planning': planning
+    }
+
+
+def run_benchmark(sizes, densities, colors, cell_pixels=24, distortion=0.15,
+                  repeats=3, seed=0, classifiers=None, planners=None):
+    """
+    Benchmark all combinations of grid size and block density.
+    
+    Robot marker colors are cycled across scenes.
+    
+    Args:
+        sizes: Grid sizes (square grids of size x size)
+        densities: Block densities
+        colors: Robot marker colors to cycle through
+        cell_pixels: Cell side length in the top-down view
+        distortion: Perspective distortion strength
+        repeats: Timed repetitions per stage
+        seed: Base random seed
+        classifiers: Classification engine names (default: all registered)
+        planners: Planning engine names (default: all registered)
+    
+    Returns:
+        dict: Benchmark report with metadata and per-scene results
+    """
+    results = []
+    scene_index = 0
+    
+    for size in sizes:
+        for density in densities:
+            robot_color = colors[scene_index % len(colors)]
+            scene_seed = seed + scene_index
+            scene = generate_scene(size, size, density=density, robot_color=robot_color,
+                                   cell_pixels=cell_pixels, distortion=distortion, seed=scene_seed)
+            
+            result = benchmark_scene(scene, size, size, robot_color, repeats=repeats,
+                                     classifiers=classifiers, planners=planners)
+            result.update({
+                'rows': size,
+                'cols': size,
+                'density': density,
+                'robot_color': robot_color,
+                'seed': scene_seed
+            })
+            results.append(result)
+            scene_index += 1
+            
+            accuracy = ", ".join(f"{name}={r['accuracy']:.3f}" for name, r in result['classification'].items())
+            optimal = ", ".join(f"{name}={describe_optimality(r)}" for name, r in result['planning'].items())
+            print(f"{size:>4}x{size:<4} density={density:.2f} color={robot_color:<7} "
+                  f"warp={result['stages']['warp']['median_ms']:.2f}ms | accuracy: {accuracy} | optimal: {optimal}")
+    
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'platform': platform.platform(),
+            'cell_pixels': cell_pixels,
+            'distortion': distortion,
+            'repeats': repeats,
+            'seed': seed
+        },
+        'results': results
+    }
+
+
+def parse_arguments():
+    """
+    Parse command-line arguments.
+    
+    Returns:
+        argparse.Namespace: Parsed arguments
+    """
+    all_colors = list(RobotDetector().color_ranges.keys())
+    
+    parser = argparse.ArgumentParser(description='Router pipeline benchmark on synthetic scenes')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 10, 25, 50, 100, 200],
+                        help='Square grid sizes to benchmark (default: 5 10 25 50 100 200)')
+    parser.add_argument('--densities', type=float, nargs='+', default=[0.1, 0.3],
+                        help='Block densities to benchmark (default: 0.1 0.3)')
+    parser.add_argument('--colors', type=str, nargs='+', default=all_colors, choices=all_colors,
+                        help='Robot marker colors to cycle through (default: all)')
+    parser.add_argument('--cell-pixels', type=int, default=24,
+                        help='Cell size in pixels of the synthetic top-down view (default: 24)')
+    parser.add_argument('--distortion', type=float, default=0.15,
+                        help='Perspective distortion strength (default: 0.15)')
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='Timed repetitions per stage (default: 3)')
+    parser.add_argument('--seed', type=int, default=0, help='Base random seed (default: 0)')
+    parser.add_argument('--classifiers', type=str, nargs='+', default=None, choices=list(CLASSIFIERS),
+                        help='Classification engines to run (default: all)')
+    parser.add_argument('--planners', type=str, nargs='+', default=None, choices=list(PLANNERS),
+                        help='Planning engines to run (default: all)')
+    parser.add_argument('--output', type=str, default='benchmark_results.json',
+                        help='Path of the JSON report (default: benchmark_results.json)')
+    
+    return parser.parse_args()
+
+
+def main():
+    """
+    Run the benchmark and write the JSON report.
+    """
+    args = parse_arguments()
+    
+    print("=" * 60)
+    print("Router Pipeline Benchmark")
+    print("=" * 60)
+    
+    report = run_benchmark(
+        args.sizes,
+        args.densities,
+        args.colors,
+        cell_pixels=args.cell_pixels,
+        distortion=args.distortion,
+        repeats=args.repeats,
+        seed=args.seed,
+        classifiers=args.classifiers,
+        planners=args.planners
+    )
+    
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    
+    print(f"\nResults saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
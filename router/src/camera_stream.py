@@ -6,6 +6,8 @@ Handles both live camera feed and static image loading.
 import cv2
 import numpy as np
 
+from profiling import profile_stage, increment_counter
+
 
 class CameraStream:
     """
@@ -29,6 +31,9 @@ class CameraStream:
         self.cap = None
         self.static_image = None
         
+        # Frames copied into caller buffers by read_frame_into (0 when decoded in place)
+        self.frame_copies = 0
+        
         if source is None or isinstance(source, int):
             # Camera mode
             camera_index = source if source is not None else 0
@@ -64,10 +69,13 @@ class CameraStream:
                    - frame (numpy.ndarray): The captured/loaded image
         """
         if self.is_camera:
-            ret, frame = self.cap.read()
+            with profile_stage('capture'):
+                ret, frame = self.cap.read()
             if not ret:
+                increment_counter('frames_dropped')
                 print("Warning: Failed to read frame from camera")
                 return False, None
+            increment_counter('frames_captured')
             return True, frame
         
         elif self.is_image:
@@ -77,6 +85,44 @@ class CameraStream:
         return False, None
     
     
+    def read_frame_into(self, buffer):
+        """
+        Read a frame directly into a preallocated buffer (e.g. a shared-memory slot).
+        
+        Cameras decode straight into the buffer when its shape and dtype match the
+        frame; otherwise the frame is copied in and counted as a 'frame_copies' event.
+        
+        Args:
+            buffer: Writable uint8 array of shape (height, width, 3)
+        
+        Returns:
+            bool: True if the buffer now holds a new frame
+        """
+        if self.is_camera:
+            with profile_stage('capture'):
+                ret, frame = self.cap.read(buffer)
+            if not ret or frame is None:
+                increment_counter('frames_dropped')
+                print("Warning: Failed to read frame from camera")
+                return False
+            increment_counter('frames_captured')
+            source = frame
+        elif self.is_image:
+            source = self.static_image
+        else:
+            return False
+        
+        if source.shape != buffer.shape:
+            print(f"Warning: Frame size {source.shape} does not match buffer size {buffer.shape}")
+            return False
+        
+        if not np.shares_memory(source, buffer):
+            np.copyto(buffer, source)
+            self.frame_copies += 1
+            increment_counter('frame_copies')
+        return True
+    
+    
     def release(self):
         """
         Release camera resources.
@@ -0,0 +1,219 @@
+"""
+Cost map module.
+Builds clearance-aware traversal costs from the occupancy grid for weighted planning.
+
+A distance transform over the occupancy array gives each cell its clearance (distance
+in cells to the nearest block). Cells closer to a block than the inflation radius get
+a traversal penalty that grows towards the block, and cells within the lethal radius
+become impassable. The planner then prefers the middle of aisles over hugging shelves.
+"""
+
+import cv2
+import numpy as np
+
+from profiling import profile_stage
+
+
+class CostMap:
+    """
+    Per-cell traversal costs derived from block clearance.
+    
+    The cost map is cached by OccupancyGrid version: update() only recomputes the
+    distance transform when the grid has changed since the last call.
+    """
+    
+    def __init__(self, inflation_radius=2.0, penalty=5.0, lethal_radius=0.0, border_is_obstacle=False):
+        """
+        Initialize the cost map.
+        
+        Args:
+            inflation_radius: Clearance (in cells) below which cells are penalized (default: 2.0)
+            penalty: Extra cost of a cell directly next to a block (default: 5.0)
+            lethal_radius: Clearance (in cells) at or below which cells are impassable,
+                           e.g. the robot radius (default: 0.0 = only blocks are impassable)
+            border_is_obstacle: Treat the area outside the grid as blocked, so the planner
+                                also keeps away from the inventory edges (default: False)
+        """
+        if inflation_radius < 0 or lethal_radius < 0:
+            raise ValueError("Inflation and lethal radii must be non-negative")
+        
+        self.inflation_radius = inflation_radius
+        self.penalty = penalty
+        self.lethal_radius = lethal_radius
+        self.border_is_obstacle = border_is_obstacle
+        
+        self.clearance = None
+        self.costs = None
+        self._flat_costs = None
+        self._grid_key = None
+    
+    
+    def compute_clearance(self, grid, block_value=1):
+        """
+        Compute the Euclidean distance (in cells) from each cell to the nearest block.
+        
+        Args:
+            grid: 2D occupancy array
+            block_value: Value marking blocked cells (default: 1)
+        
+        Returns:
+            numpy.ndarray: Float32 clearance per cell (0 for blocks, inf if there are none)
+        """
+        free = (grid != block_value).astype(np.uint8)
+        
+        if self.border_is_obstacle:
+            free = cv2.copyMakeBorder(free, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+        
+        if free.all():
+            return np.full(grid.shape, np.inf, dtype=np.float32)
+        
+        clearance = cv2.distanceTransform(free, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+        
+        if self.border_is_obstacle:
+            clearance = clearance[1:-1, 1:-1]
+        
+        return clearance
+    
+    
+    def compute_costs(self, clearance):
+        """
+        Convert clearance into per-cell traversal costs.
+        
+        Free cells cost 1. Within the inflation radius the cost rises linearly to
+        1 + penalty for cells adjacent to a block. Blocks and cells within the lethal
+        radius cost infinity.
+        
+        Args:
+            clearance: Clearance array from compute_clearance
+        
+        Returns:
+            numpy.ndarray: Float64 traversal cost per cell
+        """
+        costs = np.ones(clearance.shape, dtype=np.float64)
+        
+        if self.inflation_radius > 0 and self.penalty > 0:
+            closeness = (self.inflation_radius - clearance + 1.0) / self.inflation_radius
+            inflated = clearance <= self.inflation_radius
+            costs[inflated] += self.penalty * np.clip(closeness[inflated], 0.0, 1.0)
+        
+        costs[clearance <= max(self.lethal_radius, 0.0)] = np.inf
+        
+        return costs
+    
+    
+    def update(self, occupancy_grid):
+        """
+        Recompute the cost map if the occupancy grid has changed.
+        
+        Args:
+            occupancy_grid: OccupancyGrid instance
+        
+        Returns:
+            CostMap: self, for chaining
+        """
+        key = (id(occupancy_grid), id(occupancy_grid.grid), occupancy_grid.version)
+        if key == self._grid_key:
+            return self
+        
+        with profile_stage('cost_map'):
+            self.clearance = self.compute_clearance(occupancy_grid.grid, occupancy_grid.BLOCK)
+            self.costs = self.compute_costs(self.clearance)
+            self._flat_costs = self.costs.ravel().tolist()
+        
+        self._grid_key = key
+        return self
+    
+    
+    def invalidate(self):
+        """
+        Force recomputation on the next update().
+        
+        Call this after writing to occupancy_grid.grid directly.
+        """
+        self._grid_key = None
+    
+    
+    def flat_costs(self, occupancy_grid):
+        """
+        Get the per-cell costs as a flat row-major list (fast scalar indexing for planners).
+        
+        Args:
+            occupancy_grid: OccupancyGrid instance
+        
+        Returns:
+            list: Traversal cost per cell, indexed by row * n_cols + col
+        """
+        self.update(occupancy_grid)
+        return self._flat_costs
+    
+    
+    def get_cost(self, row, col):
+        """
+        Get the traversal cost of a single cell.
+        
+        Args:
+            row: Row index
+            col: Column index
+        
+        Returns:
+            float: Cost of entering the cell
+        """
+        return float(self.costs[row, col])
+    
+    
+    def path_cost(self, path):
+        """
+        Total cost of a path (cost of every cell entered after the start).
+        
+        Args:
+            path: List of (row, col) positions
+        
+        Returns:
+            float: Path cost
+        """
+        if not path:
+            return float('inf')
+        
+        rows, cols = zip(*path[1:]) if len(path) > 1 else ((), ())
+        return float(self.costs[list(rows), list(cols)].sum())
+    
+    
+    def visualize(self, cell_size=50):
+        """
+        Create a heat-map image of the traversal costs.
+        
+        Args:
+            cell_size: Size of each cell in pixels
+        
+        Returns:
+            numpy.ndarray: BGR image (impassable cells drawn black)
+        """
+        costs = self.costs
+        finite = np.isfinite(costs)
+        max_cost = costs[finite].max() if finite.any() else 1.0
+        scaled = np.zeros(costs.shape, dtype=np.uint8)
+        if max_cost > 1.0:
+            scaled[finite] = ((costs[finite] - 1.0) / (max_cost - 1.0) * 255).astype(np.uint8)
+        
+        image = cv2.applyColorMap(scaled, cv2.COLORMAP_JET)
+        image[~finite] = 0
+        
+        return cv2.resize(image, (costs.shape[1] * cell_size, costs.shape[0] * cell_size),
+                          interpolation=cv2.INTER_NEAREST)
+
+
+def build_cost_map(occupancy_grid, inflation_radius=2.0, penalty=5.0, lethal_radius=0.0):
+    """
+    Factory function to create and compute a CostMap.
+    
+    Args:
+        occupancy_grid: OccupancyGrid instance
+        inflation_radius: Clearance (in cells) below which cells are penalized
+        penalty: Extra cost of a cell directly next to a block
+        lethal_radius: Clearance (in cells) at or below which cells are impassable
+    
+    Returns:
+        CostMap: Cost map computed for the grid
+    """
+    return CostMap(inflation_radius=inflation_radius, penalty=penalty,
+                   lethal_radius=lethal_radius).update(occupancy_grid)
@@ -7,22 +7,27 @@ Uses classical computer vision techniques (color thresholding, contour detection
 import cv2
 import numpy as np
 
+from profiling import profile_stage, increment_counter
+
 
 class RobotDetector:
     """
     Detects robot based on colored marker (default: red).
     """
     
-    def __init__(self, color='red', min_area_ratio=0.05):
+    def __init__(self, color='red', min_area_ratio=0.05, back_color=None):
         """
         Initialize robot detector.
         
         Args:
             color: Color of robot marker ('red', 'blue', 'green')
             min_area_ratio: Minimum ratio of colored pixels to consider as robot
+            back_color: Optional color of a second marker on the back of the robot;
+                        when set, locate() also estimates the robot heading
         """
         self.color = color.lower()
         self.min_area_ratio = min_area_ratio
+        self.back_color = back_color.lower() if back_color else None
         
         # Define HSV color ranges
         self.color_ranges = {
@@ -62,6 +67,11 @@ class RobotDetector:
         if self.color not in self.color_ranges:
             print(f"Warning: Unknown color '{color}', defaulting to red")
             self.color = 'red'
+        
+        if self.back_color is not None and (self.back_color not in self.color_ranges
+                                            or self.back_color == self.color):
+            print(f"Warning: Invalid back marker color '{back_color}', heading estimation disabled")
+            self.back_color = None
     
     
     def detect(self, cell_image):
@@ -77,23 +87,181 @@ class RobotDetector:
         if cell_image is None or cell_image.size == 0:
             return False
         
+        mask = self.color_mask(cell_image)
+        
+        # Calculate ratio of colored pixels
+        total_pixels = cell_image.shape[0] * cell_image.shape[1]
+        colored_pixels = cv2.countNonZero(mask)
+        ratio = colored_pixels / total_pixels
+        
+        # Robot detected if ratio exceeds threshold
+        return ratio >= self.min_area_ratio
+    
+    
+    def color_mask(self, image, color=None, hsv=None):
+        """
+        Threshold an image for a marker color.
+        
+        Args:
+            image: BGR image
+            color: Color to threshold (default: the robot marker color)
+            hsv: Optional precomputed HSV version of image
+        
+        Returns:
+            numpy.ndarray: Binary mask (255 where the marker color is present)
+        """
         # Convert to HSV
-        hsv = cv2.cvtColor(cell_image, cv2.COLOR_BGR2HSV)
+        if hsv is None:
+            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
         
         # Create mask for the specified color
         mask = np.zeros(hsv.shape[:2], dtype=np.uint8)
         
-        for lower, upper in self.color_ranges[self.color]:
+        for lower, upper in self.color_ranges[color or self.color]:
             mask_temp = cv2.inRange(hsv, lower, upper)
             mask = cv2.bitwise_or(mask, mask_temp)
         
-        # Calculate ratio of colored pixels
-        total_pixels = cell_image.shape[0] * cell_image.shape[1]
-        colored_pixels = cv2.countNonZero(mask)
-        ratio = colored_pixels / total_pixels
+        return mask
+    
+    
+    def locate(self, image, grid_mapper=None, min_area=None, cell_size=None):
+        """
+        Locate the robot marker in a whole frame.
         
-        # Robot detected if ratio exceeds threshold
-        return ratio >= self.min_area_ratio
+        The frame is thresholded once and the largest connected component of the
+        marker color is taken as the robot, so a marker straddling several cells
+        still yields a single position. With a back marker color configured, the
+        back marker is found in the same HSV frame and the heading is the direction
+        from the back centroid to the front centroid; the robot centroid is then the
+        area-weighted center of both markers.
+        
+        Args:
+            image: BGR image (typically the top-down view)
+            grid_mapper: Optional GridMapper used to convert the centroid to a cell
+            min_area: Minimum component area in pixels (default: min_area_ratio of
+                      one cell if the grid is known, otherwise 1 pixel)
+            cell_size: Optional (cell_height, cell_width) of a grid starting at the
+                       image origin, used when no grid_mapper is given
+        
+        Returns:
+            dict: 'centroid' (x, y) in pixels, 'cell' (row, col) or None, 'area' in
+                  pixels, 'bbox' (x, y, w, h) and 'confidence' in [0, 1]
+                  (the share of marker-colored pixels belonging to the component),
+                  'heading' in degrees clockwise from up (None without a back
+                  marker) and 'marker_cells', a (n_rows, n_cols) bool array of the
+                  cells at least min_area_ratio covered by the marker(s) (None
+                  without a grid); None if no marker is found
+        """
+        if image is None or image.size == 0:
+            return None
+        
+        grid_shape = None
+        if grid_mapper is not None:
+            cell_size = (grid_mapper.cell_height, grid_mapper.cell_width)
+            grid_shape = (grid_mapper.n_rows, grid_mapper.n_cols)
+        
+        if min_area is None:
+            if cell_size is not None:
+                min_area = self.min_area_ratio * cell_size[0] * cell_size[1]
+            else:
+                min_area = 1
+        
+        with profile_stage('robot_localization'):
+            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+            front = self._largest_component(self.color_mask(image, hsv=hsv), min_area)
+            back = None
+            if front is not None and self.back_color is not None:
+                back = self._largest_component(self.color_mask(image, self.back_color, hsv=hsv), min_area)
+        
+        if front is None:
+            return None
+        
+        marker_cells = None
+        if cell_size is not None:
+            marker = front['mask'] if back is None else front['mask'] | back['mask']
+            marker_cells = self._covered_cells(marker, cell_size, grid_shape)
+        
+        x, y = front['centroid']
+        heading = None
+        
+        if back is not None:
+            bx, by = back['centroid']
+            # Image y grows downwards; 0 degrees = up, 90 = right
+            heading = float(np.degrees(np.arctan2(x - bx, by - y)) % 360.0)
+            total = front['area'] + back['area']
+            x = (x * front['area'] + bx * back['area']) / total
+            y = (y * front['area'] + by * back['area']) / total
+        
+        cell = grid_mapper.pixel_to_grid(x, y) if grid_mapper is not None else None
+        
+        return {
+            'centroid': (float(x), float(y)),
+            'cell': cell,
+            'area': front['area'],
+            'bbox': front['bbox'],
+            'confidence': front['confidence'] * (back['confidence'] if back is not None else 1.0),
+            'heading': heading,
+            'marker_cells': marker_cells
+        }
+    
+    
+    def _covered_cells(self, mask, cell_size, grid_shape=None):
+        """
+        Find the grid cells a marker mask covers.
+        
+        Args:
+            mask: Bool mask of marker pixels
+            cell_size: (cell_height, cell_width) of a grid starting at the image origin
+            grid_shape: (n_rows, n_cols) of the grid (default: as many whole cells as
+                        fit in the mask; pass it when the image size is not a
+                        multiple of the cell size, as GridMapper floors it)
+        
+        Returns:
+            numpy.ndarray: (n_rows, n_cols) bool, True where at least min_area_ratio
+                           of the cell is marker
+        """
+        cell_h, cell_w = cell_size
+        if grid_shape is None:
+            grid_shape = (mask.shape[0] // cell_h, mask.shape[1] // cell_w)
+        n_rows, n_cols = grid_shape
+        counts = mask[:n_rows * cell_h, :n_cols * cell_w].reshape(n_rows, cell_h, n_cols, cell_w).sum(axis=(1, 3))
+        return counts >= self.min_area_ratio * cell_h * cell_w
+    
+    
+    @staticmethod
+    def _largest_component(mask, min_area):
+        """
+        Find the largest connected component of a mask.
+        
+        Args:
+            mask: Binary mask
+            min_area: Minimum component area in pixels
+        
+        Returns:
+            dict: 'centroid', 'area', 'bbox', 'confidence' (share of all mask
+                  pixels in the component) and 'mask' (bool mask of the component),
+                  or None if no component is large enough
+        """
+        n_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        
+        if n_labels < 2:
+            return None
+        
+        # Label 0 is the background
+        areas = stats[1:, cv2.CC_STAT_AREA]
+        largest = int(np.argmax(areas)) + 1
+        area = int(stats[largest, cv2.CC_STAT_AREA])
+        
+        if area < min_area:
+            return None
+        
+        return {
+            'centroid': (float(centroids[largest][0]), float(centroids[largest][1])),
+            'area': area,
+            'bbox': tuple(int(v) for v in stats[largest, :4]),
+            'confidence': area / float(areas.sum()),
+            'mask': labels == largest
+        }
 
 
 class BlockDetector:
@@ -114,6 +282,7 @@ class BlockDetector:
         self.background_color = background_color
         self.min_contour_area = min_contour_area
         self.min_area_ratio = min_area_ratio
+        self._background_cache = None
     
     
     def detect(self, cell_image):
@@ -164,8 +333,12 @@ class BlockDetector:
         if cell_image is None or background_sample is None:
             return self.detect(cell_image)
         
-        # Resize background sample to match cell size
-        bg_resized = cv2.resize(background_sample, (cell_image.shape[1], cell_image.shape[0]))
+        # Resize background sample to match cell size (cached: cells of a grid share one size)
+        key = (id(background_sample), cell_image.shape[:2])
+        if self._background_cache is None or self._background_cache[0] != key:
+            self._background_cache = (key, background_sample,
+                                      cv2.resize(background_sample, (cell_image.shape[1], cell_image.shape[0])))
+        bg_resized = self._background_cache[2]
         
         # Compute absolute difference
         diff = cv2.absdiff(cell_image, bg_resized)
@@ -182,6 +355,193 @@ class BlockDetector:
         return ratio >= self.min_area_ratio
 
 
+class BackgroundModel:
+    """
+    Learned empty-floor model for whole-image block detection.
+    
+    Fitted once on one or more top-down views of the empty floor. Stores the
+    per-pixel mean floor color and a per-cell noise variance; a frame is classified
+    with a single absdiff against the mean, a per-pixel z-score threshold and a
+    per-cell reduction, instead of blur + Otsu on every cell. Because the mean is
+    per pixel, uneven lighting and floor texture are part of the model.
+    """
+    
+    def __init__(self, z_threshold=4.0, min_std=6.0, min_area_ratio=0.5):
+        """
+        Initialize an unfitted background model.
+        
+        Args:
+            z_threshold: Pixels further than this many standard deviations from the
+                         floor are foreground (default: 4.0)
+            min_std: Lower bound on the per-cell standard deviation, in gray levels
+            min_area_ratio: Minimum foreground ratio for a cell to be a block (default: 0.5)
+        """
+        self.z_threshold = z_threshold
+        self.min_std = min_std
+        self.min_area_ratio = min_area_ratio
+        
+        self.n_rows = None
+        self.n_cols = None
+        self.mean = None          # Per-pixel floor color, float32 (H, W, 3)
+        self.cell_mean = None     # Per-cell floor color, float32 (n_rows, n_cols, 3)
+        self.cell_var = None      # Per-cell noise variance, float32 (n_rows, n_cols)
+        
+        self._mean_u8 = None
+        self._threshold = None
+    
+    
+    @property
+    def is_fitted(self):
+        """True once fit() or load() has been called."""
+        return self.mean is not None
+    
+    
+    def _cell_region(self):
+        """Get the (cell_h, cell_w) of the modeled grid, matching GridMapper."""
+        height, width = self.mean.shape[:2]
+        return height // self.n_rows, width // self.n_cols
+    
+    
+    def fit(self, images, n_rows, n_cols):
+        """
+        Fit the model on top-down views of the empty floor.
+        
+        Args:
+            images: Top-down BGR image, or a list of them (same size)
+            n_rows: Number of grid rows
+            n_cols: Number of grid columns
+        
+        Returns:
+            BackgroundModel: self, for chaining
+        """
+        if isinstance(images, np.ndarray):
+            images = [images]
+        stack = np.stack([np.asarray(image, dtype=np.float32) for image in images])
+        
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.mean = stack.mean(axis=0)
+        cell_h, cell_w = self._cell_region()
+        
+        # Pixel noise: temporal variance across frames plus floor texture that a
+        # slightly shifted view would not line up with (residual against a blur)
+        residual = self.mean - cv2.GaussianBlur(self.mean, (5, 5), 0)
+        pixel_var = np.max(residual ** 2, axis=2)
+        if len(stack) > 1:
+            pixel_var += np.max(stack.var(axis=0), axis=2)
+        
+        region = (slice(0, n_rows * cell_h), slice(0, n_cols * cell_w))
+        self.cell_var = pixel_var[region].reshape(n_rows, cell_h, n_cols, cell_w).mean(axis=(1, 3))
+        self.cell_mean = self.mean[region].reshape(n_rows, cell_h, n_cols, cell_w, 3).mean(axis=(1, 3))
+        
+        self._prepare()
+        return self
+    
+    
+    def _prepare(self):
+        """Precompute the uint8 mean image and per-pixel threshold map."""
+        cell_h, cell_w = self._cell_region()
+        region = (slice(0, self.n_rows * cell_h), slice(0, self.n_cols * cell_w))
+        
+        self._mean_u8 = np.ascontiguousarray(np.clip(np.round(self.mean[region]), 0, 255).astype(np.uint8))
+        
+        std = np.maximum(np.sqrt(self.cell_var), self.min_std)
+        threshold = np.clip(np.round(self.z_threshold * std), 0, 255).astype(np.uint8)
+        self._threshold = np.repeat(np.repeat(threshold, cell_h, axis=0), cell_w, axis=1)
+    
+    
+    def matches(self, image, n_rows, n_cols):
+        """
+        Check whether the model was fitted for this image size and grid.
+        
+        Args:
+            image: Top-down image
+            n_rows: Number of grid rows
+            n_cols: Number of grid columns
+        
+        Returns:
+            bool: True if occupancy_ratios can be used on the image
+        """
+        return (self.is_fitted and (self.n_rows, self.n_cols) == (n_rows, n_cols)
+                and image.shape[:2] == self.mean.shape[:2])
+    
+    
+    def occupancy_ratios(self, image):
+        """
+        Compute the fraction of foreground pixels in every cell.
+        
+        Args:
+            image: Top-down BGR image of the fitted size
+        
+        Returns:
+            numpy.ndarray: (n_rows, n_cols) float ratios in [0, 1]
+        """
+        if not self.is_fitted:
+            raise ValueError("Background model is not fitted")
+        if image.shape[:2] != self.mean.shape[:2]:
+            raise ValueError(f"Image size {image.shape[:2]} does not match background size {self.mean.shape[:2]}")
+        
+        cell_h, cell_w = self._cell_region()
+        region = image[:self.n_rows * cell_h, :self.n_cols * cell_w]
+        
+        with profile_stage('background_diff'):
+            # Largest per-channel difference, compared against the cell's threshold
+            diff = cv2.absdiff(region, self._mean_u8)
+            diff = cv2.max(cv2.max(diff[:, :, 0], diff[:, :, 1]), diff[:, :, 2])
+            foreground = diff > self._threshold
+            counts = foreground.reshape(self.n_rows, cell_h, self.n_cols, cell_w).sum(axis=(1, 3))
+        
+        return counts / float(cell_h * cell_w)
+    
+    
+    def detect_cells(self, image):
+        """
+        Detect blocks in every cell at once.
+        
+        Args:
+            image: Top-down BGR image of the fitted size
+        
+        Returns:
+            numpy.ndarray: (n_rows, n_cols) bool, True where a block is detected
+        """
+        return self.occupancy_ratios(image) > self.min_area_ratio
+    
+    
+    def save(self, path):
+        """
+        Save the model to a .npz file.
+        
+        Args:
+            path: Output path
+        """
+        np.savez_compressed(path, mean=self.mean, cell_mean=self.cell_mean, cell_var=self.cell_var,
+                            grid=np.array([self.n_rows, self.n_cols]),
+                            params=np.array([self.z_threshold, self.min_std, self.min_area_ratio]))
+    
+    
+    @classmethod
+    def load(cls, path):
+        """
+        Load a model saved with save().
+        
+        Args:
+            path: .npz file path
+        
+        Returns:
+            BackgroundModel: Fitted model
+        """
+        with np.load(path) as data:
+            z_threshold, min_std, min_area_ratio = data['params']
+            model = cls(float(z_threshold), float(min_std), float(min_area_ratio))
+            model.n_rows, model.n_cols = (int(v) for v in data['grid'])
+            model.mean = data['mean'].astype(np.float32)
+            model.cell_mean = data['cell_mean'].astype(np.float32)
+            model.cell_var = data['cell_var'].astype(np.float32)
+        
+        model._prepare()
+        return model
+
+
 class CellClassifier:
     """
     Classifies grid cells as ROBOT, BLOCK, or EMPTY.
@@ -192,7 +552,8 @@ class CellClassifier:
     BLOCK = 1
     ROBOT = 2
     
-    def __init__(self, robot_color='red', robot_min_ratio=0.05, block_min_ratio=0.5):
+    def __init__(self, robot_color='red', robot_min_ratio=0.05, block_min_ratio=0.5, back_color=None,
+                 background_model=None):
         """
         Initialize cell classifier.
         
@@ -200,9 +561,18 @@ class CellClassifier:
             robot_color: Color of robot marker
             robot_min_ratio: Minimum color ratio for robot detection
             block_min_ratio: Minimum area ratio for block detection (default: 0.5 = 50%)
+            back_color: Optional color of the back marker for heading estimation
+            background_model: Optional fitted BackgroundModel; when it matches the
+                              image and grid, blocks are detected on the whole image
+                              at once instead of per-cell Otsu thresholding
         """
-        self.robot_detector = RobotDetector(color=robot_color, min_area_ratio=robot_min_ratio)
+        self.robot_detector = RobotDetector(color=robot_color, min_area_ratio=robot_min_ratio,
+                                            back_color=back_color)
         self.block_detector = BlockDetector(min_area_ratio=block_min_ratio)
+        self.background_model = background_model
+        
+        # Result of the last whole-frame robot localization (see classify_all_cells)
+        self.robot_location = None
     
     
     def classify_cell(self, cell_image):
@@ -234,6 +604,13 @@ class CellClassifier:
         """
         Classify all cells in a grid.
         
+        The robot is located once on the whole image (see RobotDetector.locate) and
+        only the cell containing its centroid is marked ROBOT. Other cells covered
+        by the marker are left EMPTY, never BLOCK: the marker itself is not an
+        obstacle. The remaining cells are checked for blocks, all at once with the
+        background model when one is set, otherwise per cell. The localization
+        result is kept in robot_location.
+        
         Args:
             grid_mapper: GridMapper instance
         
@@ -242,10 +619,35 @@ class CellClassifier:
         """
         classifications = np.zeros((grid_mapper.n_rows, grid_mapper.n_cols), dtype=int)
         
-        for i in range(grid_mapper.n_rows):
-            for j in range(grid_mapper.n_cols):
-                cell_image = grid_mapper.get_cell(i, j)
-                classifications[i, j] = self.classify_cell(cell_image)
+        with profile_stage('classification'):
+            self.robot_location = self.robot_detector.locate(grid_mapper.image, grid_mapper)
+            robot_cell = None
+            marker_cells = np.zeros_like(classifications, dtype=bool)
+            if self.robot_location is not None:
+                robot_cell = self.robot_location['cell']
+                marker_cells = self.robot_location['marker_cells']
+            
+            model = self.background_model
+            if model is not None and model.matches(grid_mapper.image, grid_mapper.n_rows, grid_mapper.n_cols):
+                classifications[model.detect_cells(grid_mapper.image) & ~marker_cells] = self.BLOCK
+                if robot_cell is not None:
+                    classifications[robot_cell] = self.ROBOT
+                increment_counter('cells_classified', grid_mapper.n_rows * grid_mapper.n_cols)
+                return classifications
+            
+            for i in range(grid_mapper.n_rows):
+                for j in range(grid_mapper.n_cols):
+                    if (i, j) == robot_cell:
+                        classifications[i, j] = self.ROBOT
+                        continue
+                    if marker_cells[i, j]:
+                        continue
+                    
+                    cell_image = grid_mapper.get_cell(i, j)
+                    if cell_image is not None and cell_image.size > 0 and self.block_detector.detect(cell_image):
+                        classifications[i, j] = self.BLOCK
+        
+        increment_counter('cells_classified', grid_mapper.n_rows * grid_mapper.n_cols)
         
         return classifications
 
@@ -6,13 +6,15 @@ Converts the warped top-down image into an N x M grid of cells.
 import cv2
 import numpy as np
 
+from profiling import profile_stage
+
 
 class GridMapper:
     """
     Maps a top-down image to an N x M grid and provides access to individual cells.
     """
     
-    def __init__(self, image, n_rows, n_cols):
+    def __init__(self, image, n_rows, n_cols, verbose=True):
         """
         Initialize the grid mapper.
         
@@ -20,6 +22,7 @@ class GridMapper:
             image: Top-down warped image
             n_rows: Number of rows in the grid
             n_cols: Number of columns in the grid
+            verbose: Print grid and cell dimensions (default: True)
         """
         self.image = image
         self.n_rows = n_rows
@@ -31,9 +34,10 @@ class GridMapper:
         self.cell_height = self.height // n_rows
         self.cell_width = self.width // n_cols
         
-        print(f"Grid initialized: {n_rows}x{n_cols} grid")
-        print(f"Image size: {self.width}x{self.height}")
-        print(f"Cell size: {self.cell_width}x{self.cell_height}")
+        if verbose:
+            print(f"Grid initialized: {n_rows}x{n_cols} grid")
+            print(f"Image size: {self.width}x{self.height}")
+            print(f"Cell size: {self.cell_width}x{self.cell_height}")
     
     
     def get_cell(self, row, col):
@@ -72,12 +76,13 @@ class GridMapper:
         """
         cells = []
         
-        for i in range(self.n_rows):
-            row_cells = []
-            for j in range(self.n_cols):
-                cell = self.get_cell(i, j)
-                row_cells.append(cell)
-            cells.append(row_cells)
+        with profile_stage('cell_extraction'):
+            for i in range(self.n_rows):
+                row_cells = []
+                for j in range(self.n_cols):
+                    cell = self.get_cell(i, j)
+                    row_cells.append(cell)
+                cells.append(row_cells)
         
         return cells
     
@@ -0,0 +1,570 @@
+"""
+Hierarchical path planning module (HPA*).
+Plans on an abstract graph of cluster entrances before refining to grid cells.
+
+The grid is partitioned into square clusters. Wherever two neighbouring clusters share
+free border cells, entrance nodes are placed on both sides of the border, and distances
+between the entrances of each cluster are precomputed. A query only searches this
+small abstract graph; each abstract edge is then refined lazily into grid cells with a
+search restricted to a single cluster. When the occupancy grid changes, only the
+clusters containing changed cells (and the borders they share) are rebuilt.
+"""
+
+import heapq
+from collections import deque
+
+import numpy as np
+
+from profiling import profile_stage, increment_counter
+
+
+class HierarchicalPlanner:
+    """
+    HPA* planner for large occupancy grids.
+    
+    Usage:
+        planner = HierarchicalPlanner(occupancy_grid, cluster_size=16)
+        path = planner.find_path(start, goal)
+        
+        # After the grid changes (only dirty clusters are rebuilt)
+        planner.update(occupancy_grid)
+    """
+    
+    def __init__(self, occupancy_grid=None, cluster_size=16, max_entrance_width=6):
+        """
+        Initialize the hierarchical planner.
+        
+        Args:
+            occupancy_grid: OccupancyGrid to build the abstraction for (optional)
+            cluster_size: Side length of a cluster in cells (default: 16)
+            max_entrance_width: Border openings at least this wide get an entrance at
+                                each end instead of a single one in the middle (default: 6)
+        """
+        if cluster_size < 2:
+            raise ValueError("Cluster size must be at least 2")
+        
+        self.cluster_size = cluster_size
+        self.max_entrance_width = max_entrance_width
+        
+        self.n_rows = 0
+        self.n_cols = 0
+        self.n_cluster_rows = 0
+        self.n_cluster_cols = 0
+        
+        self.passable = None
+        self.border_transitions = {}   # border key -> list of (cell_a, cell_b)
+        self.inter_edges = {}          # cell -> set of cells across a border
+        self.cluster_nodes = {}        # cluster id -> set of entrance cells
+        self.intra_edges = {}          # cluster id -> {cell: {cell: distance}}
+        self._refined = {}             # (cell_a, cell_b) -> cached grid path
+        self._grid_key = None
+        
+        if occupancy_grid is not None:
+            self.build(occupancy_grid)
+    
+    
+    # ------------------------------------------------------------------
+    # Abstraction construction
+    # ------------------------------------------------------------------
+    
+    def cluster_of(self, cell):
+        """
+        Get the cluster id containing a cell.
+        
+        Args:
+            cell: Position (row, col)
+        
+        Returns:
+            tuple: Cluster id (cluster_row, cluster_col)
+        """
+        return (cell[0] // self.cluster_size, cell[1] // self.cluster_size)
+    
+    
+    def cluster_bounds(self, cluster):
+        """
+        Get the cell bounds of a cluster.
+        
+        Args:
+            cluster: Cluster id (cluster_row, cluster_col)
+        
+        Returns:
+            tuple: (row_start, row_end, col_start, col_end), end exclusive
+        """
+        row_start = cluster[0] * self.cluster_size
+        col_start = cluster[1] * self.cluster_size
+        return (row_start, min(row_start + self.cluster_size, self.n_rows),
+                col_start, min(col_start + self.cluster_size, self.n_cols))
+    
+    
+    def _cluster_borders(self, cluster):
+        """
+        Get the keys of all borders a cluster shares with its neighbours.
+        
+        A border key is ('h', r, c) for the border between clusters (r, c) and (r, c + 1),
+        or ('v', r, c) for the border between clusters (r, c) and (r + 1, c).
+        """
+        r, c = cluster
+        borders = []
+        if c + 1 < self.n_cluster_cols:
+            borders.append(('h', r, c))
+        if c > 0:
+            borders.append(('h', r, c - 1))
+        if r + 1 < self.n_cluster_rows:
+            borders.append(('v', r, c))
+        if r > 0:
+            borders.append(('v', r - 1, c))
+        return borders
+    
+    
+    @staticmethod
+    def _border_clusters(border):
+        """Get the two cluster ids on either side of a border."""
+        kind, r, c = border
+        if kind == 'h':
+            return (r, c), (r, c + 1)
+        return (r, c), (r + 1, c)
+    
+    
+    def _find_transitions(self, border):
+        """
+        Find the entrance transitions across a border.
+        
+        Args:
+            border: Border key
+        
+        Returns:
+            list: (cell_a, cell_b) pairs of adjacent free cells across the border
+        """
+        kind, r, c = border
+        size = self.cluster_size
+        
+        if kind == 'h':
+            col_a = (c + 1) * size - 1
+            row_start, row_end = r * size, min((r + 1) * size, self.n_rows)
+            open_cells = self.passable[row_start:row_end, col_a] & self.passable[row_start:row_end, col_a + 1]
+            to_pair = lambda i: ((row_start + i, col_a), (row_start + i, col_a + 1))
+        else:
+            row_a = (r + 1) * size - 1
+            col_start, col_end = c * size, min((c + 1) * size, self.n_cols)
+            open_cells = self.passable[row_a, col_start:col_end] & self.passable[row_a + 1, col_start:col_end]
+            to_pair = lambda i: ((row_a, col_start + i), (row_a + 1, col_start + i))
+        
+        transitions = []
+        i = 0
+        n = len(open_cells)
+        
+        while i < n:
+            if not open_cells[i]:
+                i += 1
+                continue
+            
+            j = i
+            while j + 1 < n and open_cells[j + 1]:
+                j += 1
+            
+            if j - i + 1 >= self.max_entrance_width:
+                transitions.append(to_pair(i))
+                transitions.append(to_pair(j))
+            else:
+                transitions.append(to_pair((i + j) // 2))
+            
+            i = j + 1
+        
+        return transitions
+    
+    
+    def _set_border(self, border):
+        """
+        Recompute the transitions of a border and update the inter-cluster edges.
+        
+        Args:
+            border: Border key
+        """
+        for a, b in self.border_transitions.get(border, []):
+            for x, y in ((a, b), (b, a)):
+                links = self.inter_edges.get(x)
+                if links is not None:
+                    links.discard(y)
+                    if not links:
+                        del self.inter_edges[x]
+        
+        transitions = self._find_transitions(border)
+        self.border_transitions[border] = transitions
+        
+        for a, b in transitions:
+            self.inter_edges.setdefault(a, set()).add(b)
+            self.inter_edges.setdefault(b, set()).add(a)
+    
+    
+    def _cluster_search(self, source, cluster, targets=None):
+        """
+        Breadth-first search restricted to a single cluster.
+        
+        Args:
+            source: Start cell (must lie in the cluster)
+            cluster: Cluster id
+            targets: Optional set of cells; the search stops once all are reached
+        
+        Returns:
+            tuple: (distances dict, parents dict)
+        """
+        row_start, row_end, col_start, col_end = self.cluster_bounds(cluster)
+        passable = self.passable
+        
+        distances = {source: 0}
+        parents = {source: None}
+        remaining = set(targets) - {source} if targets else None
+        queue = deque([source])
+        
+        while queue:
+            current = queue.popleft()
+            row, col = current
+            distance = distances[current] + 1
+            
+            for neighbor in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+                r, c = neighbor
+                if (row_start <= r < row_end and col_start <= c < col_end
+                        and neighbor not in distances and passable[r, c]):
+                    distances[neighbor] = distance
+                    parents[neighbor] = current
+                    if remaining is not None:
+                        remaining.discard(neighbor)
+                        if not remaining:
+                            return distances, parents
+                    queue.append(neighbor)
+        
+        return distances, parents
+    
+    
+    def _cluster_distances(self, source, cluster, targets):
+        """
+        Grid distances from a cell to a set of target cells within one cluster.
+        
+        Same search as _cluster_search, but on flat cluster-local indices without
+        parent tracking, since building the abstraction runs it once per entrance.
+        
+        Args:
+            source: Start cell (must lie in the cluster)
+            cluster: Cluster id
+            targets: Set of cells to measure the distance to
+        
+        Returns:
+            dict: Target cell -> distance, for the reachable targets
+        """
+        row_start, row_end, col_start, col_end = self.cluster_bounds(cluster)
+        width = col_end - col_start
+        passable = self.passable[row_start:row_end, col_start:col_end].ravel().tolist()
+        size = len(passable)
+        
+        wanted = {}
+        for row, col in targets:
+            wanted[(row - row_start) * width + (col - col_start)] = (row, col)
+        
+        origin = (source[0] - row_start) * width + (source[1] - col_start)
+        distance = [-1] * size
+        distance[origin] = 0
+        queue = [origin]
+        head = 0
+        found = {}
+        remaining = len(wanted)
+        
+        if origin in wanted:
+            found[wanted[origin]] = 0
+            remaining -= 1
+        
+        while head < len(queue) and remaining:
+            current = queue[head]
+            head += 1
+            next_distance = distance[current] + 1
+            col = current % width
+            
+            for neighbor, valid in ((current - width, current >= width),
+                                    (current + width, current + width < size),
+                                    (current - 1, col > 0),
+                                    (current + 1, col + 1 < width)):
+                if valid and distance[neighbor] < 0 and passable[neighbor]:
+                    distance[neighbor] = next_distance
+                    queue.append(neighbor)
+                    if neighbor in wanted:
+                        found[wanted[neighbor]] = next_distance
+                        remaining -= 1
+        
+        return found
+    
+    
+    def _build_cluster(self, cluster):
+        """
+        Collect the entrance nodes of a cluster and precompute their distances.
+        
+        Args:
+            cluster: Cluster id
+        """
+        nodes = set()
+        for border in self._cluster_borders(cluster):
+            for a, b in self.border_transitions.get(border, []):
+                nodes.add(a if self.cluster_of(a) == cluster else b)
+        
+        edges = {}
+        for node in nodes:
+            distances = self._cluster_distances(node, cluster, nodes)
+            distances.pop(node, None)
+            edges[node] = distances
+        
+        self.cluster_nodes[cluster] = nodes
+        self.intra_edges[cluster] = edges
+    
+    
+    def build(self, occupancy_grid):
+        """
+        Build the full abstraction for an occupancy grid.
+        
+        Args:
+            occupancy_grid: OccupancyGrid instance
+        """
+        with profile_stage('hpa_build'):
+            self.n_rows = occupancy_grid.n_rows
+            self.n_cols = occupancy_grid.n_cols
+            self.n_cluster_rows = -(-self.n_rows // self.cluster_size)
+            self.n_cluster_cols = -(-self.n_cols // self.cluster_size)
+            self.passable = occupancy_grid.grid != occupancy_grid.BLOCK
+            
+            self.border_transitions = {}
+            self.inter_edges = {}
+            self.cluster_nodes = {}
+            self.intra_edges = {}
+            self._refined = {}
+            
+            for r in range(self.n_cluster_rows):
+                for c in range(self.n_cluster_cols):
+                    for border in self._cluster_borders((r, c)):
+                        if border not in self.border_transitions:
+                            self._set_border(border)
+            
+            for r in range(self.n_cluster_rows):
+                for c in range(self.n_cluster_cols):
+                    self._build_cluster((r, c))
+        
+        self._grid_key = (id(occupancy_grid), id(occupancy_grid.grid), occupancy_grid.version)
+    
+    
+    def update(self, occupancy_grid):
+        """
+        Bring the abstraction up to date with the occupancy grid.
+        
+        Only clusters containing changed cells are rebuilt, together with the borders
+        they share and the neighbouring clusters whose entrances those borders affect.
+        
+        Args:
+            occupancy_grid: OccupancyGrid instance
+        
+        Returns:
+            set: Cluster ids that were rebuilt
+        """
+        key = (id(occupancy_grid), id(occupancy_grid.grid), occupancy_grid.version)
+        if key == self._grid_key:
+            return set()
+        
+        if self.passable is None or occupancy_grid.grid.shape != self.passable.shape:
+            self.build(occupancy_grid)
+            return set(self.cluster_nodes)
+        
+        passable = occupancy_grid.grid != occupancy_grid.BLOCK
+        changed = np.argwhere(passable != self.passable)
+        self.passable = passable
+        self._grid_key = key
+        
+        if len(changed) == 0:
+            return set()
+        
+        with profile_stage('hpa_update'):
+            dirty = {(int(r), int(c)) for r, c in np.unique(changed // self.cluster_size, axis=0)}
+            
+            borders = set()
+            for cluster in dirty:
+                borders.update(self._cluster_borders(cluster))
+            
+            affected = set(dirty)
+            for border in borders:
+                self._set_border(border)
+                affected.update(self._border_clusters(border))
+            
+            for cluster in affected:
+                self._build_cluster(cluster)
+            
+            self._refined = {pair: path for pair, path in self._refined.items()
+                             if self.cluster_of(pair[0]) not in affected}
+        
+        increment_counter('hpa_clusters_rebuilt', len(affected))
+        return affected
+    
+    
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    
+    def find_abstract_path(self, start, goal):
+        """
+        Search the abstract graph between two cells.
+        
+        Args:
+            start: Start position (row, col)
+            goal: Goal position (row, col)
+        
+        Returns:
+            list: Abstract path (start, entrance cells..., goal), or None if no path found
+        """
+        start, goal = tuple(start), tuple(goal)
+        
+        for cell in (start, goal):
+            if not (0 <= cell[0] < self.n_rows and 0 <= cell[1] < self.n_cols):
+                return None
+        if not self.passable[goal]:
+            return None
+        if start == goal:
+            return [start]
+        
+        start_cluster = self.cluster_of(start)
+        goal_cluster = self.cluster_of(goal)
+        
+        # Temporarily connect start and goal to the entrances of their clusters
+        start_nodes = self.cluster_nodes[start_cluster] | {goal} if start_cluster == goal_cluster \
+            else self.cluster_nodes[start_cluster]
+        start_links = self._cluster_distances(start, start_cluster, start_nodes)
+        start_links.pop(start, None)
+        
+        goal_links = self._cluster_distances(goal, goal_cluster, self.cluster_nodes[goal_cluster])
+        goal_links.pop(goal, None)
+        
+        def neighbors(cell):
+            if cell == start:
+                yield from start_links.items()
+            else:
+                yield from self.intra_edges[self.cluster_of(cell)].get(cell, {}).items()
+            for other in self.inter_edges.get(cell, ()):
+                yield other, 1
+            if cell in goal_links:
+                yield goal, goal_links[cell]
+        
+        goal_row, goal_col = goal
+        g_score = {start: 0}
+        came_from = {}
+        closed = set()
+        open_set = [(abs(start[0] - goal_row) + abs(start[1] - goal_col), start)]
+        expanded = 0
+        
+        while open_set:
+            _, current = heapq.heappop(open_set)
+            if current in closed:
+                continue
+            closed.add(current)
+            expanded += 1
+            
+            if current == goal:
+                increment_counter('nodes_expanded_hpa', expanded)
+                path = [current]
+                while current in came_from:
+                    current = came_from[current]
+                    path.append(current)
+                path.reverse()
+                return path
+            
+            for neighbor, distance in neighbors(current):
+                if neighbor in closed:
+                    continue
+                tentative = g_score[current] + distance
+                if tentative < g_score.get(neighbor, float('inf')):
+                    g_score[neighbor] = tentative
+                    came_from[neighbor] = current
+                    f = tentative + abs(neighbor[0] - goal_row) + abs(neighbor[1] - goal_col)
+                    heapq.heappush(open_set, (f, neighbor))
+        
+        increment_counter('nodes_expanded_hpa', expanded)
+        return None
+    
+    
+    def refine_segment(self, a, b):
+        """
+        Refine one abstract edge into grid cells.
+        
+        Args:
+            a: Segment start cell
+            b: Segment end cell
+        
+        Returns:
+            list: Grid path from a to b (inclusive)
+        """
+        if abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1:
+            return [a, b]
+        
+        cached = self._refined.get((a, b))
+        if cached is not None:
+            return cached
+        
+        _, parents = self._cluster_search(a, self.cluster_of(a), {b})
+        segment = [b]
+        while segment[-1] != a:
+            segment.append(parents[segment[-1]])
+        segment.reverse()
+        
+        # Only entrance-to-entrance segments survive across queries
+        if a in self.inter_edges and b in self.inter_edges:
+            self._refined[(a, b)] = segment
+        
+        return segment
+    
+    
+    def iter_refined_path(self, abstract_path):
+        """
+        Lazily refine an abstract path, one segment at a time.
+        
+        Args:
+            abstract_path: Path from find_abstract_path
+        
+        Yields:
+            tuple: Grid cells from start to goal
+        """
+        if not abstract_path:
+            return
+        
+        yield abstract_path[0]
+        for a, b in zip(abstract_path[:-1], abstract_path[1:]):
+            yield from self.refine_segment(a, b)[1:]
+    
+    
+    def find_path(self, start, goal, occupancy_grid=None):
+        """
+        Find a grid path between two cells.
+        
+        Args:
+            start: Start position (row, col)
+            goal: Goal position (row, col)
+            occupancy_grid: Optional OccupancyGrid; if given, the abstraction is
+                            updated first
+        
+        Returns:
+            list: Path as list of (row, col) positions, or None if no path found
+        """
+        if occupancy_grid is not None:
+            self.update(occupancy_grid)
+        
+        with profile_stage('planning'):
+            abstract_path = self.find_abstract_path(start, goal)
+            if abstract_path is None:
+                return None
+            return list(self.iter_refined_path(abstract_path))
+    
+    
+    def stats(self):
+        """
+        Summarize the abstraction size.
+        
+        Returns:
+            dict: Cluster, entrance node and edge counts
+        """
+        return {
+            'clusters': self.n_cluster_rows * self.n_cluster_cols,
+            'nodes': sum(len(nodes) for nodes in self.cluster_nodes.values()),
+            'intra_edges': sum(len(edges) for cluster in self.intra_edges.values()
+                               for edges in cluster.values()),
+            'inter_edges': sum(len(links) for links in self.inter_edges.values())
+        }
@@ -6,6 +6,8 @@ Handles corner detection and perspective transformation to create a top-down vie
 import cv2
 import numpy as np
 
+from profiling import profile_stage
+
 
 def detect_corners_manual(image, display=True):
     """
@@ -204,7 +206,8 @@ def compute_homography(src_points, dst_width=800, dst_height=800):
     ])
     
     # Compute homography
-    H, status = cv2.findHomography(src_points, dst_points)
+    with profile_stage('homography'):
+        H, status = cv2.findHomography(src_points, dst_points)
     
     if H is None:
         raise ValueError("Failed to compute homography matrix")
@@ -227,13 +230,64 @@ def warp_perspective(image, homography_matrix, width, height):
     Returns:
         numpy.ndarray: Warped top-down view
     """
-    warped = cv2.warpPerspective(image, homography_matrix, (width, height))
+    with profile_stage('warp'):
+        warped = cv2.warpPerspective(image, homography_matrix, (width, height))
     
     print(f"Perspective warped to {width}x{height}")
     
     return warped
 
 
+def choose_warp_size(n_rows, n_cols, min_cell_pixels=16, max_size=800):
+    """
+    Pick the smallest square warp size that gives every cell at least
+    min_cell_pixels pixels on each side.
+    
+    Detection thresholds are ratios of cell area, so they work the same at any
+    resolution; warping straight to a smaller size cuts per-frame pixel work
+    roughly by (max_size / size)^2.
+    
+    Args:
+        n_rows: Number of grid rows
+        n_cols: Number of grid columns
+        min_cell_pixels: Minimum cell side length in pixels (default: 16)
+        max_size: Upper bound, usually the display warp size (default: 800)
+    
+    Returns:
+        int: Side length of the top-down view in pixels
+    """
+    size = max(n_rows, n_cols) * max(1, int(min_cell_pixels))
+    if max_size:
+        size = min(size, max_size)
+    return size
+
+
+def scale_homography(homography_matrix, src_size, dst_size):
+    """
+    Rescale a homography computed for one top-down size to another.
+    
+    Uses the same corner convention as compute_homography (corners map to
+    0 and size - 1), so warping with the result equals resizing the original view.
+    
+    Args:
+        homography_matrix: Homography to a src_size top-down view
+        src_size: Original output size, int (square) or (width, height)
+        dst_size: New output size, int (square) or (width, height)
+    
+    Returns:
+        numpy.ndarray: Homography to a dst_size top-down view
+    """
+    src_w, src_h = (src_size, src_size) if np.isscalar(src_size) else src_size
+    dst_w, dst_h = (dst_size, dst_size) if np.isscalar(dst_size) else dst_size
+    
+    scale = np.array([
+        [(dst_w - 1) / max(1, src_w - 1), 0, 0],
+        [0, (dst_h - 1) / max(1, src_h - 1), 0],
+        [0, 0, 1]
+    ])
+    return scale @ homography_matrix
+
+
 def get_top_down_view(image, corners=None, width=800, height=800, auto_detect='manual'):
     """
     Complete pipeline to get top-down view from an image.
@@ -251,9 +305,11 @@ def get_top_down_view(image, corners=None, width=800, height=800, auto_detect='m
     # Detect corners if not provided
     if corners is None:
         if auto_detect == 'aruco':
-            corners = detect_corners_aruco(image)
+            with profile_stage('corner_detection'):
+                corners = detect_corners_aruco(image)
         elif auto_detect == 'contour':
-            corners = detect_corners_contour(image)
+            with profile_stage('corner_detection'):
+                corners = detect_corners_contour(image)
         else:  # manual
             corners = detect_corners_manual(image)
         
@@ -20,6 +20,9 @@ Usage:
     
     # Manual corner selection
     python main.py --image sample.jpg --rows 5 --cols 5 --goal 2 3 --corners manual
+    
+    # Per-stage timing report saved as JSON
+    python main.py --image sample.jpg --rows 10 --cols 10 --goal 4 5 --profile --profile-output timings.json
 """
 
 import argparse
@@ -28,11 +31,18 @@ import cv2
 import numpy as np
 
 from camera_stream import CameraStream
-from homography import get_top_down_view
+from costmap import CostMap
+from homography import get_top_down_view, choose_warp_size, scale_homography
 from grid_mapper import GridMapper
-from detector import CellClassifier
+from hierarchical_planner import HierarchicalPlanner
+from detector import BackgroundModel, CellClassifier
 from occupancy_grid import build_occupancy_grid
+from pipeline import RouterPipeline
+from path_smoothing import path_to_motion_commands, smooth_path, waypoints_to_commands, estimate_travel_time
 from planner import find_path, path_to_commands
+from profiling import enable_profiling, get_profiler, profile_stage
+from recorder import GridRecorder
+from render_cache import GridRenderCache
 from utils import draw_grid_on_image, draw_path_on_grid, annotate_grid_cells, resize_for_display
 
 
@@ -74,6 +84,9 @@ def parse_arguments():
     parser.add_argument('--robot-color', type=str, default='red',
                         choices=['red', 'blue', 'green', 'yellow', 'orange', 'purple', 'pink', 'cyan', 'white', 'black'],
                         help='Color of robot marker (default: red)')
+    parser.add_argument('--back-color', type=str, default=None,
+                        choices=['red', 'blue', 'green', 'yellow', 'orange', 'purple', 'pink', 'cyan', 'white', 'black'],
+                        help='Color of a second marker on the back of the robot, used to estimate its heading')
     parser.add_argument('--manual-robot', action='store_true',
                         help='Manually click on robot position instead of automatic detection')
     parser.add_argument('--manual-goal', action='store_true',
@@ -90,16 +103,188 @@ def parse_arguments():
     
     # Algorithm choice
     parser.add_argument('--algorithm', type=str, default='astar',
-                        choices=['astar', 'bfs'],
+                        choices=['astar', 'bfs', 'hpa'],
                         help='Path planning algorithm (default: astar)')
+    parser.add_argument('--cluster-size', type=int, default=16,
+                        help='Cluster side length in cells for --algorithm hpa (default: 16)')
+    parser.add_argument('--clearance', type=float, default=0.0,
+                        help='Inflation radius in cells: A* keeps this far from blocks when it can (default: 0 = off)')
+    parser.add_argument('--clearance-penalty', type=float, default=5.0,
+                        help='Extra cost of a cell next to a block when --clearance is set (default: 5.0)')
+    
+    # Command output
+    parser.add_argument('--commands', type=str, default='cells',
+                        choices=['cells', 'runs', 'any-angle'],
+                        help='Command style: one per cell, merged FORWARD runs, or any-angle waypoints (default: cells)')
+    parser.add_argument('--heading', type=str, default=None,
+                        choices=['UP', 'DOWN', 'LEFT', 'RIGHT'],
+                        help='Initial robot heading (default: estimated with --back-color, else facing the first move)')
+    parser.add_argument('--turn-cost', type=float, default=1.0,
+                        help='Cost of a 90 degree turn in cells of travel for heading-aware A* (default: 1.0)')
     
     # Display options
     parser.add_argument('--no-display', action='store_true',
                         help='Do not display visualization windows')
     
+    # Live mode
+    parser.add_argument('--live', action='store_true',
+                        help='Keep processing frames with the pipelined capture/classify/plan workers')
+    parser.add_argument('--live-frames', type=int, default=None,
+                        help='Stop live mode after this many results (default: run until q is pressed)')
+    parser.add_argument('--live-fps', type=float, default=None,
+                        help='Limit the live capture rate (default: as fast as the source delivers)')
+    parser.add_argument('--min-cell-pixels', type=int, default=None,
+                        help='Run detection on the smallest warp giving each cell at least this many pixels '
+                             'per side (e.g. 16); --warp-size is then only used for display')
+    parser.add_argument('--background', type=str, default=None,
+                        help='Empty-floor reference for block detection: a .npz background model, or an '
+                             'image of the empty floor taken from the same camera position')
+    parser.add_argument('--save-background', type=str, default=None,
+                        help='Save the background model fitted from --background to this .npz file')
+    parser.add_argument('--detect-processes', type=int, default=0,
+                        help='Live mode: run warp+classify in this many worker processes fed through '
+                             'shared memory (default: 0 = worker thread)')
+    parser.add_argument('--record', type=str, default=None,
+                        help='Append each frame\'s grid, robot pose, goal, plan and timings to this grid log '
+                             '(replay with recorder.py)')
+    
+    # Profiling options
+    parser.add_argument('--profile', action='store_true',
+                        help='Record per-stage timings and counters and print a report')
+    parser.add_argument('--profile-output', type=str, default=None,
+                        help='Save profiling results to a .json, .csv or .prom file (implies --profile)')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='Serve Prometheus-style metrics on this port (implies --profile)')
+    
     return parser.parse_args()
 
 
+def load_background_model(args, homography, top_down):
+    """
+    Load or fit the empty-floor background model given with --background.
+    
+    Args:
+        args: Parsed command-line arguments
+        homography: Homography of the detection view, or None with --skip-homography
+        top_down: Current detection view (the model is fitted at its size)
+    
+    Returns:
+        BackgroundModel: Fitted model, or None if it could not be loaded
+    """
+    if args.background.lower().endswith('.npz'):
+        model = BackgroundModel.load(args.background)
+        print(f"Background model loaded: {args.background}")
+    else:
+        image = cv2.imread(args.background)
+        if image is None:
+            print(f"Warning: Cannot read background image {args.background}; using per-cell detection")
+            return None
+        
+        size = (top_down.shape[1], top_down.shape[0])
+        if homography is None:
+            floor = cv2.resize(image, size)
+        else:
+            floor = cv2.warpPerspective(image, homography, size)
+        model = BackgroundModel(min_area_ratio=args.block_threshold).fit(floor, args.rows, args.cols)
+        print(f"Background model fitted from: {args.background}")
+    
+    if args.save_background:
+        model.save(args.save_background)
+        print(f"Background model saved to: {args.save_background}")
+    
+    if not model.matches(top_down, args.rows, args.cols):
+        print("Warning: Background model does not match the current view size or grid; "
+              "using per-cell detection")
+    
+    return model
+
+
+def run_live(args, camera_stream, homography, classifier, detect_size=None):
+    """
+    Run the pipelined live mode: capture, warp+classify and plan+emit on separate
+    worker threads, always working on the newest frame.
+    
+    Args:
+        args: Parsed command-line arguments
+        camera_stream: Opened CameraStream
+        homography: Homography to the detection view, or None with --skip-homography
+        classifier: CellClassifier
+        detect_size: Detection warp size (default: --warp-size)
+    """
+    if args.goal is None:
+        print("Error: --live requires --goal")
+        camera_stream.release()
+        sys.exit(1)
+    
+    print("\n[5/8] Starting live pipeline (press q to stop)...")
+    
+    # The live planner runs plain A*/BFS on every frame; say which single-shot options it drops
+    if args.algorithm == 'hpa':
+        print("Warning: --algorithm hpa is not supported in live mode, using astar")
+    if args.clearance > 0:
+        print("Warning: --clearance is ignored in live mode")
+    if args.heading is not None or args.back_color is not None:
+        print("Warning: --heading/--back-color are ignored in live mode, paths are planned without a start heading")
+    if args.turn_cost != 1.0:
+        print("Warning: --turn-cost is ignored in live mode")
+    
+    detect_size = detect_size or args.warp_size
+    display_size = args.warp_size if not args.no_display and detect_size != args.warp_size else None
+    
+    pipeline = RouterPipeline(camera_stream, args.rows, args.cols, tuple(args.goal),
+                              homography=homography, warp_size=detect_size, display_size=display_size,
+                              classifier=classifier,
+                              algorithm='bfs' if args.algorithm == 'bfs' else 'astar',
+                              max_fps=args.live_fps or (30.0 if camera_stream.is_image else None),
+                              detect_processes=args.detect_processes)
+    
+    # Grid lines and labels are drawn once and only changed cells are redrawn per frame
+    render_cache = GridRenderCache()
+    recorder = GridRecorder(args.record, args.rows, args.cols) if args.record else None
+    results = 0
+    
+    with pipeline:
+        while args.live_frames is None or results < args.live_frames:
+            result = pipeline.get_result(timeout=1.0)
+            if result is None:
+                if not pipeline.is_capturing():
+                    print("Input source stopped delivering frames")
+                    break
+                continue
+            
+            results += 1
+            steps = len(result['path']) - 1 if result['path'] else None
+            print(f"Frame {result['frame_id']}: robot {result['robot']}, path steps {steps}, "
+                  f"latency {result['latency_ms']:.1f} ms")
+            
+            if recorder is not None:
+                recorder.record_result(result, goal=tuple(args.goal))
+            
+            if not args.no_display:
+                view = result.get('display')
+                if view is None:
+                    view = result['top_down']
+                vis_image = render_cache.render_overlay(view, result['occupancy_grid'], result['path'])
+                cv2.imshow("Inventory Robot Routing - Live", resize_for_display(vis_image))
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+    
+    pipeline.print_report()
+    if recorder is not None:
+        recorder.close()
+        recorder.print_report()
+    camera_stream.release()
+    if not args.no_display:
+        cv2.destroyAllWindows()
+    
+    profiler = get_profiler()
+    if profiler.enabled:
+        profiler.print_report()
+        if args.profile_output:
+            profiler.save(args.profile_output)
+            print(f"Profiling results saved to: {args.profile_output}")
+
+
 def main():
     """
     Main execution function.
@@ -112,6 +297,11 @@ def main():
         print("Error: Either --goal or --manual-goal must be specified")
         sys.exit(1)
     
+    if args.profile or args.profile_output or args.metrics_port:
+        profiler = enable_profiling()
+        if args.metrics_port:
+            profiler.serve(port=args.metrics_port)
+    
     print("=" * 60)
     print("Overhead Vision-Based Inventory Robot Routing System")
     print("=" * 60)
@@ -140,7 +330,8 @@ def main():
     if args.skip_homography:
         print("\n[2/8] Skipping homography (image already cropped)...")
         # Resize to standard size for consistency
-        top_down = cv2.resize(frame, (args.warp_size, args.warp_size))
+        with profile_stage('warp'):
+            top_down = cv2.resize(frame, (args.warp_size, args.warp_size))
         homography = None
         print(f"Image resized to {args.warp_size}x{args.warp_size}")
     else:
@@ -159,14 +350,43 @@ def main():
         
         print("Top-down view created successfully")
     
+    # Detection runs on a smaller warp when cells are larger than needed; the
+    # --warp-size view is kept for display and manual selection
+    detect_size = args.warp_size
+    detect_view = top_down
+    detect_homography = homography
+    if args.min_cell_pixels:
+        detect_size = choose_warp_size(args.rows, args.cols, args.min_cell_pixels, max_size=args.warp_size)
+        if detect_size != args.warp_size:
+            with profile_stage('warp'):
+                if homography is None:
+                    detect_view = cv2.resize(frame, (detect_size, detect_size), interpolation=cv2.INTER_AREA)
+                else:
+                    detect_homography = scale_homography(homography, args.warp_size, detect_size)
+                    detect_view = cv2.warpPerspective(frame, detect_homography, (detect_size, detect_size))
+            print(f"Detection view: {detect_size}x{detect_size} "
+                  f"({detect_size // max(args.rows, args.cols)} px per cell, "
+                  f"{(args.warp_size / detect_size) ** 2:.1f}x fewer pixels than display)")
+    
     # Step 3: Create grid mapper
     print(f"\n[3/8] Creating {args.rows}x{args.cols} grid mapper...")
     grid_mapper = GridMapper(top_down, args.rows, args.cols)
+    detect_mapper = grid_mapper
+    if detect_view is not top_down:
+        detect_mapper = GridMapper(detect_view, args.rows, args.cols, verbose=False)
     
     # Step 4: Initialize detector
     print(f"\n[4/8] Initializing detector (robot color: {args.robot_color})...")
     print(f"Block threshold: {args.block_threshold * 100:.0f}% occupied to mark as BLOCK")
-    classifier = CellClassifier(robot_color=args.robot_color, block_min_ratio=args.block_threshold)
+    background_model = None
+    if args.background:
+        background_model = load_background_model(args, detect_homography, detect_view)
+    classifier = CellClassifier(robot_color=args.robot_color, block_min_ratio=args.block_threshold,
+                                back_color=args.back_color, background_model=background_model)
+    
+    if args.live:
+        run_live(args, camera_stream, detect_homography, classifier, detect_size=detect_size)
+        return
     
     # Step 5: Build occupancy grid
     print("\n[5/8] Building occupancy grid...")
@@ -261,15 +481,16 @@ def main():
         cv2.destroyAllWindows()
         
         # Build occupancy grid
-        occupancy_grid = build_occupancy_grid(grid_mapper, classifier)
+        occupancy_grid = build_occupancy_grid(detect_mapper, classifier)
         
         # Set manual robot position
         if args.manual_robot and selected_robot[0] is not None:
             occupancy_grid.set_cell(selected_robot[0][0], selected_robot[0][1], occupancy_grid.ROBOT)
+            occupancy_grid.robot_location = None
             print(f"Robot manually placed at: {selected_robot[0]}")
     else:
         # Automatic detection
-        occupancy_grid = build_occupancy_grid(grid_mapper, classifier)
+        occupancy_grid = build_occupancy_grid(detect_mapper, classifier)
     
     occupancy_grid.print_grid()
     
@@ -284,6 +505,17 @@ def main():
         sys.exit(1)
     
     print(f"Robot found at position: {robot_pos}")
+    if occupancy_grid.robot_location is not None:
+        # Centroid in display pixels
+        x, y = (v * args.warp_size / detect_size for v in occupancy_grid.robot_location['centroid'])
+        print(f"Marker centroid: ({x:.1f}, {y:.1f}) px, confidence: {occupancy_grid.robot_location['confidence']:.2f}")
+    
+    # Robot heading: explicit --heading wins over the two-color marker estimate
+    robot_heading = args.heading
+    if robot_heading is None and occupancy_grid.robot_location is not None:
+        robot_heading = occupancy_grid.robot_location['heading']
+        if robot_heading is not None:
+            print(f"Estimated robot heading: {robot_heading:.0f} degrees")
     
     # Step 7: Determine goal position
     if args.manual_goal and selected_goal[0] is not None:
@@ -297,8 +529,21 @@ def main():
     
     print(f"\n[7/8] Planning path from {robot_pos} to {goal_pos}...")
     
-    path = find_path(robot_pos, goal_pos, occupancy_grid, algorithm=args.algorithm)
+    cost_map = None
+    if args.clearance > 0:
+        cost_map = CostMap(inflation_radius=args.clearance, penalty=args.clearance_penalty)
+        print(f"Using clearance-aware costs (inflation radius: {args.clearance} cells)")
     
+    if args.algorithm == 'hpa':
+        if cost_map is not None:
+            print("Warning: --clearance is ignored by the hierarchical planner")
+        planner = HierarchicalPlanner(occupancy_grid, cluster_size=args.cluster_size)
+        path = planner.find_path(robot_pos, goal_pos)
+    else:
+        path = find_path(robot_pos, goal_pos, occupancy_grid, algorithm=args.algorithm, cost_map=cost_map,
+                         start_heading=robot_heading, turn_cost=args.turn_cost)
+    
+    waypoints = None
     if path is None:
         print("\nNo path found! Possible reasons:")
         print("  - Goal position is blocked")
@@ -310,22 +555,39 @@ def main():
         print(f"Steps: {len(path) - 1}")
         
         # Convert to movement commands
-        commands = path_to_commands(path)
+        if args.commands == 'runs':
+            commands = path_to_motion_commands(path, initial_heading=robot_heading)
+        elif args.commands == 'any-angle':
+            waypoints = smooth_path(path, occupancy_grid)
+            commands = waypoints_to_commands(waypoints, initial_heading=robot_heading)
+            print(f"Waypoints: {[(int(r), int(c)) for r, c in waypoints]}")
+        else:
+            commands = path_to_commands(path)
         print(f"Commands: {' -> '.join(commands)}")
+        print(f"Estimated travel time: {estimate_travel_time(commands):.1f}s ({len(commands)} commands)")
+    
+    if args.record:
+        with GridRecorder(args.record, args.rows, args.cols) as recorder:
+            recorder.record(occupancy_grid, robot=robot_pos, goal=goal_pos, path=path)
+        print(f"Frame recorded to: {args.record}")
     
     # Step 8: Visualize results
     print("\n[8/8] Generating visualization...")
     
-    # Create visualization with grid
-    vis_image = grid_mapper.draw_grid(color=(0, 255, 0), thickness=2)
-    
-    # Annotate cells
-    vis_image = annotate_grid_cells(vis_image, occupancy_grid.grid, args.rows, args.cols)
-    
-    # Draw path if found
-    if path is not None:
-        vis_image = draw_path_on_grid(vis_image, path, args.rows, args.cols,
-                                      color=(255, 0, 255), thickness=3)
+    with profile_stage('visualization'):
+        # Create visualization with grid
+        vis_image = grid_mapper.draw_grid(color=(0, 255, 0), thickness=2)
+        
+        # Annotate cells
+        vis_image = annotate_grid_cells(vis_image, occupancy_grid.grid, args.rows, args.cols)
+        
+        # Draw path if found
+        if path is not None:
+            vis_image = draw_path_on_grid(vis_image, path, args.rows, args.cols,
+                                          color=(255, 0, 255), thickness=3)
+            if waypoints is not None:
+                vis_image = draw_path_on_grid(vis_image, waypoints, args.rows, args.cols,
+                                              color=(0, 255, 255), thickness=2)
     
     # Add text overlay
     cv2.putText(vis_image, f"Robot: {robot_pos}", (10, 30),
@@ -364,6 +626,14 @@ def main():
     # Cleanup
     camera_stream.release()
     
+    # Report timings
+    profiler = get_profiler()
+    if profiler.enabled:
+        profiler.print_report()
+        if args.profile_output:
+            profiler.save(args.profile_output)
+            print(f"Profiling results saved to: {args.profile_output}")
+    
     print("\n" + "=" * 60)
     print("Processing complete!")
     print("=" * 60)
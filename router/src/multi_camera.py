@@ -0,0 +1,492 @@
+"""
+Multi-camera module.
+Stitches several overhead cameras into a single occupancy grid.
+
+Every camera has a stored homography from its image into a shared world frame: a
+top-down canvas of n_rows x n_cols cells, cell_pixels wide each. Per frame, each
+camera is read, warped into the cell-aligned region of the world it covers and
+classified, all in parallel worker threads (OpenCV releases the GIL while warping).
+The per-cell results are then fused with confidence-weighted voting, where a
+camera's vote for a cell is its weight times the fraction of the cell it sees.
+
+Usage:
+    python multi_camera.py --config cameras.json
+    python multi_camera.py --config cameras.json --frames 100 --output fused.png
+
+Config file format:
+    {
+        "rows": 20, "cols": 30, "cell_pixels": 40,
+        "cameras": [
+            {"name": "north", "source": 0, "homography": [[...], [...], [...]], "weight": 1.0},
+            {"name": "south", "source": "south.jpg", "image_points": [[x, y], ...],
+             "world_cells": [[col, row], ...]}
+        ]
+    }
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from camera_stream import CameraStream
+from detector import CellClassifier
+from occupancy_grid import OccupancyGrid
+from profiling import profile_stage, increment_counter
+
+
+def homography_from_points(image_points, world_cells, cell_pixels):
+    """
+    Compute a camera-to-world homography from point correspondences.
+    
+    Args:
+        image_points: At least 4 (x, y) pixel positions in the camera image
+        world_cells: Matching (col, row) positions in the world grid, in cell units
+                     (e.g. (0, 0) is the top-left corner of the floor, (cols, rows)
+                     the bottom-right corner)
+        cell_pixels: Side length of a cell in the world frame, in pixels
+    
+    Returns:
+        numpy.ndarray: 3x3 homography matrix
+    """
+    src = np.float32(image_points)
+    dst = np.float32(world_cells) * cell_pixels
+    
+    if len(src) < 4 or len(src) != len(dst):
+        raise ValueError("At least 4 matching image/world points are required")
+    
+    H, _ = cv2.findHomography(src, dst)
+    
+    if H is None:
+        raise ValueError("Failed to compute camera homography")
+    
+    return H
+
+
+class CameraSource:
+    """
+    One camera with its homography into the shared world frame.
+    """
+    
+    def __init__(self, stream, homography, name=None, weight=1.0):
+        """
+        Initialize a camera source.
+        
+        Args:
+            stream: CameraStream to read frames from
+            homography: 3x3 homography from camera pixels to world pixels
+            name: Camera name used in reports (default: 'camera<N>')
+            weight: Trust in this camera's classifications (default: 1.0)
+        """
+        self.stream = stream
+        self.homography = np.asarray(homography, dtype=np.float64)
+        self.name = name
+        self.weight = weight
+        
+        # Set by MultiCameraFusion once the world geometry is known
+        self.roi = None          # (row_start, row_end, col_start, col_end) in cells
+        self.roi_homography = None
+        self.coverage = None     # Fraction of each ROI cell visible to the camera
+        self.frame_size = None
+
+
+class MultiCameraFusion:
+    """
+    Fuses the per-cell classifications of several cameras into one OccupancyGrid.
+    """
+    
+    def __init__(self, sources, n_rows, n_cols, cell_pixels=40, classifier=None,
+                 min_coverage=0.5, unseen_value=OccupancyGrid.BLOCK, max_workers=None):
+        """
+        Initialize the fusion.
+        
+        Args:
+            sources: List of CameraSource
+            n_rows: Number of rows in the world grid
+            n_cols: Number of columns in the world grid
+            cell_pixels: Side length of a world cell in pixels (default: 40)
+            classifier: CellClassifier used for every camera (default: red marker)
+            min_coverage: Minimum visible fraction of a cell for a camera to vote on it
+            unseen_value: Value for cells no camera sees (default: BLOCK, so the
+                          planner never routes through unobserved floor)
+            max_workers: Worker threads (default: one per camera)
+        """
+        if not sources:
+            raise ValueError("At least one camera source is required")
+        
+        self.sources = sources
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.cell_pixels = cell_pixels
+        self.classifier = classifier if classifier is not None else CellClassifier()
+        self.min_coverage = min_coverage
+        self.unseen_value = unseen_value
+        
+        for i, source in enumerate(self.sources):
+            if source.name is None:
+                source.name = f"camera{i}"
+        
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or len(sources))
+        self.last_results = None
+        self.last_report = None
+    
+    
+    def _prepare(self, source, frame):
+        """
+        Compute the cell-aligned world region a camera covers and its per-cell coverage.
+        
+        Args:
+            source: CameraSource
+            frame: First frame from the camera (used for its size)
+        """
+        height, width = frame.shape[:2]
+        size = self.cell_pixels
+        
+        corners = np.float32([[0, 0], [width, 0], [width, height], [0, height]]).reshape(-1, 1, 2)
+        world = cv2.perspectiveTransform(corners, source.homography).reshape(-1, 2)
+        
+        col_start = int(np.clip(np.floor(world[:, 0].min() / size), 0, self.n_cols))
+        col_end = int(np.clip(np.ceil(world[:, 0].max() / size), 0, self.n_cols))
+        row_start = int(np.clip(np.floor(world[:, 1].min() / size), 0, self.n_rows))
+        row_end = int(np.clip(np.ceil(world[:, 1].max() / size), 0, self.n_rows))
+        
+        source.frame_size = (width, height)
+        source.roi = (row_start, row_end, col_start, col_end)
+        
+        if row_end <= row_start or col_end <= col_start:
+            print(f"Warning: {source.name} does not see any part of the world grid")
+            source.coverage = np.zeros((0, 0))
+            return
+        
+        # Shift the homography so the ROI's top-left corner is the output origin
+        shift = np.array([[1, 0, -col_start * size], [0, 1, -row_start * size], [0, 0, 1]], dtype=np.float64)
+        source.roi_homography = shift @ source.homography
+        
+        roi_rows, roi_cols = row_end - row_start, col_end - col_start
+        visible = cv2.warpPerspective(np.full((height, width), 255, dtype=np.uint8), source.roi_homography,
+                                      (roi_cols * size, roi_rows * size), flags=cv2.INTER_NEAREST)
+        source.coverage = visible.reshape(roi_rows, size, roi_cols, size).mean(axis=(1, 3)) / 255.0
+    
+    
+    def process_source(self, source):
+        """
+        Read, warp and classify one camera (runs in a worker thread).
+        
+        Args:
+            source: CameraSource
+        
+        Returns:
+            dict: Per-camera result with 'blocks', 'coverage', 'robot', 'image',
+                  'captured_at' and 'latency_ms', or None if no frame was read
+        """
+        start = time.perf_counter()
+        
+        with profile_stage(f"camera_{source.name}"):
+            success, frame = source.stream.read_frame()
+            captured_at = time.perf_counter()
+            
+            if not success or frame is None:
+                increment_counter('camera_frames_missed')
+                return None
+            
+            if source.coverage is None or source.frame_size != (frame.shape[1], frame.shape[0]):
+                self._prepare(source, frame)
+            
+            row_start, row_end, col_start, col_end = source.roi
+            roi_rows, roi_cols = row_end - row_start, col_end - col_start
+            if roi_rows == 0 or roi_cols == 0:
+                return None
+            
+            size = self.cell_pixels
+            image = cv2.warpPerspective(frame, source.roi_homography, (roi_cols * size, roi_rows * size))
+            
+            # Cells under the marker are never blocks, so they vote free
+            robot = self.classifier.robot_detector.locate(image, cell_size=(size, size))
+            marker_cells = np.zeros((roi_rows, roi_cols), dtype=bool)
+            if robot is not None:
+                marker_cells = robot['marker_cells']
+            
+            blocks = np.zeros((roi_rows, roi_cols), dtype=bool)
+            for i in range(roi_rows):
+                for j in range(roi_cols):
+                    if source.coverage[i, j] >= self.min_coverage and not marker_cells[i, j]:
+                        cell = image[i * size:(i + 1) * size, j * size:(j + 1) * size]
+                        blocks[i, j] = self.classifier.block_detector.detect(cell)
+            
+            if robot is not None:
+                x, y = robot['centroid']
+                row, col = int(y // size), int(x // size)
+                bx, by, bw, bh = robot['bbox']
+                world_cells = np.zeros((self.n_rows, self.n_cols), dtype=bool)
+                world_cells[row_start:row_end, col_start:col_end] = marker_cells
+                robot = dict(robot,
+                             centroid=(x + col_start * size, y + row_start * size),
+                             cell=(row + row_start, col + col_start),
+                             bbox=(bx + col_start * size, by + row_start * size, bw, bh),
+                             confidence=float(robot['confidence'] * source.coverage[row, col] * source.weight),
+                             marker_cells=world_cells)
+        
+        return {
+            'name': source.name,
+            'roi': source.roi,
+            'blocks': blocks,
+            'coverage': source.coverage,
+            'weight': source.weight,
+            'robot': robot,
+            'image': image,
+            'captured_at': captured_at,
+            'latency_ms': (time.perf_counter() - start) * 1000.0
+        }
+    
+    
+    def fuse(self, results):
+        """
+        Fuse per-camera results with confidence-weighted voting.
+        
+        Args:
+            results: List of results from process_source (None entries are skipped)
+        
+        Returns:
+            OccupancyGrid: Fused grid; its robot_location holds the most confident
+                           robot detection across cameras
+        """
+        block_votes = np.zeros((self.n_rows, self.n_cols))
+        free_votes = np.zeros((self.n_rows, self.n_cols))
+        robot = None
+        
+        with profile_stage('fusion'):
+            for result in results:
+                if result is None:
+                    continue
+                
+                row_start, row_end, col_start, col_end = result['roi']
+                votes = result['coverage'] * result['weight']
+                votes[result['coverage'] < self.min_coverage] = 0.0
+                
+                block_votes[row_start:row_end, col_start:col_end] += np.where(result['blocks'], votes, 0.0)
+                free_votes[row_start:row_end, col_start:col_end] += np.where(result['blocks'], 0.0, votes)
+                
+                if result['robot'] is not None and (robot is None or result['robot']['confidence'] > robot['confidence']):
+                    robot = result['robot']
+            
+            grid = np.full((self.n_rows, self.n_cols), self.unseen_value, dtype=int)
+            seen = (block_votes + free_votes) > 0
+            grid[seen] = np.where(block_votes[seen] > free_votes[seen], OccupancyGrid.BLOCK, OccupancyGrid.FREE)
+            
+            if robot is not None:
+                # Another camera's votes must not put a block under the robot
+                grid[robot['marker_cells'] & (grid == OccupancyGrid.BLOCK)] = OccupancyGrid.FREE
+                grid[robot['cell']] = OccupancyGrid.ROBOT
+            
+            occupancy_grid = OccupancyGrid(self.n_rows, self.n_cols)
+            occupancy_grid.from_classifications(grid)
+            occupancy_grid.robot_location = robot
+        
+        return occupancy_grid
+    
+    
+    def capture(self):
+        """
+        Capture one frame from every camera in parallel and fuse them.
+        
+        Returns:
+            OccupancyGrid: Fused occupancy grid (see last_report for timings)
+        """
+        results = list(self.executor.map(self.process_source, self.sources))
+        occupancy_grid = self.fuse(results)
+        fused_at = time.perf_counter()
+        
+        valid = [r for r in results if r is not None]
+        self.last_results = results
+        self.last_report = {
+            'cameras': {
+                r['name']: {
+                    'latency_ms': r['latency_ms'],
+                    'frame_age_ms': (fused_at - r['captured_at']) * 1000.0,
+                    'cells_seen': int((r['coverage'] >= self.min_coverage).sum())
+                } for r in valid
+            },
+            'missing': [s.name for s, r in zip(self.sources, results) if r is None],
+            # Age of the oldest frame that went into the fused grid
+            'fused_age_ms': max(((fused_at - r['captured_at']) * 1000.0 for r in valid), default=None)
+        }
+        
+        return occupancy_grid
+    
+    
+    def stitched_view(self, results=None):
+        """
+        Blend the warped camera images into one world-frame mosaic.
+        
+        Args:
+            results: Results from process_source (default: from the last capture)
+        
+        Returns:
+            numpy.ndarray: BGR image of the whole world frame
+        """
+        results = results if results is not None else self.last_results or []
+        size = self.cell_pixels
+        height, width = self.n_rows * size, self.n_cols * size
+        
+        total = np.zeros((height, width, 3), dtype=np.float32)
+        weights = np.zeros((height, width, 1), dtype=np.float32)
+        
+        for result in results:
+            if result is None:
+                continue
+            row_start, row_end, col_start, col_end = result['roi']
+            y0, x0 = row_start * size, col_start * size
+            image = result['image'].astype(np.float32)
+            mask = (image.sum(axis=2, keepdims=True) > 0).astype(np.float32) * result['weight']
+            total[y0:row_end * size, x0:col_end * size] += image * mask
+            weights[y0:row_end * size, x0:col_end * size] += mask
+        
+        return (total / np.maximum(weights, 1e-6)).astype(np.uint8)
+    
+    
+    def print_report(self):
+        """
+        Print per-camera latency and the fused-frame age of the last capture.
+        """
+        if self.last_report is None:
+            print("No frames captured yet")
+            return
+        
+        print("\nCamera latency:")
+        for name, stats in self.last_report['cameras'].items():
+            print(f"  {name:<16}{stats['latency_ms']:>8.1f} ms  age {stats['frame_age_ms']:>7.1f} ms  "
+                  f"cells {stats['cells_seen']}")
+        for name in self.last_report['missing']:
+            print(f"  {name:<16}  no frame")
+        
+        if self.last_report['fused_age_ms'] is not None:
+            print(f"Fused frame age: {self.last_report['fused_age_ms']:.1f} ms")
+    
+    
+    def close(self):
+        """
+        Stop the worker threads and release all camera streams.
+        """
+        self.executor.shutdown(wait=True)
+        for source in self.sources:
+            source.stream.release()
+    
+    
+    def __enter__(self):
+        """Context manager entry."""
+        return self
+    
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit."""
+        self.close()
+
+
+def load_camera_config(path, classifier=None):
+    """
+    Build a MultiCameraFusion from a JSON config file.
+    
+    Each camera needs either a 'homography' matrix or 'image_points' with matching
+    'world_cells' (see homography_from_points).
+    
+    Args:
+        path: Path to the JSON config
+        classifier: Optional CellClassifier
+    
+    Returns:
+        MultiCameraFusion: Configured fusion
+    """
+    with open(path, 'r') as f:
+        config = json.load(f)
+    
+    cell_pixels = config.get('cell_pixels', 40)
+    sources = []
+    
+    for camera in config['cameras']:
+        if 'homography' in camera:
+            H = np.array(camera['homography'], dtype=np.float64)
+        else:
+            H = homography_from_points(camera['image_points'], camera['world_cells'], cell_pixels)
+        
+        sources.append(CameraSource(CameraStream(camera['source']), H,
+                                    name=camera.get('name'), weight=camera.get('weight', 1.0)))
+    
+    return MultiCameraFusion(sources, config['rows'], config['cols'], cell_pixels=cell_pixels,
+                             classifier=classifier, min_coverage=config.get('min_coverage', 0.5))
+
+
+def save_camera_config(path, fusion, sources_spec):
+    """
+    Save a fusion setup (with its homographies) as a JSON config file.
+    
+    Args:
+        path: Output path
+        fusion: MultiCameraFusion
+        sources_spec: Stream sources (camera index or image path) in camera order
+    """
+    config = {
+        'rows': fusion.n_rows,
+        'cols': fusion.n_cols,
+        'cell_pixels': fusion.cell_pixels,
+        'min_coverage': fusion.min_coverage,
+        'cameras': [
+            {
+                'name': source.name,
+                'source': spec,
+                'homography': source.homography.tolist(),
+                'weight': source.weight
+            } for source, spec in zip(fusion.sources, sources_spec)
+        ]
+    }
+    
+    with open(path, 'w') as f:
+        json.dump(config, f, indent=2)
+
+
+def parse_arguments():
+    """
+    Parse command-line arguments.
+    
+    Returns:
+        argparse.Namespace: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description='Fuse several overhead cameras into one occupancy grid')
+    parser.add_argument('--config', type=str, required=True,
+                        help='JSON file with the world grid size and per-camera homographies')
+    parser.add_argument('--robot-color', type=str, default='red',
+                        help='Color of robot marker (default: red)')
+    parser.add_argument('--block-threshold', type=float, default=0.5,
+                        help='Minimum occupied ratio for a cell to be a block (default: 0.5)')
+    parser.add_argument('--frames', type=int, default=1,
+                        help='Number of fused frames to capture (default: 1)')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Save the stitched world view to this path')
+    
+    return parser.parse_args()
+
+
+def main():
+    """
+    Capture fused frames and print the grid and latency report.
+    """
+    args = parse_arguments()
+    
+    classifier = CellClassifier(robot_color=args.robot_color, block_min_ratio=args.block_threshold)
+    
+    with load_camera_config(args.config, classifier=classifier) as fusion:
+        for _ in range(args.frames):
+            occupancy_grid = fusion.capture()
+        
+        occupancy_grid.print_grid()
+        fusion.print_report()
+        
+        if args.output:
+            cv2.imwrite(args.output, fusion.stitched_view())
+            print(f"Stitched view saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
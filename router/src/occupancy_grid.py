@@ -6,6 +6,8 @@ Builds and manages the occupancy grid representation of the inventory.
 import numpy as np
 import cv2
 
+from profiling import profile_stage
+
 
 class OccupancyGrid:
     """
@@ -37,6 +39,13 @@ class OccupancyGrid:
         self.grid = np.zeros((n_rows, n_cols), dtype=int)
         self.robot_position = None
         self.goal_position = None
+        
+        # Whole-frame robot localization (centroid, confidence) when built from an image
+        self.robot_location = None
+        
+        # Incremented on every change made through set_cell/from_classifications,
+        # so planners and caches can tell when derived data is stale
+        self.version = 0
     
     
     def set_cell(self, row, col, value):
@@ -50,6 +59,7 @@ class OccupancyGrid:
         """
         if 0 <= row < self.n_rows and 0 <= col < self.n_cols:
             self.grid[row, col] = value
+            self.version += 1
             
             # Track robot position
             if value == self.ROBOT:
@@ -120,7 +130,7 @@ class OccupancyGrid:
         # Search for robot in grid
         robot_cells = np.where(self.grid == self.ROBOT)
         if len(robot_cells[0]) > 0:
-            self.robot_position = (robot_cells[0][0], robot_cells[1][0])
+            self.robot_position = (int(robot_cells[0][0]), int(robot_cells[1][0]))
             return self.robot_position
         
         return None
@@ -165,6 +175,8 @@ class OccupancyGrid:
             raise ValueError("Classifications shape does not match grid dimensions")
         
         self.grid = classifications.copy()
+        self.version += 1
+        self.robot_position = None
         self.robot_position = self.get_robot_position()
     
     
@@ -258,8 +270,10 @@ def build_occupancy_grid(grid_mapper, classifier):
     classifications = classifier.classify_all_cells(grid_mapper)
     
     # Create occupancy grid
-    occupancy_grid = OccupancyGrid(grid_mapper.n_rows, grid_mapper.n_cols)
-    occupancy_grid.from_classifications(classifications)
+    with profile_stage('grid_build'):
+        occupancy_grid = OccupancyGrid(grid_mapper.n_rows, grid_mapper.n_cols)
+        occupancy_grid.from_classifications(classifications)
+        occupancy_grid.robot_location = classifier.robot_location
     
     print("Occupancy grid built successfully")
     
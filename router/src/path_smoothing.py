@@ -0,0 +1,470 @@
+"""
+Path smoothing module.
+Turns cell-by-cell paths into compact robot commands and any-angle waypoints.
+
+Two post-processing stages are provided:
+- Run merging: consecutive moves in the same direction become a single
+  "FORWARD n" command, with "TURN LEFT/RIGHT/AROUND" between runs.
+- Any-angle smoothing: string-pulling over an existing path, or Theta* planning,
+  both using line-of-sight checks on the occupancy array. The cells crossed by a
+  segment are computed in one vectorized step and the results are cached until the
+  occupancy grid changes.
+"""
+
+import heapq
+import math
+
+import numpy as np
+
+from profiling import profile_stage, increment_counter
+
+
+# Grid directions as (d_row, d_col) and their headings in degrees (clockwise from up)
+DIRECTIONS = {
+    'UP': (-1, 0),
+    'RIGHT': (0, 1),
+    'DOWN': (1, 0),
+    'LEFT': (0, -1)
+}
+
+HEADINGS = {
+    'UP': 0.0,
+    'RIGHT': 90.0,
+    'DOWN': 180.0,
+    'LEFT': 270.0
+}
+
+
+def heading_degrees(heading):
+    """
+    Normalize a heading to degrees clockwise from up.
+    
+    Args:
+        heading: Direction name ('UP', 'DOWN', 'LEFT', 'RIGHT'), angle in degrees, or None
+    
+    Returns:
+        float: Heading in degrees, or None
+    """
+    if heading is None:
+        return None
+    if isinstance(heading, str):
+        return HEADINGS[heading.upper()]
+    return float(heading) % 360.0
+
+
+def merge_runs(path):
+    """
+    Group a 4-connected path into straight runs.
+    
+    Args:
+        path: List of (row, col) positions
+    
+    Returns:
+        list: List of (direction, length) tuples, e.g. [('RIGHT', 4), ('DOWN', 2)]
+    """
+    runs = []
+    
+    if not path or len(path) < 2:
+        return runs
+    
+    moves = {step: name for name, step in DIRECTIONS.items()}
+    
+    for current, next_pos in zip(path[:-1], path[1:]):
+        direction = moves[(next_pos[0] - current[0], next_pos[1] - current[1])]
+        
+        if runs and runs[-1][0] == direction:
+            runs[-1] = (direction, runs[-1][1] + 1)
+        else:
+            runs.append((direction, 1))
+    
+    return runs
+
+
+def turn_command(from_heading, to_heading):
+    """
+    Get the command that turns the robot between two headings.
+    
+    Quarter and half turns use the short forms 'TURN LEFT', 'TURN RIGHT' and
+    'TURN AROUND'; other angles use 'TURN LEFT 45' / 'TURN RIGHT 30' style commands.
+    
+    Args:
+        from_heading: Current heading in degrees (clockwise from up)
+        to_heading: Target heading in degrees
+    
+    Returns:
+        str: Turn command, or None if no turn is needed
+    """
+    delta = (to_heading - from_heading + 180.0) % 360.0 - 180.0
+    
+    if abs(delta) < 1e-6:
+        return None
+    if abs(abs(delta) - 180.0) < 1e-6:
+        return 'TURN AROUND'
+    if abs(delta - 90.0) < 1e-6:
+        return 'TURN RIGHT'
+    if abs(delta + 90.0) < 1e-6:
+        return 'TURN LEFT'
+    
+    return f"TURN {'RIGHT' if delta > 0 else 'LEFT'} {abs(delta):.0f}"
+
+
+def path_to_motion_commands(path, initial_heading=None):
+    """
+    Convert a grid path to heading-relative run commands.
+    
+    Args:
+        path: List of (row, col) positions
+        initial_heading: Direction the robot is facing ('UP', 'DOWN', 'LEFT', 'RIGHT' or
+                         degrees clockwise from up), or None to assume it already faces
+                         the first run
+    
+    Returns:
+        list: Commands such as ['FORWARD 4', 'TURN RIGHT', 'FORWARD 2']
+    """
+    commands = []
+    heading = heading_degrees(initial_heading)
+    
+    for direction, length in merge_runs(path):
+        if heading is not None:
+            turn = turn_command(heading, HEADINGS[direction])
+            if turn:
+                commands.append(turn)
+        
+        commands.append(f"FORWARD {length}")
+        heading = HEADINGS[direction]
+    
+    return commands
+
+
+def waypoints_to_commands(waypoints, initial_heading=None):
+    """
+    Convert any-angle waypoints to turn and forward commands.
+    
+    Args:
+        waypoints: List of (row, col) positions; consecutive waypoints are joined by
+                   straight segments between cell centers
+        initial_heading: Direction the robot is facing ('UP', 'DOWN', 'LEFT', 'RIGHT' or
+                         degrees clockwise from up), or None to assume it already faces
+                         the first segment
+    
+    Returns:
+        list: Commands such as ['TURN RIGHT 27', 'FORWARD 4.47']
+    """
+    commands = []
+    heading = heading_degrees(initial_heading)
+    
+    if not waypoints:
+        return commands
+    
+    for current, next_pos in zip(waypoints[:-1], waypoints[1:]):
+        dr = next_pos[0] - current[0]
+        dc = next_pos[1] - current[1]
+        segment_heading = math.degrees(math.atan2(dc, -dr)) % 360.0
+        
+        if heading is not None:
+            turn = turn_command(heading, segment_heading)
+            if turn:
+                commands.append(turn)
+        
+        distance = math.hypot(dr, dc)
+        commands.append(f"FORWARD {distance:.0f}" if distance == int(distance) else f"FORWARD {distance:.2f}")
+        heading = segment_heading
+    
+    return commands
+
+
+def estimate_travel_time(commands, speed=1.0, turn_rate=90.0, command_latency=0.2):
+    """
+    Estimate how long the robot takes to execute a command list.
+    
+    Single-cell commands ('UP', 'DOWN', 'LEFT', 'RIGHT') from path_to_commands are
+    treated as one-cell moves that each pay the start/stop latency, plus the turn
+    needed whenever the direction changes.
+    
+    Args:
+        commands: Command list
+        speed: Forward speed in cells per second (default: 1.0)
+        turn_rate: Turn speed in degrees per second (default: 90.0)
+        command_latency: Motor start/stop overhead per command in seconds (default: 0.2)
+    
+    Returns:
+        float: Estimated travel time in seconds
+    """
+    total = 0.0
+    heading = None
+    
+    for command in commands:
+        parts = command.split()
+        
+        if parts[0] == 'FORWARD':
+            total += float(parts[1]) / speed
+        elif parts[0] == 'TURN':
+            if parts[1] == 'AROUND':
+                angle = 180.0
+            else:
+                angle = float(parts[2]) if len(parts) > 2 else 90.0
+            total += angle / turn_rate
+        else:
+            if heading is not None:
+                delta = abs((HEADINGS[command] - heading + 180.0) % 360.0 - 180.0)
+                total += delta / turn_rate
+            heading = HEADINGS[command]
+            total += 1.0 / speed
+        
+        total += command_latency
+    
+    return total
+
+
+class LineOfSight:
+    """
+    Cached line-of-sight checks on an occupancy grid.
+    
+    A segment between two cell centers is clear if none of the cells it touches is
+    blocked. Segments passing exactly through a cell corner also check both cells
+    beside the corner, so the robot never cuts between two diagonal blocks.
+    """
+    
+    def __init__(self, occupancy_grid=None):
+        """
+        Initialize the line-of-sight checker.
+        
+        Args:
+            occupancy_grid: OccupancyGrid to check against (optional, see update())
+        """
+        self.blocked = None
+        self._cache = {}
+        self._grid_key = None
+        
+        if occupancy_grid is not None:
+            self.update(occupancy_grid)
+    
+    
+    def update(self, occupancy_grid):
+        """
+        Bind to the occupancy grid, clearing the cache if it has changed.
+        
+        Args:
+            occupancy_grid: OccupancyGrid instance
+        
+        Returns:
+            LineOfSight: self, for chaining
+        """
+        key = (id(occupancy_grid), id(occupancy_grid.grid), occupancy_grid.version)
+        if key != self._grid_key:
+            self.blocked = occupancy_grid.grid == occupancy_grid.BLOCK
+            self._cache = {}
+            self._grid_key = key
+        return self
+    
+    
+    def invalidate(self):
+        """
+        Clear the cache; call this after writing to occupancy_grid.grid directly.
+        """
+        self._grid_key = None
+        self._cache = {}
+    
+    
+    @staticmethod
+    def segment_cells(a, b):
+        """
+        Get all cells touched by the segment between two cell centers.
+        
+        Args:
+            a: Start cell (row, col)
+            b: End cell (row, col)
+        
+        Returns:
+            tuple: (rows, cols) integer arrays of the touched cells
+        """
+        r0, c0 = a
+        dr = b[0] - r0
+        dc = b[1] - c0
+        
+        # Parameters where the segment crosses a row or column boundary
+        crossings = [np.array([0.0, 1.0])]
+        if dr:
+            boundaries = np.arange(min(r0, b[0]), max(r0, b[0])) + 0.5
+            crossings.append((boundaries - r0) / dr)
+        if dc:
+            boundaries = np.arange(min(c0, b[1]), max(c0, b[1])) + 0.5
+            crossings.append((boundaries - c0) / dc)
+        t = np.concatenate(crossings)
+        
+        # Nudge each crossing point to every side of the boundary it lies on
+        eps = 1e-6
+        offsets = np.array([[-eps, -eps], [-eps, eps], [eps, -eps], [eps, eps]])
+        points = np.stack([r0 + t * dr, c0 + t * dc], axis=1)
+        cells = np.floor(points[:, None, :] + offsets[None, :, :] + 0.5).astype(np.int64).reshape(-1, 2)
+        
+        # Points just outside a cell edge at the segment ends are not touched
+        low = np.minimum(a, b)
+        high = np.maximum(a, b)
+        keep = np.all((cells >= low) & (cells <= high), axis=1)
+        cells = np.unique(cells[keep], axis=0)
+        
+        return cells[:, 0], cells[:, 1]
+    
+    
+    def is_clear(self, a, b):
+        """
+        Check whether the straight segment between two cells avoids all blocks.
+        
+        Args:
+            a: Start cell (row, col)
+            b: End cell (row, col)
+        
+        Returns:
+            bool: True if no touched cell is blocked
+        """
+        key = (a, b) if a <= b else (b, a)
+        
+        clear = self._cache.get(key)
+        if clear is None:
+            rows, cols = self.segment_cells(a, b)
+            clear = not self.blocked[rows, cols].any()
+            self._cache[key] = clear
+            increment_counter('los_checks')
+        
+        return clear
+
+
+def smooth_path(path, occupancy_grid, line_of_sight=None):
+    """
+    Shorten a grid path into any-angle waypoints by string-pulling.
+    
+    From each waypoint the path is followed as far as a straight, unobstructed
+    segment reaches, and that cell becomes the next waypoint.
+    
+    Args:
+        path: List of (row, col) positions from a grid planner
+        occupancy_grid: OccupancyGrid instance
+        line_of_sight: Optional LineOfSight to reuse its cache across calls
+    
+    Returns:
+        list: Waypoints (a subset of path, including both ends)
+    """
+    if not path or len(path) < 3:
+        return list(path) if path else path
+    
+    if line_of_sight is None:
+        line_of_sight = LineOfSight()
+    line_of_sight.update(occupancy_grid)
+    
+    with profile_stage('smoothing'):
+        waypoints = [path[0]]
+        anchor = 0
+        
+        while anchor < len(path) - 1:
+            # Furthest visible point along the path; the next cell is always visible
+            furthest = anchor + 1
+            for i in range(len(path) - 1, anchor + 1, -1):
+                if line_of_sight.is_clear(path[anchor], path[i]):
+                    furthest = i
+                    break
+            
+            waypoints.append(path[furthest])
+            anchor = furthest
+    
+    return waypoints
+
+
+def theta_star(start, goal, occupancy_grid, line_of_sight=None, verbose=True):
+    """
+    Theta* any-angle path planning.
+    
+    Like A* on the 4-connected grid, but a cell may take its parent's parent as its
+    own parent when the two can see each other, so paths follow straight lines at
+    any angle instead of grid steps.
+    
+    Args:
+        start: Start position (row, col)
+        goal: Goal position (row, col)
+        occupancy_grid: OccupancyGrid instance
+        line_of_sight: Optional LineOfSight to reuse its cache across calls
+        verbose: Print progress messages (default: True)
+    
+    Returns:
+        list: Waypoints from start to goal, or None if no path found
+    """
+    start, goal = tuple(start), tuple(goal)
+    
+    if not occupancy_grid.is_valid(goal[0], goal[1]) or not occupancy_grid.is_free(goal[0], goal[1]):
+        if verbose:
+            print(f"Invalid or blocked goal position: {goal}")
+        return None
+    
+    if line_of_sight is None:
+        line_of_sight = LineOfSight()
+    line_of_sight.update(occupancy_grid)
+    blocked = line_of_sight.blocked
+    n_rows, n_cols = blocked.shape
+    
+    def distance(a, b):
+        return math.hypot(a[0] - b[0], a[1] - b[1])
+    
+    with profile_stage('planning'):
+        g_score = {start: 0.0}
+        parent = {start: start}
+        closed = set()
+        open_set = [(distance(start, goal), start)]
+        expanded = 0
+        
+        while open_set:
+            _, current = heapq.heappop(open_set)
+            if current in closed:
+                continue
+            closed.add(current)
+            expanded += 1
+            
+            if current == goal:
+                increment_counter('nodes_expanded_theta', expanded)
+                waypoints = [current]
+                while parent[current] != current:
+                    current = parent[current]
+                    waypoints.append(current)
+                waypoints.reverse()
+                if verbose:
+                    print(f"Path found with {len(waypoints)} waypoints ({expanded} nodes expanded)")
+                return waypoints
+            
+            row, col = current
+            for neighbor in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+                r, c = neighbor
+                if not (0 <= r < n_rows and 0 <= c < n_cols) or blocked[r, c] or neighbor in closed:
+                    continue
+                
+                # Path 2: connect straight from the grandparent when visible
+                source = parent[current]
+                if not line_of_sight.is_clear(source, neighbor):
+                    source = current
+                
+                tentative = g_score[source] + distance(source, neighbor)
+                if tentative < g_score.get(neighbor, float('inf')):
+                    g_score[neighbor] = tentative
+                    parent[neighbor] = source
+                    heapq.heappush(open_set, (tentative + distance(neighbor, goal), neighbor))
+        
+        increment_counter('nodes_expanded_theta', expanded)
+    
+    if verbose:
+        print(f"No path found ({expanded} nodes expanded)")
+    return None
+
+
+def waypoints_length(waypoints):
+    """
+    Euclidean length of a waypoint path in cells.
+    
+    Args:
+        waypoints: List of (row, col) positions
+    
+    Returns:
+        float: Total segment length
+    """
+    if not waypoints or len(waypoints) < 2:
+        return 0.0
+    
+    points = np.asarray(waypoints, dtype=float)
+    return float(np.hypot(*np.diff(points, axis=0).T).sum())
@@ -0,0 +1,497 @@
+"""
+Pipelined frame processing module.
+Runs capture, warp+classify and plan+emit concurrently on separate worker threads.
+
+Stages are connected by single-slot "latest value" queues: when a stage produces a
+new frame before the next stage has picked up the previous one, the older frame is
+dropped. A slow stage therefore never builds up a backlog, throughput is bounded by
+the slowest stage instead of the sum of all stages, and every emitted result is
+based on the freshest frame available. OpenCV releases the GIL during warping and
+thresholding, so the stages genuinely overlap.
+
+With detect_processes > 0, warp+classify runs in worker processes instead of a
+thread: the capture stage decodes frames straight into a shared-memory ring
+(shared_frames.SharedFrameRing) and the workers read them as zero-copy views.
+
+Usage:
+    pipeline = RouterPipeline(CameraStream(0), 10, 10, goal=(0, 9), homography=H)
+    pipeline.start()
+    result = pipeline.get_result(timeout=1.0)
+    pipeline.stop()
+"""
+
+import threading
+import time
+
+import cv2
+
+from detector import CellClassifier
+from grid_mapper import GridMapper
+from occupancy_grid import OccupancyGrid
+from homography import scale_homography
+from planner import PlannerContext, path_to_commands
+from profiling import StageStats, profile_stage, increment_counter
+from shared_frames import SharedFrameRing, DetectionProcessPool
+
+
+# Wait between retries after a failed frame read (seconds)
+READ_RETRY_DELAY = 0.01
+
+
+class LatestQueue:
+    """
+    Bounded queue that keeps only the newest items.
+    
+    put() never blocks: when the queue is full the oldest item is discarded.
+    """
+    
+    def __init__(self, maxsize=1, name='queue'):
+        """
+        Initialize the queue.
+        
+        Args:
+            maxsize: Number of items kept (default: 1 = latest value only)
+            name: Name used for the superseded-items counter
+        """
+        self.maxsize = maxsize
+        self.name = name
+        self.items = []
+        self.superseded = 0
+        self.closed = False
+        self._condition = threading.Condition()
+    
+    
+    def put(self, item):
+        """
+        Add an item, dropping the oldest one if the queue is full.
+        
+        Args:
+            item: Item to add
+        """
+        with self._condition:
+            if len(self.items) >= self.maxsize:
+                self.items.pop(0)
+                self.superseded += 1
+                increment_counter(f"{self.name}_superseded")
+            self.items.append(item)
+            self._condition.notify()
+    
+    
+    def get(self, timeout=None):
+        """
+        Remove and return the oldest item, waiting for one if necessary.
+        
+        Args:
+            timeout: Maximum wait in seconds (default: wait until an item arrives)
+        
+        Returns:
+            Item, or None on timeout or when the queue is closed and empty
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.items or self.closed, timeout=timeout):
+                return None
+            if not self.items:
+                return None
+            return self.items.pop(0)
+    
+    
+    def close(self):
+        """
+        Wake up all waiting consumers; get() returns None once the queue is empty.
+        """
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+    
+    
+    def __len__(self):
+        with self._condition:
+            return len(self.items)
+
+
+class RouterPipeline:
+    """
+    Three-stage routing pipeline: capture -> warp+classify -> plan+emit.
+    
+    Each stage runs on its own thread. Results are dicts with the frame id, capture
+    timestamp, occupancy grid, robot position, path, commands, per-stage times and
+    the end-to-end latency from capture to emit.
+    """
+    
+    def __init__(self, stream, n_rows, n_cols, goal, homography=None, warp_size=800,
+                 classifier=None, algorithm='astar', max_fps=None, queue_size=1, on_result=None,
+                 detect_processes=0, shm_slots=None, display_size=None, max_read_failures=100):
+        """
+        Initialize the pipeline.
+        
+        Args:
+            stream: CameraStream to read frames from
+            n_rows: Number of grid rows
+            n_cols: Number of grid columns
+            goal: Goal position (row, col)
+            homography: Homography to the top-down view, or None to resize the frame
+                        as-is (already cropped input)
+            warp_size: Size of the top-down view in pixels (default: 800)
+            classifier: CellClassifier (default: red marker, 50% block threshold)
+            algorithm: 'astar' or 'bfs' (default: 'astar')
+            max_fps: Optional capture rate limit (useful for static image sources)
+            queue_size: Frames buffered between stages (default: 1 = latest only)
+            on_result: Optional callback called with every emitted result
+            detect_processes: Run warp+classify in this many worker processes fed
+                              through shared memory (default: 0 = in-process thread)
+            shm_slots: Frame slots in the shared-memory ring (default: 2 per worker + 2)
+            display_size: Optional size of an extra full-resolution view for display,
+                          returned as result['display'] when warp_size is smaller
+                          (in-process mode only)
+            max_read_failures: Consecutive failed reads after which capture stops,
+                               e.g. a disconnected camera (default: 100)
+        """
+        self.stream = stream
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.goal = tuple(goal)
+        self.homography = homography
+        self.warp_size = warp_size
+        self.classifier = classifier if classifier is not None else CellClassifier()
+        self.algorithm = algorithm
+        self.max_fps = max_fps
+        self.on_result = on_result
+        self.detect_processes = detect_processes
+        self.shm_slots = shm_slots or 2 * detect_processes + 2
+        self.display_size = display_size if display_size != warp_size else None
+        self.max_read_failures = max_read_failures
+        self.display_homography = None
+        if self.display_size and homography is not None:
+            self.display_homography = scale_homography(homography, warp_size, display_size)
+        
+        # Shared-memory transport, created by the capture stage once the frame size is known
+        self.ring = None
+        self.pool = None
+        self._pool_ready = threading.Event()
+        self._transport_final = None
+        
+        self.frames = LatestQueue(queue_size, name='frames')
+        self.grids = LatestQueue(queue_size, name='grids')
+        self.results = LatestQueue(queue_size, name='results')
+        
+        self.planner = PlannerContext(n_rows, n_cols)
+        self.latency = StageStats()
+        self.latest_result = None
+        
+        self.frames_captured = 0
+        self.frames_emitted = 0
+        self._started_at = None
+        self._stop = threading.Event()
+        self._threads = []
+    
+    
+    def start(self):
+        """
+        Start the stage threads.
+        
+        Returns:
+            RouterPipeline: self, for chaining
+        """
+        self._stop.clear()
+        self._started_at = time.perf_counter()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name='pipeline-capture', daemon=True),
+            threading.Thread(target=self._process_loop, name='pipeline-process', daemon=True),
+            threading.Thread(target=self._plan_loop, name='pipeline-plan', daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+    
+    
+    def stop(self, timeout=2.0):
+        """
+        Stop the stage threads and wait for them to finish.
+        
+        Args:
+            timeout: Maximum wait per thread in seconds
+        """
+        self._stop.set()
+        for queue in (self.frames, self.grids, self.results):
+            queue.close()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        
+        if self.ring is not None:
+            self._transport_final = self._transport_stats()
+        if self.pool is not None:
+            self.pool.stop()
+            self.pool = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        self._pool_ready.clear()
+    
+    
+    def is_capturing(self):
+        """
+        Check whether the capture stage is still delivering frames.
+        
+        Returns:
+            bool: True while the capture thread is running
+        """
+        return bool(self._threads) and self._threads[0].is_alive()
+    
+    
+    def get_result(self, timeout=None):
+        """
+        Wait for the next emitted result.
+        
+        Args:
+            timeout: Maximum wait in seconds
+        
+        Returns:
+            dict: Result, or None on timeout
+        """
+        return self.results.get(timeout=timeout)
+    
+    
+    def _read_failed(self, failures):
+        """
+        Back off after a failed frame read.
+        
+        Args:
+            failures: Number of consecutive failed reads so far
+        
+        Returns:
+            bool: True if capture should stop
+        """
+        if self.stream.is_image:
+            return True
+        if failures >= self.max_read_failures:
+            print(f"Warning: {failures} consecutive frame reads failed; stopping capture")
+            return True
+        self._stop.wait(READ_RETRY_DELAY)
+        return False
+    
+    
+    def _capture_loop(self):
+        """Stage 1: read frames as fast as the source (or max_fps) allows."""
+        if self.detect_processes:
+            self._capture_shared_loop()
+            return
+        
+        frame_id = 0
+        failures = 0
+        interval = 1.0 / self.max_fps if self.max_fps else 0.0
+        
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            success, frame = self.stream.read_frame()
+            
+            if not success or frame is None:
+                failures += 1
+                if self._read_failed(failures):
+                    break
+                continue
+            failures = 0
+            
+            self.frames.put({'frame_id': frame_id, 'captured_at': time.perf_counter(),
+                             'frame': frame, 'timings': {}})
+            self.frames_captured += 1
+            frame_id += 1
+            
+            if interval:
+                remaining = interval - (time.perf_counter() - started)
+                if remaining > 0:
+                    self._stop.wait(remaining)
+    
+    
+    def _capture_shared_loop(self):
+        """Stage 1 (process mode): decode frames straight into the shared-memory ring."""
+        success, frame = self.stream.read_frame()
+        if not success or frame is None:
+            return
+        
+        self.ring = SharedFrameRing(frame.shape, slots=self.shm_slots)
+        self.pool = DetectionProcessPool(self.ring, self.classifier, self.n_rows, self.n_cols,
+                                         warp_size=self.warp_size, homography=self.homography,
+                                         workers=self.detect_processes).start()
+        self.ring.write(frame, 0, time.perf_counter())
+        self.frames_captured += 1
+        self._pool_ready.set()
+        
+        frame_id = 1
+        failures = 0
+        interval = 1.0 / self.max_fps if self.max_fps else 0.0
+        
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            slot, view = self.ring.begin_write()
+            
+            if not self.stream.read_frame_into(view):
+                self.ring.abort_write(slot)
+                failures += 1
+                if self._read_failed(failures):
+                    break
+                continue
+            failures = 0
+            
+            self.ring.end_write(slot, frame_id, time.perf_counter())
+            self.frames_captured += 1
+            frame_id += 1
+            
+            if interval:
+                remaining = interval - (time.perf_counter() - started)
+                if remaining > 0:
+                    self._stop.wait(remaining)
+    
+    
+    def _process_loop(self):
+        """Stage 2: warp the newest frame and classify its cells."""
+        if self.detect_processes:
+            self._collect_loop()
+            return
+        
+        size = (self.warp_size, self.warp_size)
+        
+        while not self._stop.is_set():
+            packet = self.frames.get(timeout=0.1)
+            if packet is None:
+                continue
+            
+            started = time.perf_counter()
+            
+            frame = packet.pop('frame')
+            with profile_stage('warp'):
+                if self.homography is None:
+                    top_down = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                else:
+                    top_down = cv2.warpPerspective(frame, self.homography, size)
+            
+            if self.display_size:
+                display_size = (self.display_size, self.display_size)
+                with profile_stage('display_warp'):
+                    if self.display_homography is None:
+                        packet['display'] = cv2.resize(frame, display_size)
+                    else:
+                        packet['display'] = cv2.warpPerspective(frame, self.display_homography, display_size)
+            
+            grid_mapper = GridMapper(top_down, self.n_rows, self.n_cols, verbose=False)
+            classifications = self.classifier.classify_all_cells(grid_mapper)
+            
+            occupancy_grid = OccupancyGrid(self.n_rows, self.n_cols)
+            occupancy_grid.from_classifications(classifications)
+            occupancy_grid.robot_location = self.classifier.robot_location
+            
+            packet['top_down'] = top_down
+            packet['occupancy_grid'] = occupancy_grid
+            packet['timings']['warp_classify_ms'] = (time.perf_counter() - started) * 1000.0
+            self.grids.put(packet)
+    
+    
+    def _collect_loop(self):
+        """Stage 2 (process mode): forward detection results from the worker processes."""
+        while not self._stop.is_set() and not self._pool_ready.wait(0.1):
+            pass
+        
+        while not self._stop.is_set():
+            packet = self.pool.get(timeout=0.1)
+            if packet is not None:
+                self.grids.put(packet)
+    
+    
+    def _plan_loop(self):
+        """Stage 3: plan on the newest grid and emit the result."""
+        while not self._stop.is_set():
+            packet = self.grids.get(timeout=0.1)
+            if packet is None:
+                continue
+            
+            started = time.perf_counter()
+            occupancy_grid = packet['occupancy_grid']
+            robot = occupancy_grid.get_robot_position()
+            
+            path = None
+            if robot is not None:
+                with profile_stage('planning'):
+                    path = self.planner.plan(robot, self.goal, occupancy_grid, algorithm=self.algorithm).path
+            
+            emitted_at = time.perf_counter()
+            packet['timings']['plan_ms'] = (emitted_at - started) * 1000.0
+            packet.update({
+                'robot': robot,
+                'path': path,
+                'commands': path_to_commands(path) if path else [],
+                'emitted_at': emitted_at,
+                'latency_ms': (emitted_at - packet['captured_at']) * 1000.0
+            })
+            
+            self.latency.add(emitted_at - packet['captured_at'])
+            self.frames_emitted += 1
+            self.latest_result = packet
+            self.results.put(packet)
+            
+            if self.on_result is not None:
+                self.on_result(packet)
+    
+    
+    def stats(self):
+        """
+        Summarize pipeline throughput and latency.
+        
+        Returns:
+            dict: Captured/emitted frame counts, frames superseded per queue, emitted
+                  frames per second and end-to-end latency statistics (ms)
+        """
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            'frames_captured': self.frames_captured,
+            'frames_emitted': self.frames_emitted,
+            'superseded': {queue.name: queue.superseded for queue in (self.frames, self.grids, self.results)},
+            'fps': self.frames_emitted / elapsed if elapsed > 0 else 0.0,
+            'latency': self.latency.summary(),
+            'transport': self._transport_stats()
+        }
+    
+    
+    def _transport_stats(self):
+        """Shared-memory transport counters, or None when running in-process."""
+        if not self.detect_processes:
+            return None
+        if self.ring is None and self._transport_final is not None:
+            return self._transport_final
+        
+        stats = {'frames_written': self.ring.frames_written if self.ring is not None else 0}
+        pool_stats = self.pool.stats() if self.pool is not None else {'copies': 0}
+        stats.update(pool_stats)
+        stats['copies'] = (self.stream.frame_copies + pool_stats['copies'] +
+                           (self.ring.copies if self.ring is not None else 0))
+        return stats
+    
+    
+    def print_report(self):
+        """
+        Print throughput and end-to-end latency.
+        """
+        stats = self.stats()
+        latency = stats['latency']
+        
+        print("\nPipeline:")
+        print(f"  Frames captured: {stats['frames_captured']}, emitted: {stats['frames_emitted']} "
+              f"({stats['fps']:.1f} fps)")
+        print("  Superseded: " + ", ".join(f"{name}={n}" for name, n in stats['superseded'].items()))
+        print(f"  End-to-end latency (ms): mean {latency['mean_ms']:.1f}, p50 {latency['p50_ms']:.1f}, "
+              f"p95 {latency['p95_ms']:.1f}, p99 {latency['p99_ms']:.1f}")
+        
+        transport = stats['transport']
+        if transport is not None:
+            print(f"  Shared-memory transport: {transport.get('workers', 0)} workers, "
+                  f"{transport['frames_written']} frames written, {transport.get('processed', 0)} processed, "
+                  f"{transport.get('torn_reads', 0)} torn reads, {transport['copies']} frame copies")
+    
+    
+    def __enter__(self):
+        """Context manager entry."""
+        return self.start()
+    
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit."""
+        self.stop()
@@ -5,7 +5,10 @@ Implements A* algorithm for finding collision-free paths in the occupancy grid.
 
 import heapq
 import numpy as np
-from collections import defaultdict
+from array import array
+from collections import defaultdict, deque
+
+from profiling import profile_stage, increment_counter
 
 
 def heuristic(a, b):
@@ -71,7 +74,7 @@ def reconstruct_path(came_from, current):
     return path
 
 
-def astar(start, goal, occupancy_grid):
+def astar(start, goal, occupancy_grid, verbose=True, cost_map=None):
     """
     A* path planning algorithm.
     
@@ -79,28 +82,37 @@ def astar(start, goal, occupancy_grid):
         start: Start position (row, col)
         goal: Goal position (row, col)
         occupancy_grid: OccupancyGrid instance
+        verbose: Print progress messages (default: True)
+        cost_map: Optional CostMap; when given, entering a cell costs its
+                  clearance-based traversal cost instead of 1
     
     Returns:
         list: Path as list of (row, col) positions, or None if no path found
     """
     # Validate start and goal
     if not occupancy_grid.is_valid(start[0], start[1]):
-        print(f"Error: Invalid start position {start}")
+        if verbose:
+            print(f"Error: Invalid start position {start}")
         return None
     
     if not occupancy_grid.is_valid(goal[0], goal[1]):
-        print(f"Error: Invalid goal position {goal}")
+        if verbose:
+            print(f"Error: Invalid goal position {goal}")
         return None
     
     # Check if goal is occupied by a block
     if occupancy_grid.get_cell(goal[0], goal[1]) == occupancy_grid.BLOCK:
-        print(f"Error: Goal position {goal} is blocked")
+        if verbose:
+            print(f"Error: Goal position {goal} is blocked")
         return None
     
     # If start == goal
     if start == goal:
         return [start]
     
+    if cost_map is not None:
+        cost_map.update(occupancy_grid)
+    
     # Initialize data structures
     open_set = []
     heapq.heappush(open_set, (0, start))
@@ -114,7 +126,8 @@ def astar(start, goal, occupancy_grid):
     
     visited = set()
     
-    print(f"\nA* pathfinding from {start} to {goal}...")
+    if verbose:
+        print(f"\nA* pathfinding from {start} to {goal}...")
     
     while open_set:
         _, current = heapq.heappop(open_set)
@@ -127,8 +140,10 @@ def astar(start, goal, occupancy_grid):
         
         # Check if we reached the goal
         if current == goal:
+            increment_counter('nodes_expanded_astar', len(visited))
             path = reconstruct_path(came_from, current)
-            print(f"Path found! Length: {len(path)} steps")
+            if verbose:
+                print(f"Path found! Length: {len(path)} steps")
             return path
         
         # Explore neighbors
@@ -140,7 +155,13 @@ def astar(start, goal, occupancy_grid):
                 continue
             
             # Calculate tentative g_score
-            tentative_g_score = g_score[current] + 1  # Cost of 1 per step
+            if cost_map is None:
+                tentative_g_score = g_score[current] + 1  # Cost of 1 per step
+            else:
+                step_cost = cost_map.get_cost(neighbor[0], neighbor[1])
+                if step_cost == float('inf'):
+                    continue
+                tentative_g_score = g_score[current] + step_cost
             
             # If this path is better
             if tentative_g_score < g_score[neighbor]:
@@ -153,11 +174,13 @@ def astar(start, goal, occupancy_grid):
                     heapq.heappush(open_set, (f_score[neighbor], neighbor))
     
     # No path found
-    print("No path found to goal")
+    increment_counter('nodes_expanded_astar', len(visited))
+    if verbose:
+        print("No path found to goal")
     return None
 
 
-def bfs(start, goal, occupancy_grid):
+def bfs(start, goal, occupancy_grid, verbose=True):
     """
     Breadth-First Search for path planning (alternative to A*).
     
@@ -165,36 +188,45 @@ def bfs(start, goal, occupancy_grid):
         start: Start position (row, col)
         goal: Goal position (row, col)
         occupancy_grid: OccupancyGrid instance
+        verbose: Print progress messages (default: True)
     
     Returns:
         list: Path as list of (row, col) positions, or None if no path found
     """
     # Validate start and goal
     if not occupancy_grid.is_valid(start[0], start[1]):
-        print(f"Error: Invalid start position {start}")
+        if verbose:
+            print(f"Error: Invalid start position {start}")
         return None
     
     if not occupancy_grid.is_valid(goal[0], goal[1]):
-        print(f"Error: Invalid goal position {goal}")
+        if verbose:
+            print(f"Error: Invalid goal position {goal}")
         return None
     
     if start == goal:
         return [start]
     
     # BFS queue
-    queue = [start]
+    queue = deque([start])
     visited = {start}
     came_from = {}
     
-    print(f"\nBFS pathfinding from {start} to {goal}...")
+    expanded = 0
+    
+    if verbose:
+        print(f"\nBFS pathfinding from {start} to {goal}...")
     
     while queue:
-        current = queue.pop(0)
+        current = queue.popleft()
+        expanded += 1
         
         # Check if we reached the goal
         if current == goal:
+            increment_counter('nodes_expanded_bfs', expanded)
             path = reconstruct_path(came_from, current)
-            print(f"Path found! Length: {len(path)} steps")
+            if verbose:
+                print(f"Path found! Length: {len(path)} steps")
             return path
         
         # Explore neighbors
@@ -213,11 +245,483 @@ def bfs(start, goal, occupancy_grid):
             queue.append(neighbor)
     
     # No path found
-    print("No path found to goal")
+    increment_counter('nodes_expanded_bfs', expanded)
+    if verbose:
+        print("No path found to goal")
     return None
 
 
-def find_path(start, goal, occupancy_grid, algorithm='astar'):
+# Headings of the turn-aware planner, clockwise from up (index = quarter turns)
+HEADING_NAMES = ('UP', 'RIGHT', 'DOWN', 'LEFT')
+HEADING_STEPS = ((-1, 0), (0, 1), (1, 0), (0, -1))
+
+
+def heading_index(heading):
+    """
+    Convert a heading to the nearest of the four grid directions.
+    
+    Args:
+        heading: Direction name ('UP', 'RIGHT', 'DOWN', 'LEFT') or angle in degrees
+                 clockwise from up (as estimated by RobotDetector.locate)
+    
+    Returns:
+        int: Index into HEADING_NAMES
+    """
+    if isinstance(heading, str):
+        return HEADING_NAMES.index(heading.upper())
+    return int(round((heading % 360.0) / 90.0)) % 4
+
+
+def astar_with_heading(start, goal, occupancy_grid, start_heading, goal_heading=None,
+                       turn_cost=1.0, verbose=True, cost_map=None):
+    """
+    Turn-aware A* over (cell, heading) states.
+    
+    Moving forward costs the cell cost (1, or the cost map value) and every 90 degree
+    rotation costs turn_cost, so the returned path minimizes travel plus rotation
+    time from the robot's current heading.
+    
+    Args:
+        start: Start position (row, col)
+        goal: Goal position (row, col)
+        occupancy_grid: OccupancyGrid instance
+        start_heading: Current robot heading (name or degrees, see heading_index)
+        goal_heading: Optional heading the robot must end in
+        turn_cost: Cost of a 90 degree turn, in units of one cell of travel (default: 1.0)
+        verbose: Print progress messages (default: True)
+        cost_map: Optional CostMap for clearance-aware costs
+    
+    Returns:
+        list: Path as list of (row, col) positions, or None if no path found
+    """
+    start, goal = tuple(start), tuple(goal)
+    
+    if not occupancy_grid.is_valid(start[0], start[1]) or not occupancy_grid.is_valid(goal[0], goal[1]):
+        if verbose:
+            print(f"Error: Invalid start {start} or goal {goal}")
+        return None
+    
+    if occupancy_grid.get_cell(goal[0], goal[1]) == occupancy_grid.BLOCK:
+        if verbose:
+            print(f"Error: Goal position {goal} is blocked")
+        return None
+    
+    if cost_map is not None:
+        cost_map.update(occupancy_grid)
+    
+    start_h = heading_index(start_heading)
+    goal_h = heading_index(goal_heading) if goal_heading is not None else None
+    n_rows, n_cols = occupancy_grid.n_rows, occupancy_grid.n_cols
+    blocked = occupancy_grid.grid == occupancy_grid.BLOCK
+    
+    def quarter_turns(a, b):
+        return min((a - b) % 4, (b - a) % 4)
+    
+    def lower_bound(row, col, h):
+        # Manhattan distance plus the turns any path must still make
+        dr, dc = goal[0] - row, goal[1] - col
+        needed = set()
+        if dr:
+            needed.add(2 if dr > 0 else 0)
+        if dc:
+            needed.add(1 if dc > 0 else 3)
+        turns = 0
+        if needed:
+            turns = min(quarter_turns(h, d) for d in needed) + (1 if len(needed) == 2 else 0)
+        elif goal_h is not None:
+            turns = quarter_turns(h, goal_h)
+        return abs(dr) + abs(dc) + turn_cost * turns
+    
+    start_state = (start[0], start[1], start_h)
+    g_score = {start_state: 0.0}
+    came_from = {}
+    closed = set()
+    open_set = [(lower_bound(*start_state), start_state)]
+    
+    if verbose:
+        print(f"\nTurn-aware A* from {start} (facing {HEADING_NAMES[start_h]}) to {goal}...")
+    
+    while open_set:
+        _, state = heapq.heappop(open_set)
+        if state in closed:
+            continue
+        closed.add(state)
+        
+        row, col, h = state
+        if (row, col) == goal and (goal_h is None or h == goal_h):
+            increment_counter('nodes_expanded_astar', len(closed))
+            path = [(row, col)]
+            while state in came_from:
+                state = came_from[state]
+                if (state[0], state[1]) != path[-1]:
+                    path.append((state[0], state[1]))
+            path.reverse()
+            if verbose:
+                print(f"Path found! Length: {len(path)} steps, cost: {g_score[(row, col, h)]:.1f}")
+            return path
+        
+        successors = [((row, col, (h + 1) % 4), turn_cost), ((row, col, (h - 1) % 4), turn_cost)]
+        
+        d_row, d_col = HEADING_STEPS[h]
+        r, c = row + d_row, col + d_col
+        if 0 <= r < n_rows and 0 <= c < n_cols and not blocked[r, c]:
+            step_cost = 1.0 if cost_map is None else cost_map.get_cost(r, c)
+            if step_cost != float('inf'):
+                successors.append(((r, c, h), step_cost))
+        
+        for successor, cost in successors:
+            if successor in closed:
+                continue
+            tentative = g_score[state] + cost
+            if tentative < g_score.get(successor, float('inf')):
+                g_score[successor] = tentative
+                came_from[successor] = state
+                heapq.heappush(open_set, (tentative + lower_bound(*successor), successor))
+    
+    increment_counter('nodes_expanded_astar', len(closed))
+    if verbose:
+        print("No path found to goal")
+    return None
+
+
+class PlanResult:
+    """
+    Structured result of a PlannerContext search.
+    
+    Attributes:
+        path: List of (row, col) positions from start to goal, or None if no path
+        cost: Total path cost (float('inf') if no path)
+        expanded: Number of nodes expanded by the search
+        algorithm: Name of the algorithm that produced the result
+    """
+    
+    __slots__ = ('path', 'cost', 'expanded', 'algorithm')
+    
+    def __init__(self, path, cost, expanded, algorithm):
+        self.path = path
+        self.cost = cost
+        self.expanded = expanded
+        self.algorithm = algorithm
+    
+    
+    @property
+    def found(self):
+        """bool: True if a path was found."""
+        return self.path is not None
+    
+    
+    def __repr__(self):
+        length = len(self.path) - 1 if self.path is not None else None
+        return (f"PlanResult(algorithm={self.algorithm!r}, found={self.found}, "
+                f"length={length}, cost={self.cost}, expanded={self.expanded})")
+
+
+class PlannerContext:
+    """
+    Reusable, silent path planner for tight loops.
+    
+    Owns flat scratch buffers sized to the grid (g-scores, parents, an array queue and
+    visited stamps). Instead of clearing the buffers between searches, each search uses
+    a new generation number and a cell counts as visited only if its stamp matches the
+    current generation. The passability mask is cached per OccupancyGrid version.
+    
+    Never prints; results are returned as PlanResult objects.
+    
+    Usage:
+        context = PlannerContext(n_rows, n_cols)
+        result = context.astar(start, goal, occupancy_grid)
+        if result.found:
+            print(result.path, result.cost, result.expanded)
+    """
+    
+    def __init__(self, n_rows=0, n_cols=0):
+        """
+        Initialize the planner context.
+        
+        Args:
+            n_rows: Number of grid rows to preallocate for (grows on demand)
+            n_cols: Number of grid columns to preallocate for (grows on demand)
+        """
+        self.n_rows = 0
+        self.n_cols = 0
+        self.capacity = 0
+        
+        self._generation = 0
+        self._seen = array('q')
+        self._closed = array('q')
+        self._parent = array('q')
+        self._g = array('d')
+        self._queue = array('q')
+        self._heap = []
+        
+        self._passable = None
+        self._unit_costs = None
+        self._grid_key = None
+        
+        self.resize(n_rows, n_cols)
+    
+    
+    def resize(self, n_rows, n_cols):
+        """
+        Set the grid dimensions, growing the scratch buffers if needed.
+        
+        Args:
+            n_rows: Number of grid rows
+            n_cols: Number of grid columns
+        """
+        size = n_rows * n_cols
+        
+        if size > self.capacity:
+            self._seen = array('q', bytes(8 * size))
+            self._closed = array('q', bytes(8 * size))
+            self._parent = array('q', bytes(8 * size))
+            self._g = array('d', bytes(8 * size))
+            self._queue = array('q', bytes(8 * size))
+            self._generation = 0
+            self.capacity = size
+        
+        if (n_rows, n_cols) != (self.n_rows, self.n_cols):
+            self._grid_key = None
+        
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+    
+    
+    def invalidate(self):
+        """
+        Drop the cached passability mask.
+        
+        Call this after writing to occupancy_grid.grid directly (set_cell and
+        from_classifications bump the grid version, which invalidates automatically).
+        """
+        self._grid_key = None
+    
+    
+    def _prepare(self, occupancy_grid):
+        """
+        Match the buffers to the grid and start a new search generation.
+        
+        Args:
+            occupancy_grid: OccupancyGrid instance
+        
+        Returns:
+            list: Flat passability mask (True for non-block cells)
+        """
+        if (occupancy_grid.n_rows, occupancy_grid.n_cols) != (self.n_rows, self.n_cols):
+            self.resize(occupancy_grid.n_rows, occupancy_grid.n_cols)
+        
+        key = (id(occupancy_grid), id(occupancy_grid.grid), occupancy_grid.version)
+        if key != self._grid_key:
+            passable = (occupancy_grid.grid != occupancy_grid.BLOCK).ravel()
+            self._passable = passable.tolist()
+            self._unit_costs = np.where(passable, 1.0, np.inf).tolist()
+            self._grid_key = key
+        
+        self._generation += 1
+        
+        return self._passable
+    
+    
+    def _trace(self, goal_index):
+        """
+        Follow parent links from the goal back to the start.
+        
+        Args:
+            goal_index: Flat index of the goal cell
+        
+        Returns:
+            list: Path as list of (row, col) positions
+        """
+        parent = self._parent
+        n_cols = self.n_cols
+        path = []
+        index = goal_index
+        
+        while index >= 0:
+            path.append(divmod(index, n_cols))
+            index = parent[index]
+        
+        path.reverse()
+        return path
+    
+    
+    def _in_bounds(self, position):
+        return 0 <= position[0] < self.n_rows and 0 <= position[1] < self.n_cols
+    
+    
+    def astar(self, start, goal, occupancy_grid, cost_map=None):
+        """
+        A* search with Manhattan heuristic.
+        
+        Every step costs 1 unless a cost map is given, in which case entering a cell
+        costs its traversal cost (always >= 1, so the heuristic stays admissible).
+        
+        Args:
+            start: Start position (row, col)
+            goal: Goal position (row, col)
+            occupancy_grid: OccupancyGrid instance
+            cost_map: Optional CostMap for clearance-aware planning
+        
+        Returns:
+            PlanResult: Path, cost and number of expanded nodes
+        """
+        self._prepare(occupancy_grid)
+        costs = self._unit_costs if cost_map is None else cost_map.flat_costs(occupancy_grid)
+        inf = float('inf')
+        
+        if not (self._in_bounds(start) and self._in_bounds(goal)):
+            return PlanResult(None, float('inf'), 0, 'astar')
+        
+        n_rows, n_cols = self.n_rows, self.n_cols
+        start_index = start[0] * n_cols + start[1]
+        goal_index = goal[0] * n_cols + goal[1]
+        
+        if costs[goal_index] == inf:
+            return PlanResult(None, float('inf'), 0, 'astar')
+        
+        generation = self._generation
+        seen, closed, parent, g = self._seen, self._closed, self._parent, self._g
+        goal_row, goal_col = goal
+        last_row, last_col = n_rows - 1, n_cols - 1
+        
+        heap = self._heap
+        heap.clear()
+        push, pop = heapq.heappush, heapq.heappop
+        
+        seen[start_index] = generation
+        g[start_index] = 0.0
+        parent[start_index] = -1
+        push(heap, (abs(start[0] - goal_row) + abs(start[1] - goal_col), start_index))
+        
+        expanded = 0
+        found = False
+        
+        while heap:
+            _, current = pop(heap)
+            
+            if closed[current] == generation:
+                continue
+            closed[current] = generation
+            expanded += 1
+            
+            if current == goal_index:
+                found = True
+                break
+            
+            row, col = divmod(current, n_cols)
+            current_g = g[current]
+            
+            for neighbor, in_bounds, n_row, n_col in (
+                (current - n_cols, row > 0, row - 1, col),
+                (current + n_cols, row < last_row, row + 1, col),
+                (current - 1, col > 0, row, col - 1),
+                (current + 1, col < last_col, row, col + 1)
+            ):
+                if not in_bounds or closed[neighbor] == generation:
+                    continue
+                
+                step_g = current_g + costs[neighbor]
+                if step_g == inf:
+                    continue
+                
+                if seen[neighbor] != generation or step_g < g[neighbor]:
+                    seen[neighbor] = generation
+                    g[neighbor] = step_g
+                    parent[neighbor] = current
+                    push(heap, (step_g + abs(n_row - goal_row) + abs(n_col - goal_col), neighbor))
+        
+        increment_counter('nodes_expanded_astar', expanded)
+        
+        if not found:
+            return PlanResult(None, float('inf'), expanded, 'astar')
+        
+        return PlanResult(self._trace(goal_index), g[goal_index], expanded, 'astar')
+    
+    
+    def bfs(self, start, goal, occupancy_grid):
+        """
+        Breadth-first search using a preallocated array queue.
+        
+        Args:
+            start: Start position (row, col)
+            goal: Goal position (row, col)
+            occupancy_grid: OccupancyGrid instance
+        
+        Returns:
+            PlanResult: Path, cost and number of expanded nodes
+        """
+        passable = self._prepare(occupancy_grid)
+        
+        if not (self._in_bounds(start) and self._in_bounds(goal)):
+            return PlanResult(None, float('inf'), 0, 'bfs')
+        
+        n_rows, n_cols = self.n_rows, self.n_cols
+        start_index = start[0] * n_cols + start[1]
+        goal_index = goal[0] * n_cols + goal[1]
+        
+        generation = self._generation
+        seen, parent, queue = self._seen, self._parent, self._queue
+        last_row, last_col = n_rows - 1, n_cols - 1
+        
+        # Every cell is enqueued at most once, so the queue never wraps
+        seen[start_index] = generation
+        parent[start_index] = -1
+        queue[0] = start_index
+        head, tail = 0, 1
+        found = False
+        
+        while head < tail:
+            current = queue[head]
+            head += 1
+            
+            if current == goal_index:
+                found = True
+                break
+            
+            row, col = divmod(current, n_cols)
+            
+            for neighbor, in_bounds in (
+                (current - n_cols, row > 0),
+                (current + n_cols, row < last_row),
+                (current - 1, col > 0),
+                (current + 1, col < last_col)
+            ):
+                if in_bounds and seen[neighbor] != generation and passable[neighbor]:
+                    seen[neighbor] = generation
+                    parent[neighbor] = current
+                    queue[tail] = neighbor
+                    tail += 1
+        
+        increment_counter('nodes_expanded_bfs', head)
+        
+        if not found:
+            return PlanResult(None, float('inf'), head, 'bfs')
+        
+        path = self._trace(goal_index)
+        return PlanResult(path, float(len(path) - 1), head, 'bfs')
+    
+    
+    def plan(self, start, goal, occupancy_grid, algorithm='astar', cost_map=None):
+        """
+        Plan with the specified algorithm.
+        
+        Args:
+            start: Start position (row, col)
+            goal: Goal position (row, col)
+            occupancy_grid: OccupancyGrid instance
+            algorithm: 'astar' or 'bfs'
+            cost_map: Optional CostMap for clearance-aware A* (ignored by BFS)
+        
+        Returns:
+            PlanResult: Path, cost and number of expanded nodes
+        """
+        if algorithm.lower() == 'bfs':
+            return self.bfs(start, goal, occupancy_grid)
+        return self.astar(start, goal, occupancy_grid, cost_map=cost_map)
+
+
+def find_path(start, goal, occupancy_grid, algorithm='astar', verbose=True, cost_map=None,
+              start_heading=None, turn_cost=1.0):
     """
     Find a path from start to goal using the specified algorithm.
     
@@ -226,14 +730,23 @@ def find_path(start, goal, occupancy_grid, algorithm='astar'):
         goal: Goal position (row, col)
         occupancy_grid: OccupancyGrid instance
         algorithm: 'astar' or 'bfs'
+        verbose: Print progress messages (default: True)
+        cost_map: Optional CostMap for clearance-aware A* (ignored by BFS)
+        start_heading: Optional robot heading; when given, A* also minimizes the
+                       rotation needed (ignored by BFS)
+        turn_cost: Cost of a 90 degree turn for heading-aware A* (default: 1.0)
     
     Returns:
         list: Path as list of positions, or None if no path found
     """
-    if algorithm.lower() == 'bfs':
-        return bfs(start, goal, occupancy_grid)
-    else:
-        return astar(start, goal, occupancy_grid)
+    with profile_stage('planning'):
+        if algorithm.lower() == 'bfs':
+            return bfs(start, goal, occupancy_grid, verbose=verbose)
+        elif start_heading is not None:
+            return astar_with_heading(start, goal, occupancy_grid, start_heading, turn_cost=turn_cost,
+                                      verbose=verbose, cost_map=cost_map)
+        else:
+            return astar(start, goal, occupancy_grid, verbose=verbose, cost_map=cost_map)
 
 
 def path_to_commands(path):
@@ -0,0 +1,437 @@
+"""
+Profiling and instrumentation module.
+Provides lightweight stage timers, event counters and metric exporters for the pipeline.
+
+Profiling is disabled by default. While disabled, profile_stage() returns a shared
+no-op context manager and increment_counter() returns immediately, so instrumented
+code pays only for a single attribute check.
+
+Usage:
+    from profiling import enable_profiling, profile_stage, increment_counter
+    
+    enable_profiling()
+    with profile_stage('classification'):
+        ...
+    increment_counter('cells_classified', 100)
+"""
+
+import csv
+import io
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import numpy as np
+
+
+class _NullTimer:
+    """
+    No-op context manager returned when profiling is disabled.
+    """
+    
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    """
+    Context manager that records the elapsed time of a block into a Profiler.
+    """
+    
+    __slots__ = ('profiler', 'name', 'start')
+    
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class StageStats:
+    """
+    Rolling timing statistics for a single pipeline stage.
+    """
+    
+    def __init__(self, window=1000):
+        """
+        Initialize stage statistics.
+        
+        Args:
+            window: Number of most recent samples kept for percentile estimates
+        """
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+    
+    
+    def add(self, seconds):
+        """
+        Add a timing sample.
+        
+        Args:
+            seconds: Elapsed time in seconds
+        """
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+    
+    
+    def summary(self):
+        """
+        Summarize the stage timings.
+        
+        Returns:
+            dict: Count, total, mean, last and p50/p95/p99 in milliseconds
+        """
+        if self.samples:
+            p50, p95, p99 = np.percentile(np.fromiter(self.samples, dtype=float), [50, 95, 99])
+        else:
+            p50 = p95 = p99 = 0.0
+        
+        return {
+            'count': self.count,
+            'total_ms': self.total * 1000.0,
+            'mean_ms': (self.total / self.count) * 1000.0 if self.count else 0.0,
+            'last_ms': self.last * 1000.0,
+            'p50_ms': float(p50) * 1000.0,
+            'p95_ms': float(p95) * 1000.0,
+            'p99_ms': float(p99) * 1000.0
+        }
+
+
+class Profiler:
+    """
+    Collects per-stage timings and event counters for the routing pipeline.
+    """
+    
+    def __init__(self, enabled=False, window=1000):
+        """
+        Initialize the profiler.
+        
+        Args:
+            enabled: Whether to record measurements (default: False)
+            window: Rolling window size used for percentile statistics
+        """
+        self.enabled = enabled
+        self.window = window
+        self.stages = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._server = None
+    
+    
+    def enable(self):
+        """Start recording measurements."""
+        self.enabled = True
+    
+    
+    def disable(self):
+        """Stop recording measurements (existing data is kept)."""
+        self.enabled = False
+    
+    
+    def reset(self):
+        """Clear all recorded timings and counters."""
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+    
+    
+    def stage(self, name):
+        """
+        Time a block of code as a named stage.
+        
+        Args:
+            name: Stage name (e.g. 'warp', 'classification', 'planning')
+        
+        Returns:
+            Context manager recording the elapsed time of the block
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, name)
+    
+    
+    def record(self, name, seconds):
+        """
+        Record a timing sample for a stage.
+        
+        Args:
+            name: Stage name
+            seconds: Elapsed time in seconds
+        """
+        if not self.enabled:
+            return
+        
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = StageStats(self.window)
+                self.stages[name] = stats
+            stats.add(seconds)
+    
+    
+    def increment(self, name, n=1):
+        """
+        Increment a named event counter.
+        
+        Args:
+            name: Counter name (e.g. 'cells_classified', 'frames_dropped')
+            n: Amount to add (default: 1)
+        """
+        if not self.enabled:
+            return
+        
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+    
+    
+    def summary(self):
+        """
+        Get a snapshot of all statistics.
+        
+        Returns:
+            dict: {'stages': {name: stats}, 'counters': {name: value}}
+        """
+        with self._lock:
+            return {
+                'stages': {name: stats.summary() for name, stats in self.stages.items()},
+                'counters': dict(self.counters)
+            }
+    
+    
+    def to_json(self, path=None):
+        """
+        Export statistics as JSON.
+        
+        Args:
+            path: Optional file path to write to
+        
+        Returns:
+            str: JSON document
+        """
+        text = json.dumps(self.summary(), indent=2)
+        
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(text)
+        
+        return text
+    
+    
+    def to_csv(self, path=None):
+        """
+        Export statistics as CSV (one row per stage or counter).
+        
+        Args:
+            path: Optional file path to write to
+        
+        Returns:
+            str: CSV document
+        """
+        summary = self.summary()
+        fields = ['type', 'name', 'count', 'total_ms', 'mean_ms', 'last_ms',
+                  'p50_ms', 'p95_ms', 'p99_ms', 'value']
+        
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fields)
+        writer.writeheader()
+        
+        for name, stats in summary['stages'].items():
+            writer.writerow(dict(stats, type='stage', name=name))
+        
+        for name, value in summary['counters'].items():
+            writer.writerow({'type': 'counter', 'name': name, 'value': value})
+        
+        text = buffer.getvalue()
+        
+        if path is not None:
+            with open(path, 'w', newline='') as f:
+                f.write(text)
+        
+        return text
+    
+    
+    def to_prometheus(self, prefix='router'):
+        """
+        Export statistics in the Prometheus text exposition format.
+        
+        Args:
+            prefix: Metric name prefix (default: 'router')
+        
+        Returns:
+            str: Prometheus text document
+        """
+        summary = self.summary()
+        lines = []
+        
+        metric = f"{prefix}_stage_seconds"
+        lines.append(f"# HELP {metric} Pipeline stage duration in seconds")
+        lines.append(f"# TYPE {metric} summary")
+        for name, stats in summary['stages'].items():
+            for quantile, key in (('0.5', 'p50_ms'), ('0.95', 'p95_ms'), ('0.99', 'p99_ms')):
+                lines.append(f'{metric}{{stage="{name}",quantile="{quantile}"}} {stats[key] / 1000.0:.9f}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {stats["total_ms"] / 1000.0:.9f}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {stats["count"]}')
+        
+        for name, value in summary['counters'].items():
+            counter = f"{prefix}_{name}_total"
+            lines.append(f"# TYPE {counter} counter")
+            lines.append(f"{counter} {value}")
+        
+        return "\n".join(lines) + "\n"
+    
+    
+    def save(self, path):
+        """
+        Save statistics to a file, choosing the format from the extension.
+        
+        Args:
+            path: Output path ending in .json, .csv or .prom/.txt
+        """
+        if path.endswith('.csv'):
+            self.to_csv(path)
+        elif path.endswith('.prom') or path.endswith('.txt'):
+            with open(path, 'w') as f:
+                f.write(self.to_prometheus())
+        else:
+            self.to_json(path)
+    
+    
+    def print_report(self):
+        """
+        Print a timing table to the console.
+        """
+        summary = self.summary()
+        
+        print("\nStage timings (ms):")
+        print(f"  {'stage':<20}{'count':>8}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+        for name, stats in summary['stages'].items():
+            print(f"  {name:<20}{stats['count']:>8}{stats['mean_ms']:>10.2f}"
+                  f"{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+        
+        if summary['counters']:
+            print("\nCounters:")
+            for name, value in summary['counters'].items():
+                print(f"  {name:<20}{value:>8}")
+    
+    
+    def serve(self, port=9100, host='127.0.0.1'):
+        """
+        Serve the statistics over HTTP from a background thread.
+        
+        GET /metrics returns the Prometheus text format, GET /metrics.json returns JSON.
+        
+        Args:
+            port: TCP port to listen on (default: 9100)
+            host: Interface to bind (default: 127.0.0.1)
+        
+        Returns:
+            HTTPServer: The running server (call shutdown() to stop it)
+        """
+        profiler = self
+        
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith('/metrics.json'):
+                    body = profiler.to_json().encode('utf-8')
+                    content_type = 'application/json'
+                elif self.path.startswith('/metrics'):
+                    body = profiler.to_prometheus().encode('utf-8')
+                    content_type = 'text/plain; version=0.0.4'
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self._server = HTTPServer((host, port), MetricsHandler)
+        thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        thread.start()
+        
+        print(f"Metrics endpoint running on http://{host}:{port}/metrics")
+        
+        return self._server
+
+
+# Process-wide profiler used by the instrumented modules
+_profiler = Profiler()
+
+
+def get_profiler():
+    """
+    Get the process-wide profiler.
+    
+    Returns:
+        Profiler: Shared profiler instance
+    """
+    return _profiler
+
+
+def enable_profiling(window=1000):
+    """
+    Enable the process-wide profiler.
+    
+    Args:
+        window: Rolling window size used for percentile statistics
+    
+    Returns:
+        Profiler: Shared profiler instance
+    """
+    _profiler.window = window
+    _profiler.enable()
+    return _profiler
+
+
+def profile_stage(name):
+    """
+    Time a block of code with the process-wide profiler.
+    
+    Args:
+        name: Stage name
+    
+    Returns:
+        Context manager (a shared no-op when profiling is disabled)
+    """
+    if not _profiler.enabled:
+        return _NULL_TIMER
+    return _StageTimer(_profiler, name)
+
+
+def increment_counter(name, n=1):
+    """
+    Increment a counter on the process-wide profiler.
+    
+    Args:
+        name: Counter name
+        n: Amount to add (default: 1)
+    """
+    if _profiler.enabled:
+        _profiler.increment(name, n)
@@ -0,0 +1,568 @@
+"""
+Recorder module.
+Records the per-frame occupancy grid stream to a compact binary log and replays it
+through the planners offline.
+
+Log format (little-endian, append-only):
+    File header:  MAGIC (8 bytes), n_rows (uint16), n_cols (uint16)
+    Per record:   frame_id (uint32), timestamp (float64), flags (uint8),
+                  grid payload length (uint32), metadata length (uint32),
+                  grid payload, metadata (UTF-8 JSON: robot, goal, path, timings, ...)
+
+The grid payload is the uint8 grid XOR-ed with the previous frame's grid and
+zlib-compressed, so a frame where nothing changed costs a few bytes. Every
+keyframe_interval frames a keyframe stores the grid itself, which bounds the
+work needed to decode a random frame. A sidecar index (<log>.idx) stores the
+offset, frame id and flags of every record; it is rebuilt by scanning the log
+when missing.
+
+Usage:
+    python main.py --image 0 --rows 10 --cols 10 --goal 0 9 --live --record run.grid
+    python recorder.py info run.grid
+    python recorder.py replay run.grid --planners astar context_astar hpa --output replay.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+
+from occupancy_grid import OccupancyGrid
+from profiling import StageStats
+
+
+MAGIC = b'DFPGRID1'
+FILE_HEADER = struct.Struct('<HH')
+RECORD_HEADER = struct.Struct('<IdBII')
+INDEX_ENTRY = struct.Struct('<QIB')
+
+FLAG_KEYFRAME = 1
+
+
+def _as_cells(position):
+    """Convert a (row, col) position to a JSON-friendly list of ints."""
+    if position is None:
+        return None
+    return [int(position[0]), int(position[1])]
+
+
+def _as_position(cells):
+    """Convert a JSON [row, col] list back to a position tuple."""
+    if cells is None:
+        return None
+    return tuple(cells)
+
+
+class GridRecorder:
+    """
+    Appends occupancy grids, robot pose, goal, plan and stage timings to a binary log.
+    """
+    
+    def __init__(self, path, n_rows, n_cols, keyframe_interval=100, compression_level=6):
+        """
+        Open a log for appending. A new file gets a header; an existing log must
+        have the same grid size and is continued.
+        
+        Args:
+            path: Log file path (the index is written to path + '.idx')
+            n_rows: Number of grid rows
+            n_cols: Number of grid columns
+            keyframe_interval: Store a full grid every this many frames (default: 100)
+            compression_level: zlib level 1-9 (default: 6)
+        """
+        self.path = path
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.compression_level = compression_level
+        
+        self.frames = 0
+        self.bytes_written = 0
+        self.raw_bytes = 0
+        self._previous = None
+        
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            with open(path, 'rb') as f:
+                n_rows_log, n_cols_log = _read_file_header(f)
+            if (n_rows_log, n_cols_log) != (n_rows, n_cols):
+                raise ValueError(f"Log {path} is {n_rows_log}x{n_cols_log}, not {n_rows}x{n_cols}")
+        
+        self._file = open(path, 'ab')
+        self._index = open(path + '.idx', 'ab')
+        
+        if not exists:
+            self._file.write(MAGIC + FILE_HEADER.pack(n_rows, n_cols))
+    
+    
+    def record(self, grid, robot=None, goal=None, path=None, timings=None, frame_id=None,
+               timestamp=None, extra=None):
+        """
+        Append one frame.
+        
+        Args:
+            grid: OccupancyGrid or 2D array of cell values
+            robot: Robot position (default: taken from the OccupancyGrid)
+            goal: Goal position
+            path: Planned path as list of (row, col) positions
+            timings: Dict of stage timings in milliseconds
+            frame_id: Frame number (default: running count)
+            timestamp: Capture time in seconds (default: now)
+            extra: Optional dict of additional JSON-serializable metadata
+        
+        Returns:
+            int: Number of bytes written
+        """
+        if isinstance(grid, OccupancyGrid):
+            if robot is None:
+                robot = grid.get_robot_position()
+            cells = grid.grid
+        else:
+            cells = np.asarray(grid)
+        
+        if cells.shape != (self.n_rows, self.n_cols):
+            raise ValueError(f"Grid shape {cells.shape} does not match log size {(self.n_rows, self.n_cols)}")
+        
+        cells = cells.astype(np.uint8)
+        keyframe = self._previous is None or self.frames % self.keyframe_interval == 0
+        
+        if keyframe:
+            payload = zlib.compress(cells.tobytes(), self.compression_level)
+            flags = FLAG_KEYFRAME
+        else:
+            payload = zlib.compress(np.bitwise_xor(cells, self._previous).tobytes(), self.compression_level)
+            flags = 0
+        
+        meta = {
+            'robot': _as_cells(robot),
+            'goal': _as_cells(goal),
+            'path': [_as_cells(p) for p in path] if path else None,
+            'timings': {name: round(float(ms), 3) for name, ms in (timings or {}).items()}
+        }
+        if extra:
+            meta['extra'] = extra
+        meta = json.dumps(meta, separators=(',', ':')).encode('utf-8')
+        
+        frame_id = self.frames if frame_id is None else frame_id
+        timestamp = time.time() if timestamp is None else timestamp
+        
+        offset = self._file.tell()
+        header = RECORD_HEADER.pack(frame_id, timestamp, flags, len(payload), len(meta))
+        self._file.write(header + payload + meta)
+        self._index.write(INDEX_ENTRY.pack(offset, frame_id, flags))
+        
+        self._previous = cells
+        self.frames += 1
+        self.raw_bytes += cells.nbytes + len(meta)
+        size = len(header) + len(payload) + len(meta)
+        self.bytes_written += size
+        return size
+    
+    
+    def record_result(self, result, goal=None):
+        """
+        Append a RouterPipeline result.
+        
+        Args:
+            result: Result dict emitted by RouterPipeline
+            goal: Goal position used by the pipeline
+        
+        Returns:
+            int: Number of bytes written
+        """
+        extra = None
+        location = result['occupancy_grid'].robot_location
+        if location is not None:
+            extra = {'confidence': round(float(location.get('confidence', 0.0)), 3)}
+            if location.get('heading') is not None:
+                extra['heading'] = round(float(location['heading']), 1)
+        
+        timings = dict(result.get('timings', {}))
+        timings['latency_ms'] = result.get('latency_ms', 0.0)
+        
+        return self.record(result['occupancy_grid'], robot=result.get('robot'), goal=goal,
+                           path=result.get('path'), timings=timings, frame_id=result.get('frame_id'),
+                           extra=extra)
+    
+    
+    def flush(self):
+        """
+        Flush buffered records to disk.
+        """
+        self._file.flush()
+        self._index.flush()
+    
+    
+    def close(self):
+        """
+        Close the log and its index.
+        """
+        if not self._file.closed:
+            self._file.close()
+            self._index.close()
+    
+    
+    def print_report(self):
+        """
+        Print frame count and compression ratio.
+        """
+        ratio = self.raw_bytes / self.bytes_written if self.bytes_written else 0.0
+        print(f"Recorded {self.frames} frames to {self.path} "
+              f"({self.bytes_written / 1024:.1f} KB, {ratio:.1f}x smaller than raw)")
+    
+    
+    def __enter__(self):
+        """Context manager entry."""
+        return self
+    
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit."""
+        self.close()
+
+
+def _read_file_header(f):
+    """
+    Read and check the log file header.
+    
+    Args:
+        f: Binary file positioned at the start of the log
+    
+    Returns:
+        tuple: (n_rows, n_cols)
+    """
+    magic = f.read(len(MAGIC))
+    if magic != MAGIC:
+        raise ValueError("Not a grid log (bad magic)")
+    return FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+
+
+class GridLogReader:
+    """
+    Reads a grid log written by GridRecorder, sequentially or by record number.
+    """
+    
+    def __init__(self, path):
+        """
+        Open a log and load (or rebuild) its index.
+        
+        Args:
+            path: Log file path
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        self.n_rows, self.n_cols = _read_file_header(self._file)
+        self._data_start = self._file.tell()
+        self._size = os.path.getsize(path)
+        self.index = self._load_index()
+    
+    
+    def _load_index(self):
+        """
+        Load the sidecar index, falling back to a scan of the log.
+        
+        Returns:
+            list: (offset, frame_id, flags) per complete record
+        """
+        index_path = self.path + '.idx'
+        if os.path.exists(index_path):
+            with open(index_path, 'rb') as f:
+                data = f.read()
+            usable = len(data) - len(data) % INDEX_ENTRY.size
+            index = [entry for entry in INDEX_ENTRY.iter_unpack(data[:usable])]
+            
+            # Drop entries for records cut short by a crash
+            while index and not self._record_complete(index[-1][0]):
+                index.pop()
+            if index or self._size == self._data_start:
+                return index
+        
+        return self.rebuild_index()
+    
+    
+    def _record_complete(self, offset):
+        """Check that the record at an offset is fully contained in the file."""
+        if offset + RECORD_HEADER.size > self._size:
+            return False
+        self._file.seek(offset)
+        _, _, _, payload_len, meta_len = RECORD_HEADER.unpack(self._file.read(RECORD_HEADER.size))
+        return offset + RECORD_HEADER.size + payload_len + meta_len <= self._size
+    
+    
+    def rebuild_index(self):
+        """
+        Scan the log and rebuild the record index (ignores a truncated final record).
+        
+        Returns:
+            list: (offset, frame_id, flags) per complete record
+        """
+        index = []
+        offset = self._data_start
+        
+        while self._record_complete(offset):
+            self._file.seek(offset)
+            frame_id, _, flags, payload_len, meta_len = RECORD_HEADER.unpack(self._file.read(RECORD_HEADER.size))
+            index.append((offset, frame_id, flags))
+            offset += RECORD_HEADER.size + payload_len + meta_len
+        
+        self.index = index
+        return index
+    
+    
+    def __len__(self):
+        return len(self.index)
+    
+    
+    def _read_raw(self, position):
+        """
+        Read one record without resolving its delta.
+        
+        Returns:
+            tuple: (frame_id, timestamp, flags, cells, meta dict)
+        """
+        self._file.seek(self.index[position][0])
+        frame_id, timestamp, flags, payload_len, meta_len = RECORD_HEADER.unpack(
+            self._file.read(RECORD_HEADER.size))
+        payload = zlib.decompress(self._file.read(payload_len))
+        meta = json.loads(self._file.read(meta_len).decode('utf-8'))
+        cells = np.frombuffer(payload, dtype=np.uint8).reshape(self.n_rows, self.n_cols)
+        return frame_id, timestamp, flags, cells, meta
+    
+    
+    @staticmethod
+    def _make_record(frame_id, timestamp, grid, meta):
+        """Build the record dict returned to callers."""
+        return {
+            'frame_id': frame_id,
+            'timestamp': timestamp,
+            'grid': grid,
+            'robot': _as_position(meta.get('robot')),
+            'goal': _as_position(meta.get('goal')),
+            'path': [tuple(p) for p in meta['path']] if meta.get('path') else None,
+            'timings': meta.get('timings', {}),
+            'extra': meta.get('extra', {})
+        }
+    
+    
+    def __iter__(self):
+        """
+        Decode all records in order.
+        
+        Yields:
+            dict: frame_id, timestamp, grid (uint8 array), robot, goal, path, timings, extra
+        """
+        grid = None
+        for position in range(len(self.index)):
+            frame_id, timestamp, flags, cells, meta = self._read_raw(position)
+            grid = cells.copy() if flags & FLAG_KEYFRAME or grid is None else np.bitwise_xor(grid, cells)
+            yield self._make_record(frame_id, timestamp, grid, meta)
+    
+    
+    def read(self, position):
+        """
+        Decode a single record, starting from the nearest preceding keyframe.
+        
+        Args:
+            position: Record number (0-based)
+        
+        Returns:
+            dict: Record (see __iter__)
+        """
+        if position < 0:
+            position += len(self.index)
+        
+        start = position
+        while start > 0 and not self.index[start][2] & FLAG_KEYFRAME:
+            start -= 1
+        
+        grid = None
+        for current in range(start, position + 1):
+            frame_id, timestamp, flags, cells, meta = self._read_raw(current)
+            grid = cells.copy() if grid is None else np.bitwise_xor(grid, cells)
+        
+        return self._make_record(frame_id, timestamp, grid, meta)
+    
+    
+    def summary(self):
+        """
+        Summarize the log.
+        
+        Returns:
+            dict: Grid size, frame count, keyframes, file size and duration
+        """
+        duration = 0.0
+        if len(self.index) > 1:
+            duration = self.read(-1)['timestamp'] - self.read(0)['timestamp']
+        
+        return {
+            'rows': self.n_rows,
+            'cols': self.n_cols,
+            'frames': len(self.index),
+            'keyframes': sum(1 for _, _, flags in self.index if flags & FLAG_KEYFRAME),
+            'bytes': self._size,
+            'duration_s': duration
+        }
+    
+    
+    def close(self):
+        """
+        Close the log.
+        """
+        self._file.close()
+    
+    
+    def __enter__(self):
+        """Context manager entry."""
+        return self
+    
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit."""
+        self.close()
+
+
+def replay(log_path, planners=None, repeats=1, verbose=True):
+    """
+    Feed a recorded log through planning engines as fast as possible.
+    
+    Every frame with a robot and goal is planned by each engine on the same reused
+    OccupancyGrid, updated frame by frame like in the live pipeline, so incremental
+    planners see realistic grid changes. Paths are compared to the recorded plan.
+    
+    Args:
+        log_path: Grid log written by GridRecorder
+        planners: Engine names from benchmark.PLANNERS (default: all registered)
+        repeats: Plan each frame this many times per engine (default: 1)
+        verbose: Print the results table (default: True)
+    
+    Returns:
+        dict: Per-engine frames planned, paths found, length mismatches against the
+              recorded plan, total seconds and latency statistics (ms)
+    """
+    # Imported here: the benchmark module pulls in the scene generator
+    from benchmark import PLANNERS
+    
+    names = planners or list(PLANNERS)
+    for name in names:
+        if name not in PLANNERS:
+            raise ValueError(f"Unknown planner '{name}' (available: {', '.join(PLANNERS)})")
+    
+    results = {}
+    
+    with GridLogReader(log_path) as reader:
+        frames = [record for record in reader if record['robot'] is not None and record['goal'] is not None]
+        
+        for name in names:
+            planner = PLANNERS[name]
+            occupancy_grid = OccupancyGrid(reader.n_rows, reader.n_cols)
+            stats = StageStats(window=max(1, len(frames) * repeats))
+            found = 0
+            mismatches = 0
+            total = 0.0
+            
+            with contextlib.redirect_stdout(io.StringIO()):
+                for record in frames:
+                    occupancy_grid.from_classifications(record['grid'].astype(int))
+                    
+                    for _ in range(max(1, repeats)):
+                        started = time.perf_counter()
+                        path = planner(record['robot'], record['goal'], occupancy_grid)
+                        elapsed = time.perf_counter() - started
+                        stats.add(elapsed)
+                        total += elapsed
+                    
+                    found += path is not None
+                    if (path is None) != (record['path'] is None) or \
+                            (path is not None and len(path) != len(record['path'])):
+                        mismatches += 1
+            
+            results[name] = {
+                'frames': len(frames),
+                'found': found,
+                'mismatches': mismatches,
+                'total_s': total,
+                'latency': stats.summary()
+            }
+    
+    if verbose:
+        print(f"\nReplay of {log_path}: {len(frames)} frames with a robot and goal")
+        print(f"  {'planner':<16} {'found':>6} {'mismatch':>9} {'mean ms':>9} {'p95 ms':>8} {'frames/s':>9}")
+        for name, result in results.items():
+            latency = result['latency']
+            rate = result['frames'] * max(1, repeats) / result['total_s'] if result['total_s'] > 0 else 0.0
+            print(f"  {name:<16} {result['found']:>6} {result['mismatches']:>9} "
+                  f"{latency['mean_ms']:>9.3f} {latency['p95_ms']:>8.3f} {rate:>9.0f}")
+    
+    return results
+
+
+def parse_arguments():
+    """
+    Parse command-line arguments.
+    
+    Returns:
+        argparse.Namespace: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description='Inspect and replay recorded occupancy grid logs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    info = subparsers.add_parser('info', help='Print a summary of a log')
+    info.add_argument('log', type=str, help='Grid log file')
+    info.add_argument('--show', type=int, default=None,
+                      help='Also print the grid and metadata of this record number')
+    
+    replay_parser = subparsers.add_parser('replay', help='Time planners on a recorded log')
+    replay_parser.add_argument('log', type=str, help='Grid log file')
+    replay_parser.add_argument('--planners', type=str, nargs='+', default=None,
+                               help='Planning engines to run (default: all registered in benchmark.py)')
+    replay_parser.add_argument('--repeats', type=int, default=1,
+                               help='Plan each frame this many times per engine (default: 1)')
+    replay_parser.add_argument('--output', type=str, default=None,
+                               help='Write the replay results to this JSON file')
+    
+    return parser.parse_args()
+
+
+def main():
+    """
+    Run the recorder command-line tool.
+    """
+    args = parse_arguments()
+    
+    if args.command == 'info':
+        with GridLogReader(args.log) as reader:
+            summary = reader.summary()
+            print(f"{args.log}: {summary['rows']}x{summary['cols']} grid, {summary['frames']} frames "
+                  f"({summary['keyframes']} keyframes), {summary['bytes'] / 1024:.1f} KB, "
+                  f"{summary['duration_s']:.1f} s")
+            
+            if args.show is not None:
+                record = reader.read(args.show)
+                occupancy_grid = OccupancyGrid(reader.n_rows, reader.n_cols)
+                occupancy_grid.from_classifications(record['grid'].astype(int))
+                print(f"\nFrame {record['frame_id']}: robot {record['robot']}, goal {record['goal']}")
+                print(f"Timings: {record['timings']}")
+                occupancy_grid.print_grid()
+    
+    elif args.command == 'replay':
+        try:
+            results = replay(args.log, planners=args.planners, repeats=args.repeats)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"\nReplay results saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+Render cache module.
+Draws grid overlays and occupancy-grid views incrementally for the live display.
+
+The utils drawing helpers and OccupancyGrid.visualize redraw every line, rectangle
+and label on every call. GridRenderCache instead keeps:
+- a static grid-line layer, rendered once per image geometry,
+- one pre-rendered stamp per cell state (label glyph or colored cell),
+- a label layer / grid image in which only cells whose state changed since the
+  last frame are rewritten, with a single vectorized array write,
+- a path layer, redrawn only when the path changes and alpha-blended on top.
+"""
+
+import cv2
+import numpy as np
+
+from occupancy_grid import OccupancyGrid
+from profiling import profile_stage, increment_counter
+from utils import draw_grid_on_image, draw_path_on_grid
+
+
+# Overlay labels drawn by annotate_grid_cells: value -> (text, BGR color)
+OVERLAY_LABELS = {
+    OccupancyGrid.BLOCK: ('B', (255, 0, 0)),
+    OccupancyGrid.ROBOT: ('R', (0, 0, 255)),
+    OccupancyGrid.GOAL: ('G', (0, 255, 0))
+}
+
+# Cell fill colors and labels used by OccupancyGrid.visualize
+CELL_COLORS = {
+    OccupancyGrid.FREE: ((255, 255, 255), None),
+    OccupancyGrid.BLOCK: ((128, 128, 128), None),
+    OccupancyGrid.ROBOT: ((0, 0, 255), 'R'),
+    OccupancyGrid.GOAL: ((0, 255, 0), 'G')
+}
+
+
+def _layer_pixels(colors, alpha, width):
+    """
+    Collect the non-transparent pixels of a layer for fast compositing.
+    
+    Args:
+        colors: Layer colors (H, W, 3)
+        alpha: Layer opacity 0-255 (H, W)
+        width: Width of the image the layer is composited onto
+    
+    Returns:
+        tuple: (flat pixel indices, colors as uint16, alpha as uint16 column)
+    """
+    ys, xs = np.nonzero(alpha)
+    return (ys * width + xs, colors[ys, xs].astype(np.uint16),
+            alpha[ys, xs].astype(np.uint16)[:, None])
+
+
+def _composite(image, pixels):
+    """
+    Alpha-blend layer pixels from _layer_pixels onto an image (in place).
+    
+    Args:
+        image: Contiguous BGR image
+        pixels: (indices, colors, alpha) tuple
+    """
+    indices, colors, alpha = pixels
+    flat = image.reshape(-1, 3)
+    under = flat[indices].astype(np.uint16)
+    flat[indices] = ((colors * alpha + under * (255 - alpha) + 127) // 255).astype(np.uint8)
+
+
+class GridRenderCache:
+    """
+    Incremental renderer for grid overlays, occupancy-grid views and paths.
+    """
+    
+    def __init__(self, line_color=(0, 255, 0), line_thickness=1, path_color=(255, 0, 255),
+                 path_thickness=3, path_alpha=0.8):
+        """
+        Initialize the render cache.
+        
+        Args:
+            line_color: Grid line color (B, G, R)
+            line_thickness: Grid line thickness
+            path_color: Path line color (B, G, R)
+            path_thickness: Path line thickness
+            path_alpha: Opacity of the path layer (default: 0.8)
+        """
+        self.line_color = line_color
+        self.line_thickness = line_thickness
+        self.path_color = path_color
+        self.path_thickness = path_thickness
+        self.path_alpha = path_alpha
+        
+        self.invalidate()
+    
+    
+    def invalidate(self):
+        """
+        Drop all cached layers; everything is redrawn on the next call.
+        """
+        # Camera overlay
+        self._overlay_geometry = None
+        self._line_pixels = None
+        self._label_layer = None
+        self._label_alpha = None
+        self._label_pixels = None
+        self._label_stamps = None
+        self._label_grid = None
+        self._overlay_key = None
+        
+        # Occupancy grid view
+        self._grid_geometry = None
+        self._grid_image = None
+        self._cell_stamps = None
+        self._cell_grid = None
+        self._grid_key = None
+        
+        # Path layer
+        self._path = None
+        self._path_geometry = None
+        self._path_pixels = None
+    
+    
+    @staticmethod
+    def _grid_array(grid):
+        """Get the cell array and version key of an OccupancyGrid or raw array."""
+        if isinstance(grid, OccupancyGrid):
+            return grid.grid, (grid, grid.grid, grid.version)
+        return np.asarray(grid), None
+    
+    
+    @staticmethod
+    def _same_version(key, cached_key):
+        """Check whether a grid is the same object, at the same version, as last time."""
+        if key is None or cached_key is None:
+            return False
+        return key[0] is cached_key[0] and key[1] is cached_key[1] and key[2] == cached_key[2]
+    
+    
+    @staticmethod
+    def _changed_cells(cached, grid):
+        """Get the (rows, cols) of cells that differ from the cached grid."""
+        if cached is None or cached.shape != grid.shape:
+            return np.indices(grid.shape).reshape(2, -1)
+        return np.nonzero(cached != grid)
+    
+    
+    def _build_overlay(self, height, width, n_rows, n_cols):
+        """
+        Render the static line layer and label stamps for an image geometry.
+        """
+        blank = np.zeros((height, width, 3), dtype=np.uint8)
+        lines = draw_grid_on_image(blank, n_rows, n_cols, self.line_color, self.line_thickness)
+        # Grid lines span the whole image, so they are copied as full rows and columns
+        drawn = lines.any(axis=2)
+        rows = np.nonzero(drawn.all(axis=1))[0]
+        cols = np.nonzero(drawn.all(axis=0))[0]
+        self._line_pixels = (rows, lines[rows], cols, lines[:, cols])
+        
+        cell_h, cell_w = height // n_rows, width // n_cols
+        n_values = max(max(OVERLAY_LABELS), OccupancyGrid.GOAL) + 1
+        coverage = np.zeros((n_values, cell_h, cell_w), dtype=np.uint8)
+        colors = np.zeros((n_values, cell_h, cell_w, 3), dtype=np.uint8)
+        
+        # Same glyph placement as annotate_grid_cells. Glyphs are rendered as a coverage
+        # mask so anti-aliased edges blend with the camera image underneath.
+        origin = (int(0.5 * cell_w) - 10, int(0.5 * cell_h) + 10)
+        for value, (text, color) in OVERLAY_LABELS.items():
+            cv2.putText(coverage[value], text, origin, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 255, 2)
+            colors[value][coverage[value] > 0] = color
+        
+        self._label_stamps = (coverage, colors)
+        self._label_layer = np.zeros((n_rows * cell_h, n_cols * cell_w, 3), dtype=np.uint8)
+        self._label_alpha = np.zeros((n_rows * cell_h, n_cols * cell_w), dtype=np.uint8)
+        self._label_pixels = None
+        self._label_grid = None
+        self._overlay_key = None
+        self._overlay_geometry = (height, width, n_rows, n_cols)
+    
+    
+    def _update_labels(self, grid):
+        """
+        Rewrite the label stamps of cells whose state changed.
+        """
+        rows, cols = self._changed_cells(self._label_grid, grid)
+        self.cells_updated = len(rows)
+        if len(rows) == 0:
+            return
+        
+        n_rows, n_cols = grid.shape
+        coverage, colors = self._label_stamps
+        _, cell_h, cell_w = coverage.shape
+        values = np.clip(grid[rows, cols], 0, len(coverage) - 1)
+        
+        layer = self._label_layer.reshape(n_rows, cell_h, n_cols, cell_w, 3)
+        layer[rows, :, cols, :] = colors[values]
+        alpha = self._label_alpha.reshape(n_rows, cell_h, n_cols, cell_w)
+        alpha[rows, :, cols, :] = coverage[values]
+        
+        # Pixels touched by any glyph, with their color and coverage, for compositing
+        self._label_pixels = _layer_pixels(self._label_layer, self._label_alpha, self._overlay_geometry[1])
+        
+        self._label_grid = grid.copy()
+        increment_counter('render_cells_updated', len(rows))
+    
+    
+    def _blend_path(self, image, path, n_rows, n_cols):
+        """
+        Alpha-blend the path layer onto an image (in place).
+        """
+        if not path or len(path) < 2:
+            return
+        
+        height, width = image.shape[:2]
+        geometry = (height, width, n_rows, n_cols)
+        path = [tuple(p) for p in path]
+        
+        if path != self._path or geometry != self._path_geometry:
+            blank = np.zeros((height, width, 3), dtype=np.uint8)
+            layer = draw_path_on_grid(blank, path, n_rows, n_cols, self.path_color, self.path_thickness)
+            alpha = (layer.any(axis=2) * round(255 * self.path_alpha)).astype(np.uint8)
+            self._path_pixels = _layer_pixels(layer, alpha, width)
+            self._path = path
+            self._path_geometry = geometry
+        
+        _composite(image, self._path_pixels)
+    
+    
+    def render_overlay(self, image, grid, path=None):
+        """
+        Draw grid lines, cell labels and the path on top of a camera image.
+        
+        Produces the same picture as draw_grid_on_image + annotate_grid_cells +
+        draw_path_on_grid, with the path alpha-blended.
+        
+        Args:
+            image: Top-down BGR image
+            grid: OccupancyGrid or 2D array of cell values
+            path: Optional list of (row, col) positions
+        
+        Returns:
+            numpy.ndarray: New image with the overlay
+        """
+        cells, key = self._grid_array(grid)
+        n_rows, n_cols = cells.shape
+        height, width = image.shape[:2]
+        
+        self.cells_updated = 0
+        
+        with profile_stage('render'):
+            if self._overlay_geometry != (height, width, n_rows, n_cols):
+                self._build_overlay(height, width, n_rows, n_cols)
+            
+            if not self._same_version(key, self._overlay_key):
+                self._update_labels(cells)
+                self._overlay_key = key
+            
+            result = image.copy()
+            rows, row_colors, cols, col_colors = self._line_pixels
+            result[rows] = row_colors
+            result[:, cols] = col_colors
+            if self._label_pixels is not None:
+                _composite(result, self._label_pixels)
+            self._blend_path(result, path, n_rows, n_cols)
+        
+        return result
+    
+    
+    def _build_cell_stamps(self, cell_size, n_values):
+        """
+        Render one colored, outlined and labelled cell per state.
+        """
+        stamps = np.full((n_values, cell_size, cell_size, 3), 255, dtype=np.uint8)
+        
+        for value, (color, text) in CELL_COLORS.items():
+            stamp = stamps[value]
+            stamp[:] = color
+            cv2.rectangle(stamp, (0, 0), (cell_size - 1, cell_size - 1), (0, 0, 0), 1)
+            if text:
+                # Same label placement as OccupancyGrid.visualize
+                cv2.putText(stamp, text, (cell_size // 2 - 10, cell_size // 2 + 5),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        
+        return stamps
+    
+    
+    def render_grid(self, grid, cell_size=50, path=None):
+        """
+        Render an occupancy grid view (like OccupancyGrid.visualize), optionally with a path.
+        
+        Args:
+            grid: OccupancyGrid or 2D array of cell values
+            cell_size: Size of each cell in pixels
+            path: Optional list of (row, col) positions
+        
+        Returns:
+            numpy.ndarray: BGR image (a copy; the cached image is not modified)
+        """
+        cells, key = self._grid_array(grid)
+        n_rows, n_cols = cells.shape
+        
+        self.cells_updated = 0
+        
+        with profile_stage('render'):
+            if self._grid_geometry != (n_rows, n_cols, cell_size):
+                n_values = max(CELL_COLORS) + 1
+                self._cell_stamps = self._build_cell_stamps(cell_size, n_values)
+                self._grid_image = np.zeros((n_rows * cell_size, n_cols * cell_size, 3), dtype=np.uint8)
+                self._cell_grid = None
+                self._grid_key = None
+                self._grid_geometry = (n_rows, n_cols, cell_size)
+            
+            if not self._same_version(key, self._grid_key):
+                rows, cols = self._changed_cells(self._cell_grid, cells)
+                self.cells_updated = len(rows)
+                if len(rows):
+                    values = np.clip(cells[rows, cols], 0, len(self._cell_stamps) - 1)
+                    view = self._grid_image.reshape(n_rows, cell_size, n_cols, cell_size, 3)
+                    view[rows, :, cols, :] = self._cell_stamps[values]
+                    self._cell_grid = cells.copy()
+                    increment_counter('render_cells_updated', len(rows))
+                self._grid_key = key
+            
+            result = self._grid_image.copy()
+            self._blend_path(result, path, n_rows, n_cols)
+        
+        return result
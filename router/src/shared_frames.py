@@ -0,0 +1,557 @@
+"""
+Shared-memory frame transport module.
+Moves camera frames between the capture process and detection worker processes
+without pickling them.
+
+SharedFrameRing is a multiprocessing.shared_memory block holding a small header, a
+metadata row per slot and a fixed number of frame slots. Producers write frames
+straight into a slot (CameraStream.read_frame_into decodes into it) and consumers
+get NumPy views of the slot, so a frame crosses the process boundary with no copy.
+
+Ownership handoff is lock-free and uses a per-slot sequence number (a seqlock):
+    - the single writer makes the sequence odd, fills the slot, then makes it even
+      again and publishes the slot as the latest frame,
+    - a reader records the even sequence, marks the slot as claimed (the writer
+      skips claimed slots while unclaimed ones are available) and, once it is done
+      with the view, checks that the sequence is unchanged; if the writer had to
+      reuse the slot the read is reported as torn and its result discarded.
+Worker k of N only takes frames whose write number is k mod N, so workers never
+process the same frame and no inter-process lock is needed.
+
+Usage:
+    ring = SharedFrameRing((480, 640, 3), slots=6)
+    slot, view = ring.begin_write()
+    stream.read_frame_into(view)
+    ring.end_write(slot, frame_id=0, timestamp=time.perf_counter())
+    
+    reader = SharedFrameRing.attach(ring.name)      # in another process
+    with reader.read_latest(timeout=1.0) as frame:
+        top_down = cv2.warpPerspective(frame.image, H, (800, 800))
+        ok = frame.valid()
+"""
+
+import multiprocessing
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from grid_mapper import GridMapper
+from occupancy_grid import OccupancyGrid
+from profiling import increment_counter
+
+
+RING_MAGIC = 0x44465046524d31    # 'DFPFRM1'
+
+# Header fields (int64)
+HEADER_FIELDS = 8
+H_MAGIC, H_SLOTS, H_HEIGHT, H_WIDTH, H_CHANNELS, H_WRITES, H_LATEST = range(7)
+
+# Per-slot metadata fields (int64)
+SLOT_FIELDS = 4
+S_SEQ, S_FRAME_ID, S_CLAIM, S_WRITE = range(4)
+
+ALIGNMENT = 64
+
+
+def _aligned(offset):
+    """Round an offset up to the next cache-line boundary."""
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _layout(slots):
+    """Get the byte offsets of the slot metadata, timestamps and frame data."""
+    meta_offset = _aligned(HEADER_FIELDS * 8)
+    stamp_offset = _aligned(meta_offset + slots * SLOT_FIELDS * 8)
+    data_offset = _aligned(stamp_offset + slots * 8)
+    return meta_offset, stamp_offset, data_offset
+
+
+class SharedFrame:
+    """
+    A claimed view of one ring slot. Use as a context manager to release the claim.
+    """
+    
+    def __init__(self, ring, slot, seq, frame_id, timestamp, write_number):
+        self.ring = ring
+        self.slot = slot
+        self.seq = seq
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+        self.write_number = write_number
+        self.image = ring.frames[slot]
+    
+    
+    def valid(self):
+        """
+        Check that the writer has not reused the slot since the frame was claimed.
+        
+        Returns:
+            bool: True if everything read from the view so far is consistent
+        """
+        return int(self.ring.meta[self.slot, S_SEQ]) == self.seq
+    
+    
+    def release(self):
+        """
+        Give the slot back to the writer.
+        """
+        if self.image is not None:
+            self.ring.meta[self.slot, S_CLAIM] = 0
+            self.image = None
+    
+    
+    def __enter__(self):
+        """Context manager entry."""
+        return self
+    
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit."""
+        self.release()
+
+
+class SharedFrameRing:
+    """
+    Fixed-size ring of frame slots in shared memory with seqlock handoff.
+    
+    One process writes; any number of processes read.
+    """
+    
+    def __init__(self, shape=None, slots=4, name=None, create=True):
+        """
+        Create a new ring or attach to an existing one.
+        
+        Args:
+            shape: Frame shape (height, width, channels); required when creating
+            slots: Number of frame slots (default: 4)
+            name: Shared memory name (default: generated when creating)
+            create: True to create the ring, False to attach to ring `name`
+        """
+        self.owner = create
+        
+        if create:
+            height, width, channels = shape
+            size = _layout(slots)[2] + slots * height * width * channels
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+            header[:] = 0
+            header[[H_MAGIC, H_SLOTS, H_HEIGHT, H_WIDTH, H_CHANNELS]] = [RING_MAGIC, slots, height, width, channels]
+            header[H_LATEST] = -1
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+            if header[H_MAGIC] != RING_MAGIC:
+                self.shm.close()
+                raise ValueError(f"Shared memory '{name}' is not a frame ring")
+        
+        self.header = header
+        self.slots = int(header[H_SLOTS])
+        self.shape = (int(header[H_HEIGHT]), int(header[H_WIDTH]), int(header[H_CHANNELS]))
+        
+        meta_offset, stamp_offset, data_offset = _layout(self.slots)
+        self.meta = np.ndarray((self.slots, SLOT_FIELDS), dtype=np.int64, buffer=self.shm.buf, offset=meta_offset)
+        self.stamps = np.ndarray((self.slots,), dtype=np.float64, buffer=self.shm.buf, offset=stamp_offset)
+        self.frames = np.ndarray((self.slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf, offset=data_offset)
+        
+        if create:
+            self.meta[:] = 0
+            self.meta[:, S_WRITE] = -1
+            self.stamps[:] = 0.0
+        
+        self._pid = os.getpid()
+        self.copies = 0
+    
+    
+    @classmethod
+    def attach(cls, name):
+        """
+        Attach to a ring created by another process.
+        
+        Args:
+            name: Shared memory name (SharedFrameRing.name)
+        
+        Returns:
+            SharedFrameRing: Attached ring
+        """
+        return cls(name=name, create=False)
+    
+    
+    @property
+    def name(self):
+        """Shared memory name to pass to other processes."""
+        return self.shm.name
+    
+    
+    @property
+    def frames_written(self):
+        """Number of frames published so far."""
+        return int(self.header[H_WRITES])
+    
+    
+    def begin_write(self):
+        """
+        Pick a slot for the next frame and mark it as being written.
+        
+        Returns:
+            tuple: (slot index, writable NumPy view of the slot)
+        """
+        start = (int(self.header[H_LATEST]) + 1) % self.slots
+        slot = start
+        for i in range(self.slots):
+            candidate = (start + i) % self.slots
+            if self.meta[candidate, S_CLAIM] == 0:
+                slot = candidate
+                break
+        else:
+            # Every slot is claimed: reuse the oldest; its reader sees a torn read
+            increment_counter('shm_slot_steals')
+        
+        self.meta[slot, S_SEQ] += 1
+        self.meta[slot, S_WRITE] = -1
+        return slot, self.frames[slot]
+    
+    
+    def end_write(self, slot, frame_id, timestamp):
+        """
+        Publish a slot filled after begin_write.
+        
+        Args:
+            slot: Slot index from begin_write
+            frame_id: Frame number
+            timestamp: Capture time (time.perf_counter())
+        """
+        writes = int(self.header[H_WRITES])
+        self.meta[slot, S_FRAME_ID] = frame_id
+        self.stamps[slot] = timestamp
+        self.meta[slot, S_WRITE] = writes
+        self.meta[slot, S_SEQ] += 1
+        self.header[H_LATEST] = slot
+        self.header[H_WRITES] = writes + 1
+        increment_counter('shm_frames_written')
+    
+    
+    def abort_write(self, slot):
+        """
+        Return a slot from begin_write without publishing it.
+        
+        Args:
+            slot: Slot index from begin_write
+        """
+        self.meta[slot, S_SEQ] += 1
+    
+    
+    def write(self, frame, frame_id, timestamp=None):
+        """
+        Copy a frame into the ring and publish it.
+        
+        Args:
+            frame: Frame with the ring's shape
+            frame_id: Frame number
+            timestamp: Capture time (default: now)
+        """
+        slot, view = self.begin_write()
+        np.copyto(view, frame)
+        self.copies += 1
+        increment_counter('frame_copies')
+        self.end_write(slot, frame_id, time.perf_counter() if timestamp is None else timestamp)
+    
+    
+    def read_latest(self, after=-1, stripe=(0, 1), timeout=None):
+        """
+        Claim the newest published frame.
+        
+        Args:
+            after: Only return frames with a write number greater than this
+            stripe: (k, n): only return frames whose write number is k mod n
+            timeout: Maximum wait in seconds (default: wait forever)
+        
+        Returns:
+            SharedFrame: Claimed frame, or None on timeout
+        """
+        offset, stride = stripe
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        
+        while True:
+            seqs = self.meta[:, S_SEQ].copy()
+            writes = self.meta[:, S_WRITE].copy()
+            candidates = (seqs % 2 == 0) & (writes > after) & (writes % stride == offset)
+            
+            if candidates.any():
+                slot = int(np.argmax(np.where(candidates, writes, -1)))
+                seq = int(seqs[slot])
+                
+                self.meta[slot, S_CLAIM] = self._pid
+                if int(self.meta[slot, S_SEQ]) == seq and int(self.meta[slot, S_WRITE]) == writes[slot]:
+                    increment_counter('shm_frames_read')
+                    return SharedFrame(self, slot, seq, int(self.meta[slot, S_FRAME_ID]),
+                                       float(self.stamps[slot]), int(writes[slot]))
+                self.meta[slot, S_CLAIM] = 0
+                continue
+            
+            if deadline is not None and time.perf_counter() >= deadline:
+                return None
+            time.sleep(0.0005)
+    
+    
+    def frame_at(self, slot, seq):
+        """
+        Claim a specific slot if it still holds the expected frame.
+        
+        Args:
+            slot: Slot index
+            seq: Sequence number the slot had when the frame was published
+        
+        Returns:
+            SharedFrame: Claimed frame, or None if the slot has been reused
+        """
+        self.meta[slot, S_CLAIM] = self._pid
+        if int(self.meta[slot, S_SEQ]) != seq:
+            self.meta[slot, S_CLAIM] = 0
+            return None
+        return SharedFrame(self, slot, seq, int(self.meta[slot, S_FRAME_ID]),
+                           float(self.stamps[slot]), int(self.meta[slot, S_WRITE]))
+    
+    
+    def close(self):
+        """
+        Detach from the shared memory, and remove it if this process created it.
+        """
+        if self.shm is None:
+            return
+        self.header = self.meta = self.stamps = self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+        self.shm = None
+    
+    
+    def __enter__(self):
+        """Context manager entry."""
+        return self
+    
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit."""
+        self.close()
+
+
+def detection_worker(ring_name, output_name, worker_index, workers, classifier, n_rows, n_cols,
+                     warp_size, homography, results, stop_event):
+    """
+    Detection process: warp and classify frames from the input ring.
+    
+    The top-down view is warped straight into this worker's output ring, so neither
+    the camera frame nor the warped image is pickled; only the small cell grid and
+    the slot reference travel through the results queue.
+    
+    Args:
+        ring_name: Input SharedFrameRing name
+        output_name: This worker's output SharedFrameRing name (top-down views)
+        worker_index: Index k of this worker (takes write numbers k mod workers)
+        workers: Total number of workers
+        classifier: CellClassifier
+        n_rows: Number of grid rows
+        n_cols: Number of grid columns
+        warp_size: Size of the top-down view in pixels
+        homography: Homography to the top-down view, or None to resize the frame
+        results: multiprocessing.Queue for result dicts
+        stop_event: multiprocessing.Event that ends the loop
+    """
+    ring = SharedFrameRing.attach(ring_name)
+    output = SharedFrameRing.attach(output_name)
+    size = (warp_size, warp_size)
+    last = -1
+    processed = 0
+    torn = 0
+    
+    try:
+        while not stop_event.is_set():
+            frame = ring.read_latest(after=last, stripe=(worker_index, workers), timeout=0.1)
+            if frame is None:
+                continue
+            
+            started = time.perf_counter()
+            out_slot, top_down = output.begin_write()
+            
+            with frame:
+                last = frame.write_number
+                if homography is None:
+                    cv2.resize(frame.image, size, dst=top_down, interpolation=cv2.INTER_AREA)
+                else:
+                    cv2.warpPerspective(frame.image, homography, size, dst=top_down)
+                intact = frame.valid()
+            
+            if not intact:
+                output.abort_write(out_slot)
+                torn += 1
+                continue
+            
+            grid_mapper = GridMapper(top_down, n_rows, n_cols, verbose=False)
+            classifications = classifier.classify_all_cells(grid_mapper)
+            output.end_write(out_slot, frame.frame_id, frame.timestamp)
+            processed += 1
+            
+            results.put({
+                'worker': worker_index,
+                'frame_id': frame.frame_id,
+                'captured_at': frame.timestamp,
+                'grid': classifications.astype(np.uint8),
+                'robot_location': classifier.robot_location,
+                'output_slot': out_slot,
+                'output_seq': int(output.meta[out_slot, S_SEQ]),
+                'timings': {'warp_classify_ms': (time.perf_counter() - started) * 1000.0},
+                'processed': processed,
+                'torn_reads': torn
+            })
+    finally:
+        ring.close()
+        output.close()
+
+
+class DetectionProcessPool:
+    """
+    Detection worker processes fed from a SharedFrameRing.
+    """
+    
+    def __init__(self, ring, classifier, n_rows, n_cols, warp_size=800, homography=None, workers=2,
+                 output_slots=4, start_method='spawn'):
+        """
+        Initialize the pool.
+        
+        Args:
+            ring: SharedFrameRing the capture side writes into
+            classifier: CellClassifier (pickled once per worker at start)
+            n_rows: Number of grid rows
+            n_cols: Number of grid columns
+            warp_size: Size of the top-down view in pixels (default: 800)
+            homography: Homography to the top-down view, or None to resize the frame
+            workers: Number of worker processes (default: 2)
+            output_slots: Top-down slots per worker (default: 4)
+            start_method: multiprocessing start method (default: 'spawn', works everywhere)
+        """
+        self.ring = ring
+        self.classifier = classifier
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.warp_size = warp_size
+        self.homography = homography
+        self.workers = workers
+        self.output_slots = output_slots
+        
+        self._context = multiprocessing.get_context(start_method)
+        self.results = self._context.Queue()
+        self._stop = self._context.Event()
+        self.outputs = []
+        self.processes = []
+        
+        self.processed = {}
+        self.torn_reads = {}
+        self.stale_outputs = 0
+        self.copies = 0
+    
+    
+    def start(self):
+        """
+        Create the output rings and start the worker processes.
+        
+        Returns:
+            DetectionProcessPool: self, for chaining
+        """
+        for k in range(self.workers):
+            output = SharedFrameRing((self.warp_size, self.warp_size, 3), slots=self.output_slots)
+            process = self._context.Process(
+                target=detection_worker, name=f'detect-{k}', daemon=True,
+                args=(self.ring.name, output.name, k, self.workers, self.classifier, self.n_rows,
+                      self.n_cols, self.warp_size, self.homography, self.results, self._stop))
+            process.start()
+            self.outputs.append(output)
+            self.processes.append(process)
+        return self
+    
+    
+    def get(self, timeout=None):
+        """
+        Wait for the next detection result and turn it into a pipeline packet.
+        
+        The top-down view is copied out of the worker's output ring (one copy per
+        emitted frame, so the packet stays valid after the slot is reused).
+        
+        Args:
+            timeout: Maximum wait in seconds
+        
+        Returns:
+            dict: Packet with frame_id, captured_at, top_down, occupancy_grid and
+                  timings, or None on timeout or when the output slot was reused
+        """
+        try:
+            result = self.results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        
+        worker = result['worker']
+        self.processed[worker] = result['processed']
+        self.torn_reads[worker] = result['torn_reads']
+        
+        frame = self.outputs[worker].frame_at(result['output_slot'], result['output_seq'])
+        if frame is None:
+            self.stale_outputs += 1
+            return None
+        with frame:
+            top_down = frame.image.copy()
+            intact = frame.valid()
+        if not intact:
+            self.stale_outputs += 1
+            return None
+        
+        self.copies += 1
+        increment_counter('frame_copies')
+        
+        occupancy_grid = OccupancyGrid(self.n_rows, self.n_cols)
+        occupancy_grid.from_classifications(result['grid'].astype(int))
+        occupancy_grid.robot_location = result['robot_location']
+        
+        return {
+            'frame_id': result['frame_id'],
+            'captured_at': result['captured_at'],
+            'top_down': top_down,
+            'occupancy_grid': occupancy_grid,
+            'timings': result['timings']
+        }
+    
+    
+    def stop(self, timeout=2.0):
+        """
+        Stop the workers and free the output rings.
+        
+        Args:
+            timeout: Maximum wait per process in seconds
+        """
+        self._stop.set()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        for output in self.outputs:
+            output.close()
+        self.processes = []
+        self.outputs = []
+    
+    
+    def stats(self):
+        """
+        Summarize worker throughput and transport health.
+        
+        Returns:
+            dict: Frames processed per worker, torn reads, stale outputs and copies
+        """
+        return {
+            'workers': self.workers,
+            'processed': sum(self.processed.values()),
+            'torn_reads': sum(self.torn_reads.values()),
+            'stale_outputs': self.stale_outputs,
+            'copies': self.copies
+        }
@@ -42,9 +42,18 @@ def test_imports():
         'camera_stream',
         'homography',
         'grid_mapper',
+        'costmap',
+        'hierarchical_planner',
+        'path_smoothing',
+        'multi_camera',
+        'pipeline',
+        'recorder',
+        'render_cache',
+        'shared_frames',
         'detector',
         'occupancy_grid',
         'planner',
+        'profiling',
         'utils'
     ]
     
@@ -170,6 +179,560 @@ def test_functionality():
         print(f"  ✗ Detector test failed: {e}")
         return False
     
+    # Test 5: Profiling
+    print("\n[Test 5] Profiling...")
+    try:
+        from profiling import Profiler
+        
+        profiler = Profiler()
+        with profiler.stage('disabled'):
+            pass
+        assert profiler.summary()['stages'] == {}, "Disabled profiler should record nothing"
+        
+        profiler.enable()
+        for _ in range(10):
+            with profiler.stage('planning'):
+                pass
+        profiler.increment('nodes_expanded_astar', 5)
+        
+        summary = profiler.summary()
+        assert summary['stages']['planning']['count'] == 10
+        assert summary['counters']['nodes_expanded_astar'] == 5
+        assert 'router_stage_seconds_count{stage="planning"} 10' in profiler.to_prometheus()
+        
+        print("  ✓ Profiler records stages and counters")
+    except Exception as e:
+        print(f"  ✗ Profiling test failed: {e}")
+        return False
+    
+    # Test 6: Planner context
+    print("\n[Test 6] Planner Context...")
+    try:
+        from planner import PlannerContext, astar
+        
+        grid = OccupancyGrid(5, 5)
+        grid.set_cell(2, 1, grid.BLOCK)
+        grid.set_cell(2, 2, grid.BLOCK)
+        
+        context = PlannerContext(5, 5)
+        for _ in range(3):
+            result = context.astar((0, 0), (4, 4), grid)
+            assert result.path == astar((0, 0), (4, 4), grid, verbose=False), "Paths should match astar"
+            assert result.cost == 8 and result.expanded > 0
+        
+        result = context.bfs((0, 0), (4, 4), grid)
+        assert result.found and result.cost == 8, "BFS should find a shortest path"
+        
+        grid.set_cell(4, 4, grid.BLOCK)
+        assert not context.astar((0, 0), (4, 4), grid).found, "Blocked goal should be unreachable"
+        
+        print("  ✓ Planner context works correctly")
+    except Exception as e:
+        print(f"  ✗ Planner context test failed: {e}")
+        return False
+    
+    # Test 7: Cost map
+    print("\n[Test 7] Cost Map...")
+    try:
+        from costmap import CostMap
+        from planner import PlannerContext, astar
+        
+        # Open 7x7 room with a single shelf in the middle
+        grid = OccupancyGrid(7, 7)
+        grid.set_cell(3, 3, grid.BLOCK)
+        
+        cost_map = CostMap(inflation_radius=2.0, penalty=5.0)
+        cost_map.update(grid)
+        assert cost_map.clearance[3, 3] == 0 and cost_map.clearance[3, 4] == 1
+        assert cost_map.get_cost(3, 4) > cost_map.get_cost(3, 6) == 1.0
+        
+        costs_before = cost_map.costs
+        cost_map.update(grid)
+        assert cost_map.costs is costs_before, "Unchanged grid should reuse the cached cost map"
+        
+        path = astar((3, 0), (3, 6), grid, verbose=False, cost_map=cost_map)
+        result = PlannerContext().astar((3, 0), (3, 6), grid, cost_map=cost_map)
+        assert result.cost == cost_map.path_cost(path), "Context and astar costs should match"
+        assert min(cost_map.clearance[r, c] for r, c in path) > 1, "Path should keep clear of the shelf"
+        
+        print("  ✓ Cost map works correctly")
+    except Exception as e:
+        print(f"  ✗ Cost map test failed: {e}")
+        return False
+    
+    # Test 8: Hierarchical planner
+    print("\n[Test 8] Hierarchical Planner...")
+    try:
+        from hierarchical_planner import HierarchicalPlanner
+        from planner import astar
+        
+        # 12x12 grid, 4x4 clusters, wall along row 5 with a gap at column 10
+        grid = OccupancyGrid(12, 12)
+        for col in range(12):
+            if col != 10:
+                grid.set_cell(5, col, grid.BLOCK)
+        
+        planner = HierarchicalPlanner(grid, cluster_size=4)
+        path = planner.find_path((0, 0), (11, 0))
+        assert path is not None and path[0] == (0, 0) and path[-1] == (11, 0)
+        assert (5, 10) in path, "Path should go through the gap"
+        assert all(abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1 for a, b in zip(path, path[1:]))
+        assert len(path) == len(astar((0, 0), (11, 0), grid, verbose=False))
+        
+        # Closing the gap only rebuilds the clusters around it
+        grid.set_cell(5, 10, grid.BLOCK)
+        rebuilt = planner.update(grid)
+        assert (1, 2) in rebuilt and len(rebuilt) < 9, f"Unexpected rebuild: {rebuilt}"
+        assert planner.find_path((0, 0), (11, 0)) is None, "Closed wall should block the path"
+        
+        print("  ✓ Hierarchical planner works correctly")
+    except Exception as e:
+        print(f"  ✗ Hierarchical planner test failed: {e}")
+        return False
+    
+    # Test 9: Path smoothing
+    print("\n[Test 9] Path Smoothing...")
+    try:
+        from path_smoothing import (LineOfSight, path_to_motion_commands, smooth_path,
+                                    theta_star, waypoints_length)
+        from planner import astar
+        
+        path = [(0, 0), (0, 1), (0, 2), (0, 3), (1, 3), (2, 3)]
+        commands = path_to_motion_commands(path, initial_heading='UP')
+        assert commands == ['TURN RIGHT', 'FORWARD 3', 'TURN RIGHT', 'FORWARD 2'], f"Got {commands}"
+        
+        # Diagonal blocks: the segment through their shared corner is not clear
+        grid = OccupancyGrid(6, 6)
+        grid.set_cell(2, 2, grid.BLOCK)
+        grid.set_cell(3, 3, grid.BLOCK)
+        line_of_sight = LineOfSight(grid)
+        assert line_of_sight.is_clear((0, 0), (5, 0))
+        assert not line_of_sight.is_clear((0, 5), (5, 0)), "Should not cut between diagonal blocks"
+        
+        path = astar((5, 0), (0, 5), grid, verbose=False)
+        waypoints = smooth_path(path, grid, line_of_sight)
+        assert waypoints[0] == (5, 0) and waypoints[-1] == (0, 5) and len(waypoints) < len(path)
+        assert all(line_of_sight.is_clear(a, b) for a, b in zip(waypoints, waypoints[1:]))
+        
+        any_angle = theta_star((5, 0), (0, 5), grid, line_of_sight, verbose=False)
+        assert waypoints_length(any_angle) < len(path) - 1
+        
+        print("  ✓ Path smoothing works correctly")
+    except Exception as e:
+        print(f"  ✗ Path smoothing test failed: {e}")
+        return False
+    
+    # Test 10: Robot localization
+    print("\n[Test 10] Robot Localization...")
+    try:
+        from grid_mapper import GridMapper
+        
+        # 4x4 grid of 50px cells; the marker straddles cells (1, 0), (1, 1), (2, 0), (2, 1)
+        image = np.zeros((200, 200, 3), dtype=np.uint8)
+        image[85:125, 30:80] = (0, 0, 255)
+        image[10:13, 180:183] = (0, 0, 255)  # small speck of marker color elsewhere
+        grid_mapper = GridMapper(image, 4, 4, verbose=False)
+        
+        classifier = CellClassifier(robot_color='red')
+        location = classifier.robot_detector.locate(image, grid_mapper)
+        assert location is not None and location['cell'] == (2, 1), f"Got {location}"
+        assert abs(location['centroid'][0] - 54.5) < 1 and abs(location['centroid'][1] - 104.5) < 1
+        assert 0.9 < location['confidence'] < 1.0
+        
+        classifications = classifier.classify_all_cells(grid_mapper)
+        assert (classifications == CellClassifier.ROBOT).sum() == 1, "Exactly one robot cell expected"
+        assert classifications[2, 1] == CellClassifier.ROBOT
+        assert not (classifications == CellClassifier.BLOCK).any(), "The marker is not a block"
+        
+        # A marker covering 3x3 cells of a 5x5 grid must not wall the robot in
+        from occupancy_grid import build_occupancy_grid
+        from planner import find_path
+        
+        image = np.zeros((250, 250, 3), dtype=np.uint8)
+        image[60:190, 60:190] = (0, 0, 255)
+        image[0:50, 200:250] = 255
+        grid_mapper = GridMapper(image, 5, 5, verbose=False)
+        location = classifier.robot_detector.locate(image, grid_mapper)
+        assert location['marker_cells'][1:4, 1:4].all() and location['marker_cells'].sum() == 9
+        
+        grid = build_occupancy_grid(grid_mapper, classifier)
+        assert grid.get_robot_position() == (2, 2)
+        assert (grid.grid == grid.BLOCK).sum() == 1 and grid.grid[0, 4] == grid.BLOCK
+        assert find_path((2, 2), (0, 0), grid, verbose=False) is not None
+        
+        print("  ✓ Robot localization works correctly")
+    except Exception as e:
+        print(f"  ✗ Robot localization test failed: {e}")
+        return False
+    
+    # Test 11: Heading estimation and turn-aware planning
+    print("\n[Test 11] Heading-Aware Planning...")
+    try:
+        from grid_mapper import GridMapper
+        from path_smoothing import path_to_motion_commands
+        from planner import astar_with_heading
+        
+        # Red front marker right of the blue back marker: robot faces right (90 degrees)
+        image = np.zeros((200, 200, 3), dtype=np.uint8)
+        image[105:125, 110:130] = (0, 0, 255)
+        image[105:125, 70:90] = (255, 0, 0)
+        grid_mapper = GridMapper(image, 4, 4, verbose=False)
+        
+        classifier = CellClassifier(robot_color='red', back_color='blue')
+        location = classifier.robot_detector.locate(image, grid_mapper)
+        assert abs(location['heading'] - 90.0) < 1.0, f"Got heading {location['heading']}"
+        assert location['cell'] == (2, 1)
+        
+        # Facing up, going up first saves a turn compared with going right first
+        grid = OccupancyGrid(5, 5)
+        path = astar_with_heading((4, 0), (0, 4), grid, 'UP', turn_cost=1.0, verbose=False)
+        assert path[0] == (4, 0) and path[-1] == (0, 4) and len(path) == 9
+        commands = path_to_motion_commands(path, initial_heading='UP')
+        assert sum(c.startswith('TURN') for c in commands) == 1, f"Got {commands}"
+        
+        print("  ✓ Heading-aware planning works correctly")
+    except Exception as e:
+        print(f"  ✗ Heading-aware planning test failed: {e}")
+        return False
+    
+    # Test 12: Multi-camera fusion
+    print("\n[Test 12] Multi-Camera Fusion...")
+    try:
+        import tempfile
+        from camera_stream import CameraStream
+        from multi_camera import CameraSource, MultiCameraFusion
+        
+        # 3x5 world of 40px cells; camera a sees columns 0-2, camera b columns 2-4
+        size = 40
+        world = np.zeros((3 * size, 5 * size, 3), dtype=np.uint8)
+        world[0:size, size:2 * size] = 255
+        world[2 * size:3 * size, 4 * size:5 * size] = 255
+        world[size + 10:size + 30, 2 * size + 10:2 * size + 30] = (0, 0, 255)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            cv2.imwrite(os.path.join(tmp, 'a.png'), world[:, :3 * size])
+            cv2.imwrite(os.path.join(tmp, 'b.png'), world[:, 2 * size:])
+            shift = np.array([[1, 0, 2 * size], [0, 1, 0], [0, 0, 1]], dtype=np.float64)
+            sources = [CameraSource(CameraStream(os.path.join(tmp, 'a.png')), np.eye(3), name='a'),
+                       CameraSource(CameraStream(os.path.join(tmp, 'b.png')), shift, name='b', weight=0.5)]
+            
+            with MultiCameraFusion(sources, 3, 5, cell_pixels=size) as fusion:
+                grid = fusion.capture()
+                assert grid.grid[0, 1] == grid.BLOCK and grid.grid[2, 4] == grid.BLOCK
+                assert grid.get_robot_position() == (1, 2), "Robot should be seen in the overlap"
+                assert (grid.grid == grid.BLOCK).sum() == 2
+                assert set(fusion.last_report['cameras']) == {'a', 'b'}
+                assert fusion.last_report['fused_age_ms'] >= 0
+                
+                # Conflicting votes in the overlap: the heavier camera wins
+                results = fusion.last_results
+                results[1]['blocks'][:, 0] = True
+                assert fusion.fuse(results).grid[0, 2] == grid.FREE
+            
+            # A marker covering cells in both views is fused without blocks around it
+            world = np.zeros((3 * size, 5 * size, 3), dtype=np.uint8)
+            world[5:3 * size - 5, 2 * size + 5:4 * size - 5] = (0, 0, 255)
+            cv2.imwrite(os.path.join(tmp, 'a.png'), world[:, :3 * size])
+            cv2.imwrite(os.path.join(tmp, 'b.png'), world[:, 2 * size:])
+            sources = [CameraSource(CameraStream(os.path.join(tmp, 'a.png')), np.eye(3), name='a', weight=0.5),
+                       CameraSource(CameraStream(os.path.join(tmp, 'b.png')), shift, name='b')]
+            
+            with MultiCameraFusion(sources, 3, 5, cell_pixels=size) as fusion:
+                grid = fusion.capture()
+                assert not (grid.grid == grid.BLOCK).any(), f"Phantom blocks under the marker: {grid.grid}"
+                assert grid.get_robot_position() == (1, 2)
+                assert grid.robot_location['marker_cells'][:, 2:4].all()
+        
+        print("  ✓ Multi-camera fusion works correctly")
+    except Exception as e:
+        print(f"  ✗ Multi-camera fusion test failed: {e}")
+        return False
+    
+    # Test 13: Pipelined processing
+    print("\n[Test 13] Frame Pipeline...")
+    try:
+        import tempfile
+        import time
+        from camera_stream import CameraStream
+        from pipeline import LatestQueue, RouterPipeline
+        
+        queue = LatestQueue(maxsize=1)
+        queue.put(1)
+        queue.put(2)
+        assert queue.get(timeout=0.1) == 2 and queue.superseded == 1, "Newer items should supersede older ones"
+        assert queue.get(timeout=0.01) is None
+        
+        # 4x4 scene of 50px cells on a black floor: robot at (3, 0), block at (1, 1)
+        image = np.zeros((200, 200, 3), dtype=np.uint8)
+        image[160:190, 10:40] = (0, 0, 255)
+        image[50:100, 50:100] = 255
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'scene.png')
+            cv2.imwrite(path, image)
+            stream = CameraStream(path)
+            
+            with RouterPipeline(stream, 4, 4, goal=(0, 0), warp_size=200, max_fps=50) as pipeline:
+                results = [pipeline.get_result(timeout=2.0) for _ in range(3)]
+            
+            assert all(r is not None for r in results), "Pipeline should emit results"
+            assert results[-1]['robot'] == (3, 0) and results[-1]['path'][-1] == (0, 0)
+            assert results[0]['frame_id'] < results[-1]['frame_id']
+            assert all(r['latency_ms'] > 0 for r in results)
+            assert pipeline.stats()['frames_emitted'] >= 3
+        
+        # A source that keeps failing is retried with a back-off, then given up
+        class FailingStream:
+            is_image = False
+            reads = 0
+            
+            def read_frame(self):
+                FailingStream.reads += 1
+                return False, None
+        
+        with RouterPipeline(FailingStream(), 4, 4, goal=(0, 0), max_read_failures=5) as pipeline:
+            time.sleep(0.3)
+            assert not pipeline.is_capturing(), "Capture should stop after repeated failures"
+        assert FailingStream.reads == 5, f"Got {FailingStream.reads} reads"
+        
+        print("  ✓ Frame pipeline works correctly")
+    except Exception as e:
+        print(f"  ✗ Frame pipeline test failed: {e}")
+        return False
+    
+    # Test 14: Render cache
+    print("\n[Test 14] Render Cache...")
+    try:
+        from occupancy_grid import OccupancyGrid
+        from render_cache import GridRenderCache
+        from utils import draw_grid_on_image, annotate_grid_cells
+        
+        grid = OccupancyGrid(4, 4)
+        grid.set_cell(3, 0, OccupancyGrid.ROBOT)
+        grid.set_cell(1, 1, OccupancyGrid.BLOCK)
+        image = np.full((200, 200, 3), 40, dtype=np.uint8)
+        
+        cache = GridRenderCache()
+        overlay = cache.render_overlay(image, grid)
+        expected = annotate_grid_cells(draw_grid_on_image(image, 4, 4), grid.grid, 4, 4)
+        assert np.array_equal(overlay, expected), "Cached overlay should match the uncached drawing"
+        assert cache.cells_updated == 16
+        
+        cache.render_overlay(image, grid)
+        assert cache.cells_updated == 0, "Unchanged grid should not redraw any cell"
+        
+        grid.set_cell(2, 2, OccupancyGrid.BLOCK)
+        overlay = cache.render_overlay(image, grid, path=[(3, 0), (2, 0), (1, 0)])
+        assert cache.cells_updated == 1, "Only the changed cell should be redrawn"
+        assert not np.array_equal(overlay[125:175, 25], image[125:175, 25]), "Path should be blended in"
+        
+        view = cache.render_grid(grid, cell_size=20)
+        assert view.shape == (80, 80, 3) and tuple(view[50, 50]) == (128, 128, 128)
+        grid.set_cell(2, 2, OccupancyGrid.FREE)
+        view = cache.render_grid(grid, cell_size=20)
+        assert cache.cells_updated == 1 and tuple(view[50, 50]) == (255, 255, 255)
+        
+        print("  ✓ Render cache works correctly")
+    except Exception as e:
+        print(f"  ✗ Render cache test failed: {e}")
+        return False
+    
+    # Test 15: Grid recorder and replay
+    print("\n[Test 15] Grid Recorder...")
+    try:
+        import tempfile
+        from occupancy_grid import OccupancyGrid
+        from planner import find_path
+        from recorder import GridRecorder, GridLogReader, replay
+        
+        rng = np.random.default_rng(0)
+        grid = OccupancyGrid(12, 12)
+        grids = []
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            log_path = os.path.join(tmp, 'run.grid')
+            
+            with GridRecorder(log_path, 12, 12, keyframe_interval=10) as recorder:
+                for frame in range(25):
+                    cells = np.zeros((12, 12), dtype=int)
+                    cells[rng.random((12, 12)) < 0.15] = OccupancyGrid.BLOCK
+                    cells[11, 0] = OccupancyGrid.ROBOT
+                    cells[0, 11] = OccupancyGrid.FREE
+                    grid.from_classifications(cells)
+                    path = find_path((11, 0), (0, 11), grid, verbose=False)
+                    recorder.record(grid, goal=(0, 11), path=path, timings={'plan_ms': 0.5})
+                    grids.append(cells)
+            
+            with GridLogReader(log_path) as reader:
+                records = list(reader)
+                assert len(records) == 25 and reader.summary()['keyframes'] == 3
+                assert all(np.array_equal(r['grid'], g) for r, g in zip(records, grids)), "Grids should round-trip"
+                assert np.array_equal(reader.read(17)['grid'], grids[17]), "Random access should decode deltas"
+                assert records[3]['robot'] == (11, 0) and records[3]['goal'] == (0, 11)
+            
+            # A crash mid-record leaves a truncated tail; a lost index is rebuilt
+            with open(log_path, 'ab') as f:
+                f.write(b'\x01\x02\x03')
+            os.remove(log_path + '.idx')
+            with GridLogReader(log_path) as reader:
+                assert len(reader) == 25
+            
+            results = replay(log_path, planners=['astar', 'context_astar'], verbose=False)
+            assert results['astar']['mismatches'] == 0 and results['context_astar']['mismatches'] == 0
+            assert results['astar']['frames'] == 25
+        
+        print("  ✓ Grid recorder works correctly")
+    except Exception as e:
+        print(f"  ✗ Grid recorder test failed: {e}")
+        return False
+    
+    # Test 16: Shared-memory frame transport
+    print("\n[Test 16] Shared-Memory Frames...")
+    try:
+        import tempfile
+        from camera_stream import CameraStream
+        from pipeline import RouterPipeline
+        from shared_frames import SharedFrameRing, S_CLAIM
+        
+        with SharedFrameRing((20, 30, 3), slots=3) as ring:
+            reader = SharedFrameRing.attach(ring.name)
+            ring.write(np.full((20, 30, 3), 7, dtype=np.uint8), frame_id=5)
+            
+            with reader.read_latest(timeout=0.5) as frame:
+                assert frame.frame_id == 5 and frame.image[0, 0, 0] == 7 and frame.valid()
+                assert np.shares_memory(frame.image, reader.frames), "Reader should get a zero-copy view"
+            
+            # A write into the slot after it was claimed makes the read torn
+            frame = reader.read_latest(timeout=0.5)
+            ring.meta[frame.slot, S_CLAIM] = 0
+            for i in range(3):
+                ring.write(np.zeros((20, 30, 3), dtype=np.uint8), frame_id=6 + i)
+            assert not frame.valid(), "Reused slot should be detected"
+            frame.release()
+            assert reader.read_latest(after=ring.frames_written - 1, timeout=0.01) is None
+            reader.close()
+        
+        # 4x4 scene of 50px cells on a black floor: robot at (3, 0)
+        image = np.zeros((200, 200, 3), dtype=np.uint8)
+        image[160:190, 10:40] = (0, 0, 255)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'scene.png')
+            cv2.imwrite(path, image)
+            stream = CameraStream(path)
+            
+            with RouterPipeline(stream, 4, 4, goal=(0, 3), warp_size=200, max_fps=50,
+                                detect_processes=1) as pipeline:
+                result = pipeline.get_result(timeout=30.0)
+            
+            assert result is not None and result['robot'] == (3, 0) and result['path'][-1] == (0, 3)
+            transport = pipeline.stats()['transport']
+            assert transport['frames_written'] >= 1 and transport['processed'] >= 1
+        
+        print("  ✓ Shared-memory frame transport works correctly")
+    except Exception as e:
+        print(f"  ✗ Shared-memory frame test failed: {e}")
+        return False
+    
+    # Test 17: Background model
+    print("\n[Test 17] Background Model...")
+    try:
+        import tempfile
+        from detector import BackgroundModel, CellClassifier
+        from grid_mapper import GridMapper
+        
+        # Unevenly lit, textured floor: a brightness ramp plus noise
+        rng = np.random.default_rng(1)
+        ramp = np.linspace(40, 160, 200, dtype=np.float32)[None, :, None]
+        floor = np.clip(ramp + rng.normal(0, 3, (200, 200, 3)), 0, 255).astype(np.uint8)
+        
+        model = BackgroundModel().fit(floor, 4, 4)
+        scene = floor.copy()
+        scene[55:95, 55:95] = 255                   # Block at (1, 1)
+        scene[160:190, 10:40] = (0, 0, 255)         # Robot at (3, 0)
+        
+        blocks = model.detect_cells(scene)
+        assert blocks[1, 1] and blocks.sum() == 1, "Only the block cell should be foreground"
+        
+        classifier = CellClassifier(background_model=model)
+        classifications = classifier.classify_all_cells(GridMapper(scene, 4, 4, verbose=False))
+        assert classifications[1, 1] == CellClassifier.BLOCK and classifications[3, 0] == CellClassifier.ROBOT
+        assert (classifications == CellClassifier.BLOCK).sum() == 1, "Bright empty cells must stay empty"
+        
+        # A marker spanning four cells is foreground too, but never a block
+        marker_scene = floor.copy()
+        marker_scene[55:95, 55:95] = 255
+        marker_scene[110:190, 10:90] = (0, 0, 255)
+        classifications = classifier.classify_all_cells(GridMapper(marker_scene, 4, 4, verbose=False))
+        assert model.detect_cells(marker_scene)[2:4, 0:2].all()
+        assert (classifications == CellClassifier.BLOCK).sum() == 1 and classifications[1, 1] == CellClassifier.BLOCK
+        assert (classifications == CellClassifier.ROBOT).sum() == 1
+        
+        # Grid size that does not divide the view: 19 cells of 10px leave a 10px margin
+        odd_model = BackgroundModel().fit(floor, 19, 19)
+        odd_mapper = GridMapper(marker_scene, 19, 19, verbose=False)
+        location = classifier.robot_detector.locate(marker_scene, odd_mapper)
+        assert location['marker_cells'].shape == (19, 19)
+        classifications = CellClassifier(background_model=odd_model).classify_all_cells(odd_mapper)
+        assert classifications.shape == (19, 19) and (classifications == CellClassifier.ROBOT).sum() == 1
+        assert not (classifications[11:19, 1:9] == CellClassifier.BLOCK).any()
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'floor.npz')
+            model.save(path)
+            loaded = BackgroundModel.load(path)
+            assert np.array_equal(loaded.detect_cells(scene), blocks)
+        
+        print("  ✓ Background model works correctly")
+    except Exception as e:
+        print(f"  ✗ Background model test failed: {e}")
+        return False
+    
+    # Test 18: Downscaled detection
+    print("\n[Test 18] Detection Resolution Policy...")
+    try:
+        from benchmark import generate_scene
+        from detector import BackgroundModel, CellClassifier
+        from grid_mapper import GridMapper
+        from homography import choose_warp_size, compute_homography, scale_homography
+        
+        assert choose_warp_size(10, 10, 16, max_size=800) == 160
+        assert choose_warp_size(10, 25, 16, max_size=800) == 400
+        assert choose_warp_size(60, 60, 16, max_size=800) == 800, "Never exceed the display size"
+        
+        scene = generate_scene(10, 10, density=0.3, cell_pixels=60, seed=3)
+        H, _ = compute_homography(scene['corners'], 600, 600)
+        small = choose_warp_size(10, 10, 16, max_size=600)
+        H_small = scale_homography(H, 600, small)
+        
+        corner = cv2.perspectiveTransform(np.float32([[scene['corners'][2]]]), H_small)[0, 0]
+        assert np.allclose(corner, [small - 1, small - 1], atol=0.5), "Scaled homography should map to the small view"
+        
+        predictions = []
+        for size, homography in ((600, H), (small, H_small)):
+            view = cv2.warpPerspective(scene['image'], homography, (size, size))
+            floor = cv2.warpPerspective(scene['background'], homography, (size, size))
+            classifier = CellClassifier(background_model=BackgroundModel().fit(floor, 10, 10))
+            predictions.append(classifier.classify_all_cells(GridMapper(view, 10, 10, verbose=False)))
+        
+        assert np.array_equal(predictions[0], scene['truth']), "Full-resolution detection should be exact"
+        assert np.array_equal(predictions[1], predictions[0]), "Downscaled detection should match full resolution"
+        
+        # The empty-floor reference is a separate noisy capture, but reproducible from the seed
+        row, col = np.argwhere(scene['truth'] == 0)[0]
+        cell = (slice(row * 60 + 10, row * 60 + 50), slice(col * 60 + 10, col * 60 + 50))
+        view = cv2.warpPerspective(scene['image'], H, (600, 600))[cell]
+        floor = cv2.warpPerspective(scene['background'], H, (600, 600))[cell]
+        assert not np.array_equal(view, floor), "Background should not share the scene's pixel noise"
+        assert abs(view.astype(float).mean() - floor.astype(float).mean()) < 3, "Background should show the same floor"
+        assert np.array_equal(generate_scene(10, 10, density=0.3, cell_pixels=60, seed=3)['background'],
+                              scene['background']), "Background should be reproducible from the seed"
+        
+        print("  ✓ Detection resolution policy works correctly")
+    except Exception as e:
+        print(f"  ✗ Detection resolution test failed: {e}")
+        return False
+    
     print("\n" + "="*60)
     print("✓ All functionality tests passed!")
     print("="*60)